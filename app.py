@@ -9,8 +9,10 @@ Para executar:
     python app.py
 """
 
-from flask import Flask, render_template, redirect, url_for, session, jsonify
-from config import SECRET_KEY, DEBUG, PORT, CODIGO_ACESSO_TAMANHO, CODIGO_ACESSO_DURACAO_HORAS
+import os
+from flask import Flask, render_template, redirect, url_for, session, jsonify, send_from_directory
+from config import (SECRET_KEY, DEBUG, PORT, CODIGO_ACESSO_TAMANHO, CODIGO_ACESSO_DURACAO_HORAS,
+                    FAVICON_MAX_AGE_SEGUNDOS)
 from modules.autenticacao import autenticacao_bp, verificar_sessao
 from modules.usuarios import usuarios_bp
 from modules.escolas import escolas_bp
@@ -18,7 +20,17 @@ from modules.gestores import gestores_bp
 from modules.fornecedores import fornecedores_bp
 from modules.produtos import produtos_bp
 from modules.pedidos import pedidos_bp
-from core.database import Database
+from modules.relatorios import relatorios_bp
+from core.cache import cache_referencias
+from core.invalidacao import barramento_invalidacao
+from core.relatorios import atualizador_relatorios
+from core.particionamento import gerenciador_particoes
+from core.codigos_acesso import gerenciador_codigos
+from core.saude import monitor_saude
+from core.resposta import comprimir_resposta
+from core.fragmentos import CacheFragmentos, cache_fragmentos
+from core.compilacao_templates import configurar_bytecode, aquecer_se_configurado
+from core.estaticos import gerenciador_ativos
 
 # ============================================
 # CRIAÇÃO DA APLICAÇÃO FLASK
@@ -31,6 +43,15 @@ app.secret_key = SECRET_KEY
 # Ativa modo de depuração: recarregamento automático e mensagens de erro detalhadas
 app.config['DEBUG'] = DEBUG
 
+# Bloco {% cache chave, ttl %} nos templates (core/fragmentos.py)
+app.jinja_env.add_extension(CacheFragmentos)
+
+# Bytecode dos templates em disco, compartilhado pelos workers (core/compilacao_templates.py)
+configurar_bytecode(app.jinja_env)
+
+# Pacotes CSS/JS com hash no nome, ativo() nos templates e cache imutável em /static (core/estaticos.py)
+gerenciador_ativos.instalar(app)
+
 # ============================================
 # REGISTRO DOS BLUEPRINTS (MÓDULOS)
 # ============================================
@@ -58,6 +79,83 @@ app.register_blueprint(produtos_bp)
 # RF07 - Gerenciar Pedidos
 app.register_blueprint(pedidos_bp)
 
+# Relatórios - Dashboards de vendas e estoque (rollups materializados)
+app.register_blueprint(relatorios_bp)
+
+
+# ============================================
+# PRÉ-CARREGAMENTO (GUNICORN --PRELOAD)
+# ============================================
+
+def precarregar():
+    """
+    Antecipa no processo mestre os imports que os módulos adiam (driver
+    async, SMTP/MIME, gzip do arquivamento), carrega todos os templates
+    e congela os objetos já criados.
+
+    Com --preload os workers nascem por fork e compartilham essas páginas;
+    gc.freeze() tira os objetos do mestre das coletas, que de outro modo
+    tocariam nos contadores de referência e copiariam as páginas em cada worker.
+    Sem --preload não é chamada: cada worker só paga o que de fato usa.
+    """
+    import gc
+    import gzip  # noqa: F401
+    import smtplib  # noqa: F401
+    from email.mime.multipart import MIMEMultipart  # noqa: F401
+    from email.mime.text import MIMEText  # noqa: F401
+    from core.database_async import DatabaseAsync
+
+    DatabaseAsync.disponivel()
+    aquecer_se_configurado(app.jinja_env)
+    gc.collect()
+    gc.freeze()
+
+
+# ============================================
+# SERVIÇOS DE SEGUNDO PLANO (POR WORKER)
+# ============================================
+
+# Threads de cada processo: verificação do banco (lida pelos healthchecks),
+# ouvinte LISTEN/NOTIFY de invalidação de cache, agendador dos rollups de
+# relatórios, manutenção das partições de logs e varredura de códigos de
+# acesso expirados. Todos os workers as executam; advisory locks e SKIP
+# LOCKED evitam trabalho duplicado entre eles.
+SERVICOS_SEGUNDO_PLANO = (monitor_saude, barramento_invalidacao, atualizador_relatorios,
+                          gerenciador_particoes, gerenciador_codigos)
+_servicos_pid = None
+
+
+@app.before_request
+def iniciar_servicos_segundo_plano():
+    """
+    Inicia as threads de segundo plano uma vez por processo.
+
+    Nunca na importação: com --preload o mestre importa a aplicação e
+    threads não atravessam o fork. No gunicorn o post_worker_init
+    (core/servidor.py) já as inicia antes da primeira conexão; fora dele
+    (python app.py, uvicorn) a primeira requisição as inicia. Depois disso
+    o custo por requisição é só a comparação do pid.
+    """
+    global _servicos_pid
+    if _servicos_pid == os.getpid():
+        return
+    for servico in SERVICOS_SEGUNDO_PLANO:
+        servico.garantir_iniciado()
+    _servicos_pid = os.getpid()
+
+
+# ============================================
+# COMPRESSÃO DE RESPOSTAS
+# ============================================
+
+@app.after_request
+def comprimir(resposta):
+    """
+    Comprime HTML/CSS/JS/JSON com br ou gzip conforme o Accept-Encoding
+    do cliente (core/resposta.py); estáticos de send_file passam direto.
+    """
+    return comprimir_resposta(resposta)
+
 
 # ============================================
 # ROTA PRINCIPAL (HOME)
@@ -69,12 +167,12 @@ def index():
     Rota raiz: Implementa healthcheck do banco antes de redirecionar
     
     Fluxo:
-    1. Verifica conectividade com PostgreSQL via banco_esta_ativo()
+    1. Consulta o último estado do banco (monitor_saude, sem abrir conexão)
     2. Se banco indisponível: exibe tela de carregamento com polling JS
     3. Se banco OK: segue fluxo de autenticação padrão (verificar_sessao)
     """
     # Healthcheck: evita erros de sessão se o banco estiver iniciando (ex: Docker)
-    if not banco_esta_ativo():
+    if not monitor_saude.pronto():
         return render_template('carregando.html')
 
     # Banco disponível: valida sessão do usuário via cookie
@@ -107,42 +205,6 @@ def home():
 # HEALTHCHECK DO BANCO DE DADOS
 # ============================================
 
-def banco_esta_ativo() -> bool:
-    """
-    Verifica disponibilidade do PostgreSQL executando query simples.
-    
-    Utilizado para:
-    - Evitar erros ao carregar app durante inicialização do container Docker
-    - Implementar retry logic no frontend via polling
-    - Garantir que migrations foram aplicadas antes de aceitar requests
-    
-    Returns:
-        bool: True se SELECT 1 executou com sucesso, False caso contrário
-    """
-    try:
-        conexao = Database.conectar()
-        if not conexao:
-            return False
-        cur = None
-        try:
-            cur = conexao.cursor()
-            cur.execute('SELECT 1')
-            return True
-        finally:
-            # Garante fechamento de recursos mesmo em caso de exceção
-            if cur is not None:
-                try:
-                    cur.close()
-                except Exception:
-                    pass
-            try:
-                conexao.close()
-            except Exception:
-                pass
-    except Exception:
-        return False
-
-
 @app.route('/health/db')
 def health_db():
     """
@@ -150,10 +212,47 @@ def health_db():
     
     Frontend faz polling neste endpoint quando detecta banco indisponível.
     Retorna JSON com status HTTP 503 (Service Unavailable) se banco offline.
+    Serve o último estado do verificador em segundo plano (core/saude.py):
+    não abre conexão por requisição.
+    """
+    estado = monitor_saude.estado()
+    return jsonify({'ok': estado['pronto'], **estado}), 200 if estado['pronto'] else 503
+
+
+@app.route('/health/live')
+def health_live():
+    """Liveness: o worker responde (independe do banco; não reinicie o container por queda do banco)"""
+    return jsonify(monitor_saude.vivo())
+
+
+@app.route('/health/ready')
+def health_ready():
+    """
+    Readiness: banco 'ok' ou 'degradado' (latência acima de SAUDE_LATENCIA_DEGRADADA_MS)
+    com verificação recente; 503 enquanto indisponível ou iniciando.
+    """
+    estado = monitor_saude.estado()
+    return jsonify(estado), 200 if estado['pronto'] else 503
+
+
+@app.route('/health/cache')
+def health_cache():
+    """
+    Métricas do cache de leitura de entidades de referência (por worker).
+    
+    Retorna acertos, erros, acertos negativos, carregamentos e invalidações
+    por namespace, além da taxa de acerto.
+    """
+    return jsonify(cache_referencias.metricas())
+
+
+@app.route('/health/fragmentos')
+def health_fragmentos():
+    """
+    Métricas do cache de fragmentos de template (por worker): acertos,
+    erros e taxa de acerto por namespace dos blocos {% cache %}.
     """
-    if banco_esta_ativo():
-        return jsonify({'ok': True})
-    return jsonify({'ok': False}), 503
+    return jsonify(cache_fragmentos.metricas())
 
 
 # ============================================
@@ -163,13 +262,15 @@ def health_db():
 @app.route('/favicon.ico')
 def favicon():
     """
-    Serve favicon via redirect para static folder.
+    Serve o favicon diretamente na raiz do domínio, sem redirect.
     
     Evita logs de erro 404 repetidos em navegadores que buscam /favicon.ico
-    automaticamente na raiz do domínio.
+    automaticamente. As páginas apontam para a cópia com hash (ativo('favicon.png'),
+    cache imutável); esta URL é fixa, então o cache é curto (FAVICON_MAX_AGE_SEGUNDOS).
     """
     # Serve o favicon presente na pasta static (PNG por padrão neste projeto)
-    return redirect(url_for('static', filename='favicon.png'))
+    return send_from_directory(app.static_folder, 'favicon.png', mimetype='image/png',
+                               max_age=FAVICON_MAX_AGE_SEGUNDOS)
 
 
 # ============================================
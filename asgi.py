@@ -0,0 +1,213 @@
+"""
+============================================
+CONECTA UNIFORME - ENTRADA ASGI
+============================================
+Serve a mesma aplicação Flask por um servidor ASGI (uvicorn), para que as
+views async (/produtos/vitrine, /auth/tipos-por-email) rodem de fato no
+event loop do servidor.
+
+No gthread (app:app) o Flask executa cada view async em um loop próprio
+criado pelo asgiref, e a thread da requisição fica bloqueada até a view
+terminar: as requisições em andamento por worker continuam limitadas ao
+número de threads. Aqui:
+
+- Endpoint com view async: o contexto de requisição do Flask é aberto na
+  própria tarefa do loop (contextvars isolam as requisições) e a view é
+  aguardada ali mesmo, com before_request, after_request e tratadores de
+  erro como no WSGI. Enquanto espera o PostgreSQL não ocupa thread
+  nenhuma: um worker mantém milhares de requisições em andamento, e o
+  limite passa a ser o pool (DB_POOL_ASYNC_MAX conexões; o excedente
+  aguarda na fila do pool até DB_POOL_ASYNC_TIMEOUT)
+- Demais endpoints: a aplicação WSGI roda em um pool de threads do mesmo
+  tamanho das threads do gthread (mesmo orçamento de conexões); a
+  resposta é acumulada na thread e enviada pelo loop
+- Lifespan: o pool de DatabaseAsync passa a viver no loop do servidor e
+  é fechado no desligamento
+
+Para executar:
+    uvicorn asgi:aplicacao --port 5000
+    GUNICORN_ASGI=true gunicorn -c gunicorn.conf.py
+"""
+
+import asyncio
+import inspect
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from flask import request_started
+from werkzeug.exceptions import HTTPException
+from app import app
+from core.database_async import DatabaseAsync
+from core.servidor import dimensionar
+
+
+def _montar_environ(scope: Dict, corpo: bytes) -> Dict:
+    """Environ WSGI equivalente ao escopo HTTP do ASGI"""
+    script_name = scope.get('root_path', '').encode('utf-8').decode('latin-1')
+    path_info = scope['path'].encode('utf-8').decode('latin-1')
+    if script_name and path_info.startswith(script_name):
+        path_info = path_info[len(script_name):]
+    servidor = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': script_name,
+        'PATH_INFO': path_info,
+        'QUERY_STRING': scope['query_string'].decode('ascii'),
+        'SERVER_NAME': servidor[0],
+        'SERVER_PORT': str(servidor[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(corpo),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for nome, valor in scope.get('headers', []):
+        nome = nome.decode('latin-1').upper().replace('-', '_')
+        chave = nome if nome in ('CONTENT_TYPE', 'CONTENT_LENGTH') else f"HTTP_{nome}"
+        valor = valor.decode('latin-1')
+        if chave in environ:
+            valor = f"{environ[chave]}{'; ' if chave == 'HTTP_COOKIE' else ','}{valor}"
+        environ[chave] = valor
+    return environ
+
+
+def _coletar(resposta, environ: Dict) -> Tuple[int, List[Tuple[str, str]], List[bytes]]:
+    """Status, cabeçalhos e corpo de uma resposta WSGI"""
+    inicio = {}
+
+    def start_response(status, cabecalhos, exc_info=None):
+        inicio['status'], inicio['cabecalhos'] = int(status.split(' ', 1)[0]), cabecalhos
+
+    iteravel = resposta(environ, start_response)
+    try:
+        blocos = [bloco for bloco in iteravel if bloco]
+    finally:
+        if hasattr(iteravel, 'close'):
+            iteravel.close()
+    return inicio['status'], inicio['cabecalhos'], blocos
+
+
+class AplicacaoASGI:
+    """Aplicação ASGI sobre o app Flask (views async no loop, demais em threads)"""
+
+    def __init__(self, wsgi, threads: int):
+        self.wsgi = wsgi
+        self.threads = threads
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._endpoints_async: Dict[str, bool] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            # Sem websockets: o servidor fecha a conexão
+            return
+
+        corpo = await self._ler_corpo(receive)
+        environ = _montar_environ(scope, corpo)
+        if self._async(environ):
+            status, cabecalhos, blocos = await self._despachar_async(environ)
+        else:
+            loop = asyncio.get_running_loop()
+            status, cabecalhos, blocos = await loop.run_in_executor(self._obter_executor(),
+                                                                   self._despachar_wsgi, environ)
+
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(nome.lower().encode('latin-1'), valor.encode('latin-1')) for nome, valor in cabecalhos],
+        })
+        await send({'type': 'http.response.body', 'body': b''.join(blocos)})
+
+    # --------------------------------------------
+    # Roteamento
+    # --------------------------------------------
+
+    def _async(self, environ: Dict) -> bool:
+        """True se a rota cai em uma view async (OPTIONS automático segue pelo WSGI)"""
+        if environ['REQUEST_METHOD'] == 'OPTIONS':
+            return False
+        try:
+            endpoint, _ = self.wsgi.url_map.bind_to_environ(environ).match()
+        except HTTPException:
+            return False
+        if endpoint not in self._endpoints_async:
+            self._endpoints_async[endpoint] = inspect.iscoroutinefunction(self.wsgi.view_functions.get(endpoint))
+        return self._endpoints_async[endpoint]
+
+    async def _despachar_async(self, environ: Dict):
+        """Mesmo fluxo de Flask.wsgi_app/full_dispatch_request, aguardando a view no loop atual"""
+        app_flask = self.wsgi
+        contexto = app_flask.request_context(environ)
+        erro = None
+        try:
+            try:
+                contexto.push()
+                try:
+                    request_started.send(app_flask, _async_wrapper=app_flask.ensure_sync)
+                    retorno = app_flask.preprocess_request()
+                    if retorno is None:
+                        requisicao = contexto.request
+                        if requisicao.routing_exception is not None:
+                            app_flask.raise_routing_exception(requisicao)
+                        view = app_flask.view_functions[requisicao.url_rule.endpoint]
+                        retorno = await view(**requisicao.view_args)
+                except Exception as e:
+                    retorno = app_flask.handle_user_exception(e)
+                resposta = app_flask.finalize_request(retorno)
+            except Exception as e:
+                erro = e
+                resposta = app_flask.handle_exception(e)
+            return _coletar(resposta, environ)
+        finally:
+            if erro is not None and app_flask.should_ignore_error(erro):
+                erro = None
+            contexto.pop(erro)
+
+    def _despachar_wsgi(self, environ: Dict):
+        return _coletar(self.wsgi, environ)
+
+    # --------------------------------------------
+    # Infraestrutura
+    # --------------------------------------------
+
+    @staticmethod
+    async def _ler_corpo(receive) -> bytes:
+        partes = []
+        while True:
+            mensagem = await receive()
+            if mensagem['type'] != 'http.request':
+                break
+            partes.append(mensagem.get('body', b''))
+            if not mensagem.get('more_body'):
+                break
+        return b''.join(partes)
+
+    def _obter_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='asgi-wsgi')
+        return self._executor
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            mensagem = await receive()
+            if mensagem['type'] == 'lifespan.startup':
+                DatabaseAsync.usar_loop_atual()
+                await send({'type': 'lifespan.startup.complete'})
+            elif mensagem['type'] == 'lifespan.shutdown':
+                await DatabaseAsync.fechar_async()
+                if self._executor is not None:
+                    self._executor.shutdown(wait=False)
+                    self._executor = None
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+aplicacao = AplicacaoASGI(app, threads=dimensionar()['threads'])
@@ -0,0 +1,140 @@
+"""
+============================================
+BENCHMARK - IMPLANTAÇÃO WSGI x ASGI
+============================================
+Compara, com o mesmo gerador de carga HTTP (benchmarks/cliente_http.py)
+e os mesmos parâmetros, as duas formas de servir as views async:
+
+- wsgi: gunicorn gthread com app:app (a view async roda em um loop do
+  asgiref, prendendo a thread da requisição até terminar)
+- asgi: gunicorn com workers uvicorn e asgi:aplicacao (a view async é
+  aguardada no loop do servidor, sem thread por requisição)
+
+Ambas sobem com gunicorn.conf.py, o mesmo número de workers e threads, e
+usam DatabaseAsync com o mesmo pool; a diferença medida é apenas a
+quantidade de requisições que cada worker consegue manter em andamento.
+
+Uso:
+    python -m benchmarks.async_vs_sync --requisicoes 5000 --concorrencia 1000
+    python -m benchmarks.async_vs_sync --rota /produtos/vitrine --workers 2 --saida async_vs_sync.json
+    python -m benchmarks.async_vs_sync --url-wsgi http://10.0.0.5:5000 --url-asgi http://10.0.0.6:5000
+
+Sem --url-*, os servidores são iniciados localmente (portas --porta e
+--porta + 1) e encerrados ao final. O resultado é impresso em JSON.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import urllib.request
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+from benchmarks.cliente_http import gerar_carga
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Views async da aplicação (tipos-por-email com um email que não existe: uma consulta indexada)
+ROTAS_PADRAO = ['/auth/tipos-por-email?email=carga%40carga.local', '/produtos/vitrine']
+
+
+@contextmanager
+def servidor(asgi: bool, porta: int, workers: int, threads: int, espera: float) -> Iterator[str]:
+    """Sobe o gunicorn com gunicorn.conf.py e devolve a URL base"""
+    ambiente = {**os.environ, 'GUNICORN_ASGI': str(asgi).lower(), 'GUNICORN_BIND': f"127.0.0.1:{porta}",
+                'GUNICORN_WORKERS': str(workers), 'GUNICORN_THREADS': str(threads),
+                'GUNICORN_MAX_REQUESTS': '0', 'DEBUG': 'false'}
+    processo = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'], cwd=RAIZ,
+                                env=ambiente, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    url = f"http://127.0.0.1:{porta}"
+    try:
+        limite = time.monotonic() + espera
+        while True:
+            if processo.poll() is not None:
+                raise RuntimeError(f"gunicorn terminou ao iniciar:\n{processo.stderr.read().decode()[-2000:]}")
+            try:
+                with urllib.request.urlopen(f"{url}/health/live", timeout=1):
+                    break
+            except OSError:
+                if time.monotonic() > limite:
+                    raise RuntimeError(f"gunicorn não respondeu em {espera:.0f} s")
+                time.sleep(0.2)
+        yield url
+    finally:
+        processo.terminate()
+        try:
+            processo.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            processo.kill()
+
+
+def medir(url: str, rotas: List[str], requisicoes: int, concorrencia: int, aquecimento: int) -> Dict:
+    """Aquece (abre pools, compila templates) e mede a carga contra uma implantação"""
+    if aquecimento:
+        gerar_carga(url, rotas, aquecimento, min(concorrencia, aquecimento))
+    return gerar_carga(url, rotas, requisicoes, concorrencia)
+
+
+def _comparar(resultados: Dict[str, Dict]) -> Optional[Dict]:
+    if set(resultados) != {'wsgi', 'asgi'}:
+        return None
+    wsgi, asgi = resultados['wsgi']['total'], resultados['asgi']['total']
+    return {
+        'vazao_asgi_sobre_wsgi': round(asgi['vazao_rps'] / wsgi['vazao_rps'], 2) if wsgi['vazao_rps'] else None,
+        'p99_asgi_sobre_wsgi': round(asgi['p99_ms'] / wsgi['p99_ms'], 2) if wsgi['p99_ms'] else None,
+    }
+
+
+# ============================================
+# EXECUÇÃO
+# ============================================
+
+def main():
+    parser = argparse.ArgumentParser(description='Mesma carga HTTP contra gunicorn gthread (WSGI) e uvicorn (ASGI)')
+    parser.add_argument('--rota', action='append', dest='rotas',
+                        help=f"Caminho a requisitar (repetível; padrão: {', '.join(ROTAS_PADRAO)})")
+    parser.add_argument('--requisicoes', type=int, default=2000, help='Requisições por implantação')
+    parser.add_argument('--concorrencia', type=int, default=500, help='Requisições simultâneas (conexões abertas)')
+    parser.add_argument('--aquecimento', type=int, default=200, help='Requisições antes de medir')
+    parser.add_argument('--workers', type=int, default=1, help='Workers de cada implantação local')
+    parser.add_argument('--threads', type=int, default=0, help='Threads por worker (0 = core/servidor.py)')
+    parser.add_argument('--porta', type=int, default=8100, help='Porta da implantação WSGI local (ASGI usa a seguinte)')
+    parser.add_argument('--espera', type=float, default=60.0, help='Segundos aguardando cada servidor subir')
+    parser.add_argument('--url-wsgi', help='Implantação WSGI já em execução (não sobe servidor)')
+    parser.add_argument('--url-asgi', help='Implantação ASGI já em execução (não sobe servidor)')
+    parser.add_argument('--somente', choices=['wsgi', 'asgi'], help='Mede apenas uma implantação')
+    parser.add_argument('--saida', help='Arquivo JSON para gravar o resultado (opcional)')
+    args = parser.parse_args()
+    rotas = args.rotas or ROTAS_PADRAO
+
+    resultados = {}
+    for nome, asgi, url, porta in (('wsgi', False, args.url_wsgi, args.porta),
+                                   ('asgi', True, args.url_asgi, args.porta + 1)):
+        if args.somente and args.somente != nome:
+            continue
+        if url:
+            resultados[nome] = medir(url, rotas, args.requisicoes, args.concorrencia, args.aquecimento)
+            continue
+        with servidor(asgi, porta, args.workers, args.threads, args.espera) as url_local:
+            resultados[nome] = medir(url_local, rotas, args.requisicoes, args.concorrencia, args.aquecimento)
+
+    resultado = {
+        'executado_em': datetime.now().isoformat(timespec='seconds'),
+        'ambiente': {'python': platform.python_version(), 'plataforma': platform.platform()},
+        'parametros': {**vars(args), 'rotas': rotas},
+        'resultados': resultados,
+        'comparacao': _comparar(resultados),
+    }
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    print(texto)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(texto)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,282 @@
+"""
+============================================
+BENCHMARK - JORNADAS DE USUÁRIO SOB CARGA
+============================================
+Usuários virtuais concorrentes repetem a jornada de compra do responsável
+contra a aplicação Flask (cliente de teste, no mesmo processo, ou um
+servidor em execução com --url) e um PostgreSQL local populado por
+benchmarks/dados.py:
+
+    solicitar código -> validar código -> vitrine -> adicionar itens
+    -> carrinho -> finalizar
+
+Por rota são medidos vazão, percentis de latência, consultas por
+requisição e tempo de banco (benchmarks/medicao.py;
+consultas de threads em segundo plano não entram na conta). Com --url as
+consultas acontecem no processo do servidor: só vazão e latências são
+medidas (consultas e tempo de banco ficam zerados).
+
+Uso:
+    python -m benchmarks.carga --usuarios 20 --duracao 60
+    python -m benchmarks.carga --usuarios 50 --jornadas 500 --itens 3 --saida carga.json
+    python -m benchmarks.carga --usuarios 200 --duracao 60 --url http://127.0.0.1:5000
+
+O envio de email é desviado para uma porta local fechada (falha imediata,
+a aplicação segue o fluxo sem email); use --enviar-email para manter o SMTP
+configurado (com --url, configure SMTP_SERVER/SMTP_PORT no servidor). O
+código de acesso é lido do banco, fora da medição.
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import statistics
+import subprocess
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from benchmarks.medicao import medir, observando
+
+
+def _percentil(ordenadas: List[float], p: float) -> float:
+    if not ordenadas:
+        return 0.0
+    indice = min(len(ordenadas) - 1, int(round(p / 100.0 * (len(ordenadas) - 1))))
+    return round(ordenadas[indice] * 1000, 2)
+
+
+def _resumo(amostras: List[Dict], duracao: float) -> Dict:
+    """Vazão, percentis (ms), consultas e tempo de banco de um conjunto de requisições"""
+    latencias = sorted(a['latencia'] for a in amostras)
+    consultas = [a['consultas'] for a in amostras]
+    tempos_db = sorted(a['tempo_db'] for a in amostras)
+    return {
+        'requisicoes': len(amostras),
+        'erros': sum(1 for a in amostras if not a['ok']),
+        'vazao_rps': round(len(amostras) / duracao, 1) if duracao else 0.0,
+        'latencia_media_ms': round(statistics.mean(latencias) * 1000, 2) if latencias else 0.0,
+        'p50_ms': _percentil(latencias, 50),
+        'p95_ms': _percentil(latencias, 95),
+        'p99_ms': _percentil(latencias, 99),
+        'consultas_por_requisicao': round(statistics.mean(consultas), 2) if consultas else 0.0,
+        'consultas_max': max(consultas, default=0),
+        'tempo_db_medio_ms': round(statistics.mean(tempos_db) * 1000, 2) if tempos_db else 0.0,
+        'tempo_db_p95_ms': _percentil(tempos_db, 95),
+    }
+
+
+class Jornada:
+    """Uma jornada completa de um responsável, com medição por requisição"""
+
+    def __init__(self, cliente, email: str, produto_ids: List[int], itens: int,
+                 rng: random.Random, amostras: List[Dict], lock: threading.Lock):
+        self.cliente = cliente
+        self.email = email
+        self.produto_ids = produto_ids
+        self.itens = itens
+        self.rng = rng
+        self.amostras = amostras
+        self.lock = lock
+
+    def _requisicao(self, rota: str, metodo: str, url: str, esperado: int, **kwargs):
+        with medir() as medicao:
+            inicio = time.perf_counter()
+            resposta = self.cliente.open(url, method=metodo, **kwargs)
+            latencia = time.perf_counter() - inicio
+        amostra = {'rota': rota, 'latencia': latencia, 'ok': resposta.status_code == esperado,
+                   'status': resposta.status_code, 'consultas': medicao.consultas,
+                   'tempo_db': medicao.tempo_db}
+        with self.lock:
+            self.amostras.append(amostra)
+        if not amostra['ok']:
+            raise RuntimeError(f"{rota}: status {resposta.status_code} (esperado {esperado})")
+        return resposta
+
+    def executar(self) -> None:
+        from core.database import Database
+
+        self._requisicao('POST /auth/solicitar-codigo', 'POST', '/auth/solicitar-codigo', 302,
+                         data={'email': self.email})
+        codigo = Database.executar("""
+            SELECT ca.codigo FROM codigos_acesso ca
+            JOIN usuarios u ON u.id = ca.usuario_id
+            WHERE u.email = %s AND u.tipo = 'responsavel' AND ca.usado = FALSE
+            ORDER BY ca.data_criacao DESC LIMIT 1
+        """, (self.email,), fetchone=True)
+        if not codigo:
+            raise RuntimeError(f"código de acesso não encontrado para {self.email}")
+        self._requisicao('POST /auth/validar-codigo', 'POST', '/auth/validar-codigo', 302,
+                         data={'email': self.email, 'tipo': 'responsavel', 'codigo': codigo['codigo']})
+
+        self._requisicao('GET /produtos/vitrine', 'GET', '/produtos/vitrine', 200)
+        for produto_id in self.rng.sample(self.produto_ids, min(self.itens, len(self.produto_ids))):
+            self._requisicao('POST /pedidos/adicionar_item', 'POST', '/pedidos/adicionar_item', 302,
+                             data={'produto_id': produto_id, 'quantidade': self.rng.randint(1, 2)})
+
+        carrinho = self._requisicao('GET /pedidos/carrinho', 'GET', '/pedidos/carrinho', 200)
+        encontrado = re.search(r'/pedidos/finalizar/(\d+)', carrinho.get_data(as_text=True))
+        if not encontrado:
+            raise RuntimeError('carrinho sem pedido para finalizar')
+        self._requisicao('POST /pedidos/finalizar/<id>', 'POST', f"/pedidos/finalizar/{encontrado.group(1)}", 302)
+
+
+def _carregar_massa(limite_produtos: int) -> Dict[str, List]:
+    """Responsáveis @carga.local e produtos disponíveis na vitrine"""
+    from core.database import Database
+    from benchmarks.dados import DOMINIO
+
+    responsaveis = Database.executar("""
+        SELECT u.email FROM usuarios u
+        JOIN responsaveis r ON r.usuario_id = u.id
+        WHERE u.tipo = 'responsavel' AND u.ativo = TRUE AND u.email LIKE %s
+        ORDER BY u.id
+    """, (f"%@{DOMINIO}",), fetchall=True) or []
+    produtos = Database.executar("""
+        SELECT id FROM produtos WHERE ativo = TRUE AND estoque > 100
+        ORDER BY id DESC LIMIT %s
+    """, (limite_produtos,), fetchall=True) or []
+    return {'emails': [r['email'] for r in responsaveis], 'produto_ids': [p['id'] for p in produtos]}
+
+
+def _versao() -> Optional[str]:
+    """Commit atual do repositório (para comparar rodadas ao longo do tempo)"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+# ============================================
+# EXECUÇÃO
+# ============================================
+
+def executar_carga(criar_cliente: Callable, emails: List[str], produto_ids: List[int], usuarios: int,
+                   jornadas: Optional[int], duracao: Optional[float], itens: int, seed: int) -> Dict:
+    """
+    Roda as jornadas com `usuarios` threads até atingir `jornadas` ou
+    `duracao` segundos; `criar_cliente` devolve uma sessão nova por jornada
+    (cliente de teste do Flask ou benchmarks.cliente_http.ClienteHTTP)
+    """
+    amostras: List[Dict] = []
+    tempos_jornada: List[float] = []
+    falhas: List[str] = []
+    lock = threading.Lock()
+    contador = iter(range(jornadas)) if jornadas else None
+    limite_tempo = time.perf_counter() + duracao if duracao else None
+
+    def proxima() -> bool:
+        if limite_tempo is not None and time.perf_counter() >= limite_tempo:
+            return False
+        if contador is not None:
+            with lock:
+                return next(contador, None) is not None
+        return True
+
+    def usuario_virtual(indice: int) -> None:
+        # Cada usuário virtual usa responsáveis próprios: carrinhos nunca são disputados
+        proprios = emails[indice::usuarios]
+        rng = random.Random(seed + indice)
+        rodada = 0
+        while proxima():
+            email = proprios[rodada % len(proprios)]
+            rodada += 1
+            inicio = time.perf_counter()
+            try:
+                Jornada(criar_cliente(), email, produto_ids, itens, rng, amostras, lock).executar()
+                with lock:
+                    tempos_jornada.append(time.perf_counter() - inicio)
+            except Exception as e:
+                with lock:
+                    falhas.append(str(e))
+
+    threads = [threading.Thread(target=usuario_virtual, args=(i,), name=f'usuario-virtual-{i}')
+               for i in range(usuarios)]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    total = time.perf_counter() - inicio
+
+    rotas = {}
+    for amostra in amostras:
+        rotas.setdefault(amostra['rota'], []).append(amostra)
+    ordenadas = sorted(tempos_jornada)
+    return {
+        'duracao_s': round(total, 3),
+        'jornadas': {
+            'concluidas': len(tempos_jornada),
+            'falhas': len(falhas),
+            'vazao_jps': round(len(tempos_jornada) / total, 2) if total else 0.0,
+            'p50_ms': _percentil(ordenadas, 50),
+            'p95_ms': _percentil(ordenadas, 95),
+            'p99_ms': _percentil(ordenadas, 99),
+            'exemplos_falha': sorted(set(falhas))[:5],
+        },
+        'total': _resumo(amostras, total),
+        'rotas': {rota: _resumo(lista, total) for rota, lista in rotas.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Jornadas de compra concorrentes contra a aplicação e o PostgreSQL local')
+    parser.add_argument('--usuarios', type=int, default=10, help='Usuários virtuais simultâneos (threads)')
+    parser.add_argument('--jornadas', type=int, default=None, help='Total de jornadas (padrão: até --duracao)')
+    parser.add_argument('--duracao', type=float, default=30.0, help='Segundos de carga quando --jornadas não é informado')
+    parser.add_argument('--itens', type=int, default=3, help='Itens adicionados ao carrinho por jornada')
+    parser.add_argument('--aquecimento', type=int, default=1, help='Jornadas por usuário virtual antes de medir')
+    parser.add_argument('--produtos', type=int, default=500, help='Produtos sorteados nas jornadas')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--enviar-email', action='store_true', help='Mantém o SMTP configurado (padrão: desativado)')
+    parser.add_argument('--url', help='Servidor em execução (gunicorn/uvicorn) em vez do cliente de teste')
+    parser.add_argument('--saida', help='Arquivo JSON para gravar o resultado (opcional)')
+    args = parser.parse_args()
+
+    if not args.enviar_email:
+        # Porta fechada: EmailService falha na hora e a rota segue sem email
+        os.environ['SMTP_SERVER'] = '127.0.0.1'
+        os.environ['SMTP_PORT'] = '9'
+
+    from core.database_async import DatabaseAsync
+    if args.url:
+        from benchmarks.cliente_http import ClienteHTTP
+        criar_cliente = lambda: ClienteHTTP(args.url)
+    else:
+        from app import app
+        criar_cliente = app.test_client
+
+    massa = _carregar_massa(args.produtos)
+    if len(massa['emails']) < args.usuarios or not massa['produto_ids']:
+        parser.error(f"massa insuficiente ({len(massa['emails'])} responsáveis, "
+                     f"{len(massa['produto_ids'])} produtos): rode benchmarks.dados antes")
+
+    try:
+        if args.aquecimento:
+            executar_carga(criar_cliente, massa['emails'], massa['produto_ids'], args.usuarios,
+                           args.aquecimento * args.usuarios, None, args.itens, args.seed)
+        with observando():
+            medicao = executar_carga(criar_cliente, massa['emails'], massa['produto_ids'], args.usuarios,
+                                     args.jornadas, None if args.jornadas else args.duracao,
+                                     args.itens, args.seed)
+    finally:
+        DatabaseAsync.fechar()
+
+    resultado = {
+        'executado_em': datetime.now().isoformat(timespec='seconds'),
+        'versao': _versao(),
+        'parametros': vars(args),
+        **medicao,
+    }
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    print(texto)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(texto)
+
+
+if __name__ == '__main__':
+    main()
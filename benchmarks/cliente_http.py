@@ -0,0 +1,189 @@
+"""
+============================================
+BENCHMARK - CLIENTES HTTP
+============================================
+Clientes usados para medir a aplicação atrás de um servidor de verdade
+(gunicorn gthread ou ASGI), pela rede, em vez do cliente de teste do Flask:
+
+- ClienteHTTP: sessão síncrona com cookies e sem seguir redirects, com a
+  mesma interface mínima do cliente de teste (open/status_code/get_data);
+  usado pelas jornadas de carga.py com --url
+- gerar_carga: gerador assíncrono de GETs (HTTP/1.1 com keep-alive, uma
+  conexão por requisição simultânea), capaz de manter milhares de
+  requisições em andamento a partir de um único processo; usado por
+  async_vs_sync.py contra as duas implantações
+
+Somente biblioteca padrão.
+"""
+
+import asyncio
+import http.cookiejar
+import statistics
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+def percentil(ordenadas: List[float], p: float) -> float:
+    """Percentil p (ms) de latências em segundos já ordenadas"""
+    if not ordenadas:
+        return 0.0
+    indice = min(len(ordenadas) - 1, int(round(p / 100.0 * (len(ordenadas) - 1))))
+    return round(ordenadas[indice] * 1000, 2)
+
+
+# ============================================
+# CLIENTE SÍNCRONO (JORNADAS)
+# ============================================
+
+class _SemRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class RespostaHTTP:
+    def __init__(self, status_code: int, dados: bytes, cabecalhos):
+        self.status_code = status_code
+        self.dados = dados
+        self.headers = cabecalhos
+
+    def get_data(self, as_text: bool = False):
+        return self.dados.decode('utf-8', errors='replace') if as_text else self.dados
+
+
+class ClienteHTTP:
+    """Sessão HTTP com cookies (um por usuário virtual)"""
+
+    def __init__(self, url_base: str, timeout: float = 30.0):
+        self.url_base = url_base.rstrip('/')
+        self.timeout = timeout
+        self._abridor = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _SemRedirect())
+
+    def open(self, caminho: str, method: str = 'GET', data: Optional[Dict] = None) -> RespostaHTTP:
+        corpo = urllib.parse.urlencode(data).encode('utf-8') if data is not None else None
+        pedido = urllib.request.Request(self.url_base + caminho, data=corpo, method=method)
+        try:
+            with self._abridor.open(pedido, timeout=self.timeout) as resposta:
+                return RespostaHTTP(resposta.status, resposta.read(), resposta.headers)
+        except urllib.error.HTTPError as e:
+            # 3xx (redirects não seguidos) e 4xx/5xx chegam como HTTPError
+            return RespostaHTTP(e.code, e.read(), e.headers)
+
+
+# ============================================
+# GERADOR DE CARGA ASSÍNCRONO
+# ============================================
+
+async def _ler_resposta(leitor: asyncio.StreamReader) -> Tuple[int, bool]:
+    """Lê status, cabeçalhos e corpo; retorna (status, manter conexão)"""
+    linha = await leitor.readline()
+    if not linha:
+        raise ConnectionError('conexão encerrada pelo servidor')
+    status = int(linha.split()[1])
+    cabecalhos = {}
+    while True:
+        linha = await leitor.readline()
+        if linha in (b'\r\n', b'\n', b''):
+            break
+        nome, _, valor = linha.decode('latin-1').partition(':')
+        cabecalhos[nome.strip().lower()] = valor.strip()
+
+    if 'content-length' in cabecalhos:
+        await leitor.readexactly(int(cabecalhos['content-length']))
+    elif cabecalhos.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            tamanho = int((await leitor.readline()).split(b';')[0], 16)
+            await leitor.readexactly(tamanho + 2)
+            if tamanho == 0:
+                break
+    else:
+        await leitor.read()
+        return status, False
+    return status, cabecalhos.get('connection', '').lower() != 'close'
+
+
+async def _executar_carga(url_base: str, caminhos: Sequence[str], requisicoes: int,
+                          concorrencia: int, timeout: float) -> Dict:
+    partes = urllib.parse.urlsplit(url_base)
+    host, porta = partes.hostname, partes.port or 80
+    prefixo = partes.path.rstrip('/')
+    fila = iter(range(requisicoes))
+    latencias: Dict[str, List[float]] = {caminho: [] for caminho in caminhos}
+    erros: Dict[str, int] = {caminho: 0 for caminho in caminhos}
+    status: Dict[str, int] = {}
+    em_andamento = {'atual': 0, 'maximo': 0}
+
+    async def conexao() -> None:
+        leitor = escritor = None
+        for indice in fila:
+            caminho = caminhos[indice % len(caminhos)]
+            inicio = time.perf_counter()
+            em_andamento['atual'] += 1
+            em_andamento['maximo'] = max(em_andamento['maximo'], em_andamento['atual'])
+            try:
+                if escritor is None:
+                    leitor, escritor = await asyncio.wait_for(asyncio.open_connection(host, porta), timeout)
+                escritor.write(f"GET {prefixo}{caminho} HTTP/1.1\r\nHost: {partes.netloc}\r\n"
+                               f"Accept-Encoding: identity\r\n\r\n".encode('latin-1'))
+                await escritor.drain()
+                codigo, manter = await asyncio.wait_for(_ler_resposta(leitor), timeout)
+                status[str(codigo)] = status.get(str(codigo), 0) + 1
+                if codigo == 200:
+                    latencias[caminho].append(time.perf_counter() - inicio)
+                else:
+                    erros[caminho] += 1
+                if not manter:
+                    escritor.close()
+                    escritor = None
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, IndexError):
+                erros[caminho] += 1
+                status['falha'] = status.get('falha', 0) + 1
+                if escritor is not None:
+                    escritor.close()
+                escritor = None
+            finally:
+                em_andamento['atual'] -= 1
+        if escritor is not None:
+            escritor.close()
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(conexao() for _ in range(concorrencia)))
+    duracao = time.perf_counter() - inicio
+
+    def resumo(lista: List[float], falhas: int) -> Dict:
+        ordenadas = sorted(lista)
+        return {
+            'requisicoes': len(lista) + falhas,
+            'erros': falhas,
+            'vazao_rps': round(len(lista) / duracao, 1) if duracao else 0.0,
+            'latencia_media_ms': round(statistics.mean(ordenadas) * 1000, 2) if ordenadas else 0.0,
+            'p50_ms': percentil(ordenadas, 50),
+            'p95_ms': percentil(ordenadas, 95),
+            'p99_ms': percentil(ordenadas, 99),
+        }
+
+    todas = [t for lista in latencias.values() for t in lista]
+    return {
+        'duracao_s': round(duracao, 3),
+        'em_andamento_max': em_andamento['maximo'],
+        'status': status,
+        'total': resumo(todas, sum(erros.values())),
+        'rotas': {caminho: resumo(latencias[caminho], erros[caminho]) for caminho in caminhos},
+    }
+
+
+def gerar_carga(url_base: str, caminhos: Sequence[str], requisicoes: int, concorrencia: int,
+                timeout: float = 60.0) -> Dict:
+    """
+    Dispara `requisicoes` GETs distribuídos entre `caminhos`, com até
+    `concorrencia` requisições simultâneas (uma conexão keep-alive cada)
+
+    Retorna:
+        dict: duração, pico de requisições em andamento, contagem por
+        status e, no total e por caminho, vazão e percentis (só status 200
+        conta como sucesso)
+    """
+    return asyncio.run(_executar_carga(url_base, list(caminhos), requisicoes, concorrencia, timeout))
@@ -0,0 +1,311 @@
+"""
+============================================
+BENCHMARK - ORÇAMENTO DE CONSULTAS POR ROTA
+============================================
+Percorre todas as rotas GET dos blueprints de modules/ (mais os POSTs do
+fluxo de compra) com o cliente de teste do Flask, contra um banco local
+populado por benchmarks/dados.py, e compara consultas SQL e tempo de banco
+de cada rota com o orçamento versionado em benchmarks/orcamento_consultas.json.
+
+Falha (código 1) quando:
+- uma rota faz mais consultas que o orçamento
+- o tempo de banco passa do orçamento além de --limiar-tempo (e do piso)
+- uma rota crítica (vitrine, carrinho, detalhes...) não tem orçamento
+- uma rota responde 5xx
+- o orçamento está vazio (nunca gerado com --atualizar)
+
+Uso:
+    python -m benchmarks.consultas                   # confere o orçamento
+    python -m benchmarks.consultas --detalhar        # lista as queries das rotas reprovadas
+    python -m benchmarks.consultas --atualizar       # regrava o orçamento com a medição atual
+
+Cada GET é chamado duas vezes e vale a segunda (caches aquecidos); a
+primeira aparece como consultas_frio. Os POSTs alteram o banco de
+benchmark (adicionam um item e finalizam o carrinho de um responsável).
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+from benchmarks.medicao import medir, observando
+
+ORCAMENTO_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'orcamento_consultas.json')
+
+# Rotas quentes: precisam de orçamento e qualquer consulta extra reprova
+ROTAS_CRITICAS = {
+    'GET produtos.vitrine', 'GET pedidos.ver_carrinho', 'GET pedidos.detalhes',
+    'GET produtos.detalhes', 'GET escolas.detalhes', 'GET fornecedores.detalhes',
+    'GET gestores.detalhes', 'GET usuarios.visualizar', 'GET pedidos.listar',
+    'POST pedidos.adicionar_item', 'POST pedidos.finalizar',
+}
+
+# Perfil da sessão por endpoint (padrão: administrador)
+PERFIS = {
+    'produtos.vitrine': 'responsavel',
+    'pedidos.ver_carrinho': 'responsavel',
+}
+
+# Tabela de onde sai o <id> das rotas de cada blueprint
+TABELAS_ID = {
+    'escolas': 'escolas',
+    'fornecedores': 'fornecedores',
+    'gestores': 'gestores_escolares',
+    'pedidos': 'pedidos',
+    'produtos': 'produtos',
+    'usuarios': 'usuarios',
+}
+
+# Consultas específicas quando o primeiro id da tabela não exercita a rota
+IDS_ESPECIFICOS = {
+    'pedidos.detalhes': "SELECT MIN(pedido_id) AS id FROM itens_pedido",
+    'pedidos.editar': "SELECT MIN(pedido_id) AS id FROM itens_pedido",
+    'usuarios.logs': "SELECT usuario_id AS id FROM logs_alteracoes WHERE usuario_id IS NOT NULL "
+                     "GROUP BY usuario_id ORDER BY COUNT(*) DESC, usuario_id LIMIT 1",
+    'usuarios.logs_acesso': "SELECT usuario_id AS id FROM logs_acesso WHERE usuario_id IS NOT NULL "
+                            "GROUP BY usuario_id ORDER BY COUNT(*) DESC, usuario_id LIMIT 1",
+}
+
+
+class Percurso:
+    """Resolve sessões e argumentos das rotas e mede cada requisição"""
+
+    def __init__(self, app, guardar_queries: bool):
+        from core.database import Database
+
+        self.app = app
+        self.db = Database
+        self.guardar_queries = guardar_queries
+        self.usuarios: Dict[str, Dict] = {}
+
+    def usuario(self, tipo: str) -> Dict:
+        """
+        Primeiro usuário ativo do tipo, preferindo os gerados (@carga.local).
+        O responsável precisa ter cadastro em responsaveis.
+        """
+        from benchmarks.dados import DOMINIO
+
+        if tipo not in self.usuarios:
+            juncao = "JOIN responsaveis r ON r.usuario_id = u.id" if tipo == 'responsavel' else ""
+            usuario = self.db.executar(f"""
+                SELECT u.id, u.nome, u.email, u.tipo FROM usuarios u {juncao}
+                WHERE u.tipo = %s AND u.ativo = TRUE
+                ORDER BY u.email LIKE %s DESC, u.id LIMIT 1
+            """, (tipo, f"%@{DOMINIO}"), fetchone=True)
+            if not usuario:
+                raise RuntimeError(f"nenhum usuário '{tipo}' ativo: rode benchmarks.dados antes")
+            self.usuarios[tipo] = dict(usuario)
+        return self.usuarios[tipo]
+
+    def cliente(self, tipo: Optional[str]):
+        cliente = self.app.test_client()
+        if tipo:
+            usuario = self.usuario(tipo)
+            with cliente.session_transaction() as sessao:
+                sessao.update({'usuario_id': usuario['id'], 'usuario_nome': usuario['nome'],
+                               'usuario_email': usuario['email'], 'usuario_tipo': usuario['tipo'],
+                               'logged_in': True})
+        return cliente
+
+    def argumentos(self, endpoint: str, nomes: List[str]) -> Optional[Dict[str, int]]:
+        valores = {}
+        for nome in nomes:
+            if nome == 'escola_id':
+                query = "SELECT MIN(escola_id) AS id FROM gestores_escolares"
+            elif endpoint in IDS_ESPECIFICOS:
+                query = IDS_ESPECIFICOS[endpoint]
+            elif endpoint.split('.')[0] in TABELAS_ID:
+                query = f"SELECT MIN(id) AS id FROM {TABELAS_ID[endpoint.split('.')[0]]}"
+            else:
+                return None
+            linha = self.db.executar(query, fetchone=True)
+            if not linha or linha['id'] is None:
+                return None
+            valores[nome] = linha['id']
+        return valores
+
+    def requisitar(self, tipo: Optional[str], metodo: str, url: str, **kwargs) -> Dict:
+        cliente = self.cliente(tipo)
+        with medir(self.guardar_queries) as medicao:
+            inicio = time.perf_counter()
+            resposta = cliente.open(url, method=metodo, **kwargs)
+            latencia = time.perf_counter() - inicio
+        return {
+            'url': url,
+            'status': resposta.status_code,
+            'consultas': medicao.consultas,
+            'tempo_db_ms': round(medicao.tempo_db * 1000, 2),
+            'latencia_ms': round(latencia * 1000, 2),
+            'queries': medicao.queries,
+        }
+
+
+def _rotas_get(app) -> Dict[str, Any]:
+    """Uma regra GET por endpoint de blueprint (a primeira, como url_for)"""
+    rotas = {}
+    for regra in app.url_map.iter_rules():
+        blueprint = regra.endpoint.rpartition('.')[0]
+        if blueprint in app.blueprints and 'GET' in regra.methods and regra.endpoint not in rotas:
+            rotas[regra.endpoint] = regra
+    return dict(sorted(rotas.items()))
+
+
+def percorrer(app, guardar_queries: bool) -> Dict[str, Dict]:
+    """Mede todas as rotas; a chave é 'MÉTODO endpoint'"""
+    from flask import url_for
+
+    percurso = Percurso(app, guardar_queries)
+    medicoes: Dict[str, Dict] = {}
+    responsavel = percurso.usuario('responsavel')
+    produto = percurso.db.executar(
+        "SELECT MIN(id) AS id FROM produtos WHERE ativo = TRUE AND estoque > 100", fetchone=True)
+
+    # Fluxo de compra (antes dos GETs, para o carrinho ter itens)
+    medicoes['POST autenticacao.solicitar_codigo'] = percurso.requisitar(
+        None, 'POST', '/auth/solicitar-codigo', data={'email': responsavel['email']})
+    if produto and produto['id']:
+        medicoes['POST pedidos.adicionar_item'] = percurso.requisitar(
+            'responsavel', 'POST', '/pedidos/adicionar_item', data={'produto_id': produto['id'], 'quantidade': 1})
+
+    with app.test_request_context():
+        urls = {}
+        for endpoint, regra in _rotas_get(app).items():
+            argumentos = percurso.argumentos(endpoint, sorted(regra.arguments))
+            if argumentos is None:
+                medicoes[f'GET {endpoint}'] = {'ignorada': 'sem registro para os argumentos da rota'}
+                continue
+            urls[endpoint] = url_for(endpoint, **argumentos)
+
+    for endpoint, url in urls.items():
+        tipo = PERFIS.get(endpoint, 'administrador')
+        frio = percurso.requisitar(tipo, 'GET', url)
+        quente = percurso.requisitar(tipo, 'GET', url)
+        quente['consultas_frio'] = frio['consultas']
+        medicoes[f'GET {endpoint}'] = quente
+
+    carrinho = percurso.db.executar("""
+        SELECT MAX(p.id) AS id FROM pedidos p
+        JOIN responsaveis r ON r.id = p.responsavel_id
+        WHERE r.usuario_id = %s AND p.status = 'carrinho'
+    """, (responsavel['id'],), fetchone=True)
+    if carrinho and carrinho['id']:
+        medicoes['POST pedidos.finalizar'] = percurso.requisitar(
+            'responsavel', 'POST', f"/pedidos/finalizar/{carrinho['id']}")
+
+    return medicoes
+
+
+def conferir(medicoes: Dict[str, Dict], orcamento: Dict, limiar_tempo: float,
+             piso_tempo_ms: float) -> List[Dict]:
+    """Compara a medição com o orçamento; devolve uma linha por rota com o veredito"""
+    rotas_orcamento = orcamento.get('rotas', {})
+    if not rotas_orcamento:
+        # Sem orçamento nenhuma rota pode reprovar: o portão não protegeria nada
+        return [{'rota': '*', 'status': 'falha',
+                 'problemas': ['orçamento vazio: gere-o com --atualizar no banco de benchmark '
+                               'e versione benchmarks/orcamento_consultas.json']}]
+    vereditos = []
+    for rota, medicao in medicoes.items():
+        if 'ignorada' in medicao:
+            vereditos.append({'rota': rota, 'status': 'ignorada', 'motivo': medicao['ignorada']})
+            continue
+        limite = rotas_orcamento.get(rota)
+        veredito = {'rota': rota, 'consultas': medicao['consultas'], 'tempo_db_ms': medicao['tempo_db_ms']}
+        problemas = []
+        if medicao['status'] >= 500:
+            problemas.append(f"status {medicao['status']}")
+        if limite is None:
+            if rota in ROTAS_CRITICAS:
+                problemas.append('rota crítica sem orçamento')
+            veredito['status'] = 'falha' if problemas else 'sem_orcamento'
+        else:
+            veredito.update({'orcamento_consultas': limite['consultas'],
+                             'orcamento_tempo_db_ms': limite.get('tempo_db_ms')})
+            if medicao['consultas'] > limite['consultas']:
+                problemas.append(f"{medicao['consultas']} consultas (orçamento {limite['consultas']})")
+            teto = (limite.get('tempo_db_ms') or 0) * (1 + limiar_tempo)
+            if medicao['tempo_db_ms'] > max(teto, piso_tempo_ms):
+                problemas.append(f"{medicao['tempo_db_ms']} ms de banco (teto {round(max(teto, piso_tempo_ms), 2)} ms)")
+            if problemas:
+                veredito['status'] = 'falha'
+            elif medicao['consultas'] < limite['consultas']:
+                veredito['status'] = 'abaixo'
+            else:
+                veredito['status'] = 'ok'
+        if problemas:
+            veredito['problemas'] = problemas
+            if medicao.get('queries'):
+                veredito['queries'] = medicao['queries']
+        vereditos.append(veredito)
+
+    for rota in sorted(set(rotas_orcamento) - set(medicoes)):
+        vereditos.append({'rota': rota, 'status': 'nao_medida'})
+    return vereditos
+
+
+def _novo_orcamento(medicoes: Dict[str, Dict]) -> Dict:
+    return {
+        'descricao': 'Consultas SQL e tempo de banco (ms) por rota; gerado por python -m benchmarks.consultas --atualizar',
+        'rotas': {rota: {'consultas': m['consultas'], 'tempo_db_ms': m['tempo_db_ms']}
+                  for rota, m in sorted(medicoes.items()) if 'ignorada' not in m},
+    }
+
+
+# ============================================
+# EXECUÇÃO
+# ============================================
+
+def main():
+    parser = argparse.ArgumentParser(description='Confere consultas SQL e tempo de banco por rota contra o orçamento')
+    parser.add_argument('--orcamento', default=ORCAMENTO_PADRAO, help='Arquivo de orçamento (JSON)')
+    parser.add_argument('--atualizar', action='store_true', help='Regrava o orçamento com a medição atual')
+    parser.add_argument('--limiar-tempo', type=float, default=1.0,
+                        help='Folga sobre o tempo de banco orçado (1.0 = até o dobro)')
+    parser.add_argument('--piso-tempo-ms', type=float, default=20.0,
+                        help='Tempo de banco abaixo do qual nunca reprova (ruído)')
+    parser.add_argument('--detalhar', action='store_true', help='Inclui as queries das rotas reprovadas')
+    parser.add_argument('--saida', help='Arquivo JSON para gravar o resultado (opcional)')
+    args = parser.parse_args()
+
+    # Envio de email desviado para porta fechada (falha imediata), como em carga.py
+    os.environ['SMTP_SERVER'] = '127.0.0.1'
+    os.environ['SMTP_PORT'] = '9'
+
+    from app import app
+    from core.database_async import DatabaseAsync
+
+    try:
+        with observando():
+            medicoes = percorrer(app, args.detalhar)
+    finally:
+        DatabaseAsync.fechar()
+
+    if args.atualizar:
+        with open(args.orcamento, 'w', encoding='utf-8') as arquivo:
+            json.dump(_novo_orcamento(medicoes), arquivo, indent=2, ensure_ascii=False)
+            arquivo.write('\n')
+        print(f"Orçamento gravado em {args.orcamento} ({len(medicoes)} rotas)")
+        return
+
+    with open(args.orcamento, encoding='utf-8') as arquivo:
+        orcamento = json.load(arquivo)
+    vereditos = conferir(medicoes, orcamento, args.limiar_tempo, args.piso_tempo_ms)
+    falhas = [v for v in vereditos if v['status'] == 'falha']
+
+    texto = json.dumps({'parametros': vars(args), 'falhas': len(falhas), 'rotas': vereditos},
+                       indent=2, ensure_ascii=False)
+    print(texto)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(texto)
+
+    for falha in falhas:
+        print(f"ORÇAMENTO ESTOURADO {falha['rota']}: {'; '.join(falha['problemas'])}", file=sys.stderr)
+    if falhas:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
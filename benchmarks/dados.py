@@ -0,0 +1,229 @@
+"""
+============================================
+BENCHMARK - GERADOR DE DADOS DE CARGA
+============================================
+Amplia as fixtures de schema.sql para N escolas, fornecedores, produtos,
+responsáveis e pedidos, para que os benchmarks rodem sobre volumes
+parecidos com os de produção.
+
+Uso (contra um PostgreSQL local dedicado aos benchmarks):
+    python -m benchmarks.dados --schema --escolas 50 --fornecedores 20 --produtos 5000 --pedidos 20000
+    python -m benchmarks.dados --responsaveis 500 --seed 42 --saida dados.json
+
+Os usuários gerados usam emails @carga.local (é por eles que
+benchmarks/carga.py escolhe quem faz as jornadas). Documentos (CNPJ/CPF)
+levam o número do lote, então rodadas sucessivas somam dados em vez de
+colidir nas restrições UNIQUE. Tudo é inserido em uma única transação.
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+from core.database import Database
+from core.relatorios import atualizador_relatorios
+
+# Domínio dos emails gerados (usado por benchmarks/carga.py)
+DOMINIO = 'carga.local'
+
+CATEGORIAS = ['Camisa', 'Calça', 'Camiseta', 'Bermuda', 'Saia', 'Agasalho', 'Acessório']
+TAMANHOS = ['PP', 'P', 'M', 'G', 'GG', 'Único']
+CORES = ['Azul Marinho', 'Branca', 'Cinza', 'Preta', 'Bordô', 'Verde']
+CIDADES = [('São Paulo', 'SP'), ('Rio de Janeiro', 'RJ'), ('Belo Horizonte', 'MG'),
+           ('Brasília', 'DF'), ('Curitiba', 'PR'), ('Salvador', 'BA')]
+# Pesos dos status dos pedidos históricos (o carrinho fica para as jornadas)
+STATUS_PEDIDOS = {'pendente': 10, 'pago': 25, 'enviado': 15, 'entregue': 40, 'cancelado': 10}
+
+
+def _documento(lote: int, indice: int, digitos: int) -> str:
+    """Número único por (lote, índice) com a quantidade de dígitos pedida"""
+    return f"{lote % 10 ** (digitos - 8):0{digitos - 8}d}{indice:08d}"
+
+
+def _cnpj(lote: int, indice: int) -> str:
+    d = _documento(lote, indice, 14)
+    return f"{d[:2]}.{d[2:5]}.{d[5:8]}/{d[8:12]}-{d[12:]}"
+
+
+def _cpf(lote: int, indice: int) -> str:
+    d = _documento(lote, indice, 11)
+    return f"{d[:3]}.{d[3:6]}.{d[6:9]}-{d[9:]}"
+
+
+def _usuarios(cursor, tipo: str, quantidade: int, lote: int, rng: random.Random) -> List[int]:
+    registros = [{
+        'nome': f"{tipo.capitalize()} Carga {lote}-{i}",
+        'email': f"{tipo}.{lote}.{i}@{DOMINIO}",
+        'telefone': f"(11) 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}",
+        'tipo': tipo,
+    } for i in range(quantidade)]
+    return Database.inserir_muitos('usuarios', registros, cursor=cursor)
+
+
+def _endereco(rng: random.Random) -> Dict:
+    cidade, estado = rng.choice(CIDADES)
+    return {
+        'endereco': f"Rua {rng.randint(1, 500)}, {rng.randint(1, 3000)}",
+        'cidade': cidade,
+        'estado': estado,
+        'cep': f"{rng.randint(10000, 99999)}-{rng.randint(100, 999)}",
+    }
+
+
+def gerar(escolas: int, fornecedores: int, produtos: int, responsaveis: int,
+          pedidos: int, seed: int, lote: int) -> Dict[str, int]:
+    """
+    Insere os dados de carga em uma transação
+
+    Retorna:
+        dict: Quantidade inserida por tabela (ou levanta RuntimeError em erro)
+    """
+    rng = random.Random(seed)
+
+    def operacao(cursor):
+        contagem = {}
+
+        usuarios_escolas = _usuarios(cursor, 'escola', escolas, lote, rng)
+        escola_ids = Database.inserir_muitos('escolas', [{
+            'usuario_id': usuario_id, 'nome': f"Escola Carga {lote}-{i}",
+            'cnpj': _cnpj(lote, i), 'razao_social': f"E.C. Carga {lote}-{i}", **_endereco(rng),
+        } for i, usuario_id in enumerate(usuarios_escolas)], cursor=cursor)
+
+        usuarios_fornecedores = _usuarios(cursor, 'fornecedor', fornecedores, lote, rng)
+        fornecedor_ids = Database.inserir_muitos('fornecedores', [{
+            'usuario_id': usuario_id, 'cnpj': _cnpj(lote, escolas + i),
+            'razao_social': f"Uniformes Carga {lote}-{i} LTDA", **_endereco(rng),
+        } for i, usuario_id in enumerate(usuarios_fornecedores)], cursor=cursor)
+
+        # Cada escola homologa até 3 fornecedores; os produtos saem desses pares
+        pares = [(escola_id, fornecedor_id)
+                 for escola_id in escola_ids
+                 for fornecedor_id in rng.sample(fornecedor_ids, min(3, len(fornecedor_ids)))]
+        Database.inserir_muitos('homologacao_fornecedores', [{
+            'escola_id': escola_id, 'fornecedor_id': fornecedor_id, 'observacoes': 'Gerado para carga',
+        } for escola_id, fornecedor_id in pares], cursor=cursor)
+
+        catalogo = []
+        for _ in range(produtos):
+            escola_id, fornecedor_id = rng.choice(pares)
+            categoria = rng.choice(CATEGORIAS)
+            catalogo.append({
+                'fornecedor_id': fornecedor_id, 'escola_id': escola_id,
+                'nome': f"{categoria} Escolar {rng.randint(1, 200)}",
+                'descricao': f"{categoria} gerada para testes de carga",
+                'categoria': categoria, 'tamanho': rng.choice(TAMANHOS), 'cor': rng.choice(CORES),
+                'preco': round(rng.uniform(20, 150), 2),
+                # Estoque alto: as jornadas não devem esgotar produtos durante a medição
+                'estoque': rng.randint(10000, 50000),
+            })
+        produto_ids = Database.inserir_muitos('produtos', catalogo, cursor=cursor)
+        produtos_por_escola: Dict[int, List[int]] = {}
+        for produto_id, produto in zip(produto_ids, catalogo):
+            produtos_por_escola.setdefault(produto['escola_id'], []).append(produto_id)
+        precos = {produto_id: produto['preco'] for produto_id, produto in zip(produto_ids, catalogo)}
+
+        usuarios_responsaveis = _usuarios(cursor, 'responsavel', responsaveis, lote, rng)
+        responsavel_ids = Database.inserir_muitos('responsaveis', [{
+            'usuario_id': usuario_id, 'cpf': _cpf(lote, i), **_endereco(rng),
+        } for i, usuario_id in enumerate(usuarios_responsaveis)], cursor=cursor)
+
+        escolas_com_produtos = list(produtos_por_escola)
+        agora = datetime.now()
+        cabecalhos, itens_por_pedido = [], []
+        for _ in range(pedidos if escolas_com_produtos else 0):
+            escola_id = rng.choice(escolas_com_produtos)
+            escolhidos = rng.sample(produtos_por_escola[escola_id],
+                                    min(rng.randint(1, 4), len(produtos_por_escola[escola_id])))
+            itens = []
+            for produto_id in escolhidos:
+                quantidade = rng.randint(1, 3)
+                itens.append({'produto_id': produto_id, 'quantidade': quantidade,
+                              'preco_unitario': precos[produto_id],
+                              'subtotal': round(precos[produto_id] * quantidade, 2)})
+            cabecalhos.append({
+                'responsavel_id': rng.choice(responsavel_ids), 'escola_id': escola_id,
+                'valor_total': round(sum(i['subtotal'] for i in itens), 2),
+                'status': rng.choices(list(STATUS_PEDIDOS), weights=list(STATUS_PEDIDOS.values()))[0],
+                'data_pedido': agora - timedelta(minutes=rng.randint(0, 365 * 24 * 60)),
+            })
+            itens_por_pedido.append(itens)
+        pedido_ids = Database.inserir_muitos('pedidos', cabecalhos, cursor=cursor)
+        Database.inserir_muitos('itens_pedido', [
+            {'pedido_id': pedido_id, **item}
+            for pedido_id, itens in zip(pedido_ids, itens_por_pedido) for item in itens
+        ], cursor=cursor)
+
+        contagem.update({
+            'usuarios': len(usuarios_escolas) + len(usuarios_fornecedores) + len(usuarios_responsaveis),
+            'escolas': len(escola_ids), 'fornecedores': len(fornecedor_ids),
+            'homologacoes': len(pares), 'produtos': len(produto_ids),
+            'responsaveis': len(responsavel_ids), 'pedidos': len(pedido_ids),
+            'itens_pedido': sum(len(itens) for itens in itens_por_pedido),
+        })
+        return contagem
+
+    resultado = Database.transaction(operacao)
+    if resultado is None:
+        raise RuntimeError('Falha ao gerar os dados de carga (veja o erro acima)')
+    return resultado
+
+
+def aplicar_schema(caminho: str) -> None:
+    """Executa schema.sql (idempotente) no banco configurado em DB_*"""
+    with open(caminho, encoding='utf-8') as arquivo:
+        script = arquivo.read()
+    if Database.transaction(lambda cursor: cursor.execute(script) or True) is None:
+        raise RuntimeError('Falha ao aplicar o schema (veja o erro acima)')
+
+
+# ============================================
+# EXECUÇÃO
+# ============================================
+
+def main():
+    parser = argparse.ArgumentParser(description='Gera dados de carga a partir das fixtures de schema.sql')
+    parser.add_argument('--escolas', type=int, default=20)
+    parser.add_argument('--fornecedores', type=int, default=10)
+    parser.add_argument('--produtos', type=int, default=1000)
+    parser.add_argument('--responsaveis', type=int, default=200,
+                        help='Responsáveis @carga.local (limita os usuários simultâneos de carga.py)')
+    parser.add_argument('--pedidos', type=int, default=5000, help='Pedidos históricos (fora do carrinho)')
+    parser.add_argument('--seed', type=int, default=42, help='Semente dos valores aleatórios')
+    parser.add_argument('--lote', type=int, default=None,
+                        help='Identificador da rodada nos emails/documentos (padrão: horário atual)')
+    parser.add_argument('--schema', action='store_true', help='Aplica schema.sql antes de gerar')
+    parser.add_argument('--saida', help='Arquivo JSON para gravar o resultado (opcional)')
+    args = parser.parse_args()
+    if min(args.escolas, args.fornecedores, args.responsaveis) < 1:
+        parser.error('--escolas, --fornecedores e --responsaveis devem ser maiores que zero')
+
+    lote = args.lote if args.lote is not None else int(time.time()) % 1000000
+    if args.schema:
+        aplicar_schema(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'schema.sql'))
+
+    inicio = time.perf_counter()
+    contagem = gerar(args.escolas, args.fornecedores, args.produtos, args.responsaveis,
+                     args.pedidos, args.seed, lote)
+    duracao = time.perf_counter() - inicio
+
+    # Pedidos inseridos direto nas tabelas: recalcula os rollups dos relatórios
+    relatorios = atualizador_relatorios.executar_ciclo(completo=True)
+
+    resultado = {
+        'parametros': {**vars(args), 'lote': lote},
+        'inseridos': contagem,
+        'duracao_s': round(duracao, 3),
+        'relatorios_recalculados': bool(relatorios and relatorios.get('executado')),
+    }
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    print(texto)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(texto)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""
+============================================
+BENCHMARK - INICIALIZAÇÃO DO WORKER
+============================================
+Mede, em processos Python novos, o custo de `import app` (o que cada
+worker do gunicorn paga sem --preload, ou o mestre paga uma vez com ele):
+
+- Cold start: tempo de parede do import (mediana de --repeticoes processos)
+- Memória: RSS máximo do processo após o import
+- Perfil de import (-X importtime): tempo total, módulos mais caros (tempo
+  próprio e acumulado) e custo por pacote de topo
+- Portão de regressão opcional contra um baseline salvo, como em micro.py
+
+Uso:
+    python -m benchmarks.inicializacao
+    python -m benchmarks.inicializacao --precarregar --top 30 --saida inicializacao.json
+    python -m benchmarks.inicializacao --salvar-baseline inicializacao_base.json
+    python -m benchmarks.inicializacao --baseline inicializacao_base.json --limiar 0.15
+
+O import de app consulta o banco (chaves estrangeiras) uma vez; com o banco
+fora do ar a tentativa falha rápido, mas um host inacessível soma até
+DB_CONNECT_TIMEOUT (forçado a 1 s aqui).
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+from typing import Dict, List
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Executado no processo filho: importa a aplicação e informa tempo e RSS
+_SCRIPT_FILHO = """
+import json, resource, sys, time
+inicio = time.perf_counter()
+import app
+if {precarregar}:
+    app.precarregar()
+duracao = time.perf_counter() - inicio
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({{'import_ms': duracao * 1000, 'rss_kb': rss_kb, 'modulos': len(sys.modules)}}))
+"""
+
+
+def _ambiente_filho() -> Dict[str, str]:
+    return {**os.environ, 'DB_CONNECT_TIMEOUT': '1', 'PYTHONDONTWRITEBYTECODE': '1'}
+
+
+def _executar_filho(precarregar: bool, importtime: bool) -> subprocess.CompletedProcess:
+    comando = [sys.executable] + (['-X', 'importtime'] if importtime else [])
+    comando += ['-c', _SCRIPT_FILHO.format(precarregar=precarregar)]
+    return subprocess.run(comando, cwd=RAIZ, env=_ambiente_filho(), capture_output=True,
+                          text=True, timeout=120)
+
+
+def _ultima_linha_json(saida: str) -> Dict:
+    for linha in reversed(saida.strip().splitlines()):
+        if linha.startswith('{'):
+            return json.loads(linha)
+    raise RuntimeError(f"processo filho não informou a medição:\n{saida}")
+
+
+def medir_cold_start(repeticoes: int, precarregar: bool) -> Dict:
+    """Tempo de import e RSS em `repeticoes` processos novos"""
+    medicoes = []
+    for _ in range(repeticoes):
+        processo = _executar_filho(precarregar, importtime=False)
+        if processo.returncode != 0:
+            raise RuntimeError(f"import app falhou:\n{processo.stderr}")
+        medicoes.append(_ultima_linha_json(processo.stdout))
+    tempos = sorted(m['import_ms'] for m in medicoes)
+    rss = sorted(m['rss_kb'] for m in medicoes)
+    return {
+        'repeticoes': repeticoes,
+        'import_mediana_ms': round(statistics.median(tempos), 1),
+        'import_min_ms': round(tempos[0], 1),
+        'import_max_ms': round(tempos[-1], 1),
+        'rss_mediana_kb': int(statistics.median(rss)),
+        'modulos_carregados': medicoes[-1]['modulos'],
+    }
+
+
+def perfil_importtime(precarregar: bool, top: int) -> Dict:
+    """Interpreta a saída de -X importtime (linhas 'import time: próprio | acumulado | módulo')"""
+    processo = _executar_filho(precarregar, importtime=True)
+    modulos = []
+    for linha in processo.stderr.splitlines():
+        if not linha.startswith('import time:') or 'self [us]' in linha:
+            continue
+        proprio, acumulado, nome = linha[len('import time:'):].split('|')
+        nivel = (len(nome) - len(nome.lstrip())) // 2
+        modulos.append({'modulo': nome.strip(), 'proprio_us': int(proprio), 'acumulado_us': int(acumulado),
+                        'nivel': nivel})
+
+    por_pacote: Dict[str, int] = {}
+    for modulo in modulos:
+        pacote = modulo['modulo'].split('.')[0]
+        por_pacote[pacote] = por_pacote.get(pacote, 0) + modulo['proprio_us']
+    total_us = sum(m['proprio_us'] for m in modulos)
+
+    def resumo(lista: List[Dict]) -> List[Dict]:
+        return [{'modulo': m['modulo'], 'proprio_ms': round(m['proprio_us'] / 1000, 2),
+                 'acumulado_ms': round(m['acumulado_us'] / 1000, 2)} for m in lista[:top]]
+
+    return {
+        'total_ms': round(total_us / 1000, 1),
+        'modulos': len(modulos),
+        'mais_caros_proprio': resumo(sorted(modulos, key=lambda m: -m['proprio_us'])),
+        'mais_caros_acumulado': resumo(sorted(modulos, key=lambda m: -m['acumulado_us'])),
+        'por_pacote_ms': {p: round(us / 1000, 1)
+                          for p, us in sorted(por_pacote.items(), key=lambda i: -i[1])[:top]},
+    }
+
+
+def comparar(atual: Dict, baseline: Dict, limiar: float) -> List[Dict]:
+    """Compara tempo de import, total do importtime e RSS com o baseline"""
+    metricas = [
+        ('import_mediana_ms', atual['cold_start']['import_mediana_ms'], baseline['cold_start']['import_mediana_ms']),
+        ('importtime_total_ms', atual['importtime']['total_ms'], baseline['importtime']['total_ms']),
+        ('rss_mediana_kb', atual['cold_start']['rss_mediana_kb'], baseline['cold_start']['rss_mediana_kb']),
+    ]
+    comparacao = []
+    for nome, valor, base in metricas:
+        razao = valor / base if base else 1.0
+        status = 'regressao' if razao > 1 + limiar else 'melhoria' if razao < 1 - limiar else 'ok'
+        comparacao.append({'metrica': nome, 'status': status, 'base': base, 'atual': valor,
+                           'razao': round(razao, 3)})
+    return comparacao
+
+
+# ============================================
+# EXECUÇÃO
+# ============================================
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold start, RSS e perfil de import da aplicação')
+    parser.add_argument('--repeticoes', type=int, default=5, help='Processos medidos no cold start')
+    parser.add_argument('--top', type=int, default=20, help='Módulos/pacotes listados no perfil')
+    parser.add_argument('--precarregar', action='store_true',
+                        help='Mede também app.precarregar() (o que o mestre faz com --preload)')
+    parser.add_argument('--baseline', help='Baseline JSON para comparar (portão de regressão)')
+    parser.add_argument('--limiar', type=float, default=0.20, help='Piora tolerada sobre o baseline (0.20 = 20%%)')
+    parser.add_argument('--salvar-baseline', help='Grava o resultado como novo baseline neste arquivo')
+    parser.add_argument('--saida', help='Arquivo JSON para gravar o resultado (opcional)')
+    args = parser.parse_args()
+
+    resultado = {
+        'executado_em': datetime.now().isoformat(timespec='seconds'),
+        'ambiente': {'python': platform.python_version(), 'plataforma': platform.platform()},
+        'parametros': vars(args),
+        'cold_start': medir_cold_start(max(1, args.repeticoes), args.precarregar),
+        'importtime': perfil_importtime(args.precarregar, args.top),
+    }
+
+    regressoes = []
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as arquivo:
+            resultado['comparacao'] = comparar(resultado, json.load(arquivo), args.limiar)
+        regressoes = [c for c in resultado['comparacao'] if c['status'] == 'regressao']
+
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    print(texto)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(texto)
+    if args.salvar_baseline:
+        with open(args.salvar_baseline, 'w', encoding='utf-8') as arquivo:
+            json.dump({k: resultado[k] for k in ('executado_em', 'ambiente', 'cold_start', 'importtime')},
+                      arquivo, indent=2, ensure_ascii=False)
+
+    for regressao in regressoes:
+        print(f"REGRESSÃO {regressao['metrica']}: {regressao['base']} -> {regressao['atual']} "
+              f"(x{regressao['razao']})", file=sys.stderr)
+    if regressoes:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
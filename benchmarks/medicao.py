@@ -0,0 +1,72 @@
+"""
+============================================
+BENCHMARK - CONSULTAS POR REQUISIÇÃO
+============================================
+Atribui cada comando SQL à medição em andamento no contexto atual
+(ContextVar), via Database.registrar_observador_consulta. Consultas de
+ExecucaoParalela e das views async entram na requisição que as originou;
+as das threads de segundo plano ficam de fora.
+
+Uso:
+    with observando():
+        with medir() as medicao:
+            cliente.get('/produtos/vitrine')
+    medicao.consultas, medicao.tempo_db, medicao.queries
+"""
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, List, Optional
+
+
+class Medicao:
+    """Consultas e tempo de banco acumulados durante uma medição"""
+
+    def __init__(self, guardar_queries: bool = False):
+        self.consultas = 0
+        self.tempo_db = 0.0
+        self.queries: List[str] = []
+        self.guardar_queries = guardar_queries
+        self._lock = threading.Lock()
+
+    def registrar(self, query: Any, duracao: float) -> None:
+        with self._lock:
+            self.consultas += 1
+            self.tempo_db += duracao
+            if self.guardar_queries:
+                self.queries.append(' '.join(str(query).split()))
+
+
+# Medição em andamento (None fora das requisições medidas)
+_atual: ContextVar[Optional[Medicao]] = ContextVar('medicao_consultas', default=None)
+
+
+def _observar(query: Any, duracao: float) -> None:
+    medicao = _atual.get()
+    if medicao is not None:
+        medicao.registrar(query, duracao)
+
+
+@contextmanager
+def observando() -> Iterator[None]:
+    """Liga a instrumentação de Database enquanto o bloco executa"""
+    # Import tardio: quem usa este módulo pode ajustar o ambiente antes de carregar config
+    from core.database import Database
+
+    Database.registrar_observador_consulta(_observar)
+    try:
+        yield
+    finally:
+        Database.remover_observador_consulta(_observar)
+
+
+@contextmanager
+def medir(guardar_queries: bool = False) -> Iterator[Medicao]:
+    """Acumula em uma Medicao as consultas feitas neste contexto"""
+    medicao = Medicao(guardar_queries)
+    token = _atual.set(medicao)
+    try:
+        yield medicao
+    finally:
+        _atual.reset(token)
@@ -0,0 +1,354 @@
+"""
+============================================
+BENCHMARK - MICROBENCHMARKS DO PACOTE CORE
+============================================
+Mede funções puras e quentes (chamadas por célula de template, por campo
+de formulário ou por linha de log), sem banco:
+
+- Aquecimento, calibração do número de laços (cada rodada dura pelo menos
+  --tempo-minimo) e --repeticoes rodadas com o GC desligado, como o timeit
+- Resumo estatístico por chamada: mínimo, mediana, média, desvio e
+  coeficiente de variação
+- Memória (tracemalloc, em passada separada para não distorcer o tempo):
+  pico transitório por chamada e bytes retidos por chamada (vazamentos)
+- Portão de regressão: compara a mediana com um baseline salvo e sai com
+  código 1 se algum caso ficar mais lento que o limiar
+
+Uso:
+    python -m benchmarks.micro --salvar-baseline benchmarks/micro_baseline.json
+    python -m benchmarks.micro --baseline benchmarks/micro_baseline.json --limiar 0.15
+    python -m benchmarks.micro --filtro Formatador --saida micro.json
+
+Cada caso devolve uma função sem argumentos; uma "chamada" é uma execução
+dela (em geral um lote pequeno de entradas representativas).
+"""
+
+import argparse
+import gc
+import itertools
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional
+
+# Nome do caso -> preparo (monta os dados e devolve a função medida)
+CASOS: Dict[str, Callable[[], Callable[[], Any]]] = {}
+
+
+def caso(nome: str):
+    """Registra um preparo de caso em CASOS"""
+    def registrar(preparo):
+        CASOS[nome] = preparo
+        return preparo
+    return registrar
+
+
+# ============================================
+# CASOS
+# ============================================
+
+@caso('FormatadorService.formatar_dinheiro')
+def _formatar_dinheiro():
+    from core.services import FormatadorService
+    valores = [Decimal('1234.56'), 45.9, 0, None, '12,50', Decimal('1000000.00'), 'invalido']
+    formatar = FormatadorService.formatar_dinheiro
+    return lambda: [formatar(v) for v in valores]
+
+
+@caso('FormatadorService.formatar_data')
+def _formatar_data():
+    from core.services import FormatadorService
+    valores = [datetime(2025, 3, 15, 10, 30), '2025-03-15 10:30:00', None]
+    formatar = FormatadorService.formatar_data
+    return lambda: [formatar(v) for v in valores]
+
+
+@caso('FormatadorService.documentos')
+def _formatar_documentos():
+    from core.services import FormatadorService as F
+    return lambda: (F.formatar_cpf('12345678900'), F.formatar_cnpj('12345678000190'),
+                    F.formatar_telefone('11911111111'), F.formatar_cep('01234567'))
+
+
+@caso('ValidacaoService.validar_email')
+def _validar_email():
+    from core.services import ValidacaoService
+    valores = ['responsavel@escola.com.br', 'sem-arroba.com', '', 'a@b.c', 'x@y']
+    validar = ValidacaoService.validar_email
+    return lambda: [validar(v) for v in valores]
+
+
+@caso('ValidacaoService.validar_cpf')
+def _validar_cpf():
+    from core.services import ValidacaoService
+    valores = ['123.456.789-00', '11111111111', '', '123']
+    validar = ValidacaoService.validar_cpf
+    return lambda: [validar(v) for v in valores]
+
+
+@caso('ValidacaoService.validar_cnpj')
+def _validar_cnpj():
+    from core.services import ValidacaoService
+    valores = ['12.345.678/0001-90', '00000000000000', '', '12.345']
+    validar = ValidacaoService.validar_cnpj
+    return lambda: [validar(v) for v in valores]
+
+
+@caso('ValidacaoService.validar_cep_telefone')
+def _validar_cep_telefone():
+    from core.services import ValidacaoService as V
+    return lambda: (V.validar_cep('01234-567'), V.validar_cep('123'),
+                    V.validar_telefone('(11) 91111-1111'), V.validar_telefone('1234'))
+
+
+def _logs_exemplo(quantidade: int, gravados: bool) -> List[Dict]:
+    """Linhas de logs_alteracoes como chegam às telas (com diff gravado ou legadas)"""
+    antigos = {'id': 7, 'nome': 'Camisa Polo', 'preco': '45.90', 'estoque': 150, 'ativo': True,
+               'data_atualizacao': '2025-03-01 10:00:00'}
+    novos = {**antigos, 'preco': '49.90', 'estoque': 140, 'data_atualizacao': '2025-03-02 10:00:00'}
+    linhas = []
+    for i in range(quantidade):
+        linha = {'id': i, 'acao': 'UPDATE', 'tabela': 'produtos', 'registro_id': 7,
+                 'descricao': f'Produto atualizado (ID: {i})'}
+        if gravados:
+            linha.update({'diff': [{'campo': 'estoque', 'antes': 150, 'depois': 140},
+                                   {'campo': 'preco', 'antes': '45.90', 'depois': '49.90'}],
+                          'descricao_segura': 'Produto atualizado'})
+        else:
+            linha.update({'diff': None, 'versao': None,
+                          'dados_antigos': json.dumps(antigos), 'dados_novos': json.dumps(novos)})
+        linhas.append(linha)
+    return linhas
+
+
+@caso('usuarios._preparar_detalhes_logs[legado]')
+def _preparar_logs_legado():
+    from modules.usuarios.module import _preparar_detalhes_logs
+    logs = _logs_exemplo(50, gravados=False)
+    # Cópia rasa a cada chamada: a função altera as linhas recebidas
+    return lambda: _preparar_detalhes_logs([dict(l) for l in logs])
+
+
+@caso('usuarios._preparar_detalhes_logs[gravado]')
+def _preparar_logs_gravado():
+    from modules.usuarios.module import _preparar_detalhes_logs
+    logs = _logs_exemplo(50, gravados=True)
+    return lambda: _preparar_detalhes_logs([dict(l) for l in logs])
+
+
+@caso('Auditoria.montar[UPDATE]')
+def _auditoria_montar():
+    from core.auditoria import Auditoria
+    antigos = {'id': 7, 'nome': 'Camisa Polo', 'preco': Decimal('45.90'), 'estoque': 150,
+               'data_cadastro': datetime(2025, 1, 1), 'ativo': True}
+    novos = {'preco': Decimal('49.90'), 'estoque': 140}
+    return lambda: Auditoria.montar(1, 'produtos', 7, 'UPDATE', antigos, novos, 'Produto atualizado (ID: 7)')
+
+
+@caso('FilterHelper.build_where_clause')
+def _build_where_clause():
+    from core.pagination import FilterHelper
+    filtros = {'status': 'pago', 'escola_id': 3, 'valor_min': 10, 'valor_max': 500,
+               'nome_like': 'camisa', 'busca': 'polo', 'fornecedor_id': None, 'categoria': ''}
+    mapeamento = {'status': 'p.status', 'valor': 'p.valor_total', 'nome': 'pr.nome'}
+    return lambda: FilterHelper.build_where_clause(filtros, mapeamento)
+
+
+@caso('Pagination.iter_pages')
+def _iter_pages():
+    from core.pagination import Pagination
+    return lambda: list(Pagination(page=250, per_page=20, total=10000).iter_pages())
+
+
+@caso('UtilsService.extrair_ids')
+def _extrair_ids():
+    from core.services import UtilsService
+    valores = ['1', '2', '3, 4, 5', '10\n11\n12', '7;8;9', 'abc', '3']
+    return lambda: UtilsService.extrair_ids(valores)
+
+
+@caso('ProdutoRepository._montar_query_vitrine')
+def _montar_query_vitrine():
+    from core.repositories import ProdutoRepository
+    filtros = {'categoria': 'Camisa', 'escola': '3', 'busca': 'polo'}
+    return lambda: ProdutoRepository._montar_query_vitrine(filtros)
+
+
+# ============================================
+# MEDIÇÃO
+# ============================================
+
+def _cronometrar(funcao: Callable[[], Any], lacos: int) -> float:
+    repeticao = itertools.repeat(None, lacos)
+    inicio = time.perf_counter()
+    for _ in repeticao:
+        funcao()
+    return time.perf_counter() - inicio
+
+
+def medir_tempo(funcao: Callable[[], Any], repeticoes: int, tempo_minimo: float,
+                aquecimento: int) -> Dict:
+    """Tempo por chamada (µs) em `repeticoes` rodadas de `lacos` chamadas cada"""
+    for _ in range(aquecimento):
+        funcao()
+
+    gc_ativo = gc.isenabled()
+    gc.disable()
+    try:
+        # Calibração: dobra os laços até uma rodada durar tempo_minimo
+        lacos = 1
+        while _cronometrar(funcao, lacos) < tempo_minimo and lacos < 1 << 24:
+            lacos *= 2
+        tempos = [_cronometrar(funcao, lacos) / lacos * 1e6 for _ in range(repeticoes)]
+    finally:
+        if gc_ativo:
+            gc.enable()
+
+    media = statistics.mean(tempos)
+    desvio = statistics.stdev(tempos) if len(tempos) > 1 else 0.0
+    return {
+        'lacos': lacos,
+        'repeticoes': repeticoes,
+        'min_us': round(min(tempos), 4),
+        'mediana_us': round(statistics.median(tempos), 4),
+        'media_us': round(media, 4),
+        'desvio_us': round(desvio, 4),
+        'cv_pct': round(desvio / media * 100, 2) if media else 0.0,
+    }
+
+
+def medir_memoria(funcao: Callable[[], Any], chamadas: int) -> Dict:
+    """Pico transitório e bytes retidos por chamada, medidos com tracemalloc"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        # Primeira chamada fora da conta: caches preguiçosos e interning
+        funcao()
+        antes, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        funcao()
+        _, pico = tracemalloc.get_traced_memory()
+        for _ in range(chamadas - 1):
+            funcao()
+        depois, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'pico_bytes': max(0, pico - antes),
+        'retido_bytes_por_chamada': round(max(0, depois - antes) / max(1, chamadas), 1),
+    }
+
+
+def executar(filtro: Optional[str], repeticoes: int, tempo_minimo: float,
+             aquecimento: int, chamadas_memoria: int) -> Dict[str, Dict]:
+    resultados = {}
+    for nome, preparo in CASOS.items():
+        if filtro and filtro.lower() not in nome.lower():
+            continue
+        funcao = preparo()
+        resultados[nome] = {**medir_tempo(funcao, repeticoes, tempo_minimo, aquecimento),
+                            **medir_memoria(funcao, chamadas_memoria)}
+    return resultados
+
+
+# ============================================
+# PORTÃO DE REGRESSÃO
+# ============================================
+
+def comparar(resultados: Dict[str, Dict], baseline: Dict, limiar: float) -> List[Dict]:
+    """
+    Compara a mediana de cada caso com a do baseline
+
+    status: 'regressao' (mais lento que 1 + limiar), 'melhoria' (mais rápido
+    que 1 - limiar), 'ok' ou 'novo' (caso ausente do baseline)
+    """
+    comparacao = []
+    casos_base = baseline.get('casos', {})
+    for nome, atual in resultados.items():
+        base = casos_base.get(nome)
+        if not base or not base.get('mediana_us'):
+            comparacao.append({'caso': nome, 'status': 'novo'})
+            continue
+        razao = atual['mediana_us'] / base['mediana_us']
+        status = 'regressao' if razao > 1 + limiar else 'melhoria' if razao < 1 - limiar else 'ok'
+        comparacao.append({
+            'caso': nome,
+            'status': status,
+            'razao': round(razao, 3),
+            'mediana_base_us': base['mediana_us'],
+            'mediana_atual_us': atual['mediana_us'],
+            'pico_base_bytes': base.get('pico_bytes'),
+            'pico_atual_bytes': atual['pico_bytes'],
+        })
+    return comparacao
+
+
+def _ambiente() -> Dict:
+    return {'python': platform.python_version(), 'implementacao': platform.python_implementation(),
+            'plataforma': platform.platform(), 'processador': platform.processor() or platform.machine()}
+
+
+# ============================================
+# EXECUÇÃO
+# ============================================
+
+def main():
+    parser = argparse.ArgumentParser(description='Microbenchmarks das funções quentes do pacote core')
+    parser.add_argument('--filtro', help='Mede apenas os casos cujo nome contém o texto')
+    parser.add_argument('--listar', action='store_true', help='Lista os casos e sai')
+    parser.add_argument('--repeticoes', type=int, default=7, help='Rodadas medidas por caso')
+    parser.add_argument('--tempo-minimo', type=float, default=0.05, help='Duração mínima de cada rodada (s)')
+    parser.add_argument('--aquecimento', type=int, default=200, help='Chamadas antes de medir')
+    parser.add_argument('--chamadas-memoria', type=int, default=200, help='Chamadas na passada do tracemalloc')
+    parser.add_argument('--baseline', help='Baseline JSON para comparar (portão de regressão)')
+    parser.add_argument('--limiar', type=float, default=0.20, help='Lentidão tolerada sobre o baseline (0.20 = 20%%)')
+    parser.add_argument('--salvar-baseline', help='Grava o resultado como novo baseline neste arquivo')
+    parser.add_argument('--saida', help='Arquivo JSON para gravar o resultado (opcional)')
+    args = parser.parse_args()
+
+    if args.listar:
+        print('\n'.join(CASOS))
+        return
+
+    resultados = executar(args.filtro, max(2, args.repeticoes), args.tempo_minimo,
+                          args.aquecimento, max(1, args.chamadas_memoria))
+    resultado = {
+        'executado_em': datetime.now().isoformat(timespec='seconds'),
+        'ambiente': _ambiente(),
+        'parametros': vars(args),
+        'casos': resultados,
+    }
+
+    regressoes = []
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as arquivo:
+            baseline = json.load(arquivo)
+        resultado['comparacao'] = comparar(resultados, baseline, args.limiar)
+        regressoes = [c for c in resultado['comparacao'] if c['status'] == 'regressao']
+        if baseline.get('ambiente', {}).get('python') != resultado['ambiente']['python']:
+            resultado['aviso'] = 'baseline gerado com outra versão do Python'
+
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False, default=str)
+    print(texto)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(texto)
+    if args.salvar_baseline:
+        with open(args.salvar_baseline, 'w', encoding='utf-8') as arquivo:
+            json.dump({k: resultado[k] for k in ('executado_em', 'ambiente', 'casos')},
+                      arquivo, indent=2, ensure_ascii=False)
+
+    for regressao in regressoes:
+        print(f"REGRESSÃO {regressao['caso']}: {regressao['mediana_base_us']} -> "
+              f"{regressao['mediana_atual_us']} µs (x{regressao['razao']})", file=sys.stderr)
+    if regressoes:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
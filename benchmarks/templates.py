@@ -0,0 +1,181 @@
+"""
+============================================
+BENCHMARK - COMPILAÇÃO DE TEMPLATES
+============================================
+Mede, em processos Python novos (como um worker recém-criado), quanto a
+compilação dos templates Jinja pesa na primeira requisição e quanto o
+cache de bytecode em disco e o aquecimento de core/compilacao_templates.py
+tiram dela:
+
+- frio: sem cache de bytecode e sem aquecimento (compila no primeiro uso)
+- bytecode: cache em disco já preenchido por outro processo, sem aquecimento
+- aquecido_memoria: aquecimento sem cache em disco (compila tudo antes)
+- aquecido: cache em disco + aquecimento (o que o gunicorn faz por padrão)
+
+Para cada modo: tempo do aquecimento (pago antes de aceitar requisições),
+latência da primeira e da segunda requisição de rotas que não consultam
+o banco (mediana de --repeticoes processos). Portão de regressão opcional
+contra um baseline salvo, como em inicializacao.py.
+
+Uso:
+    python -m benchmarks.templates
+    python -m benchmarks.templates --repeticoes 9 --saida templates.json
+    python -m benchmarks.templates --salvar-baseline templates_base.json
+    python -m benchmarks.templates --baseline templates_base.json --limiar 0.25
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from typing import Dict, List
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Rotas que renderizam templates sem depender do banco
+ROTAS = ['/auth/solicitar-codigo', '/rota-inexistente']
+
+# Modo -> (usa o cache de bytecode em disco, aquece antes da primeira requisição)
+MODOS = {
+    'frio': (False, False),
+    'bytecode': (True, False),
+    'aquecido_memoria': (False, True),
+    'aquecido': (True, True),
+}
+
+# Executado no processo filho: aquece (opcional) e mede a 1ª e a 2ª requisição de cada rota
+_SCRIPT_FILHO = """
+import json, time
+import app
+from core.compilacao_templates import aquecer_templates
+aquecimento = aquecer_templates(app.app.jinja_env) if {aquecer} else None
+cliente = app.app.test_client()
+rotas = {{}}
+for rota in {rotas!r}:
+    tempos = []
+    for _ in range(2):
+        inicio = time.perf_counter()
+        resposta = cliente.get(rota)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    rotas[rota] = {{'status': resposta.status_code, 'primeira_ms': tempos[0], 'segunda_ms': tempos[1]}}
+print(json.dumps({{'aquecimento': aquecimento, 'rotas': rotas}}))
+"""
+
+
+def _executar_filho(diretorio: str, aquecer: bool) -> Dict:
+    ambiente = {**os.environ, 'DB_CONNECT_TIMEOUT': '1', 'PYTHONDONTWRITEBYTECODE': '1',
+                'TEMPLATES_BYTECODE_DIR': diretorio}
+    processo = subprocess.run([sys.executable, '-c', _SCRIPT_FILHO.format(aquecer=aquecer, rotas=ROTAS)],
+                              cwd=RAIZ, env=ambiente, capture_output=True, text=True, timeout=120)
+    if processo.returncode != 0:
+        raise RuntimeError(f"processo filho falhou:\n{processo.stderr}")
+    for linha in reversed(processo.stdout.strip().splitlines()):
+        if linha.startswith('{'):
+            return json.loads(linha)
+    raise RuntimeError(f"processo filho não informou a medição:\n{processo.stdout}")
+
+
+def _mediana(valores: List[float]) -> float:
+    return round(statistics.median(valores), 2)
+
+
+def medir_modo(diretorio: str, aquecer: bool, repeticoes: int) -> Dict:
+    """Medianas de aquecimento e latências em `repeticoes` processos novos"""
+    medicoes = [_executar_filho(diretorio, aquecer) for _ in range(repeticoes)]
+    resultado = {'rotas': {}}
+    if aquecer:
+        resultado['aquecimento_ms'] = _mediana([m['aquecimento']['duracao_ms'] for m in medicoes])
+        resultado['templates'] = medicoes[-1]['aquecimento']['templates']
+    for rota in ROTAS:
+        resultado['rotas'][rota] = {
+            'status': medicoes[-1]['rotas'][rota]['status'],
+            'primeira_ms': _mediana([m['rotas'][rota]['primeira_ms'] for m in medicoes]),
+            'segunda_ms': _mediana([m['rotas'][rota]['segunda_ms'] for m in medicoes]),
+        }
+    resultado['primeiras_total_ms'] = round(sum(r['primeira_ms'] for r in resultado['rotas'].values()), 2)
+    return resultado
+
+
+def medir(repeticoes: int) -> Dict:
+    """Todos os modos; o cache em disco é um diretório temporário preenchido antes"""
+    diretorio = tempfile.mkdtemp(prefix='bench_jinja_')
+    try:
+        _executar_filho(diretorio, aquecer=True)
+        return {modo: medir_modo(diretorio if bytecode else '', aquecer, repeticoes)
+                for modo, (bytecode, aquecer) in MODOS.items()}
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+
+def comparar(atual: Dict, baseline: Dict, limiar: float) -> List[Dict]:
+    """Compara o total das primeiras requisições e o aquecimento de cada modo com o baseline"""
+    comparacao = []
+    for modo, medicao in atual['modos'].items():
+        base = baseline['modos'].get(modo)
+        if not base:
+            continue
+        for metrica in ('primeiras_total_ms', 'aquecimento_ms'):
+            if metrica not in medicao or metrica not in base:
+                continue
+            razao = medicao[metrica] / base[metrica] if base[metrica] else 1.0
+            status = 'regressao' if razao > 1 + limiar else 'melhoria' if razao < 1 - limiar else 'ok'
+            comparacao.append({'metrica': f"{modo}.{metrica}", 'status': status, 'base': base[metrica],
+                               'atual': medicao[metrica], 'razao': round(razao, 3)})
+    return comparacao
+
+
+# ============================================
+# EXECUÇÃO
+# ============================================
+
+def main():
+    parser = argparse.ArgumentParser(description='Compilação de templates na primeira requisição')
+    parser.add_argument('--repeticoes', type=int, default=5, help='Processos medidos por modo')
+    parser.add_argument('--baseline', help='Baseline JSON para comparar (portão de regressão)')
+    parser.add_argument('--limiar', type=float, default=0.25, help='Piora tolerada sobre o baseline (0.25 = 25%%)')
+    parser.add_argument('--salvar-baseline', help='Grava o resultado como novo baseline neste arquivo')
+    parser.add_argument('--saida', help='Arquivo JSON para gravar o resultado (opcional)')
+    args = parser.parse_args()
+
+    modos = medir(max(1, args.repeticoes))
+    frio = modos['frio']['primeiras_total_ms']
+    resultado = {
+        'executado_em': datetime.now().isoformat(timespec='seconds'),
+        'ambiente': {'python': platform.python_version(), 'plataforma': platform.platform()},
+        'parametros': vars(args),
+        'modos': modos,
+        'reducao_primeiras_vs_frio': {modo: round(1 - m['primeiras_total_ms'] / frio, 3) if frio else 0.0
+                                      for modo, m in modos.items() if modo != 'frio'},
+    }
+
+    regressoes = []
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as arquivo:
+            resultado['comparacao'] = comparar(resultado, json.load(arquivo), args.limiar)
+        regressoes = [c for c in resultado['comparacao'] if c['status'] == 'regressao']
+
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    print(texto)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(texto)
+    if args.salvar_baseline:
+        with open(args.salvar_baseline, 'w', encoding='utf-8') as arquivo:
+            json.dump({k: resultado[k] for k in ('executado_em', 'ambiente', 'modos')},
+                      arquivo, indent=2, ensure_ascii=False)
+
+    for regressao in regressoes:
+        print(f"REGRESSÃO {regressao['metrica']}: {regressao['base']} -> {regressao['atual']} "
+              f"(x{regressao['razao']})", file=sys.stderr)
+    if regressoes:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
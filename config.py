@@ -27,6 +27,18 @@ DB_CONFIG = {
     'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', '3'))  # Timeout em segundos para evitar travamento
 }
 
+# Pool assíncrono (psycopg 3) usado pelas rotas async de alta concorrência
+DB_POOL_ASYNC_MIN = int(os.getenv('DB_POOL_ASYNC_MIN', '1'))  # Conexões mantidas abertas por worker
+DB_POOL_ASYNC_MAX = int(os.getenv('DB_POOL_ASYNC_MAX', '20'))  # Limite de conexões simultâneas por worker
+DB_POOL_ASYNC_TIMEOUT = float(os.getenv('DB_POOL_ASYNC_TIMEOUT', '10'))  # Espera máxima por uma conexão livre (segundos)
+
+# Operações em lote (Database.inserir_muitos/atualizar_muitos/excluir_muitos/upsert)
+DB_TAMANHO_LOTE = int(os.getenv('DB_TAMANHO_LOTE', '1000'))  # Linhas por statement; limitado a 65535 parâmetros
+
+# Consultas independentes de uma requisição executadas em paralelo (core/paralelo.py)
+PARALELO_MAX_THREADS = int(os.getenv('PARALELO_MAX_THREADS', '16'))  # Threads do pool compartilhado por worker
+PARALELO_LIMITE_POR_REQUISICAO = int(os.getenv('PARALELO_LIMITE_POR_REQUISICAO', '4'))  # Consultas simultâneas por requisição
+
 # ============================================
 # CONFIGURAÇÕES DO SERVIDOR SMTP (ENVIO DE EMAIL)
 # ============================================
@@ -49,18 +61,113 @@ SECRET_KEY = os.getenv('SECRET_KEY', 'change-me')  # Chave para assinatura de co
 DEBUG = os.getenv('DEBUG', 'true').lower() in ('1', 'true', 'yes', 'on')  # Modo desenvolvimento com traceback
 PORT = int(os.getenv('PORT', '5000'))  # Porta do servidor Werkzeug
 
+# ============================================
+# CONFIGURAÇÕES DO SERVIDOR WSGI (GUNICORN)
+# ============================================
+# Lidas por gunicorn.conf.py; workers/threads em 0 são calculados por core/servidor.py
+GUNICORN_BIND = os.getenv('GUNICORN_BIND', f"0.0.0.0:{PORT}")  # Endereço de escuta
+GUNICORN_WORKERS = int(os.getenv('GUNICORN_WORKERS', '0'))  # Processos (0 = pela CPU, limitado pelo orçamento de conexões)
+GUNICORN_THREADS = int(os.getenv('GUNICORN_THREADS', '0'))  # Threads por worker (0 = pelo tamanho do pool async)
+GUNICORN_ASGI = os.getenv('GUNICORN_ASGI', 'false').lower() in ('1', 'true', 'yes', 'on')  # Workers uvicorn com asgi.py: views async no event loop, sem ocupar thread
+GUNICORN_PRELOAD = os.getenv('GUNICORN_PRELOAD', 'true').lower() in ('1', 'true', 'yes', 'on')  # Importa a aplicação no mestre antes do fork
+GUNICORN_TIMEOUT = int(os.getenv('GUNICORN_TIMEOUT', '30'))  # Worker sem sinal de vida por N s é abortado (pilhas vão para o log)
+GUNICORN_GRACEFUL_TIMEOUT = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))  # Prazo para concluir requisições em andamento no desligamento
+GUNICORN_KEEPALIVE = int(os.getenv('GUNICORN_KEEPALIVE', '5'))  # Segundos de keep-alive (atrás de proxy reverso)
+GUNICORN_MAX_REQUESTS = int(os.getenv('GUNICORN_MAX_REQUESTS', '2000'))  # Requisições até reciclar o worker (0 = nunca)
+GUNICORN_MAX_REQUESTS_JITTER = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '200'))  # Variação aleatória para os workers não reciclarem juntos
+DB_MAX_CONEXOES = int(os.getenv('DB_MAX_CONEXOES', '90'))  # Conexões que a instância inteira pode abrir (max_connections do PostgreSQL menos reserva)
+
+# ============================================
+# CONFIGURAÇÕES DE RESPOSTAS HTTP
+# ============================================
+# Compressão negociada por Accept-Encoding e GET condicional por versão dos dados (core/resposta.py)
+COMPRESSAO_ATIVA = os.getenv('COMPRESSAO_ATIVA', 'true').lower() in ('1', 'true', 'yes', 'on')  # Desligue se o proxy reverso já comprime
+COMPRESSAO_MIN_BYTES = int(os.getenv('COMPRESSAO_MIN_BYTES', '1024'))  # Corpos menores seguem sem compressão
+COMPRESSAO_NIVEL_GZIP = int(os.getenv('COMPRESSAO_NIVEL_GZIP', '6'))  # 1 (rápido) a 9 (menor)
+COMPRESSAO_QUALIDADE_BROTLI = int(os.getenv('COMPRESSAO_QUALIDADE_BROTLI', '5'))  # 0 a 11; acima de 5 fica caro para páginas dinâmicas
+RESPOSTA_CONDICIONAL_ATIVA = os.getenv('RESPOSTA_CONDICIONAL_ATIVA', 'true').lower() in ('1', 'true', 'yes', 'on')  # ETag fraco + 304 nas listagens e na vitrine
+
+# ============================================
+# CONFIGURAÇÕES DE ARQUIVOS ESTÁTICOS
+# ============================================
+# Pacotes CSS/JS minificados com hash no nome, manifest e .gz/.br pré-comprimidos (core/estaticos.py)
+ATIVOS_CONSTRUIR_NA_INICIALIZACAO = os.getenv('ATIVOS_CONSTRUIR_NA_INICIALIZACAO', 'true').lower() in ('1', 'true', 'yes', 'on')  # Gera os pacotes na importação se o manifest estiver ausente ou desatualizado
+ATIVOS_VERIFICAR_FONTES = os.getenv('ATIVOS_VERIFICAR_FONTES', str(DEBUG)).lower() in ('1', 'true', 'yes', 'on')  # Refaz os pacotes quando um fonte muda (desenvolvimento)
+ATIVOS_MINIFICAR = os.getenv('ATIVOS_MINIFICAR', 'true').lower() in ('1', 'true', 'yes', 'on')  # Desligado, os pacotes só concatenam os fontes
+ATIVOS_MAX_AGE_SEGUNDOS = int(os.getenv('ATIVOS_MAX_AGE_SEGUNDOS', '31536000'))  # Arquivos com hash no nome nunca mudam: 1 ano + immutable
+FAVICON_MAX_AGE_SEGUNDOS = int(os.getenv('FAVICON_MAX_AGE_SEGUNDOS', '86400'))  # /favicon.ico tem URL fixa: cache curto
+
 # ============================================
 # CONFIGURAÇÕES DE AUTENTICAÇÃO
 # ============================================
 CODIGO_ACESSO_DURACAO_HORAS = int(os.getenv('CODIGO_ACESSO_DURACAO_HORAS', '24'))  # TTL do código numérico
 CODIGO_ACESSO_TAMANHO = int(os.getenv('CODIGO_ACESSO_TAMANHO', '6'))  # Quantidade de dígitos (ex: 123456)
 SESSAO_DURACAO_DIAS = int(os.getenv('SESSAO_DURACAO_DIAS', '7'))  # Validade do cookie de sessão após login
+CODIGOS_ACESSO_VARREDURA_AUTOMATICA = os.getenv('CODIGOS_ACESSO_VARREDURA_AUTOMATICA', 'true').lower() in ('1', 'true', 'yes', 'on')  # Thread por worker que remove códigos expirados
+CODIGOS_ACESSO_VARREDURA_INTERVALO_SEGUNDOS = int(os.getenv('CODIGOS_ACESSO_VARREDURA_INTERVALO_SEGUNDOS', '900'))  # Intervalo entre varreduras
+CODIGOS_ACESSO_VARREDURA_LOTE = int(os.getenv('CODIGOS_ACESSO_VARREDURA_LOTE', '500'))  # Códigos removidos por transação
+CODIGOS_ACESSO_RETENCAO_HORAS = int(os.getenv('CODIGOS_ACESSO_RETENCAO_HORAS', '24'))  # Tempo após a expiração antes da remoção
+CODIGOS_ACESSO_ARQUIVAR = os.getenv('CODIGOS_ACESSO_ARQUIVAR', 'false').lower() in ('1', 'true', 'yes', 'on')  # Copia metadados (sem o código) para codigos_acesso_historico
 
 # ============================================
 # CONFIGURAÇÕES DE PAGINAÇÃO
 # ============================================
 ITENS_POR_PAGINA = int(os.getenv('ITENS_POR_PAGINA', '20'))  # Quantidade padrão de registros por página em listagens
 
+# ============================================
+# CONFIGURAÇÕES DE CACHE
+# ============================================
+# Cache de leitura para entidades de referência (escolas, fornecedores, responsáveis)
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memoria')  # 'memoria' (LRU por processo) ou 'sqlite' (compartilhado no host)
+CACHE_TTL_SEGUNDOS = float(os.getenv('CACHE_TTL_SEGUNDOS', '300'))  # Validade de uma entrada encontrada
+CACHE_TTL_NEGATIVO_SEGUNDOS = float(os.getenv('CACHE_TTL_NEGATIVO_SEGUNDOS', '30'))  # Validade de uma ausência (cache negativo)
+CACHE_MAX_ITENS = int(os.getenv('CACHE_MAX_ITENS', '5000'))  # Limite de entradas antes de descartar as menos usadas
+CACHE_SQLITE_PATH = os.getenv('CACHE_SQLITE_PATH', '/tmp/conecta_uniforme_cache.sqlite3')  # Arquivo do backend 'sqlite'
+CACHE_INVALIDACAO_DISTRIBUIDA = os.getenv('CACHE_INVALIDACAO_DISTRIBUIDA', 'true').lower() in ('1', 'true', 'yes', 'on')  # Propaga invalidações entre workers (LISTEN/NOTIFY)
+CACHE_CANAL_INVALIDACAO = os.getenv('CACHE_CANAL_INVALIDACAO', 'conecta_invalidacao')  # Canal PostgreSQL usado pelo barramento
+
+# Cache de fragmentos de template ({% cache %}, core/fragmentos.py): LRU em memória por worker
+FRAGMENTOS_ATIVO = os.getenv('FRAGMENTOS_ATIVO', 'true').lower() in ('1', 'true', 'yes', 'on')  # Desligado, os blocos {% cache %} sempre renderizam
+FRAGMENTOS_TTL_SEGUNDOS = float(os.getenv('FRAGMENTOS_TTL_SEGUNDOS', '3600'))  # Chaves já trazem a versão do registro; o TTL só limita versões antigas
+FRAGMENTOS_MAX_ITENS = int(os.getenv('FRAGMENTOS_MAX_ITENS', '10000'))  # Fragmentos mantidos por worker antes de descartar os menos usados
+
+# Compilação de templates (core/compilacao_templates.py)
+TEMPLATES_BYTECODE_DIR = os.getenv('TEMPLATES_BYTECODE_DIR', '/tmp/conecta_uniforme_jinja')  # Bytecode Jinja em disco compartilhado pelos workers do host ('' = desligado)
+TEMPLATES_AQUECER = os.getenv('TEMPLATES_AQUECER', 'true').lower() in ('1', 'true', 'yes', 'on')  # Carrega todos os templates antes do worker aceitar requisições
+
+# ============================================
+# CONFIGURAÇÕES DE RELATÓRIOS (ROLLUPS DE VENDAS)
+# ============================================
+# Compactação de resumo_vendas_deltas em resumo_vendas_diario e refresh de mv_estoque_produtos (core/relatorios.py)
+RELATORIOS_ATUALIZACAO_AUTOMATICA = os.getenv('RELATORIOS_ATUALIZACAO_AUTOMATICA', 'true').lower() in ('1', 'true', 'yes', 'on')  # Agendador em thread por worker (apenas um executa por vez)
+RELATORIOS_INTERVALO_SEGUNDOS = int(os.getenv('RELATORIOS_INTERVALO_SEGUNDOS', '60'))  # Intervalo da compactação de deltas
+RELATORIOS_INTERVALO_COMPLETO_SEGUNDOS = int(os.getenv('RELATORIOS_INTERVALO_COMPLETO_SEGUNDOS', '0'))  # Recálculo completo periódico (0 = só na primeira execução ou manual)
+RELATORIOS_LOTE_COMPACTACAO = int(os.getenv('RELATORIOS_LOTE_COMPACTACAO', '5000'))  # Deltas somados por statement
+RELATORIOS_RETENCAO_DELTAS_HORAS = int(os.getenv('RELATORIOS_RETENCAO_DELTAS_HORAS', '168'))  # Janela de idempotência (deltas compactados retidos)
+
+# ============================================
+# CONFIGURAÇÕES DE LOGS (PARTICIONAMENTO E RETENÇÃO)
+# ============================================
+# logs_alteracoes e logs_acesso particionadas por mês (core/particionamento.py)
+LOGS_MANUTENCAO_AUTOMATICA = os.getenv('LOGS_MANUTENCAO_AUTOMATICA', 'true').lower() in ('1', 'true', 'yes', 'on')  # Thread por worker que cria partições e aplica retenção
+LOGS_MANUTENCAO_INTERVALO_SEGUNDOS = int(os.getenv('LOGS_MANUTENCAO_INTERVALO_SEGUNDOS', '21600'))  # Intervalo entre ciclos de manutenção
+LOGS_PARTICOES_FUTURAS = int(os.getenv('LOGS_PARTICOES_FUTURAS', '3'))  # Meses futuros com partição já criada
+LOGS_RETENCAO_MESES = int(os.getenv('LOGS_RETENCAO_MESES', '12'))  # Meses mantidos no banco (0 = sem retenção)
+LOGS_DIRETORIO_ARQUIVO = os.getenv('LOGS_DIRETORIO_ARQUIVO', str(BASE_DIR / 'arquivo' / 'logs'))  # Destino dos CSV.gz das partições removidas
+LOGS_PERIODO_CONSULTA_DIAS = int(os.getenv('LOGS_PERIODO_CONSULTA_DIAS', '90'))  # Janela padrão das telas de logs (limita as partições lidas)
+LOGS_SNAPSHOT_INTERVALO = int(os.getenv('LOGS_SNAPSHOT_INTERVALO', '20'))  # A cada N versões um UPDATE também grava o estado completo do registro
+LOGS_POR_PAGINA = int(os.getenv('LOGS_POR_PAGINA', '50'))  # Linhas por página (keyset) nas telas de logs de alterações
+LOGS_LOTE_BACKFILL = int(os.getenv('LOGS_LOTE_BACKFILL', '1000'))  # Linhas por transação no preenchimento de diffs antigos
+
+# ============================================
+# CONFIGURAÇÕES DE HEALTHCHECK
+# ============================================
+# Verificação do banco em thread por worker (core/saude.py); as rotas /health/* servem o último estado
+SAUDE_INTERVALO_SEGUNDOS = float(os.getenv('SAUDE_INTERVALO_SEGUNDOS', '5'))  # Intervalo entre verificações com o banco saudável
+SAUDE_BACKOFF_MAXIMO_SEGUNDOS = float(os.getenv('SAUDE_BACKOFF_MAXIMO_SEGUNDOS', '60'))  # Teto do backoff exponencial com o banco fora
+SAUDE_LATENCIA_DEGRADADA_MS = float(os.getenv('SAUDE_LATENCIA_DEGRADADA_MS', '250'))  # Acima disso o banco é reportado como degradado
+SAUDE_TIMEOUT_CONSULTA_MS = int(os.getenv('SAUDE_TIMEOUT_CONSULTA_MS', '2000'))  # statement_timeout do SELECT 1 de verificação
+
 # ============================================
 # CONFIGURAÇÕES DE UPLOAD DE ARQUIVOS
 # ============================================
@@ -0,0 +1,404 @@
+"""
+============================================
+CORE - AUDITORIA (FORMATO COMPACTO DE logs_alteracoes)
+============================================
+Cada linha de logs_alteracoes guarda apenas o necessário:
+
+- alteracoes (JSONB): {campo: [antes, depois]} só dos campos que mudaram
+  em um UPDATE
+- snapshot (JSONB): estado completo do registro; gravado em INSERT
+  (estado criado), DELETE (estado removido), no primeiro evento do
+  registro e a cada LOGS_SNAPSHOT_INTERVALO versões
+- versao: contador de eventos do registro (tabela, registro_id). A
+  unicidade vem da serialização, não de um índice: toda gravação trava o
+  registro por advisory lock até o fim da transação antes de ler a última
+  versão (um índice único em tabela particionada precisa incluir
+  data_alteracao e, com ela, não impediria versões repetidas)
+- diff / descricao_segura: o que as telas de logs exibem (mudanças campo
+  a campo sem identificadores, descrição sanitizada), calculado uma vez na
+  gravação; linhas antigas são preenchidas por `preencher_diffs`
+
+Qualquer versão é reconstruída a partir do snapshot anterior mais
+próximo, aplicando as alterações seguintes (Auditoria.reconstruir).
+Linhas antigas, com dados_antigos/dados_novos em TEXT, continuam legíveis.
+
+Uso manual:
+    python -m core.auditoria --preencher-diffs [--lote N]
+"""
+
+import json
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from core.database import Database
+from config import LOGS_SNAPSHOT_INTERVALO, LOGS_LOTE_BACKFILL
+
+INTERVALO_SNAPSHOT = max(LOGS_SNAPSHOT_INTERVALO, 1)
+
+# Trava (tabela, registro_id) até o fim da transação; a ordenação evita
+# deadlock entre lotes que travam os mesmos registros (o lock é avaliado
+# depois do ORDER BY por ser volátil)
+SQL_TRAVA_REGISTROS = """
+    SELECT pg_advisory_xact_lock(hashtext(r.tabela), r.registro_id)
+    FROM (SELECT DISTINCT tabela, registro_id
+          FROM unnest(%s::varchar[], %s::int[]) AS r(tabela, registro_id)) r
+    ORDER BY r.tabela, r.registro_id
+"""
+
+# Última versão de cada registro (usa idx_logs_registro_versao)
+SQL_VERSOES_ATUAIS = """
+    SELECT l.tabela, l.registro_id, MAX(l.versao) AS versao
+    FROM (SELECT DISTINCT tabela, registro_id
+          FROM unnest(%s::varchar[], %s::int[]) AS r(tabela, registro_id)) r
+    JOIN logs_alteracoes l ON l.tabela = r.tabela AND l.registro_id = r.registro_id
+    GROUP BY l.tabela, l.registro_id
+"""
+
+# Próxima versão do registro dentro de um statement (usa idx_logs_registro_versao);
+# só é segura com o registro já travado por SQL_TRAVA_REGISTROS
+SQL_PROXIMA_VERSAO = """
+    SELECT COALESCE(MAX(l.versao), 0) + 1 AS versao
+    FROM logs_alteracoes l
+    WHERE l.tabela = {tabela} AND l.registro_id = {registro_id}
+"""
+
+# Quando um UPDATE carrega o snapshot completo além do delta
+# (%% porque o trecho entra em queries parametrizadas)
+SQL_GRAVA_SNAPSHOT = f"(v.versao = 1 OR v.versao %% {INTERVALO_SNAPSHOT} = 0)"
+
+
+# Campos omitidos no diff exibido (além de 'id' e '*_id', por LGPD)
+CAMPOS_OCULTOS_EXIBICAO = {'data_atualizacao', 'data_cadastro', 'id'}
+
+# Referências numéricas removidas das descrições exibidas
+PADROES_DESCRICAO = [
+    re.compile(r"(?i)\b(id|registro|reg|cod|codigo)\s*[:=#-]?\s*\d+\b"),
+    re.compile(r"#[0-9]+\b"),
+]
+
+
+class Auditoria:
+    """Montagem, gravação e reconstrução dos registros de auditoria"""
+
+    @staticmethod
+    def normalizar(dados: Any) -> Dict[str, Any]:
+        """Converte o registro para tipos JSON (datas/decimais viram texto)"""
+        if not dados:
+            return {}
+        if isinstance(dados, str):
+            try:
+                dados = json.loads(dados)
+            except ValueError:
+                return {}
+        return json.loads(json.dumps(dict(dados), default=str))
+
+    @staticmethod
+    def calcular_alteracoes(antigos: Dict[str, Any], novos: Dict[str, Any]) -> Dict[str, list]:
+        """
+        {campo: [antes, depois]} dos campos de `novos` que realmente mudaram.
+
+        Valores de formulário chegam como texto ('5' para 5), por isso a
+        comparação também considera a representação textual.
+        """
+        alteracoes = {}
+        for campo, depois in novos.items():
+            antes = antigos.get(campo)
+            if antes != depois and str(antes) != str(depois):
+                alteracoes[campo] = [antes, depois]
+        return alteracoes
+
+    # --------------------------------------------
+    # Diff de exibição
+    # --------------------------------------------
+
+    @staticmethod
+    def campo_exibido(campo: str) -> bool:
+        """Campos de data de controle e identificadores não aparecem nas telas"""
+        return campo not in CAMPOS_OCULTOS_EXIBICAO and not campo.endswith('_id')
+
+    @staticmethod
+    def sanitizar_descricao(texto: Optional[str]) -> Optional[str]:
+        """Remove referências numéricas (ids, códigos) da descrição"""
+        if not texto:
+            return texto
+        for padrao in PADROES_DESCRICAO:
+            texto = padrao.sub('[oculto]', texto)
+        return texto
+
+    @staticmethod
+    def diff_exibicao(acao: str, antigos: Dict[str, Any], novos: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Lista [{campo, antes, depois}] ordenada por campo, pronta para o template"""
+        if acao == 'INSERT':
+            antigos = {}
+        elif acao == 'DELETE':
+            novos = {}
+        mudancas = []
+        for campo in sorted(set(antigos) | set(novos)):
+            if not Auditoria.campo_exibido(campo):
+                continue
+            antes, depois = antigos.get(campo), novos.get(campo)
+            if acao != 'UPDATE' or antes != depois:
+                mudancas.append({'campo': campo, 'antes': antes, 'depois': depois})
+        return mudancas
+
+    @staticmethod
+    def diff_do_log(linha: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Diff de exibição de uma linha já gravada (formato compacto ou legado)"""
+        acao = linha.get('acao')
+        if linha.get('versao') is not None:
+            alteracoes = linha.get('alteracoes') or {}
+            snapshot = linha.get('snapshot') or {}
+            antigos = {k: v[0] for k, v in alteracoes.items()}
+            novos = {k: v[1] for k, v in alteracoes.items()}
+            if acao == 'INSERT':
+                novos = snapshot
+            elif acao == 'DELETE':
+                antigos = snapshot
+        else:
+            antigos = Auditoria.normalizar(linha.get('dados_antigos'))
+            novos = Auditoria.normalizar(linha.get('dados_novos'))
+        return Auditoria.diff_exibicao(acao, antigos, novos)
+
+    # --------------------------------------------
+    # Gravação
+    # --------------------------------------------
+
+    @staticmethod
+    def grava_snapshot(versao: int) -> bool:
+        """Política de snapshot de UPDATE (mesma regra de SQL_GRAVA_SNAPSHOT)"""
+        return versao == 1 or versao % INTERVALO_SNAPSHOT == 0
+
+    @staticmethod
+    def travar_registros(cursor, registros: Iterable[Tuple[str, Optional[int]]]) -> None:
+        """Serializa as gravações de auditoria dos registros até o fim da transação"""
+        pares = [(tabela, registro_id) for tabela, registro_id in registros if registro_id is not None]
+        if pares:
+            cursor.execute(SQL_TRAVA_REGISTROS, ([t for t, _ in pares], [r for _, r in pares]))
+
+    @staticmethod
+    def montar(usuario_id: Optional[int], tabela: str, registro_id: Optional[int], acao: str,
+               dados_antigos: Any = None, dados_novos: Any = None,
+               descricao: Optional[str] = None) -> Dict[str, Any]:
+        """Monta a linha de auditoria (delta, snapshot candidato e diff de exibição)"""
+        antigos = Auditoria.normalizar(dados_antigos)
+        novos = Auditoria.normalizar(dados_novos)
+        alteracoes = None
+        snapshot = None
+        diff = Auditoria.diff_exibicao(acao, antigos, novos)
+
+        if acao == 'UPDATE':
+            alteracoes = Auditoria.calcular_alteracoes(antigos, novos) or None
+            snapshot = {**antigos, **novos} if antigos else None
+            diff = Auditoria.diff_exibicao(acao, {c: v[0] for c, v in (alteracoes or {}).items()},
+                                           {c: v[1] for c, v in (alteracoes or {}).items()})
+        elif acao == 'INSERT':
+            snapshot = novos or None
+        elif acao == 'DELETE':
+            snapshot = antigos or None
+
+        return {
+            'usuario_id': usuario_id,
+            'tabela': tabela,
+            'registro_id': registro_id,
+            'acao': acao,
+            'alteracoes': alteracoes,
+            'snapshot': snapshot,
+            'diff': diff,
+            'descricao': descricao,
+            'descricao_segura': Auditoria.sanitizar_descricao(descricao),
+        }
+
+    @staticmethod
+    def gravar(registros: List[Dict[str, Any]], cursor=None) -> Optional[int]:
+        """
+        Grava linhas montadas por `montar` em um único INSERT.
+
+        Os registros são travados (advisory lock) e as versões lidas e
+        numeradas aqui, inclusive várias linhas do mesmo registro no lote;
+        o snapshot de UPDATE só segue para o banco quando a política o exige.
+
+        Parâmetros:
+            registros: Linhas de Auditoria.montar
+            cursor: Cursor de uma transação em andamento (opcional)
+
+        Retorna:
+            int: Linhas gravadas, ou None em erro
+        """
+        if not registros:
+            return 0
+        if cursor is None:
+            return Database.transaction(lambda cursor_transacao: Auditoria.gravar(registros, cursor_transacao))
+
+        query = """
+            INSERT INTO logs_alteracoes
+                (usuario_id, tabela, registro_id, acao, alteracoes, snapshot, versao,
+                 diff, descricao, descricao_segura)
+            SELECT r.usuario_id, r.tabela, r.registro_id, r.acao, r.alteracoes, r.snapshot,
+                   r.versao, r.diff, r.descricao, r.descricao_segura
+            FROM jsonb_to_recordset(%s::jsonb) AS r(usuario_id INTEGER, tabela VARCHAR, registro_id INTEGER,
+                                                   acao VARCHAR, alteracoes JSONB, snapshot JSONB, versao INTEGER,
+                                                   diff JSONB, descricao TEXT, descricao_segura TEXT)
+        """
+        chaves = [(r['tabela'], r['registro_id']) for r in registros]
+
+        Auditoria.travar_registros(cursor, chaves)
+        pares = [(t, r) for t, r in chaves if r is not None]
+        versoes = {}
+        if pares:
+            cursor.execute(SQL_VERSOES_ATUAIS, ([t for t, _ in pares], [r for _, r in pares]))
+            versoes = {(l['tabela'], l['registro_id']): l['versao'] or 0 for l in cursor.fetchall()}
+        linhas = []
+        for chave, registro in zip(chaves, registros):
+            versao = versoes.get(chave, 0) + 1
+            if chave[1] is not None:
+                versoes[chave] = versao
+            linha = dict(registro, versao=versao)
+            if registro['acao'] == 'UPDATE' and not Auditoria.grava_snapshot(versao):
+                linha['snapshot'] = None
+            linhas.append(linha)
+        cursor.execute(query, (json.dumps(linhas, default=str),))
+        return cursor.rowcount
+
+    # --------------------------------------------
+    # Reconstrução de versões
+    # --------------------------------------------
+
+    @staticmethod
+    def aplicar(estado: Optional[Dict[str, Any]], evento: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Estado do registro após o evento (snapshot, delta ou formato legado)"""
+        if evento.get('snapshot') is not None:
+            return dict(evento['snapshot'])
+        if evento.get('alteracoes'):
+            return {**(estado or {}), **{campo: valores[1] for campo, valores in evento['alteracoes'].items()}}
+        if evento.get('versao') is None:
+            antigos = Auditoria.normalizar(evento.get('dados_antigos'))
+            novos = Auditoria.normalizar(evento.get('dados_novos'))
+            if evento.get('acao') == 'DELETE':
+                return antigos or estado
+            if antigos or novos:
+                return {**(estado or antigos), **novos}
+        return estado
+
+    @staticmethod
+    def reconstruir(tabela: str, registro_id: int, log_id: Optional[int] = None,
+                    cursor=None) -> Optional[Dict[str, Any]]:
+        """
+        Estado do registro logo após o log `log_id` (ou após o último log).
+
+        Lê apenas os eventos a partir do snapshot mais próximo anterior ao
+        alvo. Para um DELETE, devolve o estado removido.
+
+        Parâmetros:
+            cursor: Cursor (RealDictCursor) de uma transação em andamento (opcional)
+
+        Retorna:
+            dict: Campos do registro naquela versão, ou None se não houver
+                  histórico, se o histórico não tiver snapshot de partida
+                  (estado parcial não é devolvido) ou em erro
+        """
+        query = """
+            WITH eventos AS (
+                SELECT id, acao, versao, alteracoes, snapshot, dados_antigos, dados_novos, data_alteracao
+                FROM logs_alteracoes
+                WHERE tabela = %s AND registro_id = %s
+            ), alvo AS (
+                SELECT data_alteracao, id FROM eventos
+                WHERE %s::int IS NULL OR id = %s
+                ORDER BY data_alteracao DESC, id DESC
+                LIMIT 1
+            ), base AS (
+                SELECT e.data_alteracao, e.id
+                FROM eventos e, alvo
+                WHERE (e.data_alteracao, e.id) <= (alvo.data_alteracao, alvo.id)
+                  AND (e.snapshot IS NOT NULL OR e.versao IS NULL)
+                ORDER BY e.data_alteracao DESC, e.id DESC
+                LIMIT 1
+            )
+            SELECT e.*
+            FROM eventos e, alvo
+            WHERE (e.data_alteracao, e.id) <= (alvo.data_alteracao, alvo.id)
+              AND NOT EXISTS (SELECT 1 FROM base WHERE (e.data_alteracao, e.id) < (base.data_alteracao, base.id))
+            ORDER BY e.data_alteracao, e.id
+        """
+        parametros = (tabela, registro_id, log_id, log_id)
+        if cursor is None:
+            eventos = Database.executar(query, parametros, fetchall=True)
+        else:
+            cursor.execute(query, parametros)
+            eventos = cursor.fetchall()
+        if not eventos:
+            return None
+        if eventos[0].get('snapshot') is None and eventos[0].get('versao') is not None:
+            # Sem base: só deltas a partir de um estado desconhecido
+            print(f"Histórico de {tabela} {registro_id} sem snapshot de partida; reconstrução incompleta")
+            return None
+        estado = None
+        for evento in eventos:
+            estado = Auditoria.aplicar(estado, evento)
+        return estado
+
+    # --------------------------------------------
+    # Backfill do diff de exibição
+    # --------------------------------------------
+
+    @staticmethod
+    def preencher_diffs(lote: int = LOGS_LOTE_BACKFILL, max_lotes: Optional[int] = None) -> Optional[int]:
+        """
+        Calcula diff/descricao_segura das linhas gravadas antes da coluna existir.
+
+        Cada lote é uma transação curta (FOR UPDATE SKIP LOCKED), então o job
+        pode rodar com a aplicação no ar, ser interrompido e retomado, ou
+        rodar em paralelo em mais de um processo.
+
+        Parâmetros:
+            lote: Linhas por transação
+            max_lotes: Interrompe após N lotes (None = até acabar)
+
+        Retorna:
+            int: Linhas preenchidas, ou None em erro
+        """
+        def processar(cursor):
+            cursor.execute("""
+                SELECT id, data_alteracao, acao, versao, alteracoes, snapshot,
+                       dados_antigos, dados_novos, descricao
+                FROM logs_alteracoes
+                WHERE diff IS NULL
+                ORDER BY id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            """, (lote,))
+            linhas = cursor.fetchall()
+            for linha in linhas:
+                cursor.execute(
+                    "UPDATE logs_alteracoes SET diff = %s::jsonb, descricao_segura = %s "
+                    "WHERE id = %s AND data_alteracao = %s",
+                    (json.dumps(Auditoria.diff_do_log(linha), default=str),
+                     Auditoria.sanitizar_descricao(linha['descricao']),
+                     linha['id'], linha['data_alteracao'])
+                )
+            return len(linhas)
+
+        total = 0
+        lotes = 0
+        while max_lotes is None or lotes < max_lotes:
+            processadas = Database.transaction(processar)
+            if processadas is None:
+                return None
+            total += processadas
+            lotes += 1
+            if processadas < lote:
+                break
+        return total
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Manutenção dos registros de auditoria')
+    parser.add_argument('--preencher-diffs', action='store_true',
+                        help='Calcula o diff de exibição das linhas antigas')
+    parser.add_argument('--lote', type=int, default=LOGS_LOTE_BACKFILL, help='Linhas por transação')
+    args = parser.parse_args()
+    if args.preencher_diffs:
+        print(json.dumps({'preenchidas': Auditoria.preencher_diffs(lote=args.lote)}))
+    else:
+        parser.print_help()
@@ -0,0 +1,368 @@
+"""
+============================================
+CORE - CACHE
+============================================
+Cache de leitura (read-through) compartilhado entre requisições.
+
+Usado para entidades de referência que mudam pouco e são lidas em quase
+toda requisição (escolas, fornecedores, responsáveis e seus vínculos com
+usuários). Características:
+- TTL por entrada e invalidação explícita quando a tabela é alterada
+- Single-flight por chave: apenas uma thread carrega do banco por vez
+- Cache negativo: ausências (None) também ficam em cache, com TTL próprio;
+  falhas de carregamento (ErroCarregamento) nunca são guardadas
+- Geração por namespace: um carregamento que termina depois de uma
+  invalidação do seu namespace não grava o valor (possivelmente antigo)
+- Métricas de acerto/erro por namespace
+- Backend plugável: LRU em memória ou SQLite em disco (compartilhado entre
+  workers do mesmo host, sem dependências externas)
+"""
+
+import copy
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+from config import (CACHE_BACKEND, CACHE_MAX_ITENS, CACHE_SQLITE_PATH,
+                    CACHE_TTL_SEGUNDOS, CACHE_TTL_NEGATIVO_SEGUNDOS)
+
+
+# Marcador de "registro inexistente" armazenado no cache negativo
+_AUSENTE = '__cache_ausente__'
+
+
+class ErroCarregamento(Exception):
+    """Levantada pelo carregador quando a leitura falhou (não é ausência do registro)"""
+
+
+# ============================================
+# BACKENDS DE ARMAZENAMENTO
+# ============================================
+
+class MemoriaLRUBackend:
+    """
+    Backend em memória do processo, com política LRU e expiração por TTL.
+
+    Cada worker possui sua própria cópia; a coerência entre workers é
+    responsabilidade da invalidação por tabela.
+    """
+
+    def __init__(self, max_itens: int = CACHE_MAX_ITENS):
+        self.max_itens = max(1, max_itens)
+        self._dados: 'OrderedDict[str, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, chave: str) -> Tuple[bool, Any]:
+        """Retorna (encontrado, valor) respeitando a expiração"""
+        with self._lock:
+            item = self._dados.get(chave)
+            if item is None:
+                return False, None
+            expira_em, valor = item
+            if expira_em < time.monotonic():
+                del self._dados[chave]
+                return False, None
+            self._dados.move_to_end(chave)
+            return True, valor
+
+    def definir(self, chave: str, valor: Any, ttl: float) -> None:
+        """Armazena valor, removendo o item menos usado se exceder o limite"""
+        with self._lock:
+            self._dados[chave] = (time.monotonic() + ttl, valor)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.max_itens:
+                self._dados.popitem(last=False)
+
+    def remover_prefixo(self, prefixo: str) -> int:
+        """Remove todas as chaves iniciadas pelo prefixo"""
+        with self._lock:
+            chaves = [c for c in self._dados if c.startswith(prefixo)]
+            for c in chaves:
+                del self._dados[c]
+            return len(chaves)
+
+    def limpar(self) -> None:
+        """Esvazia o cache"""
+        with self._lock:
+            self._dados.clear()
+
+    def reiniciar_apos_fork(self) -> None:
+        """Recria o lock no processo filho (o herdado pode ter sido copiado adquirido)"""
+        self._lock = threading.Lock()
+
+
+class SQLiteBackend:
+    """
+    Backend em arquivo SQLite local, compartilhado entre workers do mesmo host.
+
+    Serve como substituto local de um store compartilhado (ex.: Redis):
+    todos os processos do container enxergam as mesmas entradas e as
+    invalidações feitas por um worker valem para os demais.
+    """
+
+    def __init__(self, caminho: str = CACHE_SQLITE_PATH, max_itens: int = CACHE_MAX_ITENS):
+        self.caminho = caminho
+        self.max_itens = max(1, max_itens)
+        self._local = threading.local()
+        with self._conexao() as conexao:
+            conexao.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " chave TEXT PRIMARY KEY, valor BLOB, expira_em REAL)"
+            )
+
+    def _conexao(self) -> sqlite3.Connection:
+        """Uma conexão por thread (sqlite3 não compartilha conexões entre threads)"""
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is None:
+            conexao = sqlite3.connect(self.caminho, timeout=5, isolation_level=None)
+            conexao.execute('PRAGMA journal_mode=WAL')
+            self._local.conexao = conexao
+        return conexao
+
+    def obter(self, chave: str) -> Tuple[bool, Any]:
+        """Retorna (encontrado, valor) respeitando a expiração"""
+        try:
+            linha = self._conexao().execute(
+                "SELECT valor, expira_em FROM cache WHERE chave = ?", (chave,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Erro ao ler cache SQLite: {e}")
+            return False, None
+        if not linha or linha[1] < time.time():
+            return False, None
+        return True, pickle.loads(linha[0])
+
+    def definir(self, chave: str, valor: Any, ttl: float) -> None:
+        """Armazena valor serializado e aplica o limite de itens"""
+        try:
+            conexao = self._conexao()
+            conexao.execute(
+                "INSERT OR REPLACE INTO cache (chave, valor, expira_em) VALUES (?, ?, ?)",
+                (chave, pickle.dumps(valor), time.time() + ttl)
+            )
+            conexao.execute(
+                "DELETE FROM cache WHERE chave IN ("
+                " SELECT chave FROM cache ORDER BY expira_em DESC LIMIT -1 OFFSET ?)",
+                (self.max_itens,)
+            )
+        except sqlite3.Error as e:
+            print(f"Erro ao gravar cache SQLite: {e}")
+
+    def remover_prefixo(self, prefixo: str) -> int:
+        """Remove todas as chaves iniciadas pelo prefixo"""
+        try:
+            cursor = self._conexao().execute(
+                "DELETE FROM cache WHERE substr(chave, 1, ?) = ?", (len(prefixo), prefixo)
+            )
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            print(f"Erro ao invalidar cache SQLite: {e}")
+            return 0
+
+    def limpar(self) -> None:
+        """Esvazia o cache"""
+        try:
+            self._conexao().execute("DELETE FROM cache")
+        except sqlite3.Error as e:
+            print(f"Erro ao limpar cache SQLite: {e}")
+
+    def reiniciar_apos_fork(self) -> None:
+        """Descarta as conexões herdadas do pai (conexão sqlite3 não atravessa fork)"""
+        self._local = threading.local()
+
+
+def criar_backend(nome: str = CACHE_BACKEND):
+    """
+    Instancia o backend configurado em CACHE_BACKEND.
+
+    Valores aceitos: 'memoria' (padrão) e 'sqlite'.
+    """
+    if nome == 'sqlite':
+        return SQLiteBackend()
+    return MemoriaLRUBackend()
+
+
+# ============================================
+# CACHE DE LEITURA (READ-THROUGH)
+# ============================================
+
+class CacheLeitura:
+    """
+    Cache read-through com single-flight, cache negativo e métricas.
+
+    As chaves são organizadas em namespaces (ex.: 'escolas'). Cada namespace
+    declara de quais tabelas depende; qualquer alteração nessas tabelas
+    invalida o namespace inteiro.
+    """
+
+    def __init__(self, backend=None, ttl: float = CACHE_TTL_SEGUNDOS,
+                 ttl_negativo: float = CACHE_TTL_NEGATIVO_SEGUNDOS):
+        self.backend = backend if backend is not None else criar_backend()
+        self.ttl = ttl
+        self.ttl_negativo = ttl_negativo
+        self._dependencias: Dict[str, set] = {}
+        self._locks_chave: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._metricas: Dict[str, Dict[str, int]] = {}
+        # Incrementadas a cada invalidação (por namespace) e limpeza (global)
+        self._geracoes: Dict[str, int] = {}
+        self._geracao_global = 0
+
+    # --------------------------------------------
+    # Registro de namespaces e métricas
+    # --------------------------------------------
+
+    def registrar_namespace(self, namespace: str, tabelas: Iterable[str]) -> None:
+        """Declara as tabelas cuja alteração invalida o namespace"""
+        for tabela in tabelas:
+            self._dependencias.setdefault(tabela, set()).add(namespace)
+
+    def _contar(self, namespace: str, evento: str) -> None:
+        with self._lock:
+            contadores = self._metricas.setdefault(namespace, {
+                'hits': 0, 'misses': 0, 'hits_negativos': 0,
+                'carregamentos': 0, 'falhas': 0, 'invalidacoes': 0
+            })
+            contadores[evento] += 1
+
+    def metricas(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Retorna contadores por namespace com taxa de acerto calculada
+
+        Retorna:
+            dict: {namespace: {hits, misses, hits_negativos, carregamentos, falhas, invalidacoes, taxa_acerto}}
+        """
+        with self._lock:
+            resultado = {}
+            for namespace, contadores in self._metricas.items():
+                dados = dict(contadores)
+                total = dados['hits'] + dados['hits_negativos'] + dados['misses']
+                acertos = dados['hits'] + dados['hits_negativos']
+                dados['taxa_acerto'] = round(acertos / total, 4) if total else 0.0
+                resultado[namespace] = dados
+            return resultado
+
+    # --------------------------------------------
+    # Leitura
+    # --------------------------------------------
+
+    @staticmethod
+    def _chave(namespace: str, chave: str) -> str:
+        return f"{namespace}:{chave}"
+
+    def _geracao(self, namespace: str) -> Tuple[int, int]:
+        with self._lock:
+            return self._geracao_global, self._geracoes.get(namespace, 0)
+
+    def _lock_da_chave(self, chave: str) -> threading.Lock:
+        with self._lock:
+            lock = self._locks_chave.get(chave)
+            if lock is None:
+                lock = self._locks_chave[chave] = threading.Lock()
+            return lock
+
+    def _ler(self, namespace: str, chave_completa: str) -> Tuple[bool, Any]:
+        encontrado, valor = self.backend.obter(chave_completa)
+        if not encontrado:
+            return False, None
+        if valor == _AUSENTE:
+            self._contar(namespace, 'hits_negativos')
+            return True, None
+        self._contar(namespace, 'hits')
+        return True, copy.copy(valor)
+
+    def obter(self, namespace: str, chave: str, carregador: Callable[[], Any],
+              ttl: Optional[float] = None) -> Any:
+        """
+        Retorna o valor em cache ou executa o carregador (uma vez por chave)
+
+        Parâmetros:
+            namespace (str): Grupo da chave (ex.: 'escolas')
+            chave (str): Identificador dentro do namespace
+            carregador (callable): Função que busca o valor no banco; levanta
+                                   ErroCarregamento quando a leitura falha
+            ttl (float): TTL específico (opcional)
+
+        Retorna:
+            Valor carregado (cópia rasa), ou None se o registro não existir
+            ou a leitura falhar (falhas não entram no cache)
+        """
+        chave_completa = self._chave(namespace, chave)
+        encontrado, valor = self._ler(namespace, chave_completa)
+        if encontrado:
+            return valor
+
+        # Single-flight: threads concorrentes aguardam o primeiro carregamento
+        lock = self._lock_da_chave(chave_completa)
+        with lock:
+            try:
+                encontrado, valor = self._ler(namespace, chave_completa)
+                if encontrado:
+                    return valor
+
+                self._contar(namespace, 'misses')
+                geracao = self._geracao(namespace)
+                try:
+                    valor = carregador()
+                except ErroCarregamento as e:
+                    print(f"Erro ao carregar {chave_completa} (não armazenado no cache): {e}")
+                    self._contar(namespace, 'falhas')
+                    return None
+                self._contar(namespace, 'carregamentos')
+
+                if isinstance(valor, dict):
+                    valor = dict(valor)
+                # Namespace invalidado durante a leitura: o valor pode ser anterior à escrita
+                if self._geracao(namespace) == geracao:
+                    if valor is None:
+                        self.backend.definir(chave_completa, _AUSENTE, self.ttl_negativo)
+                    else:
+                        self.backend.definir(chave_completa, valor, ttl if ttl is not None else self.ttl)
+                return copy.copy(valor)
+            finally:
+                # Threads que já aguardam este lock relêem o cache ao entrar
+                with self._lock:
+                    self._locks_chave.pop(chave_completa, None)
+
+    # --------------------------------------------
+    # Invalidação
+    # --------------------------------------------
+
+    def invalidar_namespace(self, namespace: str) -> None:
+        """Remove todas as entradas de um namespace"""
+        with self._lock:
+            self._geracoes[namespace] = self._geracoes.get(namespace, 0) + 1
+        self.backend.remover_prefixo(f"{namespace}:")
+        self._contar(namespace, 'invalidacoes')
+
+    def invalidar_tabela(self, tabela: str, id: Optional[int] = None) -> None:
+        """
+        Invalida os namespaces que dependem da tabela alterada.
+
+        O id é aceito para compatibilidade com os ouvintes de Database;
+        como há chaves secundárias (ex.: usuario_id), o namespace é
+        invalidado por completo.
+        """
+        for namespace in self._dependencias.get(tabela, ()):
+            self.invalidar_namespace(namespace)
+
+    def limpar(self) -> None:
+        """Esvazia o cache inteiro"""
+        with self._lock:
+            self._geracao_global += 1
+        self.backend.limpar()
+
+    def reiniciar_apos_fork(self) -> None:
+        """Chamado no worker recém-criado (gunicorn post_fork): locks e conexões próprias"""
+        self._lock = threading.Lock()
+        self._locks_chave = {}
+        self.backend.reiniciar_apos_fork()
+
+
+# ============================================
+# INSTÂNCIA COMPARTILHADA
+# ============================================
+# Uma instância por processo; repositórios e serviços reutilizam a mesma
+cache_referencias = CacheLeitura()
@@ -0,0 +1,201 @@
+"""
+============================================
+CORE - CICLO DE VIDA DOS CÓDIGOS DE ACESSO
+============================================
+Emissão, consumo e limpeza de codigos_acesso:
+
+- Consumo atômico: a busca do código válido (email + tipo + código, não
+  usado, não expirado, usuário ativo) e a marcação como usado são um único
+  UPDATE ... RETURNING, servido pelo índice parcial idx_codigos_acesso_validos.
+  Duas validações simultâneas do mesmo código nunca consomem ambas.
+- Varredura: uma thread por worker remove, em lotes pequenos, os códigos
+  expirados há mais de CODIGOS_ACESSO_RETENCAO_HORAS (opcionalmente
+  copiando os metadados, sem o código, para codigos_acesso_historico).
+
+Uso manual:
+    python -m core.codigos_acesso    # executa uma varredura completa
+"""
+
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from core.database import Database
+from config import (CODIGO_ACESSO_DURACAO_HORAS, CODIGOS_ACESSO_VARREDURA_AUTOMATICA,
+                    CODIGOS_ACESSO_VARREDURA_INTERVALO_SEGUNDOS, CODIGOS_ACESSO_VARREDURA_LOTE,
+                    CODIGOS_ACESSO_RETENCAO_HORAS, CODIGOS_ACESSO_ARQUIVAR)
+
+
+class GerenciadorCodigosAcesso:
+    """
+    Emite e consome códigos de acesso e varre os expirados.
+
+    Vários workers podem varrer ao mesmo tempo: cada lote trava suas linhas
+    com SKIP LOCKED, então nenhum espera pelo outro nem apaga a mesma linha.
+    """
+
+    def __init__(self, retencao_horas: int = CODIGOS_ACESSO_RETENCAO_HORAS,
+                 lote: int = CODIGOS_ACESSO_VARREDURA_LOTE,
+                 arquivar: bool = CODIGOS_ACESSO_ARQUIVAR,
+                 intervalo: int = CODIGOS_ACESSO_VARREDURA_INTERVALO_SEGUNDOS,
+                 ativo: bool = CODIGOS_ACESSO_VARREDURA_AUTOMATICA):
+        self.retencao_horas = retencao_horas
+        self.lote = lote
+        self.arquivar = arquivar
+        self.intervalo = intervalo
+        self.ativo = ativo
+        self._thread = None
+        self._pid = None
+        self._parar = threading.Event()
+        self._lock = threading.Lock()
+
+    # --------------------------------------------
+    # Emissão e consumo
+    # --------------------------------------------
+
+    @staticmethod
+    def emitir(usuario_id: int, codigo: str,
+               duracao_horas: int = CODIGO_ACESSO_DURACAO_HORAS) -> bool:
+        """Grava um novo código para o usuário, válido por `duracao_horas`"""
+        resultado = Database.executar(
+            "INSERT INTO codigos_acesso (usuario_id, codigo, data_expiracao) VALUES (%s, %s, %s)",
+            (usuario_id, codigo, datetime.now() + timedelta(hours=duracao_horas)),
+            commit=True
+        )
+        return bool(resultado)
+
+    @staticmethod
+    def consumir(email: str, tipo: str, codigo: str) -> Optional[Dict]:
+        """
+        Valida e marca o código como usado em uma única ida ao banco
+
+        Retorna:
+            dict: usuario_id, nome, email e tipo do usuário autenticado,
+                  ou None se não houver código válido (ou em erro)
+        """
+        query = """
+            WITH alvo AS (
+                SELECT ca.id
+                FROM usuarios u
+                JOIN codigos_acesso ca ON ca.usuario_id = u.id
+                WHERE u.email = %s AND u.tipo = %s AND u.ativo = TRUE
+                  AND ca.codigo = %s AND ca.usado = FALSE
+                  AND ca.data_expiracao > CURRENT_TIMESTAMP
+                ORDER BY ca.data_criacao DESC
+                LIMIT 1
+                FOR UPDATE OF ca SKIP LOCKED
+            )
+            UPDATE codigos_acesso ca
+            SET usado = TRUE
+            FROM alvo, usuarios u
+            WHERE ca.id = alvo.id AND u.id = ca.usuario_id AND ca.usado = FALSE
+            RETURNING ca.usuario_id, u.nome, u.email, u.tipo
+        """
+        return Database.executar(query, (email, tipo, codigo), fetchone=True, commit=True) or None
+
+    @staticmethod
+    def motivo_recusa(email: str, tipo: str, codigo: str) -> str:
+        """
+        Por que `consumir` recusou o código: 'expirado', 'inativo' ou 'invalido'.
+
+        Consultado só no caminho de falha, para escolher a mensagem exibida.
+        """
+        linha = Database.executar("""
+            SELECT ca.data_expiracao <= CURRENT_TIMESTAMP AS expirado, u.ativo
+            FROM usuarios u
+            JOIN codigos_acesso ca ON ca.usuario_id = u.id
+            WHERE u.email = %s AND u.tipo = %s AND ca.codigo = %s AND ca.usado = FALSE
+            ORDER BY ca.data_criacao DESC
+            LIMIT 1
+        """, (email, tipo, codigo), fetchone=True)
+        if not linha:
+            return 'invalido'
+        if linha['expirado']:
+            return 'expirado'
+        if not linha['ativo']:
+            return 'inativo'
+        return 'invalido'
+
+    # --------------------------------------------
+    # Varredura dos expirados
+    # --------------------------------------------
+
+    def varrer(self, agora: Optional[datetime] = None) -> Optional[int]:
+        """
+        Remove (ou arquiva e remove) os códigos expirados antes da janela de retenção
+
+        Cada lote é uma transação curta; a varredura segue até um lote vir
+        incompleto.
+
+        Retorna:
+            int: Códigos removidos, ou None em erro
+        """
+        limite = (agora or datetime.now()) - timedelta(hours=self.retencao_horas)
+        arquivamento = """
+            , arquivados AS (
+                INSERT INTO codigos_acesso_historico (id, usuario_id, data_criacao, data_expiracao, usado)
+                SELECT id, usuario_id, data_criacao, data_expiracao, usado FROM removidos
+            )
+        """ if self.arquivar else ""
+        query = f"""
+            WITH expirados AS (
+                SELECT id FROM codigos_acesso
+                WHERE data_expiracao < %s
+                ORDER BY data_expiracao
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            ), removidos AS (
+                DELETE FROM codigos_acesso ca
+                USING expirados e
+                WHERE ca.id = e.id
+                RETURNING ca.*
+            ){arquivamento}
+            SELECT COUNT(*) AS total FROM removidos
+        """
+        total = 0
+        while not self._parar.is_set():
+            linha = Database.executar(query, (limite, self.lote), fetchone=True, commit=True)
+            if linha is None:
+                return None
+            total += linha['total']
+            if linha['total'] < self.lote:
+                break
+        return total
+
+    def _executar_agendador(self) -> None:
+        while not self._parar.wait(self.intervalo):
+            try:
+                self.varrer()
+            except Exception as e:
+                print(f"Erro na varredura de códigos de acesso: {e}")
+
+    def garantir_iniciado(self) -> None:
+        """Inicia a thread de varredura uma vez por processo (seguro após fork)"""
+        if not self.ativo:
+            return
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._parar.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._executar_agendador,
+                                            name='varredura-codigos', daemon=True)
+            self._thread.start()
+
+    def parar(self) -> None:
+        """Sinaliza o encerramento da thread de varredura"""
+        self._parar.set()
+
+
+# ============================================
+# INSTÂNCIA COMPARTILHADA
+# ============================================
+gerenciador_codigos = GerenciadorCodigosAcesso()
+
+
+if __name__ == '__main__':
+    import json
+
+    print(json.dumps({'removidos': gerenciador_codigos.varrer()}))
@@ -0,0 +1,92 @@
+"""
+============================================
+CORE - COMPILAÇÃO DE TEMPLATES
+============================================
+O Jinja compila cada template (parse + geração de código Python) no
+primeiro uso em cada worker: sem ajuda, a primeira requisição de cada
+página em cada worker paga essa compilação.
+
+Duas camadas:
+- Cache de bytecode em disco (TEMPLATES_BYTECODE_DIR): o código compilado
+  fica em arquivos compartilhados por todos os workers do host e por
+  reinícios (max_requests, deploy sem mudança de template). Cada entrada
+  é validada pelo checksum do fonte; o nome dos arquivos leva a versão do
+  Jinja e das extensões, para que uma mudança nelas não reaproveite código
+  antigo. A escrita é atômica (arquivo temporário + rename).
+- Aquecimento (aquecer_templates): carrega todos os templates antes do
+  worker aceitar requisições — no mestre com --preload (os workers herdam
+  os templates já carregados) e no post_worker_init do gunicorn.
+
+Se o diretório não puder ser criado, o cache de bytecode fica desligado e
+os templates são compilados em memória como antes.
+"""
+
+import hashlib
+import inspect
+import os
+import time
+from typing import Dict, Optional
+import jinja2
+from jinja2 import Environment, FileSystemBytecodeCache
+from config import TEMPLATES_BYTECODE_DIR, TEMPLATES_AQUECER
+
+
+def _assinatura(ambiente: Environment) -> str:
+    """Versão do Jinja + fonte das extensões: muda o nome dos arquivos de bytecode"""
+    partes = [jinja2.__version__]
+    for extensao in sorted(ambiente.extensions.values(), key=lambda e: e.identifier):
+        try:
+            partes.append(inspect.getsource(type(extensao)))
+        except (OSError, TypeError):
+            partes.append(extensao.identifier)
+    return hashlib.sha1('\n'.join(partes).encode('utf-8')).hexdigest()[:12]
+
+
+def configurar_bytecode(ambiente: Environment, diretorio: str = TEMPLATES_BYTECODE_DIR) -> Optional[str]:
+    """
+    Liga o cache de bytecode em disco no ambiente Jinja
+
+    Deve ser chamada depois de registradas as extensões (entram na assinatura).
+
+    Retorna:
+        str ou None: Diretório em uso; None se desligado ou indisponível
+    """
+    if not diretorio:
+        return None
+    try:
+        os.makedirs(diretorio, mode=0o700, exist_ok=True)
+    except OSError as e:
+        print(f"Cache de bytecode dos templates desligado ({diretorio}): {e}")
+        return None
+    padrao = f"__jinja2_{_assinatura(ambiente)}_%s.cache"
+    ambiente.bytecode_cache = FileSystemBytecodeCache(diretorio, padrao)
+    return diretorio
+
+
+def aquecer_templates(ambiente: Environment) -> Dict:
+    """
+    Carrega todos os templates do loader (do bytecode em disco, se houver,
+    ou compilando e gravando nele)
+
+    Retorna:
+        dict: templates, erros (nome -> mensagem) e duracao_ms
+    """
+    inicio = time.perf_counter()
+    nomes = ambiente.list_templates(extensions=('html',))
+    erros = {}
+    for nome in nomes:
+        try:
+            ambiente.get_template(nome)
+        except Exception as e:
+            erros[nome] = str(e)
+            print(f"Erro ao compilar o template {nome}: {e}")
+    return {
+        'templates': len(nomes) - len(erros),
+        'erros': erros,
+        'duracao_ms': round((time.perf_counter() - inicio) * 1000, 1),
+    }
+
+
+def aquecer_se_configurado(ambiente: Environment) -> Optional[Dict]:
+    """aquecer_templates se TEMPLATES_AQUECER estiver ligado"""
+    return aquecer_templates(ambiente) if TEMPLATES_AQUECER else None
@@ -6,10 +6,52 @@ Gerenciamento centralizado de conexões e queries ao banco PostgreSQL.
 Implementa padrão Repository/DAO com psycopg2 e RealDictCursor.
 """
 
+import threading
+import time
 import psycopg2
+import psycopg2.extensions
 import psycopg2.extras
-from config import DB_CONFIG
-from typing import Optional, List, Dict, Any, Tuple
+from config import DB_CONFIG, DB_TAMANHO_LOTE
+from typing import Optional, List, Dict, Any, Tuple, Callable, Iterable, Sequence
+
+# Limite de parâmetros por statement do protocolo do PostgreSQL
+_MAX_PARAMETROS = 65535
+
+# Classes de cursor instrumentadas, uma por classe base (RealDictCursor etc.)
+_cursores_observados: Dict[type, type] = {}
+
+
+def _cursor_observado(base: type) -> type:
+    """Subclasse do cursor que mede cada execute/executemany e avisa os observadores"""
+    classe = _cursores_observados.get(base)
+    if classe is None:
+        def execute(self, query, vars=None):
+            inicio = time.perf_counter()
+            try:
+                return base.execute(self, query, vars)
+            finally:
+                Database._notificar_consulta(query, time.perf_counter() - inicio)
+
+        def executemany(self, query, vars_list):
+            inicio = time.perf_counter()
+            try:
+                return base.executemany(self, query, vars_list)
+            finally:
+                Database._notificar_consulta(query, time.perf_counter() - inicio)
+
+        classe = type(f'{base.__name__}Observado', (base,), {'execute': execute, 'executemany': executemany})
+        _cursores_observados[base] = classe
+    return classe
+
+
+class _ConexaoObservada(psycopg2.extensions.connection):
+    """Conexão cujos cursores (de qualquer cursor_factory) são instrumentados"""
+
+    def cursor(self, *args, **kwargs):
+        if len(args) < 2:
+            base = kwargs.get('cursor_factory') or self.cursor_factory or psycopg2.extensions.cursor
+            kwargs['cursor_factory'] = _cursor_observado(base)
+        return super().cursor(*args, **kwargs)
 
 
 class Database:
@@ -21,8 +63,87 @@ class Database:
     - RealDictCursor: retorna resultados como dicionários
     - Commit explícito por parâmetro (evita auto-commit acidental)
     - Rollback automático em caso de exceção
+    - Ouvintes de alteração notificados após inserir/atualizar/excluir
     """
     
+    # Funções chamadas com (tabela, id) após cada escrita bem-sucedida
+    _ouvintes_alteracao: List[Callable[[str, Optional[int]], None]] = []
+    
+    # Funções chamadas com (query, duracao_segundos) após cada comando enviado ao banco
+    _observadores_consulta: List[Callable[[Any, float], None]] = []
+    
+    # Tipos das colunas por tabela (usados nos casts de UPDATE ... FROM VALUES)
+    _tipos_colunas: Dict[str, Dict[str, str]] = {}
+
+    # Falhas de conexão/consulta da thread atual (ver falhas_na_thread)
+    _estado_thread = threading.local()
+    
+    @staticmethod
+    def registrar_ouvinte_alteracao(ouvinte: Callable[[str, Optional[int]], None]) -> None:
+        """
+        Registra uma função a ser chamada após escritas via inserir/atualizar/excluir.
+        
+        Usado para invalidar caches de leitura quando uma tabela muda.
+        """
+        if ouvinte not in Database._ouvintes_alteracao:
+            Database._ouvintes_alteracao.append(ouvinte)
+    
+    @staticmethod
+    def notificar_alteracao(tabela: str, id: Optional[int] = None) -> None:
+        """
+        Notifica os ouvintes de que um registro da tabela foi alterado.
+        
+        Também deve ser chamado por escritas feitas com SQL direto em tabelas
+        que possuem cache. Falhas em ouvintes nunca interrompem a escrita.
+        """
+        for ouvinte in list(Database._ouvintes_alteracao):
+            try:
+                ouvinte(tabela, id)
+            except Exception as e:
+                print(f"Erro ao notificar alteração em {tabela}: {e}")
+    
+    @staticmethod
+    def registrar_observador_consulta(observador: Callable[[Any, float], None]) -> None:
+        """
+        Registra uma função chamada com (query, duração em segundos) a cada
+        comando executado em conexões de Database.conectar (e nas consultas
+        de DatabaseAsync.executar).
+        
+        Usado pelos benchmarks para contar consultas e tempo de banco por
+        requisição. Sem observadores as conexões não são instrumentadas.
+        """
+        if observador not in Database._observadores_consulta:
+            Database._observadores_consulta.append(observador)
+    
+    @staticmethod
+    def remover_observador_consulta(observador: Callable[[Any, float], None]) -> None:
+        """Remove um observador registrado (conexões novas deixam de ser instrumentadas)"""
+        if observador in Database._observadores_consulta:
+            Database._observadores_consulta.remove(observador)
+    
+    @staticmethod
+    def _notificar_consulta(query: Any, duracao: float) -> None:
+        for observador in list(Database._observadores_consulta):
+            try:
+                observador(query, duracao)
+            except Exception as e:
+                print(f"Erro em observador de consultas: {e}")
+    
+    @staticmethod
+    def falhas_na_thread() -> int:
+        """
+        Quantidade de falhas de banco já ocorridas na thread atual.
+
+        Como executar/conectar/transaction retornam None tanto em erro quanto
+        em "nenhuma linha", quem precisa distinguir os dois casos (ex.: cache
+        negativo) compara este contador antes e depois da chamada.
+        """
+        return getattr(Database._estado_thread, 'falhas', 0)
+
+    @staticmethod
+    def _registrar_falha() -> None:
+        Database._estado_thread.falhas = Database.falhas_na_thread() + 1
+
     @staticmethod
     def conectar():
         """
@@ -42,11 +163,13 @@ class Database:
                 database=DB_CONFIG['database'],
                 user=DB_CONFIG['user'],
                 password=DB_CONFIG['password'],
-                connect_timeout=DB_CONFIG.get('connect_timeout', 3)
+                connect_timeout=DB_CONFIG.get('connect_timeout', 3),
+                connection_factory=_ConexaoObservada if Database._observadores_consulta else None
             )
             return conexao
         except Exception as e:
             print(f"Erro ao conectar ao banco de dados: {e}")
+            Database._registrar_falha()
             return None
 
     @staticmethod
@@ -104,6 +227,7 @@ class Database:
             
         except Exception as e:
             print(f"Erro ao executar query: {e}")
+            Database._registrar_falha()
             if conexao:
                 conexao.rollback()
             return None
@@ -132,7 +256,10 @@ class Database:
         
         # Need to commit the insert to persist the new row. Also fetch the RETURNING id.
         resultado = Database.executar(query, tuple(dados.values()), fetchone=True, commit=True)
-        return resultado['id'] if resultado and isinstance(resultado, dict) else None
+        novo_id = resultado['id'] if resultado and isinstance(resultado, dict) else None
+        if novo_id:
+            Database.notificar_alteracao(tabela, novo_id)
+        return novo_id
 
     @staticmethod
     def atualizar(tabela: str, id: int, dados: Dict[str, Any]) -> bool:
@@ -157,7 +284,10 @@ class Database:
         
         parametros = tuple(dados.values()) + (id,)
         resultado = Database.executar(query, parametros, commit=True)
-        return resultado is not None and resultado > 0
+        sucesso = resultado is not None and resultado > 0
+        if sucesso:
+            Database.notificar_alteracao(tabela, id)
+        return sucesso
 
     @staticmethod
     def excluir(tabela: str, id: int) -> bool:
@@ -173,7 +303,10 @@ class Database:
         """
         query = f"DELETE FROM {tabela} WHERE id = %s"
         resultado = Database.executar(query, (id,), commit=True)
-        return resultado is not None and resultado > 0
+        sucesso = resultado is not None and resultado > 0
+        if sucesso:
+            Database.notificar_alteracao(tabela, id)
+        return sucesso
 
     @staticmethod
     def buscar_por_id(tabela: str, id: int) -> Optional[Dict]:
@@ -210,6 +343,7 @@ class Database:
             return result
         except Exception as e:
             print(f"Erro em transação: {e}")
+            Database._registrar_falha()
             if conexao:
                 conexao.rollback()
             return None
@@ -218,3 +352,215 @@ class Database:
                 cursor.close()
             if conexao:
                 conexao.close()
+
+    # ============================================
+    # OPERAÇÕES EM LOTE
+    # ============================================
+    # Cada operação roda em uma única conexão/transação e divide os dados
+    # em lotes (DB_TAMANHO_LOTE, respeitando o limite de parâmetros).
+    # Com `cursor`, a operação participa da transação do chamador (ex.:
+    # dentro de Database.transaction) e os ouvintes não são notificados:
+    # o chamador notifica após o commit.
+
+    @staticmethod
+    def _lotes(itens: Sequence, tamanho: int) -> Iterable[Sequence]:
+        """Divide a sequência em fatias de até `tamanho` itens"""
+        tamanho = max(1, tamanho)
+        for inicio in range(0, len(itens), tamanho):
+            yield itens[inicio:inicio + tamanho]
+
+    @staticmethod
+    def _tamanho_lote(colunas: int, tamanho_lote: Optional[int]) -> int:
+        """Tamanho do lote limitado pelo número máximo de parâmetros por statement"""
+        return max(1, min(tamanho_lote or DB_TAMANHO_LOTE, _MAX_PARAMETROS // max(1, colunas)))
+
+    @staticmethod
+    def _executar_lote(operacao: Callable[[Any], Any], tabela: str, cursor=None) -> Optional[Any]:
+        """Executa a operação no cursor informado ou em transação própria (notificando ouvintes)"""
+        if cursor is not None:
+            return operacao(cursor)
+        resultado = Database.transaction(operacao)
+        if resultado:
+            Database.notificar_alteracao(tabela)
+        return resultado
+
+    @staticmethod
+    def _obter_tipos_colunas(cursor, tabela: str) -> Dict[str, str]:
+        """Lê (uma vez por processo) o tipo SQL de cada coluna da tabela"""
+        tipos = Database._tipos_colunas.get(tabela)
+        if tipos is None:
+            cursor.execute("""
+                SELECT a.attname AS coluna, format_type(a.atttypid, a.atttypmod) AS tipo
+                FROM pg_attribute a
+                WHERE a.attrelid = %s::regclass AND a.attnum > 0 AND NOT a.attisdropped
+            """, (tabela,))
+            tipos = {linha['coluna']: linha['tipo'] for linha in cursor.fetchall()}
+            Database._tipos_colunas[tabela] = tipos
+        return tipos
+
+    @staticmethod
+    def inserir_muitos(tabela: str, registros: List[Dict[str, Any]],
+                       tamanho_lote: Optional[int] = None, cursor=None) -> Optional[List[int]]:
+        """
+        Insere vários registros (INSERT ... VALUES em lote) e retorna os IDs
+        
+        Parâmetros:
+            tabela (str): Nome da tabela
+            registros (list): Dicionários com as mesmas chaves
+            tamanho_lote (int): Linhas por statement (opcional)
+            cursor: Cursor de uma transação em andamento (opcional)
+        
+        Retorna:
+            list ou None: IDs gerados, na ordem dos registros
+        """
+        if not registros:
+            return []
+        campos = list(registros[0].keys())
+        lote = Database._tamanho_lote(len(campos), tamanho_lote)
+        query = f"INSERT INTO {tabela} ({', '.join(campos)}) VALUES %s RETURNING id"
+        
+        def operacao(cur):
+            ids = []
+            for parte in Database._lotes(registros, lote):
+                linhas = psycopg2.extras.execute_values(
+                    cur, query, [tuple(r.get(c) for c in campos) for r in parte],
+                    page_size=lote, fetch=True
+                )
+                ids.extend(linha['id'] for linha in linhas)
+            return ids
+        
+        return Database._executar_lote(operacao, tabela, cursor)
+
+    @staticmethod
+    def atualizar_muitos(tabela: str, registros: List[Dict[str, Any]],
+                         tamanho_lote: Optional[int] = None, cursor=None) -> Optional[int]:
+        """
+        Atualiza vários registros com UPDATE ... FROM (VALUES ...)
+        
+        Parâmetros:
+            tabela (str): Nome da tabela
+            registros (list): Dicionários com 'id' e os campos a atualizar
+                              (mesmas chaves em todos)
+            tamanho_lote (int): Linhas por statement (opcional)
+            cursor: Cursor de uma transação em andamento (opcional)
+        
+        Retorna:
+            int ou None: Quantidade de linhas atualizadas
+        """
+        if not registros:
+            return 0
+        campos = [c for c in registros[0].keys() if c != 'id']
+        if not campos:
+            return 0
+        lote = Database._tamanho_lote(len(campos) + 1, tamanho_lote)
+        
+        def operacao(cur):
+            tipos = Database._obter_tipos_colunas(cur, tabela)
+            # Casts explícitos: sem eles, NULLs e literais de VALUES viram text
+            template = '(' + ', '.join(f"%s::{tipos.get(c, 'text')}" for c in ['id'] + campos) + ')'
+            set_clause = ', '.join(f"{c} = v.{c}" for c in campos)
+            if 'data_atualizacao' in tipos and 'data_atualizacao' not in campos:
+                set_clause += ", data_atualizacao = CURRENT_TIMESTAMP"
+            query = (f"UPDATE {tabela} AS t SET {set_clause} "
+                     f"FROM (VALUES %s) AS v(id, {', '.join(campos)}) WHERE t.id = v.id")
+            total = 0
+            for parte in Database._lotes(registros, lote):
+                psycopg2.extras.execute_values(
+                    cur, query, [(r['id'],) + tuple(r.get(c) for c in campos) for r in parte],
+                    template=template, page_size=lote
+                )
+                total += cur.rowcount
+            return total
+        
+        return Database._executar_lote(operacao, tabela, cursor)
+
+    @staticmethod
+    def excluir_muitos(tabela: str, ids: List[int],
+                       tamanho_lote: Optional[int] = None, cursor=None) -> Optional[int]:
+        """
+        Exclui vários registros com DELETE ... WHERE id = ANY(%s)
+        
+        Retorna:
+            int ou None: Quantidade de linhas excluídas
+        """
+        if not ids:
+            return 0
+        ids = list(ids)
+        
+        def operacao(cur):
+            total = 0
+            for parte in Database._lotes(ids, tamanho_lote or DB_TAMANHO_LOTE):
+                cur.execute(f"DELETE FROM {tabela} WHERE id = ANY(%s)", (list(parte),))
+                total += cur.rowcount
+            return total
+        
+        return Database._executar_lote(operacao, tabela, cursor)
+
+    @staticmethod
+    def buscar_por_ids(tabela: str, ids: List[int],
+                       tamanho_lote: Optional[int] = None) -> List[Dict]:
+        """
+        Busca vários registros por ID (WHERE id = ANY(%s))
+        
+        Retorna:
+            list: Registros encontrados, na ordem dos IDs informados
+        """
+        ids = list(dict.fromkeys(ids or []))
+        if not ids:
+            return []
+        encontrados: Dict[Any, Dict] = {}
+        for parte in Database._lotes(ids, tamanho_lote or DB_TAMANHO_LOTE):
+            linhas = Database.executar(f"SELECT * FROM {tabela} WHERE id = ANY(%s)",
+                                       (list(parte),), fetchall=True) or []
+            encontrados.update((linha['id'], linha) for linha in linhas)
+        return [encontrados[i] for i in ids if i in encontrados]
+
+    @staticmethod
+    def upsert(tabela: str, registros: List[Dict[str, Any]], conflito: List[str],
+               atualizar: Optional[List[str]] = None,
+               tamanho_lote: Optional[int] = None, cursor=None) -> Optional[List[int]]:
+        """
+        Insere ou atualiza vários registros (INSERT ... ON CONFLICT)
+        
+        Parâmetros:
+            tabela (str): Nome da tabela
+            registros (list): Dicionários com as mesmas chaves
+            conflito (list): Colunas do alvo de conflito (índice único)
+            atualizar (list): Colunas atualizadas no conflito; padrão: todas
+                              as demais. Lista vazia = DO NOTHING
+            tamanho_lote (int): Linhas por statement (opcional)
+            cursor: Cursor de uma transação em andamento (opcional)
+        
+        Retorna:
+            list ou None: IDs inseridos/atualizados (DO NOTHING omite os ignorados)
+        """
+        if not registros:
+            return []
+        campos = list(registros[0].keys())
+        if atualizar is None:
+            atualizar = [c for c in campos if c not in conflito]
+        
+        # Chaves repetidas no mesmo statement causam erro no ON CONFLICT: vale a última
+        unicos = list({tuple(r.get(c) for c in conflito): r for r in registros}.values())
+        lote = Database._tamanho_lote(len(campos), tamanho_lote)
+        
+        def operacao(cur):
+            if atualizar:
+                set_clause = ', '.join(f"{c} = EXCLUDED.{c}" for c in atualizar)
+                if 'data_atualizacao' in Database._obter_tipos_colunas(cur, tabela) and 'data_atualizacao' not in atualizar:
+                    set_clause += ", data_atualizacao = CURRENT_TIMESTAMP"
+                acao = f"DO UPDATE SET {set_clause}"
+            else:
+                acao = "DO NOTHING"
+            query = (f"INSERT INTO {tabela} ({', '.join(campos)}) VALUES %s "
+                     f"ON CONFLICT ({', '.join(conflito)}) {acao} RETURNING id")
+            ids = []
+            for parte in Database._lotes(unicos, lote):
+                linhas = psycopg2.extras.execute_values(
+                    cur, query, [tuple(r.get(c) for c in campos) for r in parte],
+                    page_size=lote, fetch=True
+                )
+                ids.extend(linha['id'] for linha in linhas)
+            return ids
+        
+        return Database._executar_lote(operacao, tabela, cursor)
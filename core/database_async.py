@@ -0,0 +1,263 @@
+"""
+============================================
+CORE - DATABASE ASSÍNCRONO
+============================================
+Contraparte assíncrona de core.database.Database para rotas I/O-bound de
+alta concorrência (vitrine, tipos por email, healthcheck).
+
+Características:
+- Pool de conexões assíncrono (psycopg 3 + psycopg_pool) por worker
+- O pool vive em um event loop dedicado (thread própria); as views async
+  do Flask, que no gthread rodam em loops efêmeros, apenas aguardam o resultado
+- Sob servidor ASGI (asgi.py) o pool vive no próprio loop do servidor
+  (usar_loop_atual no lifespan), sem thread intermediária
+- Mesma interface e semântica de Database: executar/transaction,
+  linhas como dicionários e None em caso de erro
+- Sem psycopg 3 instalado, recorre ao Database síncrono em thread
+"""
+
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Optional, Tuple
+from core.database import Database
+from config import DB_CONFIG, DB_POOL_ASYNC_MIN, DB_POOL_ASYNC_MAX, DB_POOL_ASYNC_TIMEOUT
+
+# psycopg 3 é importado na primeira consulta assíncrona (DatabaseAsync.disponivel):
+# o import custa dezenas de ms e memória em todo worker, e só as views async o usam.
+# Com gunicorn --preload, app.precarregar() antecipa o import no processo mestre.
+dict_row = None
+AsyncConnectionPool = None
+_driver_verificado = False
+
+
+class DatabaseAsync:
+    """
+    Classe estática para consultas assíncronas com pool compartilhado.
+
+    Uso em views:
+        linhas = await DatabaseAsync.executar(query, params, fetchall=True)
+    """
+
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    _thread: Optional[threading.Thread] = None
+    _pool = None
+    _pid: Optional[int] = None
+    _lock = threading.Lock()
+
+    # --------------------------------------------
+    # Event loop e pool (um por processo)
+    # --------------------------------------------
+
+    @staticmethod
+    def disponivel() -> bool:
+        """Importa o driver sob demanda; False se psycopg 3/psycopg_pool não estiverem instalados"""
+        global dict_row, AsyncConnectionPool, _driver_verificado
+        if not _driver_verificado:
+            try:
+                from psycopg.rows import dict_row
+                from psycopg_pool import AsyncConnectionPool
+            except ImportError:  # pragma: no cover - depende do ambiente
+                pass
+            _driver_verificado = True
+        return AsyncConnectionPool is not None
+
+    @classmethod
+    def _garantir_loop(cls) -> asyncio.AbstractEventLoop:
+        """Cria o event loop dedicado na primeira chamada do processo (inclusive após fork)"""
+        if cls._loop is not None and cls._pid == os.getpid():
+            return cls._loop
+        with cls._lock:
+            if cls._loop is None or cls._pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name='database-async', daemon=True)
+                thread.start()
+                cls._loop, cls._thread, cls._pool, cls._pid = loop, thread, None, os.getpid()
+        return cls._loop
+
+    @classmethod
+    async def _obter_pool(cls):
+        """Abre o pool no loop dedicado (chamado somente dentro dele)"""
+        if cls._pool is None:
+            pool = AsyncConnectionPool(
+                min_size=DB_POOL_ASYNC_MIN,
+                max_size=DB_POOL_ASYNC_MAX,
+                timeout=DB_POOL_ASYNC_TIMEOUT,
+                kwargs={
+                    'host': DB_CONFIG['host'],
+                    'port': DB_CONFIG['port'],
+                    'dbname': DB_CONFIG['database'],
+                    'user': DB_CONFIG['user'],
+                    'password': DB_CONFIG['password'],
+                    'connect_timeout': DB_CONFIG.get('connect_timeout', 3),
+                },
+                open=False
+            )
+            await pool.open()
+            cls._pool = pool
+        return cls._pool
+
+    @classmethod
+    async def _no_loop(cls, coro: Awaitable) -> Any:
+        """Executa a corrotina no loop dedicado e aguarda no loop atual"""
+        loop = cls._garantir_loop()
+        try:
+            atual = asyncio.get_running_loop()
+        except RuntimeError:
+            atual = None
+        if atual is loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    # --------------------------------------------
+    # Operações
+    # --------------------------------------------
+
+    @classmethod
+    async def _executar_no_pool(cls, query: str, parametros: Optional[Tuple],
+                                fetchall: bool, fetchone: bool, commit: bool) -> Optional[Any]:
+        pool = await cls._obter_pool()
+        async with pool.connection() as conexao:
+            try:
+                async with conexao.cursor(row_factory=dict_row) as cursor:
+                    await cursor.execute(query, parametros or None)
+
+                    resultado = None
+                    if fetchall:
+                        resultado = await cursor.fetchall()
+                    elif fetchone:
+                        resultado = await cursor.fetchone()
+
+                    if commit:
+                        await conexao.commit()
+                    else:
+                        await conexao.rollback()
+
+                    if resultado is not None:
+                        return resultado
+                    if commit:
+                        return cursor.rowcount
+                    return None
+            except Exception:
+                await conexao.rollback()
+                raise
+
+    @classmethod
+    async def executar(cls, query: str, parametros: Optional[Tuple] = None,
+                       fetchall: bool = False, fetchone: bool = False,
+                       commit: bool = False) -> Optional[Any]:
+        """
+        Executa uma query SQL de forma assíncrona
+
+        Parâmetros:
+            query (str): Query SQL a ser executada
+            parametros (tuple): Parâmetros da query (opcional)
+            fetchall (bool): Se True, retorna todos os resultados
+            fetchone (bool): Se True, retorna apenas um resultado
+            commit (bool): Se True, faz commit das alterações
+
+        Retorna:
+            list ou dict ou int ou None: Resultado da query
+        """
+        if not cls.disponivel():
+            return await asyncio.to_thread(Database.executar, query, parametros,
+                                           fetchall, fetchone, commit)
+        inicio = time.perf_counter()
+        try:
+            return await cls._no_loop(
+                cls._executar_no_pool(query, parametros, fetchall, fetchone, commit)
+            )
+        except Exception as e:
+            print(f"Erro ao executar query assíncrona: {e}")
+            return None
+        finally:
+            # Notificado aqui (e não no loop dedicado) para o observador ver o contexto da requisição
+            if Database._observadores_consulta:
+                Database._notificar_consulta(query, time.perf_counter() - inicio)
+
+    @classmethod
+    async def _transaction_no_pool(cls, func: Callable[[Any], Awaitable[Any]]) -> Any:
+        pool = await cls._obter_pool()
+        async with pool.connection() as conexao:
+            async with conexao.transaction():
+                async with conexao.cursor(row_factory=dict_row) as cursor:
+                    return await func(cursor)
+
+    @classmethod
+    async def transaction(cls, func: Callable[[Any], Awaitable[Any]]) -> Optional[Any]:
+        """
+        Executa operações em uma transação única usando a mesma conexão.
+        `func` é uma corrotina que recebe um cursor assíncrono e pode executar
+        múltiplas SQLs (await cursor.execute(...)).
+        Retorna o resultado de `func` (ou None em caso de erro).
+        """
+        if not cls.disponivel():
+            print("Erro em transação assíncrona: psycopg 3 não instalado")
+            return None
+        try:
+            return await cls._no_loop(cls._transaction_no_pool(func))
+        except Exception as e:
+            print(f"Erro em transação assíncrona: {e}")
+            return None
+
+    @classmethod
+    async def esta_ativo(cls) -> bool:
+        """Healthcheck assíncrono: True se SELECT 1 executou com sucesso"""
+        resultado = await cls.executar('SELECT 1 AS ok', fetchone=True)
+        return bool(resultado)
+
+    @classmethod
+    def usar_loop_atual(cls) -> None:
+        """
+        Servidor ASGI (lifespan startup): o pool passa a viver no loop em
+        execução, e as views async o usam sem trocar de thread.
+        """
+        with cls._lock:
+            cls._loop, cls._thread, cls._pool, cls._pid = asyncio.get_running_loop(), None, None, os.getpid()
+
+    @classmethod
+    async def fechar_async(cls) -> None:
+        """Fecha o pool a partir de um event loop (lifespan shutdown do servidor ASGI)"""
+        if cls._loop is None or cls._pid != os.getpid():
+            return
+        if cls._thread is not None:
+            await asyncio.to_thread(cls.fechar)
+            return
+        if cls._pool is not None:
+            try:
+                await cls._no_loop(cls._pool.close())
+            except Exception as e:
+                print(f"Erro ao fechar pool assíncrono: {e}")
+        cls._loop, cls._pool, cls._pid = None, None, None
+
+    @classmethod
+    def fechar(cls, timeout: float = 5.0) -> None:
+        """Fecha o pool e encerra o loop dedicado do processo atual (shutdown/scripts)"""
+        if cls._loop is None or cls._pid != os.getpid():
+            return
+        if cls._thread is None:
+            # Loop do servidor ASGI: o pool é fechado por fechar_async no lifespan
+            cls._loop, cls._pool, cls._pid = None, None, None
+            return
+        loop = cls._loop
+        if cls._pool is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(cls._pool.close(), loop).result(timeout)
+            except Exception as e:
+                print(f"Erro ao fechar pool assíncrono: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        if cls._thread is not None:
+            cls._thread.join(timeout)
+        cls._loop, cls._thread, cls._pool, cls._pid = None, None, None, None
+
+    @classmethod
+    def reiniciar_apos_fork(cls) -> None:
+        """
+        Esquece o loop e o pool herdados do processo pai (gunicorn post_fork).
+
+        Não fecha nada: os sockets do pool pertencem ao pai, e a thread do
+        loop não existe no filho. O próximo uso recria ambos neste processo.
+        """
+        cls._lock = threading.Lock()
+        cls._loop, cls._thread, cls._pool, cls._pid = None, None, None, None
@@ -0,0 +1,190 @@
+"""
+============================================
+CORE - VERIFICAÇÃO DE DEPENDÊNCIAS
+============================================
+Checa, antes de excluir um registro, se há linhas dependentes em outras
+tabelas. Todas as checagens de uma exclusão viram um único SELECT de
+subconsultas EXISTS: uma ida ao banco, interrompida na primeira linha
+encontrada em cada tabela (sem COUNT(*) completo).
+
+As dependências são derivadas das chaves estrangeiras lidas do
+information_schema na primeira exclusão de cada processo (nada é consultado
+ao importar a aplicação; se o banco estiver fora, a leitura é refeita na
+exclusão seguinte); apenas FKs que bloqueiam a exclusão (RESTRICT /
+NO ACTION) geram checagens. FKs com CASCADE ou SET NULL são ignoradas.
+"""
+
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+from core.database import Database
+
+
+# Descrição amigável das tabelas dependentes nas mensagens de bloqueio
+MENSAGENS_TABELAS = {
+    'homologacao_fornecedores': 'fornecedores homologados',
+    'produtos': 'produtos',
+    'pedidos': 'pedidos',
+    'itens_pedido': 'itens de pedido',
+    'gestores_escolares': 'gestores escolares',
+    'escolas': 'escolas',
+    'fornecedores': 'fornecedores',
+    'responsaveis': 'responsáveis',
+    'codigos_acesso': 'códigos de acesso',
+    'logs_alteracoes': 'logs de alterações',
+    'logs_acesso': 'logs de acesso',
+}
+
+_IDENTIFICADOR = re.compile(r'^[a-z_][a-z0-9_]*$')
+
+_QUERY_CHAVES_ESTRANGEIRAS = """
+    SELECT DISTINCT kcu.table_name AS tabela,
+           kcu.column_name AS campo,
+           ccu.table_name AS referenciada,
+           rc.delete_rule AS regra
+    FROM information_schema.referential_constraints rc
+    JOIN information_schema.key_column_usage kcu
+      ON kcu.constraint_schema = rc.constraint_schema
+     AND kcu.constraint_name = rc.constraint_name
+    JOIN information_schema.constraint_column_usage ccu
+      ON ccu.constraint_schema = rc.constraint_schema
+     AND ccu.constraint_name = rc.constraint_name
+    WHERE rc.constraint_schema = current_schema()
+      -- Partições (ex.: logs_alteracoes_2025_01) herdam as FKs da tabela-mãe
+      AND kcu.table_name NOT IN (SELECT relname FROM pg_class WHERE relispartition)
+    ORDER BY kcu.table_name, kcu.column_name
+"""
+
+
+class VerificadorDependencias:
+    """
+    Motor de checagem de dependências baseado nas FKs do banco.
+
+    Checagem (dict):
+        tabela, campo   -> tabela/coluna dependente (WHERE campo = valor)
+        mensagem        -> texto do bloqueio (opcional)
+        valor           -> valor comparado (padrão: id informado)
+        via             -> {'tabela', 'campo'}: compara campo com os ids de
+                           via.tabela cujo via.campo = valor (ex.: produtos
+                           da escola do usuário, sem buscar a escola antes)
+        expressao       -> SQL booleano livre com seus 'parametros'
+                           (para regras que não são FK, ex.: último admin)
+    """
+
+    REGRAS_BLOQUEANTES = ('RESTRICT', 'NO ACTION')
+
+    def __init__(self):
+        self._dependentes: Optional[Dict[str, List[Dict[str, str]]]] = None
+        self._lock = threading.Lock()
+
+    # --------------------------------------------
+    # Metadados de chaves estrangeiras
+    # --------------------------------------------
+
+    def carregar(self, forcar: bool = False) -> bool:
+        """
+        Lê as chaves estrangeiras do information_schema (uma vez por processo)
+
+        Retorna:
+            bool: True se os metadados estão disponíveis
+        """
+        if self._dependentes is not None and not forcar:
+            return True
+        with self._lock:
+            if self._dependentes is not None and not forcar:
+                return True
+            linhas = Database.executar(_QUERY_CHAVES_ESTRANGEIRAS, fetchall=True)
+            if linhas is None:
+                print("Erro ao carregar chaves estrangeiras: metadados indisponíveis")
+                return False
+            dependentes: Dict[str, List[Dict[str, str]]] = {}
+            for linha in linhas:
+                dependentes.setdefault(linha['referenciada'], []).append({
+                    'tabela': linha['tabela'],
+                    'campo': linha['campo'],
+                    'regra': linha['regra'],
+                })
+            self._dependentes = dependentes
+            return True
+
+    def dependentes(self, tabela: str, ignorar: Iterable[str] = ()) -> List[Dict[str, str]]:
+        """
+        Lista as FKs que impedem excluir registros da tabela
+
+        Parâmetros:
+            tabela (str): Tabela referenciada
+            ignorar (iterable): Tabelas dependentes a desconsiderar
+
+        Retorna:
+            list: [{'tabela', 'campo', 'mensagem'}], vazia sem metadados
+        """
+        if not self.carregar():
+            return []
+        ignoradas = set(ignorar)
+        return [
+            {
+                'tabela': fk['tabela'],
+                'campo': fk['campo'],
+                'mensagem': MENSAGENS_TABELAS.get(fk['tabela'], fk['tabela'].replace('_', ' ')),
+            }
+            for fk in self._dependentes.get(tabela, [])
+            if fk['regra'] in self.REGRAS_BLOQUEANTES and fk['tabela'] not in ignoradas
+        ]
+
+    # --------------------------------------------
+    # Verificação
+    # --------------------------------------------
+
+    @staticmethod
+    def _validar_identificador(nome: str) -> str:
+        if not isinstance(nome, str) or not _IDENTIFICADOR.match(nome):
+            raise ValueError(f"Identificador SQL inválido: {nome!r}")
+        return nome
+
+    def _montar_subconsulta(self, checagem: Dict[str, Any], id: Any) -> tuple:
+        """Converte uma checagem em (expressão booleana, parâmetros)"""
+        if 'expressao' in checagem:
+            return checagem['expressao'], tuple(checagem.get('parametros', ()))
+
+        tabela = self._validar_identificador(checagem['tabela'])
+        campo = self._validar_identificador(checagem['campo'])
+        valor = checagem.get('valor', id)
+        via = checagem.get('via')
+        if via:
+            via_tabela = self._validar_identificador(via['tabela'])
+            via_campo = self._validar_identificador(via['campo'])
+            return (f"EXISTS (SELECT 1 FROM {tabela} WHERE {campo} IN "
+                    f"(SELECT id FROM {via_tabela} WHERE {via_campo} = %s))"), (valor,)
+        return f"EXISTS (SELECT 1 FROM {tabela} WHERE {campo} = %s)", (valor,)
+
+    def verificar(self, id: Any, checagens: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Executa todas as checagens em um único SELECT
+
+        Parâmetros:
+            id: Valor padrão comparado em cada checagem
+            checagens (list): Checagens (ver docstring da classe)
+
+        Retorna:
+            list: Checagens com dependentes encontrados; None em erro de banco
+        """
+        if not checagens:
+            return []
+
+        colunas = []
+        parametros: List[Any] = []
+        for indice, checagem in enumerate(checagens):
+            expressao, valores = self._montar_subconsulta(checagem, id)
+            colunas.append(f"({expressao}) AS d{indice}")
+            parametros.extend(valores)
+
+        resultado = Database.executar("SELECT " + ", ".join(colunas), tuple(parametros), fetchone=True)
+        if not isinstance(resultado, dict):
+            return None
+        return [checagem for indice, checagem in enumerate(checagens) if resultado.get(f"d{indice}")]
+
+
+# ============================================
+# INSTÂNCIA COMPARTILHADA
+# ============================================
+verificador_dependencias = VerificadorDependencias()
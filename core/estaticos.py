@@ -0,0 +1,444 @@
+"""
+============================================
+CORE - PACOTES DE ARQUIVOS ESTÁTICOS
+============================================
+Pipeline dos CSS/JS próprios da aplicação (Bootstrap vem da CDN):
+
+- Concatena os fontes de cada pacote (PACOTES), minifica sem
+  dependências externas e grava static/dist/<nome>.<hash>.<ext>, com o
+  hash do conteúdo no nome
+- Pré-comprime cada pacote em irmãos .gz e .br (Brotli, se instalado)
+- Cópias com hash (COPIAS) para arquivos que não se minificam (favicon)
+- static/dist/manifest.json mapeia nome lógico -> arquivo com hash; os
+  arquivos do build anterior são mantidos (páginas já abertas ainda os
+  referenciam) e os mais antigos removidos
+
+Servir:
+- {{ ativo('app.css') }} nos templates devolve a URL do arquivo com hash
+- Arquivos do manifest saem com 'public, max-age=1 ano, immutable' e, se
+  o cliente aceitar, o irmão .br/.gz com Content-Encoding; o navegador
+  não volta a pedi-los até o hash mudar
+- Demais arquivos de static/ seguem o padrão do Flask
+
+Construção: `python -m core.estaticos` no build da imagem; na importação
+da aplicação os pacotes são refeitos se o manifest estiver ausente ou não
+corresponder aos fontes (ATIVOS_CONSTRUIR_NA_INICIALIZACAO). Se não
+puderem ser gravados, ativo() aponta para os fontes originais.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+from flask import current_app, request, send_from_directory, url_for
+from config import (BASE_DIR, ATIVOS_CONSTRUIR_NA_INICIALIZACAO, ATIVOS_VERIFICAR_FONTES, ATIVOS_MINIFICAR,
+                    ATIVOS_MAX_AGE_SEGUNDOS)
+
+# Nome lógico -> fontes concatenados na ordem
+PACOTES = {
+    'app.css': ['css/custom.css'],
+    'app.js': ['js/base.js'],
+}
+
+# Copiados com hash no nome, sem minificar nem comprimir
+COPIAS = ['favicon.png']
+
+DIRETORIO_PACOTES = 'dist'
+ARQUIVO_MANIFEST = 'manifest.json'
+
+# Muda a assinatura (e força novo build) quando a minificação muda
+VERSAO_PIPELINE = 1
+
+
+# ============================================
+# MINIFICAÇÃO
+# ============================================
+
+_STRING_CSS = r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\''
+_PARTES_CSS = re.compile(rf'({_STRING_CSS})|/\*.*?\*/', re.S)
+
+
+def minificar_css(texto: str) -> str:
+    """Remove comentários e espaços supérfluos (strings preservadas)"""
+    partes = []
+    for trecho in re.split(rf'({_STRING_CSS})', _PARTES_CSS.sub(lambda m: m.group(1) or ' ', texto)):
+        if trecho[:1] in ('"', "'"):
+            partes.append(trecho)
+            continue
+        trecho = re.sub(r'\s+', ' ', trecho)
+        # ':' fica de fora: "a :hover" e "a:hover" são seletores diferentes
+        trecho = re.sub(r' ?([{};,>]) ?', r'\1', trecho)
+        partes.append(trecho.replace(';}', '}'))
+    return ''.join(partes).strip()
+
+
+_PALAVRA_JS = re.compile(r'[\w$]')
+# Depois destes, '/' inicia uma expressão regular (e não uma divisão)
+_ANTES_DE_REGEX = set('(,=:[!&|?{};+-*%~^<>')
+_PALAVRAS_ANTES_DE_REGEX = {'return', 'typeof', 'case', 'do', 'else', 'in', 'of', 'new', 'delete',
+                            'void', 'throw', 'instanceof', 'yield', 'await'}
+
+
+def _fim_string(texto: str, inicio: int, delimitador: str) -> int:
+    """Índice logo após o delimitador que fecha a string iniciada em `inicio`"""
+    i = inicio + 1
+    while i < len(texto):
+        if texto[i] == '\\':
+            i += 2
+            continue
+        if texto[i] == delimitador:
+            return i + 1
+        i += 1
+    return len(texto)
+
+
+def _fim_regex(texto: str, inicio: int) -> int:
+    i, classe = inicio + 1, False
+    while i < len(texto) and texto[i] != '\n':
+        caractere = texto[i]
+        if caractere == '\\':
+            i += 2
+            continue
+        if caractere == '[':
+            classe = True
+        elif caractere == ']':
+            classe = False
+        elif caractere == '/' and not classe:
+            return i + 1
+        i += 1
+    return i
+
+
+def minificar_js(texto: str) -> str:
+    """
+    Minificação conservadora: remove comentários, indentação e linhas em
+    branco. Strings, template literals e regex ficam intactos; quebras de
+    linha são mantidas onde a inserção automática de ';' poderia depender
+    delas. Não renomeia identificadores.
+    """
+    saida: List[str] = []
+    # Um item por template literal aberto: profundidade de chaves dentro do ${...} atual
+    templates: List[int] = []
+    espaco = ''  # '', ' ' ou '\n' pendente antes do próximo token
+    i, tamanho = 0, len(texto)
+
+    def ultimo() -> str:
+        return saida[-1][-1] if saida and saida[-1] else ''
+
+    def emitir(token: str) -> None:
+        nonlocal espaco
+        anterior = ultimo()
+        if espaco and anterior:
+            palavras = _PALAVRA_JS.match(anterior) and _PALAVRA_JS.match(token[0])
+            operador_duplo = anterior in '+-' and token[0] == anterior
+            if espaco == '\n' and anterior not in '{;,([' and token[0] not in '})];,':
+                saida.append('\n')
+            elif palavras or operador_duplo:
+                saida.append(' ')
+        espaco = ''
+        saida.append(token)
+
+    def regex_permitida() -> bool:
+        anterior = ultimo()
+        if not anterior or anterior in _ANTES_DE_REGEX:
+            return True
+        return bool(_PALAVRA_JS.match(anterior)) and saida[-1] in _PALAVRAS_ANTES_DE_REGEX
+
+    def fim_template(inicio: int) -> int:
+        """Fim do trecho de template literal iniciado em `inicio` (após o ` final ou o próximo ${)"""
+        j = inicio + 1
+        while j < tamanho:
+            if texto[j] == '\\':
+                j += 2
+                continue
+            if texto[j] == '`':
+                templates.pop()
+                return j + 1
+            if texto.startswith('${', j):
+                return j + 2
+            j += 1
+        return tamanho
+
+    while i < tamanho:
+        caractere = texto[i]
+        if caractere.isspace():
+            j = i
+            while j < tamanho and texto[j].isspace():
+                j += 1
+            espaco = '\n' if '\n' in texto[i:j] or espaco == '\n' else ' '
+            i = j
+        elif texto.startswith('//', i):
+            fim = texto.find('\n', i)
+            i = tamanho if fim < 0 else fim
+        elif texto.startswith('/*', i):
+            fim = texto.find('*/', i + 2)
+            fim = tamanho if fim < 0 else fim + 2
+            espaco = '\n' if '\n' in texto[i:fim] or espaco == '\n' else ' '
+            i = fim
+        elif caractere in ('"', "'"):
+            fim = _fim_string(texto, i, caractere)
+            emitir(texto[i:fim])
+            i = fim
+        elif caractere == '`':
+            templates.append(0)
+            fim = fim_template(i)
+            emitir(texto[i:fim])
+            i = fim
+        elif caractere == '/' and regex_permitida():
+            fim = _fim_regex(texto, i)
+            emitir(texto[i:fim])
+            i = fim
+        elif caractere == '{' and templates:
+            templates[-1] += 1
+            emitir(caractere)
+            i += 1
+        elif caractere == '}' and templates and templates[-1] == 0:
+            fim = fim_template(i)
+            emitir(texto[i:fim])
+            i = fim
+        else:
+            if caractere == '}' and templates:
+                templates[-1] -= 1
+            j = i + 1
+            if _PALAVRA_JS.match(caractere):
+                while j < tamanho and _PALAVRA_JS.match(texto[j]):
+                    j += 1
+            emitir(texto[i:j])
+            i = j
+    return ''.join(saida).strip() + '\n'
+
+
+# ============================================
+# CONSTRUÇÃO E SERVIÇO DOS PACOTES
+# ============================================
+
+def _gravar(caminho: Path, dados: bytes) -> None:
+    """Escrita atômica: workers construindo ao mesmo tempo nunca leem um arquivo pela metade"""
+    temporario = caminho.with_name(f"{caminho.name}.{os.getpid()}.tmp")
+    temporario.write_bytes(dados)
+    os.replace(temporario, caminho)
+
+
+def _com_hash(nome: str, dados: bytes) -> str:
+    base, extensao = os.path.splitext(nome)
+    return f"{DIRETORIO_PACOTES}/{os.path.basename(base)}.{hashlib.sha256(dados).hexdigest()[:12]}{extensao}"
+
+
+class GerenciadorAtivos:
+    """Constrói, carrega o manifest e serve os pacotes de static/"""
+
+    def __init__(self, pasta: Path):
+        self.pasta = Path(pasta)
+        self._manifest: Dict[str, Dict] = {}
+        self._imutaveis: Dict[str, Dict] = {}
+        self._assinatura: Optional[str] = None
+        self._mtimes: Optional[float] = None
+        self._lock = threading.Lock()
+
+    # --------------------------------------------
+    # Construção
+    # --------------------------------------------
+
+    def _fontes(self) -> List[str]:
+        return [fonte for fontes in PACOTES.values() for fonte in fontes] + COPIAS
+
+    def _mtime_fontes(self) -> float:
+        try:
+            return max(os.path.getmtime(self.pasta / fonte) for fonte in self._fontes())
+        except OSError:
+            return 0.0
+
+    def assinatura(self) -> str:
+        """Hash dos fontes e das opções do pipeline: muda sempre que um build mudaria"""
+        h = hashlib.sha256(f"{VERSAO_PIPELINE}:{ATIVOS_MINIFICAR}:{self._brotli() is not None}".encode())
+        for fonte in self._fontes():
+            h.update(fonte.encode('utf-8'))
+            h.update((self.pasta / fonte).read_bytes())
+        return h.hexdigest()[:16]
+
+    @staticmethod
+    def _brotli():
+        try:
+            import brotli
+            return brotli
+        except ImportError:  # pragma: no cover - depende do ambiente
+            return None
+
+    def _pacote(self, fontes: List[str], extensao: str) -> bytes:
+        textos = [(self.pasta / fonte).read_text(encoding='utf-8') for fonte in fontes]
+        if extensao == '.css':
+            texto = '\n'.join(textos)
+            return (minificar_css(texto) if ATIVOS_MINIFICAR else texto).encode('utf-8')
+        # ';' entre arquivos: um fonte sem ';' final não se funde com o seguinte
+        texto = '\n;\n'.join(textos)
+        return (minificar_js(texto) if ATIVOS_MINIFICAR else texto).encode('utf-8')
+
+    def construir(self) -> Dict:
+        """
+        Gera os pacotes, os irmãos comprimidos e o manifest em static/dist
+
+        Retorna:
+            dict: Manifest gravado
+        """
+        destino = self.pasta / DIRETORIO_PACOTES
+        destino.mkdir(parents=True, exist_ok=True)
+        brotli = self._brotli()
+        arquivos = {}
+
+        for nome, fontes in PACOTES.items():
+            dados = self._pacote(fontes, os.path.splitext(nome)[1])
+            caminho = _com_hash(nome, dados)
+            _gravar(self.pasta / caminho, dados)
+            codificacoes = {'gzip': '.gz'}
+            _gravar(self.pasta / f"{caminho}.gz", gzip.compress(dados, compresslevel=9, mtime=0))
+            if brotli is not None:
+                _gravar(self.pasta / f"{caminho}.br", brotli.compress(dados, quality=11))
+                codificacoes['br'] = '.br'
+            arquivos[nome] = {'caminho': caminho, 'bytes': len(dados), 'fontes': fontes,
+                              'codificacoes': codificacoes}
+
+        for nome in COPIAS:
+            dados = (self.pasta / nome).read_bytes()
+            caminho = _com_hash(nome, dados)
+            _gravar(self.pasta / caminho, dados)
+            arquivos[nome] = {'caminho': caminho, 'bytes': len(dados), 'fontes': [nome], 'codificacoes': {}}
+
+        anterior = self._ler_manifest() or {}
+        manifest = {'assinatura': self.assinatura(), 'arquivos': arquivos,
+                    'anteriores': [a['caminho'] for a in anterior.get('arquivos', {}).values()]}
+        _gravar(destino / ARQUIVO_MANIFEST, json.dumps(manifest, indent=2).encode('utf-8'))
+        self._remover_antigos(manifest)
+        return manifest
+
+    def _remover_antigos(self, manifest: Dict) -> None:
+        """Remove pacotes que não são do build atual nem do anterior"""
+        manter = {ARQUIVO_MANIFEST}
+        for caminho in manifest['anteriores'] + [a['caminho'] for a in manifest['arquivos'].values()]:
+            nome = os.path.basename(caminho)
+            manter.update({nome, f"{nome}.gz", f"{nome}.br"})
+        for arquivo in (self.pasta / DIRETORIO_PACOTES).iterdir():
+            if arquivo.name not in manter and not arquivo.name.endswith('.tmp'):
+                try:
+                    arquivo.unlink()
+                except OSError:
+                    pass
+
+    def _ler_manifest(self) -> Optional[Dict]:
+        try:
+            with open(self.pasta / DIRETORIO_PACOTES / ARQUIVO_MANIFEST, encoding='utf-8') as arquivo:
+                return json.load(arquivo)
+        except (OSError, ValueError):
+            return None
+
+    # --------------------------------------------
+    # Carregamento
+    # --------------------------------------------
+
+    def carregar(self, construir: bool = ATIVOS_CONSTRUIR_NA_INICIALIZACAO) -> bool:
+        """
+        Carrega o manifest, construindo os pacotes se estiver ausente ou
+        desatualizado (e `construir` permitir)
+
+        Retorna:
+            bool: True se os pacotes estão em uso; False = fontes originais
+        """
+        with self._lock:
+            self._mtimes = self._mtime_fontes()
+            try:
+                manifest = self._ler_manifest()
+                if not manifest or manifest.get('assinatura') != self.assinatura():
+                    manifest = self.construir() if construir else None
+            except Exception as e:
+                print(f"Erro ao construir os arquivos estáticos: {e}")
+                manifest = None
+
+            if manifest is None:
+                self._manifest, self._imutaveis, self._assinatura = {}, {}, None
+                return False
+            self._manifest = manifest['arquivos']
+            self._imutaveis = {a['caminho']: a for a in manifest['arquivos'].values()}
+            self._assinatura = manifest['assinatura']
+            return True
+
+    @property
+    def versao(self) -> str:
+        """Assinatura dos pacotes em uso (entra no ETag das páginas de core/resposta.py)"""
+        return self._assinatura or 'fontes'
+
+    def _verificar_fontes(self) -> None:
+        if ATIVOS_VERIFICAR_FONTES and self._mtime_fontes() != self._mtimes:
+            self.carregar(construir=True)
+
+    # --------------------------------------------
+    # Templates e rotas
+    # --------------------------------------------
+
+    def url(self, nome: str) -> str:
+        """URL do arquivo com hash para o nome lógico (função ativo() dos templates)"""
+        self._verificar_fontes()
+        arquivo = self._manifest.get(nome)
+        if arquivo is not None:
+            return url_for('static', filename=arquivo['caminho'])
+        return url_for('static', filename=PACOTES.get(nome, [nome])[0])
+
+    def servir(self, filename: str):
+        """View de /static: pacotes do manifest com cache imutável e irmão pré-comprimido"""
+        arquivo = self._imutaveis.get(filename)
+        if arquivo is None:
+            return current_app.send_static_file(filename)
+
+        aceitas = request.accept_encodings
+        codificacao = max(arquivo['codificacoes'], default=None,
+                          key=lambda c: (aceitas[c], c == 'br'))
+        if codificacao is not None and not aceitas[codificacao]:
+            codificacao = None
+        sufixo = arquivo['codificacoes'][codificacao] if codificacao else ''
+
+        resposta = send_from_directory(self.pasta, filename + sufixo, mimetype=mimetypes.guess_type(filename)[0],
+                                       max_age=ATIVOS_MAX_AGE_SEGUNDOS)
+        resposta.cache_control.public = True
+        resposta.cache_control.immutable = True
+        if arquivo['codificacoes']:
+            resposta.vary.add('Accept-Encoding')
+        if codificacao:
+            resposta.headers['Content-Encoding'] = codificacao
+        return resposta
+
+    def instalar(self, app) -> None:
+        """Carrega os pacotes, registra ativo() nos templates e assume a view de /static"""
+        self.carregar()
+        app.add_template_global(self.url, 'ativo')
+        app.view_functions['static'] = self.servir
+        app.extensions['ativos'] = self
+
+
+gerenciador_ativos = GerenciadorAtivos(BASE_DIR / 'static')
+
+
+# ============================================
+# EXECUÇÃO MANUAL (BUILD DA IMAGEM)
+# ============================================
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Constrói os pacotes de static/ (minificação, hash e .gz/.br)')
+    parser.add_argument('--verificar', action='store_true',
+                        help='Só confere se o manifest corresponde aos fontes (sai com 1 se não)')
+    args = parser.parse_args()
+
+    if args.verificar:
+        atual = gerenciador_ativos._ler_manifest()
+        em_dia = bool(atual) and atual.get('assinatura') == gerenciador_ativos.assinatura()
+        print('Manifest em dia' if em_dia else 'Manifest ausente ou desatualizado')
+        raise SystemExit(0 if em_dia else 1)
+
+    resultado = gerenciador_ativos.construir()
+    for nome, arquivo in resultado['arquivos'].items():
+        print(f"{nome} -> {arquivo['caminho']} ({arquivo['bytes']} bytes, "
+              f"{', '.join(arquivo['codificacoes']) or 'sem compressão'})")
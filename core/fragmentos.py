@@ -0,0 +1,84 @@
+"""
+============================================
+CORE - CACHE DE FRAGMENTOS DE TEMPLATE
+============================================
+Extensão Jinja com o bloco {% cache chave, ttl %} ... {% endcache %}: o
+HTML renderizado pelo bloco fica em cache e é reaproveitado enquanto a
+chave não mudar.
+
+Chaves:
+- Uma tupla cujo primeiro item é o namespace (agrupa as métricas), ou uma
+  string (namespace 'fragmento')
+- Registros (dict com 'id') entram como id + data_atualizacao: o
+  fragmento é renderizado de novo assim que a linha é alterada
+- Tudo o mais que o bloco exibe e não vem da linha (nomes de JOIN, perfil
+  do usuário) precisa fazer parte da chave
+
+Armazenamento: CacheLeitura sobre LRU em memória por worker (HTML é
+barato de refazer e caro de serializar), com métricas por namespace em
+/health/fragmentos. Como as chaves são versionadas, não há invalidação.
+
+Uso:
+    {% for produto in produtos %}
+    {% cache ('vitrine_card', produto, produto.fornecedor_nome), 600 %}
+        ... card ...
+    {% endcache %}
+    {% endfor %}
+"""
+
+import hashlib
+from datetime import date, datetime
+from typing import Any, Callable, Optional, Tuple
+from jinja2 import nodes
+from jinja2.ext import Extension
+from core.cache import CacheLeitura, MemoriaLRUBackend
+from config import FRAGMENTOS_ATIVO, FRAGMENTOS_TTL_SEGUNDOS, FRAGMENTOS_MAX_ITENS
+
+# Identificadores mais longos que isso são trocados pelo hash
+TAMANHO_MAXIMO_CHAVE = 200
+
+cache_fragmentos = CacheLeitura(backend=MemoriaLRUBackend(FRAGMENTOS_MAX_ITENS), ttl=FRAGMENTOS_TTL_SEGUNDOS)
+
+
+def _parte_chave(valor: Any) -> str:
+    if isinstance(valor, dict) and 'id' in valor:
+        valor = (valor['id'], valor.get('data_atualizacao'))
+    if isinstance(valor, (tuple, list)):
+        return ','.join(_parte_chave(v) for v in valor)
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    return '' if valor is None else str(valor)
+
+
+def chave_fragmento(chave: Any) -> Tuple[str, str]:
+    """Converte a chave do bloco em (namespace, identificador)"""
+    if isinstance(chave, (tuple, list)) and chave:
+        namespace, partes = str(chave[0]), chave[1:]
+    else:
+        namespace, partes = 'fragmento', (chave,)
+    identificador = ':'.join(_parte_chave(parte) for parte in partes)
+    if len(identificador) > TAMANHO_MAXIMO_CHAVE:
+        identificador = hashlib.sha1(identificador.encode('utf-8')).hexdigest()
+    return namespace, identificador
+
+
+class CacheFragmentos(Extension):
+    """Bloco {% cache chave[, ttl] %} ... {% endcache %}"""
+
+    tags = {'cache'}
+
+    def parse(self, parser):
+        linha = next(parser.stream).lineno
+        argumentos = [parser.parse_expression()]
+        if parser.stream.skip_if('comma'):
+            argumentos.append(parser.parse_expression())
+        else:
+            argumentos.append(nodes.Const(None))
+        corpo = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(self.call_method('_renderizar', argumentos), [], [], corpo).set_lineno(linha)
+
+    def _renderizar(self, chave: Any, ttl: Optional[float], caller: Callable[[], str]) -> str:
+        if not FRAGMENTOS_ATIVO:
+            return caller()
+        namespace, identificador = chave_fragmento(chave)
+        return cache_fragmentos.obter(namespace, identificador, caller, ttl)
@@ -0,0 +1,206 @@
+"""
+============================================
+CORE - BARRAMENTO DE INVALIDAÇÃO
+============================================
+Propaga invalidações de cache entre workers e containers usando
+PostgreSQL LISTEN/NOTIFY.
+
+Fluxo:
+- Escritas via Database.inserir/atualizar/excluir publicam (tabela, id)
+  no canal CACHE_CANAL_INVALIDACAO (pg_notify)
+- Cada worker mantém uma thread ouvinte com conexão dedicada (LISTEN)
+  que repassa os eventos aos invalidadores registrados
+- Se a conexão cair, a thread reconecta com backoff exponencial e, ao
+  voltar, limpa todos os caches: eventos emitidos durante a queda se
+  perderam e não há como saber o que mudou
+"""
+
+import json
+import os
+import select
+import threading
+import uuid
+from typing import Callable, Dict, Iterable, List, Optional
+import psycopg2
+import psycopg2.extensions
+from core.database import Database
+from config import (DB_CONFIG, CACHE_CANAL_INVALIDACAO,
+                    CACHE_INVALIDACAO_DISTRIBUIDA)
+
+
+class BarramentoInvalidacao:
+    """
+    Barramento de eventos de invalidação sobre LISTEN/NOTIFY.
+
+    Cada processo possui uma origem própria; eventos publicados pelo próprio
+    worker são ignorados pela thread ouvinte, pois a invalidação local já
+    ocorreu de forma síncrona na escrita.
+    """
+
+    INTERVALO_ESPERA = 5.0      # Segundos entre verificações da conexão ociosa
+    BACKOFF_INICIAL = 1.0       # Primeira espera após falha de conexão
+    BACKOFF_MAXIMO = 30.0       # Teto do backoff exponencial
+
+    def __init__(self, canal: str = CACHE_CANAL_INVALIDACAO, ativo: bool = CACHE_INVALIDACAO_DISTRIBUIDA):
+        self.canal = canal
+        self.ativo = ativo
+        self._invalidadores: Dict[str, List[Callable[[str, Optional[int]], None]]] = {}
+        self._limpezas: List[Callable[[], None]] = []
+        self._origem = None
+        self._pid = None
+        self._thread = None
+        self._parar = threading.Event()
+        self._lock = threading.Lock()
+
+    # --------------------------------------------
+    # Registro
+    # --------------------------------------------
+
+    def registrar_invalidador(self, invalidador: Callable[[str, Optional[int]], None],
+                              tabelas: Iterable[str],
+                              limpeza: Optional[Callable[[], None]] = None) -> None:
+        """
+        Registra um invalidador para as tabelas informadas
+
+        Parâmetros:
+            invalidador (callable): Recebe (tabela, id) a cada evento remoto
+            tabelas (iterable): Tabelas cujas alterações interessam ao invalidador
+            limpeza (callable): Esvazia o cache inteiro após perda de eventos (opcional)
+        """
+        for tabela in tabelas:
+            self._invalidadores.setdefault(tabela, []).append(invalidador)
+        if limpeza and limpeza not in self._limpezas:
+            self._limpezas.append(limpeza)
+
+    @property
+    def origem(self) -> str:
+        """Identificador do processo atual (renovado após fork)"""
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._origem = f"{self._pid}-{uuid.uuid4().hex[:8]}"
+        return self._origem
+
+    # --------------------------------------------
+    # Publicação
+    # --------------------------------------------
+
+    def publicar(self, tabela: str, id: Optional[int] = None) -> None:
+        """
+        Publica (tabela, id) no canal de invalidação.
+
+        Somente tabelas com invalidadores registrados geram NOTIFY, evitando
+        uma ida extra ao banco em escritas que não afetam nenhum cache.
+        """
+        if not self.ativo or tabela not in self._invalidadores:
+            return
+        payload = json.dumps({'tabela': tabela, 'id': id, 'origem': self.origem})
+        Database.executar("SELECT pg_notify(%s, %s)", (self.canal, payload), commit=True)
+
+    # --------------------------------------------
+    # Recebimento
+    # --------------------------------------------
+
+    def _despachar(self, payload: str) -> None:
+        """Repassa um evento recebido aos invalidadores da tabela"""
+        try:
+            evento = json.loads(payload)
+        except (TypeError, ValueError):
+            return
+        if evento.get('origem') == self.origem:
+            return
+        tabela = evento.get('tabela')
+        for invalidador in self._invalidadores.get(tabela, ()):
+            try:
+                invalidador(tabela, evento.get('id'))
+            except Exception as e:
+                print(f"Erro ao invalidar cache de {tabela}: {e}")
+
+    def _limpar_tudo(self) -> None:
+        """Esvazia todos os caches registrados (usado após lacuna do ouvinte)"""
+        for limpeza in self._limpezas:
+            try:
+                limpeza()
+            except Exception as e:
+                print(f"Erro ao limpar cache após reconexão: {e}")
+
+    def _conectar_ouvinte(self):
+        """Abre conexão dedicada em autocommit e executa LISTEN"""
+        conexao = psycopg2.connect(
+            host=DB_CONFIG['host'],
+            port=DB_CONFIG['port'],
+            database=DB_CONFIG['database'],
+            user=DB_CONFIG['user'],
+            password=DB_CONFIG['password'],
+            connect_timeout=DB_CONFIG.get('connect_timeout', 3)
+        )
+        conexao.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        with conexao.cursor() as cursor:
+            cursor.execute(f'LISTEN "{self.canal}"')
+        return conexao
+
+    def _executar_ouvinte(self) -> None:
+        """Laço da thread ouvinte: escuta, reconecta e limpa após lacunas"""
+        backoff = self.BACKOFF_INICIAL
+        primeira_conexao = True
+        while not self._parar.is_set():
+            conexao = None
+            try:
+                conexao = self._conectar_ouvinte()
+                # Qualquer evento anterior a esta conexão pode ter sido perdido
+                if not primeira_conexao:
+                    self._limpar_tudo()
+                primeira_conexao = False
+                backoff = self.BACKOFF_INICIAL
+
+                while not self._parar.is_set():
+                    select.select([conexao], [], [], self.INTERVALO_ESPERA)
+                    conexao.poll()
+                    while conexao.notifies:
+                        notificacao = conexao.notifies.pop(0)
+                        self._despachar(notificacao.payload)
+            except Exception as e:
+                print(f"Ouvinte de invalidação desconectado: {e}")
+                # Conexão perdida: força limpeza ao reconectar
+                primeira_conexao = False
+            finally:
+                if conexao is not None:
+                    try:
+                        conexao.close()
+                    except Exception:
+                        pass
+            if self._parar.wait(backoff):
+                break
+            backoff = min(backoff * 2, self.BACKOFF_MAXIMO)
+
+    def garantir_iniciado(self) -> None:
+        """
+        Inicia a thread ouvinte uma vez por processo.
+
+        Seguro para chamar a cada requisição: após fork (gunicorn --preload)
+        a thread do processo pai não existe no filho e é recriada aqui.
+        """
+        if not self.ativo:
+            return
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._parar.clear()
+            self.origem  # fixa a origem deste processo antes de ouvir
+            self._thread = threading.Thread(target=self._executar_ouvinte,
+                                            name='ouvinte-invalidacao', daemon=True)
+            self._thread.start()
+
+    def parar(self) -> None:
+        """Sinaliza o encerramento da thread ouvinte"""
+        self._parar.set()
+
+
+# ============================================
+# INSTÂNCIA COMPARTILHADA
+# ============================================
+barramento_invalidacao = BarramentoInvalidacao()
+
+# Toda escrita via Database publica o evento para os demais workers
+Database.registrar_ouvinte_alteracao(barramento_invalidacao.publicar)
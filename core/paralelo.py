@@ -0,0 +1,121 @@
+"""
+============================================
+CORE - CONSULTAS EM PARALELO (FAN-OUT)
+============================================
+Executa leituras independentes de uma mesma requisição em paralelo, cada
+uma em sua própria conexão (Database abre uma conexão por chamada), e
+reúne os resultados. A latência passa a ser a da consulta mais lenta em
+vez da soma de todas.
+
+Características:
+- Pool de threads compartilhado por processo (recriado após fork)
+- Limite de consultas simultâneas por chamada (por requisição)
+- Propagação de erros: a primeira exceção (na ordem das tarefas) é
+  relançada e as tarefas ainda não iniciadas são canceladas
+- Chamadas aninhadas (de dentro do pool) rodam em sequência, evitando
+  que tarefas aguardem vagas ocupadas por elas mesmas
+
+Uso:
+    resultados = ExecucaoParalela.executar({
+        'pedido': ExecucaoParalela.consulta(query_pedido, (id,), fetchone=True),
+        'itens': ExecucaoParalela.consulta(query_itens, (id,), fetchall=True),
+    })
+"""
+
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Optional, Tuple
+from core.database import Database
+from config import PARALELO_MAX_THREADS, PARALELO_LIMITE_POR_REQUISICAO
+
+
+class ExecucaoParalela:
+    """Classe estática para fan-out de consultas independentes"""
+
+    _executor: Optional[ThreadPoolExecutor] = None
+    _pid: Optional[int] = None
+    _lock = threading.Lock()
+    _contexto = threading.local()
+
+    @classmethod
+    def _obter_executor(cls) -> ThreadPoolExecutor:
+        """Cria o pool de threads na primeira chamada do processo (inclusive após fork)"""
+        if cls._executor is not None and cls._pid == os.getpid():
+            return cls._executor
+        with cls._lock:
+            if cls._executor is None or cls._pid != os.getpid():
+                cls._executor = ThreadPoolExecutor(max_workers=max(1, PARALELO_MAX_THREADS),
+                                                   thread_name_prefix='consulta-paralela')
+                cls._pid = os.getpid()
+        return cls._executor
+
+    @classmethod
+    def encerrar(cls, esperar: bool = True) -> None:
+        """Encerra o pool de threads do processo atual (desligamento do worker)"""
+        with cls._lock:
+            executor, pid = cls._executor, cls._pid
+            cls._executor, cls._pid = None, None
+        if executor is not None and pid == os.getpid():
+            executor.shutdown(wait=esperar, cancel_futures=not esperar)
+
+    @staticmethod
+    def consulta(query: str, parametros: Optional[Tuple] = None, **opcoes) -> Callable[[], Any]:
+        """Atalho para montar uma tarefa que chama Database.executar(query, parametros, **opcoes)"""
+        return partial(Database.executar, query, parametros, **opcoes)
+
+    @classmethod
+    def _executar_tarefa(cls, tarefa: Callable[[], Any]) -> Any:
+        cls._contexto.no_pool = True
+        try:
+            return tarefa()
+        finally:
+            cls._contexto.no_pool = False
+
+    @classmethod
+    def executar(cls, tarefas: Dict[str, Callable[[], Any]],
+                 limite: int = PARALELO_LIMITE_POR_REQUISICAO) -> Dict[str, Any]:
+        """
+        Executa as tarefas em paralelo e devolve {nome: resultado}
+
+        Parâmetros:
+            tarefas (dict): Nome -> função sem argumentos (ex.: consulta(...) ou repo.metodo)
+            limite (int): Máximo de tarefas simultâneas desta chamada
+
+        Retorna:
+            dict: Resultados na mesma chave de cada tarefa
+
+        Exceções:
+            Relança a primeira exceção levantada por uma tarefa
+        """
+        if not tarefas:
+            return {}
+
+        # Uma única tarefa, limite 1 ou chamada aninhada: sem ganho em paralelizar
+        if len(tarefas) == 1 or limite <= 1 or getattr(cls._contexto, 'no_pool', False):
+            return {nome: tarefa() for nome, tarefa in tarefas.items()}
+
+        executor = cls._obter_executor()
+        vagas = threading.BoundedSemaphore(limite)
+        futuros = {}
+
+        def liberar(_):
+            vagas.release()
+
+        try:
+            for nome, tarefa in tarefas.items():
+                vagas.acquire()
+                # Falha já conhecida: não adianta submeter as demais
+                if any(f.done() and f.exception() is not None for f in futuros.values()):
+                    vagas.release()
+                    break
+                # Cópia do contexto: observadores (ex.: benchmarks) atribuem a consulta à requisição
+                futuro = executor.submit(contextvars.copy_context().run, cls._executar_tarefa, tarefa)
+                futuro.add_done_callback(liberar)
+                futuros[nome] = futuro
+            return {nome: futuro.result() for nome, futuro in futuros.items()}
+        finally:
+            for futuro in futuros.values():
+                futuro.cancel()
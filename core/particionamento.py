@@ -0,0 +1,429 @@
+"""
+============================================
+CORE - PARTICIONAMENTO DOS LOGS
+============================================
+logs_alteracoes e logs_acesso são particionadas por mês (RANGE na data do
+evento). Este módulo mantém as partições:
+
+- Cria com antecedência as partições dos próximos LOGS_PARTICOES_FUTURAS
+  meses, para que as inserções nunca caiam na partição padrão
+- Linhas que caíram na partição padrão (ex.: dados de carga inicial) são
+  movidas para a partição do seu mês quando ela é criada
+- Partições mais antigas que LOGS_RETENCAO_MESES são exportadas para
+  CSV compactado (gzip) em LOGS_DIRETORIO_ARQUIVO e então desanexadas
+  e removidas. Antes de remover uma partição de logs_alteracoes, o
+  primeiro evento restante de cada registro que dependia dela recebe o
+  snapshot do estado naquele ponto (Auditoria.reconstruir continua
+  encontrando a base)
+
+Bancos criados antes do particionamento têm logs_alteracoes/logs_acesso
+como tabelas comuns, que `CREATE TABLE IF NOT EXISTS` não converte: a
+subida do gunicorn é interrompida e a manutenção não roda até a migração
+(--migrar), que em uma única transação renomeia a tabela antiga, cria a
+particionada conforme schema.sql, copia as linhas (colunas novas ficam
+nulas, como nas linhas legadas), remove a antiga e reaplica schema.sql
+(índices). Execute com a aplicação parada.
+
+Uso manual:
+    python -m core.particionamento              # cria partições e aplica retenção
+    python -m core.particionamento --sem-retencao
+    python -m core.particionamento --migrar     # converte tabelas de logs anteriores ao particionamento
+"""
+
+import json
+import os
+import re
+import threading
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional
+import psycopg2.extras
+from core.auditoria import Auditoria
+from core.database import Database
+from config import (LOGS_MANUTENCAO_AUTOMATICA, LOGS_MANUTENCAO_INTERVALO_SEGUNDOS,
+                    LOGS_PARTICOES_FUTURAS, LOGS_RETENCAO_MESES, LOGS_DIRETORIO_ARQUIVO)
+
+SCHEMA_SQL = Path(__file__).resolve().parent.parent / 'schema.sql'
+
+
+class GerenciadorParticoes:
+    """
+    Cria partições mensais e aplica a retenção dos logs.
+
+    Um advisory lock por operação garante que apenas um worker altere as
+    partições por vez; os demais simplesmente pulam o ciclo.
+    """
+
+    # Tabela particionada -> coluna de partição
+    TABELAS = {
+        'logs_alteracoes': 'data_alteracao',
+        'logs_acesso': 'data_acesso',
+    }
+
+    def __init__(self, meses_futuros: int = LOGS_PARTICOES_FUTURAS,
+                 retencao_meses: int = LOGS_RETENCAO_MESES,
+                 diretorio_arquivo: str = LOGS_DIRETORIO_ARQUIVO,
+                 intervalo: int = LOGS_MANUTENCAO_INTERVALO_SEGUNDOS,
+                 ativo: bool = LOGS_MANUTENCAO_AUTOMATICA):
+        self.meses_futuros = meses_futuros
+        self.retencao_meses = retencao_meses
+        self.diretorio_arquivo = Path(diretorio_arquivo)
+        self.intervalo = intervalo
+        self.ativo = ativo
+        self._thread = None
+        self._pid = None
+        self._parar = threading.Event()
+        self._lock = threading.Lock()
+
+    # --------------------------------------------
+    # Datas e nomes
+    # --------------------------------------------
+
+    @staticmethod
+    def somar_meses(mes: date, quantidade: int) -> date:
+        """Primeiro dia do mês deslocado em `quantidade` meses"""
+        indice = mes.year * 12 + mes.month - 1 + quantidade
+        return date(indice // 12, indice % 12 + 1, 1)
+
+    @staticmethod
+    def nome_particao(tabela: str, mes: date) -> str:
+        return f"{tabela}_{mes:%Y_%m}"
+
+    @staticmethod
+    def _particoes(cursor, tabela: str) -> Dict[date, str]:
+        """Partições mensais existentes da tabela: {primeiro dia do mês: nome}"""
+        cursor.execute("""
+            SELECT c.relname AS nome
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = %s::regclass
+        """, (tabela,))
+        particoes = {}
+        prefixo = f"{tabela}_"
+        for linha in cursor.fetchall():
+            sufixo = linha['nome'][len(prefixo):]
+            try:
+                ano, mes = sufixo.split('_')
+                particoes[date(int(ano), int(mes), 1)] = linha['nome']
+            except ValueError:
+                continue  # partição padrão
+        return particoes
+
+    # --------------------------------------------
+    # Tabelas anteriores ao particionamento
+    # --------------------------------------------
+
+    def tabelas_legadas(self) -> Optional[List[str]]:
+        """
+        Tabelas de logs que existem mas não são particionadas (relkind <> 'p').
+
+        Retorna:
+            list: Nomes das tabelas a migrar ([] se está tudo certo), ou
+                  None se o banco não respondeu
+        """
+        linhas = Database.executar("""
+            SELECT t.nome
+            FROM unnest(%s::text[]) AS t(nome)
+            JOIN pg_class c ON c.oid = to_regclass(t.nome)
+            WHERE c.relkind <> 'p'
+            ORDER BY t.nome
+        """, (list(self.TABELAS),), fetchall=True)
+        if linhas is None:
+            return None
+        return [linha['nome'] for linha in linhas]
+
+    @staticmethod
+    def instrucoes_migracao(tabelas: List[str]) -> str:
+        return (f"{', '.join(tabelas)} não é particionada (schema anterior ao particionamento dos logs). "
+                "Com a aplicação parada, execute: python -m core.particionamento --migrar")
+
+    def migrar_legadas(self) -> Optional[Dict[str, int]]:
+        """
+        Converte as tabelas de logs comuns em particionadas, em uma transação.
+
+        Retorna:
+            dict: {tabela: linhas copiadas} ({} se não havia o que migrar),
+                  ou None em erro (nada é alterado)
+        """
+        legadas = self.tabelas_legadas()
+        if not legadas:
+            return legadas
+        schema = SCHEMA_SQL.read_text(encoding='utf-8')
+
+        def migrar(cursor):
+            copiadas = {}
+            for tabela in legadas:
+                copiadas[tabela] = self._migrar_tabela(cursor, schema, tabela, self.TABELAS[tabela])
+            # Índices, constraints e dados iniciais das tabelas novas (schema.sql é reaplicável)
+            cursor.execute(schema)
+            return copiadas
+
+        resultado = Database.transaction(migrar)
+        if resultado is not None:
+            self.criar_particoes()  # distribui as linhas copiadas pelas partições mensais
+        return resultado
+
+    @staticmethod
+    def _migrar_tabela(cursor, schema: str, tabela: str, coluna: str) -> int:
+        """Renomeia a tabela antiga, cria a particionada, copia as linhas e remove a antiga"""
+        legado = f"{tabela}_legado"
+        cursor.execute(f"LOCK TABLE {tabela} IN ACCESS EXCLUSIVE MODE")
+        cursor.execute(f"ALTER TABLE {tabela} RENAME TO {legado}")
+        cursor.execute(f"ALTER SEQUENCE IF EXISTS {tabela}_id_seq RENAME TO {legado}_id_seq")
+        cursor.execute(f"ALTER TABLE {legado} RENAME CONSTRAINT {tabela}_pkey TO {legado}_pkey")
+        # Libera os nomes dos índices para os da tabela nova
+        cursor.execute("""
+            SELECT indexrelid::regclass::text AS indice
+            FROM pg_index
+            WHERE indrelid = %s::regclass AND NOT indisprimary
+        """, (legado,))
+        for linha in cursor.fetchall():
+            cursor.execute(f"DROP INDEX {linha['indice']}")
+
+        for padrao in (rf"CREATE TABLE IF NOT EXISTS {tabela} \(.*?\) PARTITION BY RANGE \(\w+\);",
+                       rf"CREATE TABLE IF NOT EXISTS {tabela}_padrao PARTITION OF {tabela} DEFAULT;"):
+            encontrado = re.search(padrao, schema, re.S)
+            if not encontrado:
+                raise RuntimeError(f"definição de {tabela} não encontrada em {SCHEMA_SQL}")
+            cursor.execute(encontrado.group(0))
+
+        # Colunas em comum; a de partição é obrigatória na tabela nova
+        cursor.execute("""
+            SELECT a.attname AS coluna
+            FROM pg_attribute a
+            JOIN pg_attribute b ON b.attrelid = %s::regclass AND b.attname = a.attname
+                               AND b.attnum > 0 AND NOT b.attisdropped
+            WHERE a.attrelid = %s::regclass AND a.attnum > 0 AND NOT a.attisdropped
+            ORDER BY a.attnum
+        """, (legado, tabela))
+        colunas = [linha['coluna'] for linha in cursor.fetchall()]
+        origem = [f"COALESCE({c}, CURRENT_TIMESTAMP)" if c == coluna else c for c in colunas]
+        cursor.execute(f"INSERT INTO {tabela} ({', '.join(colunas)}) SELECT {', '.join(origem)} FROM {legado}")
+        copiadas = cursor.rowcount
+        cursor.execute(f"SELECT setval('{tabela}_id_seq', COALESCE((SELECT MAX(id) FROM {tabela}), 0) + 1, false)")
+        cursor.execute(f"DROP TABLE {legado}")
+        return copiadas
+
+    # --------------------------------------------
+    # Criação de partições
+    # --------------------------------------------
+
+    def criar_particoes(self, hoje: Optional[date] = None) -> Optional[Dict[str, List[str]]]:
+        """
+        Garante as partições do mês atual e dos próximos `meses_futuros`,
+        além das dos meses que ainda têm linhas na partição padrão.
+
+        Retorna:
+            dict: {tabela: [partições criadas]} ou None em erro
+        """
+        atual = (hoje or date.today()).replace(day=1)
+        criadas = {}
+        for tabela, coluna in self.TABELAS.items():
+            def criar(cursor, tabela=tabela, coluna=coluna):
+                cursor.execute("SELECT pg_try_advisory_xact_lock(hashtext(%s)) AS obtido", (f'particoes:{tabela}',))
+                if not cursor.fetchone()['obtido']:
+                    return []
+                existentes = self._particoes(cursor, tabela)
+                cursor.execute(f"SELECT DISTINCT date_trunc('month', {coluna})::date AS mes FROM {tabela}_padrao")
+                meses = {linha['mes'] for linha in cursor.fetchall()}
+                meses.update(self.somar_meses(atual, n) for n in range(self.meses_futuros + 1))
+                novas = []
+                for mes in sorted(meses - set(existentes)):
+                    self._criar_particao(cursor, tabela, coluna, mes)
+                    novas.append(self.nome_particao(tabela, mes))
+                return novas
+
+            resultado = Database.transaction(criar)
+            if resultado is None:
+                return None
+            criadas[tabela] = resultado
+        return criadas
+
+    def _criar_particao(self, cursor, tabela: str, coluna: str, mes: date) -> None:
+        """
+        Cria a partição do mês movendo as linhas correspondentes da partição padrão.
+
+        ATTACH exige que a partição padrão não tenha linhas do intervalo, por
+        isso a partição nasce como tabela comum, recebe as linhas e só então
+        é anexada (índices e FKs são criados pelo próprio ATTACH).
+        """
+        nome = self.nome_particao(tabela, mes)
+        inicio, fim = mes.isoformat(), self.somar_meses(mes, 1).isoformat()
+        # Bloqueia inserções na partição padrão até o ATTACH (que a varre)
+        cursor.execute(f"LOCK TABLE {tabela}_padrao IN ACCESS EXCLUSIVE MODE")
+        cursor.execute(f"CREATE TABLE {nome} (LIKE {tabela} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+        cursor.execute(f"""
+            WITH movidas AS (
+                DELETE FROM {tabela}_padrao WHERE {coluna} >= %s AND {coluna} < %s RETURNING *
+            )
+            INSERT INTO {nome} SELECT * FROM movidas
+        """, (inicio, fim))
+        cursor.execute(f"ALTER TABLE {tabela} ATTACH PARTITION {nome} FOR VALUES FROM ('{inicio}') TO ('{fim}')")
+
+    # --------------------------------------------
+    # Retenção e arquivamento
+    # --------------------------------------------
+
+    def aplicar_retencao(self, hoje: Optional[date] = None) -> Optional[Dict[str, List[str]]]:
+        """
+        Arquiva e remove as partições anteriores à janela de retenção.
+
+        Cada partição é exportada antes de ser desanexada; se algo falhar
+        no meio, ela continua anexada e será arquivada de novo no próximo ciclo.
+        Snapshots preservados, desanexação e remoção são uma única transação.
+
+        Retorna:
+            dict: {tabela: [arquivos gerados]}, {} se a retenção está
+                  desativada (LOGS_RETENCAO_MESES=0) ou None em erro
+        """
+        if self.retencao_meses <= 0:
+            return {}
+        limite = self.somar_meses((hoje or date.today()).replace(day=1), -self.retencao_meses)
+
+        conexao = Database.conectar()
+        if not conexao:
+            return None
+        arquivados = {}
+        try:
+            with conexao.cursor() as cursor:
+                cursor.execute("SELECT pg_try_advisory_lock(hashtext('retencao_logs'))")
+                if not cursor.fetchone()[0]:
+                    return {}
+            conexao.commit()
+            for tabela, coluna in self.TABELAS.items():
+                arquivados[tabela] = []
+                with conexao.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+                    particoes = self._particoes(cursor, tabela)
+                conexao.commit()
+                for mes, nome in sorted(particoes.items()):
+                    if mes >= limite:
+                        continue
+                    with conexao.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cursor:
+                        caminho = self._arquivar(cursor, tabela, coluna, nome)
+                        if tabela == 'logs_alteracoes':
+                            self._preservar_snapshots(cursor, nome, self.somar_meses(mes, 1))
+                        cursor.execute(f"ALTER TABLE {tabela} DETACH PARTITION {nome}")
+                        cursor.execute(f"DROP TABLE {nome}")
+                    conexao.commit()
+                    arquivados[tabela].append(str(caminho))
+            return arquivados
+        except Exception as e:
+            print(f"Erro ao aplicar retenção dos logs: {e}")
+            conexao.rollback()
+            return None
+        finally:
+            conexao.close()  # Encerrar a sessão libera o advisory lock
+
+    @staticmethod
+    def _preservar_snapshots(cursor, nome: str, fim: date) -> int:
+        """
+        Grava snapshot no primeiro evento posterior à partição de cada
+        registro presente nela, quando esse evento é só um delta (a base
+        da reconstrução estava na partição que será removida)
+
+        Retorna:
+            int: Eventos que receberam snapshot
+        """
+        cursor.execute(f"""
+            SELECT * FROM (
+                SELECT DISTINCT ON (l.tabela, l.registro_id)
+                       l.tabela, l.registro_id, l.id, l.data_alteracao, l.snapshot, l.versao
+                FROM logs_alteracoes l
+                WHERE l.data_alteracao >= %s
+                  AND (l.tabela, l.registro_id) IN (SELECT DISTINCT tabela, registro_id FROM {nome})
+                ORDER BY l.tabela, l.registro_id, l.data_alteracao, l.id
+            ) primeiros
+            WHERE snapshot IS NULL AND versao IS NOT NULL
+        """, (fim,))
+        preservados = 0
+        for evento in cursor.fetchall():
+            estado = Auditoria.reconstruir(evento['tabela'], evento['registro_id'], evento['id'], cursor=cursor)
+            if estado is None:
+                # Histórico já sem base antes desta partição: nada a carregar adiante
+                continue
+            cursor.execute(
+                "UPDATE logs_alteracoes SET snapshot = %s::jsonb WHERE id = %s AND data_alteracao = %s",
+                (json.dumps(estado, default=str), evento['id'], evento['data_alteracao'])
+            )
+            preservados += 1
+        return preservados
+
+    def _arquivar(self, cursor, tabela: str, coluna: str, nome: str) -> Path:
+        """Exporta a partição para <diretorio>/<tabela>/<particao>.csv.gz"""
+        import gzip  # só o arquivamento mensal precisa; fora do import do worker
+
+        destino = self.diretorio_arquivo / tabela
+        destino.mkdir(parents=True, exist_ok=True)
+        caminho = destino / f"{nome}.csv.gz"
+        temporario = caminho.with_name(f"{caminho.name}.{os.getpid()}.tmp")
+        with gzip.open(temporario, 'wt', encoding='utf-8', newline='') as arquivo:
+            cursor.copy_expert(
+                f"COPY (SELECT * FROM {nome} ORDER BY {coluna}) TO STDOUT WITH (FORMAT csv, HEADER)",
+                arquivo
+            )
+        os.replace(temporario, caminho)
+        return caminho
+
+    # --------------------------------------------
+    # Ciclo e agendador
+    # --------------------------------------------
+
+    def executar_ciclo(self, retencao: bool = True) -> Dict[str, Optional[Dict[str, List[str]]]]:
+        """Cria partições e, se pedido, aplica a retenção"""
+        legadas = self.tabelas_legadas()
+        if legadas:
+            print(f"ERRO: {self.instrucoes_migracao(legadas)}")
+            return {'legadas': legadas}
+        resultado = {'criadas': self.criar_particoes()}
+        if retencao:
+            resultado['arquivadas'] = self.aplicar_retencao()
+        return resultado
+
+    def _executar_agendador(self) -> None:
+        # Primeiro ciclo imediato: partições do mês devem existir logo após o deploy
+        while True:
+            try:
+                self.executar_ciclo()
+            except Exception as e:
+                print(f"Erro na manutenção das partições de logs: {e}")
+            if self._parar.wait(self.intervalo):
+                return
+
+    def garantir_iniciado(self) -> None:
+        """Inicia a thread de manutenção uma vez por processo (seguro após fork)"""
+        if not self.ativo:
+            return
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._parar.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._executar_agendador,
+                                            name='manutencao-particoes', daemon=True)
+            self._thread.start()
+
+    def parar(self) -> None:
+        """Sinaliza o encerramento da thread de manutenção"""
+        self._parar.set()
+
+
+# ============================================
+# INSTÂNCIA COMPARTILHADA
+# ============================================
+gerenciador_particoes = GerenciadorParticoes()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Mantém as partições mensais dos logs')
+    parser.add_argument('--sem-retencao', action='store_true', help='Apenas cria partições')
+    parser.add_argument('--migrar', action='store_true',
+                        help='Converte logs_alteracoes/logs_acesso não particionadas (aplicação parada)')
+    args = parser.parse_args()
+    if args.migrar:
+        print(json.dumps({'migradas': gerenciador_particoes.migrar_legadas()}, indent=2))
+    else:
+        print(json.dumps(gerenciador_particoes.executar_ciclo(retencao=not args.sem_retencao), indent=2))
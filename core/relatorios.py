@@ -0,0 +1,509 @@
+"""
+============================================
+CORE - RELATÓRIOS (ROLLUPS DE VENDAS E ESTOQUE)
+============================================
+Mantém as estruturas lidas pelos dashboards de /relatorios, para que
+nenhuma tela de relatório consulte pedidos/itens_pedido diretamente:
+
+- resumo_vendas_diario: vendas por dia, escola, fornecedor, produto,
+  tamanho e status (quantidade e receita)
+- mv_estoque_produtos: visão materializada de estoque com vendas de 30 dias
+
+Atualização incremental por deltas:
+- Cada mudança de status de pedido ou de item grava, na mesma transação,
+  deltas em resumo_vendas_deltas (DeltasVendas): -itens no status de
+  origem, +itens no status de destino
+- Cada delta tem uma chave de idempotência (evento, pedido, versão do
+  pedido antes da mudança); reenviar o mesmo evento não duplica valores
+- Fornecedor e tamanho de cada item são copiados do produto para
+  itens_pedido quando o pedido sai do carrinho: deltas e recálculo usam
+  essa cópia, então editar o produto depois não desloca vendas já
+  registradas entre linhas do rollup
+- O compactador soma os deltas pendentes no rollup e os marca como
+  compactados na mesma transação (nenhum delta é aplicado duas vezes)
+- Deltas compactados são mantidos por RELATORIOS_RETENCAO_DELTAS_HORAS
+  para que replays dentro desse prazo continuem sendo ignorados
+
+Recálculo completo (primeira execução, --completo ou --verificar --corrigir)
+reconstrói o rollup a partir de pedidos/itens_pedido. O agendador executa
+o primeiro ciclo assim que inicia, sem esperar RELATORIOS_INTERVALO_SEGUNDOS. A visão de estoque é
+atualizada com REFRESH ... CONCURRENTLY e um advisory lock garante que
+apenas um worker atualize por vez.
+
+Uso manual:
+    python -m core.relatorios                        # compacta deltas
+    python -m core.relatorios --completo             # recálculo completo
+    python -m core.relatorios --verificar [--corrigir]
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from core.database import Database
+from config import (RELATORIOS_ATUALIZACAO_AUTOMATICA, RELATORIOS_INTERVALO_SEGUNDOS,
+                    RELATORIOS_INTERVALO_COMPLETO_SEGUNDOS, RELATORIOS_LOTE_COMPACTACAO,
+                    RELATORIOS_RETENCAO_DELTAS_HORAS)
+
+
+# Status de pedido que contam como venda (GMV)
+STATUS_VENDA = ('pago', 'enviado', 'entregue')
+
+# Dimensões do rollup (chave primária de resumo_vendas_diario)
+_DIMENSOES = 'dia, escola_id, fornecedor_id, produto_id, tamanho, status'
+
+# Fornecedor e tamanho do item no momento da venda (produto atual só para
+# itens ainda sem a cópia)
+_FORNECEDOR_ITEM = "COALESCE(i.fornecedor_id, pr.fornecedor_id)"
+_TAMANHO_ITEM = "COALESCE(i.tamanho, pr.tamanho, '')"
+
+# Agregação de itens de pedido no formato de resumo_vendas_diario
+_SELECT_AGREGACAO = f"""
+    SELECT p.data_pedido::date AS dia,
+           COALESCE(p.escola_id, 0) AS escola_id,
+           {_FORNECEDOR_ITEM} AS fornecedor_id,
+           i.produto_id,
+           {_TAMANHO_ITEM} AS tamanho,
+           p.status,
+           SUM(i.quantidade) AS quantidade,
+           SUM(i.subtotal) AS receita
+    FROM itens_pedido i
+    JOIN pedidos p ON p.id = i.pedido_id
+    JOIN produtos pr ON pr.id = i.produto_id
+    WHERE p.status <> 'carrinho'
+    GROUP BY 1, 2, 3, 4, 5, 6
+"""
+
+
+# ============================================
+# EMISSÃO DE DELTAS
+# ============================================
+
+class DeltasVendas:
+    """
+    Grava em resumo_vendas_deltas o efeito de uma mudança de pedido no rollup.
+
+    Todos os métodos recebem o cursor da transação que altera o pedido,
+    para que o delta seja gravado (ou descartado) junto com a mudança.
+    """
+
+    _INSERT = """
+        INSERT INTO resumo_vendas_deltas
+            (chave, dia, escola_id, fornecedor_id, produto_id, tamanho, status,
+             quantidade, receita, pedido_id, status_origem, status_destino)
+    """
+    _CONFLITO = f" ON CONFLICT (chave, {_DIMENSOES}) DO NOTHING"
+
+    @staticmethod
+    def chave(evento: str, pedido_id: int, versao: Any, detalhe: str) -> str:
+        """Chave de idempotência: o mesmo evento sobre a mesma versão do pedido"""
+        versao_texto = versao.isoformat() if hasattr(versao, 'isoformat') else str(versao or '-')
+        return f"{evento}:{pedido_id}:{versao_texto}:{detalhe}"
+
+    @staticmethod
+    def transicao(cursor, pedido_id: int, status_para: Optional[str], evento: str) -> Optional[str]:
+        """
+        Trava o pedido e registra a troca do status atual para status_para.
+
+        Deve ser chamado antes do UPDATE/DELETE do pedido (status_para=None
+        para exclusão). Retorna o status anterior (None se o pedido não existe).
+        """
+        cursor.execute("SELECT status, data_atualizacao FROM pedidos WHERE id = %s FOR UPDATE", (pedido_id,))
+        pedido = cursor.fetchone()
+        if not pedido:
+            return None
+        DeltasVendas.transicoes(cursor, [{'id': pedido_id, 'valor_antigo': pedido['status'],
+                                          'versao_antiga': pedido['data_atualizacao']}],
+                                status_para, evento)
+        return pedido['status']
+
+    @staticmethod
+    def fixar_dimensoes(cursor, pedido_ids: List[int]) -> int:
+        """Copia fornecedor e tamanho do produto para os itens que ainda não os têm"""
+        cursor.execute("""
+            UPDATE itens_pedido i
+            SET fornecedor_id = pr.fornecedor_id, tamanho = COALESCE(pr.tamanho, '')
+            FROM produtos pr
+            WHERE pr.id = i.produto_id AND i.pedido_id = ANY(%s) AND i.fornecedor_id IS NULL
+        """, (list(pedido_ids),))
+        return cursor.rowcount
+
+    @staticmethod
+    def transicoes(cursor, alteracoes: List[Dict], status_para: Optional[str], evento: str) -> int:
+        """
+        Registra várias trocas de status em um único INSERT.
+
+        Itens de pedidos que saem do carrinho recebem antes a cópia de
+        fornecedor e tamanho (fixar_dimensoes).
+
+        Parâmetros:
+            alteracoes: dicts com 'id', 'valor_antigo' (status de origem) e
+                        'versao_antiga' (data_atualizacao antes da mudança),
+                        no formato devolvido por CRUDService.atualizar_em_lote
+            status_para: Status de destino (None = pedido apagado)
+            evento: Origem da mudança (ex.: 'finalizar', 'editar', 'lote')
+
+        Retorna:
+            int: Quantidade de deltas gravados
+        """
+        alteracoes = [a for a in alteracoes if a['valor_antigo'] != status_para]
+        if not alteracoes:
+            return 0
+        if status_para is not None:
+            DeltasVendas.fixar_dimensoes(cursor, [a['id'] for a in alteracoes if a['valor_antigo'] == 'carrinho'])
+        cursor.execute(DeltasVendas._INSERT + f"""
+            SELECT a.chave, p.data_pedido::date, COALESCE(p.escola_id, 0), {_FORNECEDOR_ITEM},
+                   i.produto_id, {_TAMANHO_ITEM}, s.status,
+                   s.sinal * SUM(i.quantidade), s.sinal * SUM(i.subtotal),
+                   p.id, a.status_de, %s
+            FROM unnest(%s::int[], %s::varchar[], %s::varchar[]) AS a(pedido_id, status_de, chave)
+            JOIN pedidos p ON p.id = a.pedido_id
+            JOIN itens_pedido i ON i.pedido_id = p.id
+            JOIN produtos pr ON pr.id = i.produto_id
+            CROSS JOIN LATERAL (VALUES (a.status_de, -1), (%s::varchar, 1)) AS s(status, sinal)
+            WHERE s.status IS NOT NULL AND s.status <> 'carrinho'
+            GROUP BY a.chave, a.status_de, p.id, p.data_pedido, p.escola_id, {_FORNECEDOR_ITEM},
+                     i.produto_id, {_TAMANHO_ITEM}, s.status, s.sinal
+        """ + DeltasVendas._CONFLITO, (
+            status_para,
+            [a['id'] for a in alteracoes],
+            [a['valor_antigo'] for a in alteracoes],
+            [DeltasVendas.chave(evento, a['id'], a.get('versao_antiga'), f"{a['valor_antigo']}>{status_para}")
+             for a in alteracoes],
+            status_para
+        ))
+        return cursor.rowcount
+
+    @staticmethod
+    def item(cursor, item_id: int, quantidade: int, subtotal: float, evento: str) -> int:
+        """
+        Trava item e pedido e registra a mudança do item para quantidade/subtotal.
+
+        Deve ser chamado antes do UPDATE/DELETE do item (0/0 para remoção).
+        Itens de carrinho não entram no rollup e não geram delta.
+        """
+        cursor.execute("""
+            SELECT i.pedido_id, i.produto_id, i.quantidade, i.subtotal,
+                   p.status, p.data_atualizacao
+            FROM itens_pedido i
+            JOIN pedidos p ON p.id = i.pedido_id
+            WHERE i.id = %s
+            FOR UPDATE
+        """, (item_id,))
+        atual = cursor.fetchone()
+        if not atual or atual['status'] in (None, 'carrinho'):
+            return 0
+        delta_quantidade = int(quantidade) - int(atual['quantidade'])
+        delta_receita = round(float(subtotal) - float(atual['subtotal']), 2)
+        if not delta_quantidade and not delta_receita:
+            return 0
+        cursor.execute(DeltasVendas._INSERT + f"""
+            SELECT %s, p.data_pedido::date, COALESCE(p.escola_id, 0), {_FORNECEDOR_ITEM},
+                   pr.id, {_TAMANHO_ITEM}, p.status, %s, %s, p.id, p.status, p.status
+            FROM itens_pedido i
+            JOIN pedidos p ON p.id = i.pedido_id
+            JOIN produtos pr ON pr.id = i.produto_id
+            WHERE i.id = %s
+        """ + DeltasVendas._CONFLITO, (
+            DeltasVendas.chave(evento, atual['pedido_id'], atual['data_atualizacao'],
+                               f"item{item_id}:{atual['quantidade']}>{quantidade}"),
+            delta_quantidade, delta_receita, item_id
+        ))
+        return cursor.rowcount
+
+
+# ============================================
+# COMPACTAÇÃO, RECÁLCULO E VERIFICAÇÃO
+# ============================================
+
+class AtualizadorRelatorios:
+    """
+    Atualiza os rollups de vendas e a visão de estoque.
+
+    Pode ser acionado manualmente (CLI, rota de administrador) ou pelo
+    agendador em thread iniciado em cada worker; o advisory lock faz com
+    que só um deles trabalhe em cada ciclo.
+    """
+
+    NOME = 'resumo_vendas_diario'
+
+    def __init__(self, intervalo: int = RELATORIOS_INTERVALO_SEGUNDOS,
+                 intervalo_completo: int = RELATORIOS_INTERVALO_COMPLETO_SEGUNDOS,
+                 lote: int = RELATORIOS_LOTE_COMPACTACAO,
+                 retencao_horas: int = RELATORIOS_RETENCAO_DELTAS_HORAS,
+                 ativo: bool = RELATORIOS_ATUALIZACAO_AUTOMATICA):
+        self.intervalo = intervalo
+        self.intervalo_completo = intervalo_completo
+        self.lote = lote
+        self.retencao_horas = retencao_horas
+        self.ativo = ativo
+        self._thread = None
+        self._pid = None
+        self._parar = threading.Event()
+        self._lock = threading.Lock()
+
+    # --------------------------------------------
+    # Rollup de vendas
+    # --------------------------------------------
+
+    def _obter_lock(self, cursor) -> bool:
+        cursor.execute("SELECT pg_try_advisory_xact_lock(hashtext(%s)) AS obtido", (self.NOME,))
+        return cursor.fetchone()['obtido']
+
+    def _registrar_execucao(self, cursor, completo: bool, deltas: int, inicio: float) -> int:
+        duracao_ms = int((time.perf_counter() - inicio) * 1000)
+        cursor.execute("""
+            INSERT INTO relatorios_controle (nome, ultima_execucao, ultima_completa, duracao_ms, deltas_aplicados)
+            VALUES (%s, LOCALTIMESTAMP, CASE WHEN %s THEN LOCALTIMESTAMP END, %s, %s)
+            ON CONFLICT (nome) DO UPDATE SET
+                ultima_execucao = EXCLUDED.ultima_execucao,
+                ultima_completa = COALESCE(EXCLUDED.ultima_completa, relatorios_controle.ultima_completa),
+                duracao_ms = EXCLUDED.duracao_ms,
+                deltas_aplicados = EXCLUDED.deltas_aplicados
+        """, (self.NOME, completo, duracao_ms, deltas))
+        return duracao_ms
+
+    def compactar(self) -> Optional[Dict[str, Any]]:
+        """
+        Soma os deltas pendentes no rollup, em lotes de `lote` deltas.
+
+        Cada lote marca seus deltas como compactados e faz o upsert no
+        rollup no mesmo statement; linhas que zeram são removidas.
+
+        Retorna:
+            dict: {'executado', 'completo', 'deltas', 'duracao_ms'} ou None em erro.
+                  'executado' é False se outro worker já está atualizando.
+        """
+        inicio = time.perf_counter()
+
+        def aplicar(cursor):
+            if not self._obter_lock(cursor):
+                return {'executado': False}
+            total = 0
+            while True:
+                cursor.execute(f"""
+                    WITH lote AS (
+                        SELECT id FROM resumo_vendas_deltas
+                        WHERE compactado_em IS NULL
+                        ORDER BY id LIMIT %s
+                        FOR UPDATE SKIP LOCKED
+                    ), aplicados AS (
+                        UPDATE resumo_vendas_deltas d SET compactado_em = CURRENT_TIMESTAMP
+                        FROM lote WHERE d.id = lote.id
+                        RETURNING d.dia, d.escola_id, d.fornecedor_id, d.produto_id,
+                                  d.tamanho, d.status, d.quantidade, d.receita
+                    ), somados AS (
+                        INSERT INTO resumo_vendas_diario ({_DIMENSOES}, quantidade, receita)
+                        SELECT {_DIMENSOES}, SUM(quantidade), SUM(receita)
+                        FROM aplicados
+                        GROUP BY 1, 2, 3, 4, 5, 6
+                        ON CONFLICT ({_DIMENSOES}) DO UPDATE SET
+                            quantidade = resumo_vendas_diario.quantidade + EXCLUDED.quantidade,
+                            receita = resumo_vendas_diario.receita + EXCLUDED.receita
+                    )
+                    SELECT COUNT(*) AS deltas, array_agg(DISTINCT dia) AS dias FROM aplicados
+                """, (self.lote,))
+                resultado = cursor.fetchone()
+                if not resultado['deltas']:
+                    break
+                total += resultado['deltas']
+                cursor.execute(
+                    "DELETE FROM resumo_vendas_diario WHERE dia = ANY(%s) AND quantidade = 0 AND receita = 0",
+                    (resultado['dias'],)
+                )
+                if resultado['deltas'] < self.lote:
+                    break
+            duracao_ms = self._registrar_execucao(cursor, False, total, inicio)
+            return {'executado': True, 'completo': False, 'deltas': total, 'duracao_ms': duracao_ms}
+
+        return Database.transaction(aplicar)
+
+    def recalcular_completo(self) -> Optional[Dict[str, Any]]:
+        """
+        Reconstrói o rollup a partir de pedidos/itens_pedido.
+
+        A tabela de deltas é travada contra novas escritas durante o
+        recálculo: deltas já commitados estão refletidos na agregação e são
+        marcados como compactados; mudanças em andamento aguardam e gravam
+        seus deltas sobre o resultado novo.
+        """
+        inicio = time.perf_counter()
+
+        def aplicar(cursor):
+            if not self._obter_lock(cursor):
+                return {'executado': False}
+            cursor.execute("LOCK TABLE resumo_vendas_deltas IN EXCLUSIVE MODE")
+            cursor.execute("DELETE FROM resumo_vendas_diario")
+            cursor.execute(f"INSERT INTO resumo_vendas_diario ({_DIMENSOES}, quantidade, receita) "
+                           + _SELECT_AGREGACAO)
+            cursor.execute("UPDATE resumo_vendas_deltas SET compactado_em = CURRENT_TIMESTAMP "
+                           "WHERE compactado_em IS NULL")
+            descartados = cursor.rowcount
+            duracao_ms = self._registrar_execucao(cursor, True, descartados, inicio)
+            return {'executado': True, 'completo': True, 'deltas': descartados, 'duracao_ms': duracao_ms}
+
+        return Database.transaction(aplicar)
+
+    def atualizar_vendas(self, completo: bool = False) -> Optional[Dict[str, Any]]:
+        """Compacta os deltas pendentes ou, se completo=True, recalcula todo o rollup"""
+        return self.recalcular_completo() if completo else self.compactar()
+
+    def expurgar_deltas(self) -> Optional[int]:
+        """Remove deltas compactados fora da janela de idempotência"""
+        return Database.executar(
+            "DELETE FROM resumo_vendas_deltas WHERE compactado_em < LOCALTIMESTAMP - make_interval(hours => %s)",
+            (self.retencao_horas,), commit=True
+        )
+
+    def verificar(self, limite: int = 100) -> Optional[Dict[str, Any]]:
+        """
+        Compara rollup + deltas pendentes com um recálculo completo.
+
+        Executa em snapshot único (REPEATABLE READ, somente leitura) e não
+        altera nada. Retorna {'divergencias': n, 'linhas': [...até limite]}
+        ou None em erro.
+        """
+        def comparar(cursor):
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+            cursor.execute(f"""
+                WITH esperado AS ({_SELECT_AGREGACAO}),
+                atual AS (
+                    SELECT {_DIMENSOES}, SUM(quantidade) AS quantidade, SUM(receita) AS receita
+                    FROM (
+                        SELECT {_DIMENSOES}, quantidade, receita FROM resumo_vendas_diario
+                        UNION ALL
+                        SELECT {_DIMENSOES}, quantidade, receita FROM resumo_vendas_deltas
+                        WHERE compactado_em IS NULL
+                    ) t
+                    GROUP BY 1, 2, 3, 4, 5, 6
+                )
+                SELECT {_DIMENSOES},
+                       COALESCE(a.quantidade, 0) AS quantidade_rollup,
+                       COALESCE(e.quantidade, 0) AS quantidade_esperada,
+                       COALESCE(a.receita, 0) AS receita_rollup,
+                       COALESCE(e.receita, 0) AS receita_esperada,
+                       COUNT(*) OVER () AS total
+                FROM esperado e
+                FULL JOIN atual a USING ({_DIMENSOES})
+                WHERE COALESCE(a.quantidade, 0) <> COALESCE(e.quantidade, 0)
+                   OR COALESCE(a.receita, 0) <> COALESCE(e.receita, 0)
+                ORDER BY dia, escola_id, fornecedor_id, produto_id, tamanho, status
+                LIMIT %s
+            """, (limite,))
+            linhas = cursor.fetchall()
+            return {'divergencias': linhas[0]['total'] if linhas else 0,
+                    'linhas': [{k: v for k, v in linha.items() if k != 'total'} for linha in linhas]}
+
+        return Database.transaction(comparar)
+
+    # --------------------------------------------
+    # Visão materializada de estoque
+    # --------------------------------------------
+
+    def atualizar_estoque(self) -> bool:
+        """
+        Atualiza mv_estoque_produtos.
+
+        CONCURRENTLY exige a visão já populada e não roda dentro de bloco
+        de transação, por isso usa conexão própria em autocommit.
+        """
+        conexao = Database.conectar()
+        if not conexao:
+            return False
+        try:
+            conexao.autocommit = True
+            with conexao.cursor() as cursor:
+                cursor.execute("SELECT ispopulated FROM pg_matviews WHERE matviewname = 'mv_estoque_produtos'")
+                linha = cursor.fetchone()
+                concorrente = 'CONCURRENTLY ' if linha and linha[0] else ''
+                cursor.execute(f"REFRESH MATERIALIZED VIEW {concorrente}mv_estoque_produtos")
+            return True
+        except Exception as e:
+            print(f"Erro ao atualizar visão de estoque: {e}")
+            return False
+        finally:
+            conexao.close()
+
+    # --------------------------------------------
+    # Ciclo e agendador
+    # --------------------------------------------
+
+    def _completo_vencido(self) -> bool:
+        """
+        True se o rollup nunca foi construído ou, com intervalo_completo > 0,
+        se o último recálculo completo é mais antigo que o intervalo
+        """
+        linha = Database.executar(
+            "SELECT EXTRACT(EPOCH FROM (LOCALTIMESTAMP - ultima_completa)) AS idade "
+            "FROM relatorios_controle WHERE nome = %s", (self.NOME,), fetchone=True
+        )
+        if not linha or linha['idade'] is None:
+            return True
+        return self.intervalo_completo > 0 and linha['idade'] >= self.intervalo_completo
+
+    def executar_ciclo(self, completo: Optional[bool] = None) -> Optional[Dict[str, Any]]:
+        """Compacta os deltas (ou recalcula, quando vencido), expurga e atualiza o estoque"""
+        if completo is None:
+            completo = self._completo_vencido()
+        resultado = self.atualizar_vendas(completo=completo)
+        if resultado and resultado.get('executado'):
+            self.expurgar_deltas()
+            resultado['estoque'] = self.atualizar_estoque()
+        return resultado
+
+    def _executar_agendador(self) -> None:
+        # Primeiro ciclo ao iniciar (rollup vazio é recalculado na hora), depois a cada intervalo
+        while True:
+            try:
+                self.executar_ciclo()
+            except Exception as e:
+                print(f"Erro ao atualizar relatórios: {e}")
+            if self._parar.wait(self.intervalo):
+                return
+
+    def garantir_iniciado(self) -> None:
+        """Inicia a thread do agendador uma vez por processo (seguro após fork)"""
+        if not self.ativo:
+            return
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._parar.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._executar_agendador,
+                                            name='agendador-relatorios', daemon=True)
+            self._thread.start()
+
+    def parar(self) -> None:
+        """Sinaliza o encerramento do agendador"""
+        self._parar.set()
+
+
+# ============================================
+# INSTÂNCIA COMPARTILHADA
+# ============================================
+atualizador_relatorios = AtualizadorRelatorios()
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description='Atualiza rollups de vendas e a visão de estoque')
+    parser.add_argument('--completo', action='store_true', help='Recalcula todo o histórico')
+    parser.add_argument('--verificar', action='store_true',
+                        help='Compara o rollup com um recálculo completo (não altera nada)')
+    parser.add_argument('--corrigir', action='store_true',
+                        help='Com --verificar: recalcula o rollup se houver divergências')
+    args = parser.parse_args()
+
+    if args.verificar:
+        relatorio = atualizador_relatorios.verificar()
+        if relatorio and relatorio['divergencias'] and args.corrigir:
+            relatorio['correcao'] = atualizador_relatorios.executar_ciclo(completo=True)
+        print(json.dumps(relatorio, default=str, indent=2))
+        raise SystemExit(0 if relatorio and (not relatorio['divergencias'] or args.corrigir) else 1)
+
+    print(json.dumps(atualizador_relatorios.executar_ciclo(completo=args.completo), default=str))
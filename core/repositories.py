@@ -5,9 +5,14 @@ CORE - REPOSITORIES
 Camada de acesso a dados usando padrão Repository
 """
 
-from typing import Optional, List, Dict, Any
-from core.database import Database
 import json
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Tuple, Callable
+from core.database import Database
+from core.database_async import DatabaseAsync
+from core.cache import cache_referencias, ErroCarregamento
+from core.invalidacao import barramento_invalidacao
+from core.auditoria import Auditoria
 
 
 class BaseRepository:
@@ -32,6 +37,27 @@ class BaseRepository:
         """Exclui um registro"""
         return Database.excluir(self.tabela, id)
     
+    def buscar_por_ids(self, ids: List[int]) -> List[Dict]:
+        """Busca vários registros por ID (na ordem informada)"""
+        return Database.buscar_por_ids(self.tabela, ids)
+    
+    def inserir_muitos(self, registros: List[Dict[str, Any]], cursor=None) -> Optional[List[int]]:
+        """Insere vários registros em lote e retorna os IDs"""
+        return Database.inserir_muitos(self.tabela, registros, cursor=cursor)
+    
+    def atualizar_muitos(self, registros: List[Dict[str, Any]], cursor=None) -> Optional[int]:
+        """Atualiza vários registros em lote (cada dict contém 'id')"""
+        return Database.atualizar_muitos(self.tabela, registros, cursor=cursor)
+    
+    def excluir_muitos(self, ids: List[int], cursor=None) -> Optional[int]:
+        """Exclui vários registros em lote"""
+        return Database.excluir_muitos(self.tabela, ids, cursor=cursor)
+    
+    def upsert(self, registros: List[Dict[str, Any]], conflito: List[str],
+               atualizar: Optional[List[str]] = None, cursor=None) -> Optional[List[int]]:
+        """Insere ou atualiza vários registros conforme o alvo de conflito"""
+        return Database.upsert(self.tabela, registros, conflito, atualizar, cursor=cursor)
+    
     def listar(self, filtros: Optional[Dict] = None) -> List[Dict]:
         """Lista registros com filtros opcionais"""
         query = f"SELECT * FROM {self.tabela}"
@@ -146,6 +172,102 @@ class GestorEscolarRepository(BaseRepository):
         query = "DELETE FROM gestores_escolares WHERE escola_id = %s"
         resultado = Database.executar(query, (escola_id,), commit=True)
         return resultado is not None
+    
+    # Campos editáveis comparados na sincronização
+    CAMPOS_SINCRONIZADOS = ('nome', 'email', 'telefone', 'cpf', 'tipo_gestor')
+    
+    def _diferenca_gestores(self, atuais: List[Dict], enviados: List[Dict]) -> tuple:
+        """
+        Compara gestores enviados com os atuais pela chave estável.
+        
+        Chave: id (campo oculto do formulário); sem id, o CPF casa com um
+        gestor atual ainda não reivindicado. O restante vira inserção.
+        
+        Retorna:
+            tuple: (inserir, atualizar [(antigo, novo)], remover)
+        """
+        por_id = {g['id']: g for g in atuais}
+        por_cpf = {g['cpf']: g for g in atuais if g.get('cpf')}
+        reivindicados = set()
+        inserir, atualizar = [], []
+        
+        for enviado in enviados:
+            atual = None
+            try:
+                id_enviado = int(enviado.get('id') or 0)
+            except (TypeError, ValueError):
+                id_enviado = 0
+            if id_enviado in por_id and id_enviado not in reivindicados:
+                atual = por_id[id_enviado]
+            elif enviado.get('cpf') in por_cpf and por_cpf[enviado['cpf']]['id'] not in reivindicados:
+                atual = por_cpf[enviado['cpf']]
+            
+            if atual is None:
+                inserir.append(enviado)
+                continue
+            reivindicados.add(atual['id'])
+            if any((enviado.get(c) or None) != (atual.get(c) or None) for c in self.CAMPOS_SINCRONIZADOS):
+                atualizar.append((atual, enviado))
+        
+        remover = [g for g in atuais if g['id'] not in reivindicados]
+        return inserir, atualizar, remover
+    
+    def sincronizar_por_escola(self, escola_id: int, gestores: List[Dict],
+                               usuario_id: Optional[int] = None) -> Optional[Dict[str, int]]:
+        """
+        Sincroniza os gestores da escola com a lista enviada (diff, não recriação)
+        
+        Aplica inserções, atualizações e remoções com as operações em lote de
+        Database (execute_values) em uma única transação, preservando ids de gestores inalterados. Apenas
+        as mudanças reais são auditadas em logs_alteracoes.
+        
+        Parâmetros:
+            escola_id (int): Escola dona dos gestores
+            gestores (list): Dicts com CAMPOS_SINCRONIZADOS e 'id' opcional
+            usuario_id (int): Autor das alterações para auditoria (opcional)
+        
+        Retorna:
+            dict: {'inseridos', 'atualizados', 'removidos'} ou None em erro
+        """
+        campos = self.CAMPOS_SINCRONIZADOS
+        
+        def aplicar(cursor):
+            cursor.execute(
+                f"SELECT id, {', '.join(campos)} FROM gestores_escolares "
+                "WHERE escola_id = %s ORDER BY id FOR UPDATE",
+                (escola_id,)
+            )
+            inserir, atualizar, remover = self._diferenca_gestores(cursor.fetchall(), gestores)
+            logs = []
+            
+            if remover:
+                self.excluir_muitos([g['id'] for g in remover], cursor=cursor)
+                logs += [(g['id'], 'DELETE', dict(g), None, 'Exclusão de gestor escolar') for g in remover]
+            
+            if atualizar:
+                self.atualizar_muitos([dict({c: novo.get(c) for c in campos}, id=antigo['id'])
+                                       for antigo, novo in atualizar], cursor=cursor)
+                logs += [(antigo['id'], 'UPDATE', dict(antigo), {c: novo.get(c) for c in campos},
+                          'Atualização de gestor escolar') for antigo, novo in atualizar]
+            
+            if inserir:
+                novos_ids = self.inserir_muitos([dict({c: g.get(c) for c in campos}, escola_id=escola_id)
+                                                 for g in inserir], cursor=cursor)
+                logs += [(novo_id, 'INSERT', None, {c: g.get(c) for c in campos},
+                          'Cadastro de gestor escolar') for novo_id, g in zip(novos_ids, inserir)]
+            
+            if logs and usuario_id:
+                Auditoria.gravar([
+                    Auditoria.montar(usuario_id, self.tabela, registro_id, acao, antigos, novos, descricao)
+                    for registro_id, acao, antigos, novos, descricao in logs
+                ], cursor=cursor)
+            
+            return {'inseridos': len(inserir), 'atualizados': len(atualizar), 'removidos': len(remover)}
+        
+        resultado = Database.transaction(aplicar)
+        if resultado and any(resultado.values()):
+            Database.notificar_alteracao(self.tabela)
+        return resultado
 
 
 class FornecedorRepository(BaseRepository):
@@ -194,12 +316,10 @@ class ProdutoRepository(BaseRepository):
     def __init__(self):
         super().__init__('produtos')
     
-    def listar_vitrine(self, filtros: Dict) -> List[Dict]:
-        """Lista produtos para vitrine com filtros"""
-        query = """
-            SELECT p.*, f.razao_social as fornecedor_nome, 
-                   u.nome as fornecedor_usuario_nome,
-                   e.razao_social as escola_nome
+    @staticmethod
+    def origem_vitrine(filtros: Dict) -> tuple:
+        """FROM/WHERE e parâmetros da vitrine (compartilhado pela listagem e pela versão dos dados)"""
+        origem = """
             FROM produtos p
             JOIN fornecedores f ON p.fornecedor_id = f.id
             JOIN usuarios u ON f.usuario_id = u.id
@@ -209,19 +329,41 @@ class ProdutoRepository(BaseRepository):
         parametros = []
         
         if filtros.get('categoria'):
-            query += " AND p.categoria = %s"
+            origem += " AND p.categoria = %s"
             parametros.append(filtros['categoria'])
         
         if filtros.get('escola'):
-            query += " AND p.escola_id = %s"
+            origem += " AND p.escola_id = %s"
             parametros.append(filtros['escola'])
         
         if filtros.get('busca'):
-            query += " AND p.nome ILIKE %s"
+            origem += " AND p.nome ILIKE %s"
             parametros.append(f"%{filtros['busca']}%")
         
-        query += " ORDER BY p.data_cadastro DESC"
-        return Database.executar(query, tuple(parametros) if parametros else None, fetchall=True) or []
+        return origem, tuple(parametros) if parametros else None
+    
+    @staticmethod
+    def _montar_query_vitrine(filtros: Dict) -> tuple:
+        """Monta query e parâmetros da vitrine (compartilhado pelas versões sync e async)"""
+        origem, parametros = ProdutoRepository.origem_vitrine(filtros)
+        query = f"""
+            SELECT p.*, f.razao_social as fornecedor_nome, 
+                   u.nome as fornecedor_usuario_nome,
+                   e.razao_social as escola_nome
+            {origem}
+            ORDER BY p.data_cadastro DESC
+        """
+        return query, parametros
+    
+    def listar_vitrine(self, filtros: Dict) -> List[Dict]:
+        """Lista produtos para vitrine com filtros"""
+        query, parametros = self._montar_query_vitrine(filtros)
+        return Database.executar(query, parametros, fetchall=True) or []
+    
+    async def listar_vitrine_async(self, filtros: Dict) -> List[Dict]:
+        """Lista produtos para vitrine com filtros (pool assíncrono)"""
+        query, parametros = self._montar_query_vitrine(filtros)
+        return await DatabaseAsync.executar(query, parametros, fetchall=True) or []
 
 
 class PedidoRepository(BaseRepository):
@@ -262,3 +404,293 @@ class ResponsavelRepository(BaseRepository):
         """Busca responsável pelo ID do usuário"""
         query = "SELECT id FROM responsaveis WHERE usuario_id = %s"
         return Database.executar(query, (usuario_id,), fetchone=True)
+
+
+class RelatorioRepository(BaseRepository):
+    """
+    Repositório dos dashboards de relatórios.
+    Lê apenas resumo_vendas_diario e mv_estoque_produtos (core/relatorios.py),
+    nunca pedidos/itens_pedido diretamente.
+    """
+    
+    GRANULARIDADES = ('dia', 'semana', 'mes')
+    _DATE_TRUNC = {'dia': 'day', 'semana': 'week', 'mes': 'month'}
+    
+    def __init__(self):
+        super().__init__('resumo_vendas_diario')
+    
+    @staticmethod
+    def _filtro_vendas(filtros: Dict, alias: str = 'r') -> tuple:
+        """Monta WHERE do rollup por período, escola e fornecedor"""
+        condicoes = [f"{alias}.dia BETWEEN %s AND %s"]
+        parametros = [filtros['data_inicio'], filtros['data_fim']]
+        
+        if filtros.get('escola_id') is not None:
+            condicoes.append(f"{alias}.escola_id = %s")
+            parametros.append(filtros['escola_id'])
+        
+        if filtros.get('fornecedor_id') is not None:
+            condicoes.append(f"{alias}.fornecedor_id = %s")
+            parametros.append(filtros['fornecedor_id'])
+        
+        if filtros.get('status'):
+            condicoes.append(f"{alias}.status = ANY(%s)")
+            parametros.append(list(filtros['status']))
+        
+        return " AND ".join(condicoes), parametros
+    
+    def vendas_por_periodo(self, filtros: Dict) -> List[Dict]:
+        """Quantidade e receita agrupadas por dia, semana ou mês"""
+        unidade = self._DATE_TRUNC.get(filtros.get('granularidade'), 'day')
+        where, parametros = self._filtro_vendas(filtros)
+        query = f"""
+            SELECT date_trunc('{unidade}', r.dia)::date AS periodo,
+                   SUM(r.quantidade) AS quantidade, SUM(r.receita) AS receita
+            FROM resumo_vendas_diario r
+            WHERE {where}
+            GROUP BY 1 ORDER BY 1
+        """
+        return Database.executar(query, tuple(parametros), fetchall=True) or []
+    
+    def vendas_por_produto(self, filtros: Dict, limite: int = 20) -> List[Dict]:
+        """Produtos/tamanhos mais vendidos no período"""
+        where, parametros = self._filtro_vendas(filtros)
+        query = f"""
+            SELECT r.produto_id, m.nome, r.tamanho,
+                   SUM(r.quantidade) AS quantidade, SUM(r.receita) AS receita
+            FROM resumo_vendas_diario r
+            LEFT JOIN mv_estoque_produtos m ON m.produto_id = r.produto_id
+            WHERE {where}
+            GROUP BY r.produto_id, m.nome, r.tamanho
+            ORDER BY receita DESC LIMIT %s
+        """
+        return Database.executar(query, tuple(parametros + [limite]), fetchall=True) or []
+    
+    def gmv_por_escola(self, filtros: Dict) -> List[Dict]:
+        """GMV (vendas confirmadas) por escola no período"""
+        where, parametros = self._filtro_vendas(filtros)
+        query = f"""
+            SELECT r.escola_id, COALESCE(e.razao_social, 'Sem escola') AS escola_nome,
+                   SUM(r.quantidade) AS quantidade, SUM(r.receita) AS receita
+            FROM resumo_vendas_diario r
+            LEFT JOIN escolas e ON e.id = r.escola_id
+            WHERE {where}
+            GROUP BY r.escola_id, e.razao_social
+            ORDER BY receita DESC
+        """
+        return Database.executar(query, tuple(parametros), fetchall=True) or []
+    
+    def vendas_por_status(self, filtros: Dict) -> List[Dict]:
+        """Quantidade e receita por status de pedido no período"""
+        where, parametros = self._filtro_vendas(filtros)
+        query = f"""
+            SELECT r.status, SUM(r.quantidade) AS quantidade, SUM(r.receita) AS receita
+            FROM resumo_vendas_diario r
+            WHERE {where}
+            GROUP BY r.status ORDER BY receita DESC
+        """
+        return Database.executar(query, tuple(parametros), fetchall=True) or []
+    
+    def estoque(self, filtros: Dict, limite: int = 50) -> List[Dict]:
+        """Estoque atual e vendas de 30 dias (menor cobertura primeiro)"""
+        condicoes = ["m.ativo = TRUE"]
+        parametros = []
+        
+        if filtros.get('escola_id') is not None:
+            condicoes.append("m.escola_id = %s")
+            parametros.append(filtros['escola_id'])
+        
+        if filtros.get('fornecedor_id') is not None:
+            condicoes.append("m.fornecedor_id = %s")
+            parametros.append(filtros['fornecedor_id'])
+        
+        query = f"""
+            SELECT m.produto_id, m.nome, m.categoria, m.tamanho, m.estoque, m.vendidos_30d
+            FROM mv_estoque_produtos m
+            WHERE {' AND '.join(condicoes)}
+            ORDER BY m.estoque::numeric / GREATEST(m.vendidos_30d, 1), m.nome
+            LIMIT %s
+        """
+        return Database.executar(query, tuple(parametros + [limite]), fetchall=True) or []
+
+
+class LogAlteracaoRepository(BaseRepository):
+    """
+    Consultas das telas de auditoria (logs_alteracoes).
+    
+    Cada forma de consulta tem um índice em schema.sql (acao, pouco
+    seletiva, é filtrada sobre o índice dos demais filtros) e a ordenação
+    é sempre (data_alteracao DESC, id DESC): a página seguinte começa após
+    a última linha exibida (keyset), sem OFFSET, e o limite inferior de
+    data garante que só as partições do período sejam lidas.
+    """
+    
+    # Mesma expressão do índice idx_logs_busca (qualquer diferença impede o uso do índice)
+    DOCUMENTO_BUSCA = (
+        "to_tsvector('portuguese', coalesce(l.descricao, '') || ' ' || l.tabela || ' ' || "
+        "coalesce(jsonb_path_query_array(l.diff, '$[*].campo')::text, ''))"
+    )
+    
+    # Colunas exibidas: o diff pronto e, só para linhas ainda sem diff
+    # (anteriores ao backfill), os dados necessários para calculá-lo
+    COLUNAS = """
+        l.id, l.usuario_id, l.tabela, l.registro_id, l.acao, l.data_alteracao,
+        l.diff, l.descricao_segura,
+        CASE WHEN l.diff IS NULL THEN l.descricao END AS descricao,
+        CASE WHEN l.diff IS NULL THEN l.versao END AS versao,
+        CASE WHEN l.diff IS NULL THEN l.alteracoes END AS alteracoes,
+        CASE WHEN l.diff IS NULL THEN l.snapshot END AS snapshot,
+        CASE WHEN l.diff IS NULL THEN l.dados_antigos END AS dados_antigos,
+        CASE WHEN l.diff IS NULL THEN l.dados_novos END AS dados_novos
+    """
+    
+    def __init__(self):
+        super().__init__('logs_alteracoes')
+    
+    def _filtro_logs(self, filtros: Dict) -> tuple:
+        """Monta WHERE por período, ação, tabela, registro, autor, campo e texto"""
+        condicoes = ["l.data_alteracao >= %s"]
+        parametros = [filtros['desde']]
+        
+        if filtros.get('ate') is not None:
+            condicoes.append("l.data_alteracao < %s")
+            parametros.append(filtros['ate'])
+        
+        for campo in ('acao', 'tabela', 'registro_id', 'usuario_id'):
+            if filtros.get(campo) not in (None, ''):
+                condicoes.append(f"l.{campo} = %s")
+                parametros.append(filtros[campo])
+        
+        if filtros.get('campo'):
+            condicoes.append("l.diff @> %s::jsonb")
+            parametros.append(json.dumps([{'campo': filtros['campo']}]))
+        
+        if filtros.get('texto'):
+            condicoes.append(f"{self.DOCUMENTO_BUSCA} @@ websearch_to_tsquery('portuguese', %s)")
+            parametros.append(filtros['texto'])
+        
+        return " AND ".join(condicoes), parametros
+    
+    def buscar(self, filtros: Dict, limite: int = 50,
+               apos: Optional[Tuple[datetime, int]] = None) -> Optional[Tuple[List[Dict], Optional[Tuple[datetime, int]]]]:
+        """
+        Página de logs mais recentes primeiro
+        
+        Parâmetros:
+            filtros: 'desde' (obrigatório), 'ate', 'acao', 'tabela', 'registro_id',
+                     'usuario_id', 'campo' (nome de campo alterado) e 'texto'
+                     (busca em descrição, tabela e campos alterados)
+            limite: Linhas por página
+            apos: (data_alteracao, id) da última linha da página anterior
+        
+        Retorna:
+            tuple: (logs, chave da próxima página ou None), ou None em erro
+        """
+        where, parametros = self._filtro_logs(filtros)
+        if apos:
+            where += " AND (l.data_alteracao, l.id) < (%s, %s)"
+            parametros += list(apos)
+        query = f"""
+            SELECT {self.COLUNAS}, u.nome AS usuario_nome
+            FROM logs_alteracoes l
+            LEFT JOIN usuarios u ON l.usuario_id = u.id
+            WHERE {where}
+            ORDER BY l.data_alteracao DESC, l.id DESC
+            LIMIT %s
+        """
+        logs = Database.executar(query, tuple(parametros + [limite + 1]), fetchall=True)
+        if logs is None:
+            return None
+        proxima = None
+        if len(logs) > limite:
+            logs = logs[:limite]
+            proxima = (logs[-1]['data_alteracao'], logs[-1]['id'])
+        return logs, proxima
+
+
+# ============================================
+# REPOSITÓRIOS COM CACHE DE LEITURA
+# ============================================
+# Escolas, fornecedores e responsáveis mudam pouco e são consultados em quase
+# toda requisição (permissões, vitrine, detalhes de pedido). As variantes abaixo
+# envolvem os repositórios originais com o cache read-through de core.cache.
+
+_TABELAS_REFERENCIA = ['escolas', 'fornecedores', 'responsaveis', 'usuarios']
+
+cache_referencias.registrar_namespace('escolas', ['escolas', 'usuarios'])
+cache_referencias.registrar_namespace('fornecedores', ['fornecedores', 'usuarios'])
+cache_referencias.registrar_namespace('responsaveis', ['responsaveis', 'usuarios'])
+
+# Toda escrita feita por Database.inserir/atualizar/excluir invalida o cache local
+Database.registrar_ouvinte_alteracao(cache_referencias.invalidar_tabela)
+
+# Escritas feitas em outros workers chegam via LISTEN/NOTIFY
+barramento_invalidacao.registrar_invalidador(cache_referencias.invalidar_tabela,
+                                             _TABELAS_REFERENCIA,
+                                             limpeza=cache_referencias.limpar)
+
+
+def _carregador(consulta: Callable[[], Optional[Dict]]) -> Callable[[], Optional[Dict]]:
+    """
+    Adapta uma consulta do repositório ao cache: None com falha de banco na
+    thread vira ErroCarregamento (não é cacheado como ausência)
+    """
+    def carregar() -> Optional[Dict]:
+        falhas = Database.falhas_na_thread()
+        valor = consulta()
+        if valor is None and Database.falhas_na_thread() != falhas:
+            raise ErroCarregamento('falha de banco durante a leitura')
+        return valor
+    return carregar
+
+
+class EscolaRepositoryCache(EscolaRepository):
+    """Repositório de escolas com cache de leitura"""
+    
+    def buscar_por_id(self, id: int) -> Optional[Dict]:
+        """Busca escola por ID (cache)"""
+        return cache_referencias.obter('escolas', f'id:{id}',
+                                       _carregador(lambda: super(EscolaRepositoryCache, self).buscar_por_id(id)))
+    
+    def buscar_com_usuario(self, id: int) -> Optional[Dict]:
+        """Busca escola com dados do usuário (cache)"""
+        return cache_referencias.obter('escolas', f'com_usuario:{id}',
+                                       _carregador(lambda: super(EscolaRepositoryCache, self).buscar_com_usuario(id)))
+    
+    def buscar_por_usuario_id(self, usuario_id: int) -> Optional[Dict]:
+        """Busca escola pelo ID do usuário (cache)"""
+        return cache_referencias.obter('escolas', f'usuario:{usuario_id}',
+                                       _carregador(lambda: super(EscolaRepositoryCache, self).buscar_por_usuario_id(usuario_id)))
+
+
+class FornecedorRepositoryCache(FornecedorRepository):
+    """Repositório de fornecedores com cache de leitura"""
+    
+    def buscar_por_id(self, id: int) -> Optional[Dict]:
+        """Busca fornecedor por ID (cache)"""
+        return cache_referencias.obter('fornecedores', f'id:{id}',
+                                       _carregador(lambda: super(FornecedorRepositoryCache, self).buscar_por_id(id)))
+    
+    def buscar_com_usuario(self, id: int) -> Optional[Dict]:
+        """Busca fornecedor com dados do usuário (cache)"""
+        return cache_referencias.obter('fornecedores', f'com_usuario:{id}',
+                                       _carregador(lambda: super(FornecedorRepositoryCache, self).buscar_com_usuario(id)))
+    
+    def buscar_por_usuario_id(self, usuario_id: int) -> Optional[Dict]:
+        """Busca fornecedor pelo ID do usuário (cache)"""
+        return cache_referencias.obter('fornecedores', f'usuario:{usuario_id}',
+                                       _carregador(lambda: super(FornecedorRepositoryCache, self).buscar_por_usuario_id(usuario_id)))
+
+
+class ResponsavelRepositoryCache(ResponsavelRepository):
+    """Repositório de responsáveis com cache de leitura"""
+    
+    def buscar_por_id(self, id: int) -> Optional[Dict]:
+        """Busca responsável por ID (cache)"""
+        return cache_referencias.obter('responsaveis', f'id:{id}',
+                                       _carregador(lambda: super(ResponsavelRepositoryCache, self).buscar_por_id(id)))
+    
+    def buscar_por_usuario_id(self, usuario_id: int) -> Optional[Dict]:
+        """Busca responsável pelo ID do usuário (cache)"""
+        return cache_referencias.obter('responsaveis', f'usuario:{usuario_id}',
+                                       _carregador(lambda: super(ResponsavelRepositoryCache, self).buscar_por_usuario_id(usuario_id)))
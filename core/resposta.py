@@ -0,0 +1,274 @@
+"""
+============================================
+CORE - OTIMIZAÇÃO DE RESPOSTAS HTTP
+============================================
+Duas camadas independentes:
+
+Compressão (comprimir_resposta, ligada em app.after_request):
+- br (se o pacote Brotli estiver instalado) ou gzip, conforme Accept-Encoding;
+  com qualidades iguais no cabeçalho, br tem preferência
+- Apenas tipos textuais acima de COMPRESSAO_MIN_BYTES; arquivos de
+  send_file (estáticos) e respostas já codificadas passam direto
+- Respostas em streaming são comprimidas bloco a bloco (flush a cada
+  bloco, sem acumular a página em memória)
+
+GET condicional (decorator @condicional nas listagens e na vitrine):
+- A view informa uma função de versão que devolve {'total', 'atualizado_em'}
+  da consulta (COUNT(*) e maior data_atualizacao das tabelas exibidas)
+- ETag fraco = hash(URL, usuário da sessão, versão dos templates e dos
+  pacotes estáticos, versão dos dados); se o If-None-Match confere, responde 304 sem executar a view
+  (sem a consulta completa e sem renderizar o template)
+- Respostas marcadas como 'private, no-cache': o navegador sempre
+  revalida, e proxies compartilhados não guardam páginas por usuário
+- Requisições com mensagens flash pendentes não usam 304 (a mensagem
+  precisa ser consumida pela renderização)
+
+Uso:
+    @produtos_bp.route('/listar')
+    @condicional(lambda: versao_consulta("FROM produtos", ['data_atualizacao']))
+    def listar(): ...
+"""
+
+import hashlib
+import inspect
+import os
+import zlib
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Sequence, Tuple
+from flask import Response, current_app, make_response, request, session
+from core.database import Database
+from core.database_async import DatabaseAsync
+from core.services import AutenticacaoService
+from config import (BASE_DIR, COMPRESSAO_ATIVA, COMPRESSAO_MIN_BYTES, COMPRESSAO_NIVEL_GZIP,
+                    COMPRESSAO_QUALIDADE_BROTLI, RESPOSTA_CONDICIONAL_ATIVA)
+
+TIPOS_COMPRIMIVEIS = {
+    'text/html', 'text/css', 'text/plain', 'text/javascript', 'text/xml', 'text/csv',
+    'application/javascript', 'application/json', 'application/xml', 'image/svg+xml',
+}
+
+# Brotli é opcional: importado na primeira resposta comprimida
+_brotli = None
+_brotli_verificado = False
+
+
+def _modulo_brotli():
+    global _brotli, _brotli_verificado
+    if not _brotli_verificado:
+        try:
+            import brotli
+            _brotli = brotli
+        except ImportError:  # pragma: no cover - depende do ambiente
+            pass
+        _brotli_verificado = True
+    return _brotli
+
+
+# ============================================
+# COMPRESSÃO
+# ============================================
+
+class Compressor:
+    """Compressor incremental com a mesma interface para gzip e br"""
+
+    def __init__(self, codificacao: str):
+        self.codificacao = codificacao
+        if codificacao == 'br':
+            self._objeto = _modulo_brotli().Compressor(quality=COMPRESSAO_QUALIDADE_BROTLI)
+        else:
+            # wbits 31: cabeçalho e rodapé gzip
+            self._objeto = zlib.compressobj(COMPRESSAO_NIVEL_GZIP, zlib.DEFLATED, 31)
+
+    def comprimir(self, dados: bytes, descarregar: bool = False) -> bytes:
+        """Comprime um bloco; com descarregar=True o cliente já consegue decodificá-lo"""
+        if self.codificacao == 'br':
+            saida = self._objeto.process(dados)
+            return saida + self._objeto.flush() if descarregar else saida
+        saida = self._objeto.compress(dados)
+        return saida + self._objeto.flush(zlib.Z_SYNC_FLUSH) if descarregar else saida
+
+    def finalizar(self) -> bytes:
+        if self.codificacao == 'br':
+            return self._objeto.finish()
+        return self._objeto.flush()
+
+
+def escolher_codificacao(aceitas) -> Optional[str]:
+    """Melhor codificação suportada para o Accept-Encoding (None = sem compressão)"""
+    opcoes = ['br', 'gzip'] if _modulo_brotli() is not None else ['gzip']
+    qualidades = [(aceitas[opcao], -indice, opcao) for indice, opcao in enumerate(opcoes)]
+    qualidade, _, escolhida = max(qualidades)
+    return escolhida if qualidade > 0 else None
+
+
+def _comprimir_fluxo(corpo: Iterable[bytes], compressor: Compressor) -> Iterator[bytes]:
+    try:
+        for bloco in corpo:
+            if isinstance(bloco, str):
+                bloco = bloco.encode('utf-8')
+            if bloco:
+                yield compressor.comprimir(bloco, descarregar=True)
+        yield compressor.finalizar()
+    finally:
+        if hasattr(corpo, 'close'):
+            corpo.close()
+
+
+def comprimir_resposta(resposta: Response) -> Response:
+    """Comprime a resposta conforme o Accept-Encoding (hook after_request)"""
+    if not COMPRESSAO_ATIVA or request.method == 'HEAD':
+        return resposta
+    if resposta.status_code < 200 or resposta.status_code in (204, 206, 304):
+        return resposta
+    if resposta.direct_passthrough or 'Content-Encoding' in resposta.headers:
+        return resposta
+    if resposta.mimetype not in TIPOS_COMPRIMIVEIS or 'no-transform' in resposta.headers.get('Cache-Control', ''):
+        return resposta
+
+    # O conteúdo varia com o cabeçalho mesmo quando este cliente não aceita compressão
+    resposta.vary.add('Accept-Encoding')
+    codificacao = escolher_codificacao(request.accept_encodings)
+    if codificacao is None:
+        return resposta
+
+    compressor = Compressor(codificacao)
+    if resposta.is_streamed:
+        resposta.response = _comprimir_fluxo(resposta.response, compressor)
+        resposta.headers.pop('Content-Length', None)
+    else:
+        dados = resposta.get_data()
+        if len(dados) < COMPRESSAO_MIN_BYTES:
+            return resposta
+        comprimido = compressor.comprimir(dados) + compressor.finalizar()
+        if len(comprimido) >= len(dados):
+            return resposta
+        resposta.set_data(comprimido)
+
+    resposta.headers['Content-Encoding'] = codificacao
+    # Representações com codificações diferentes não podem dividir um ETag forte
+    etag, fraco = resposta.get_etag()
+    if etag and not fraco:
+        resposta.set_etag(etag, weak=True)
+    return resposta
+
+
+# ============================================
+# VERSÃO DOS DADOS
+# ============================================
+
+def _sql_versao(origem: str, colunas_atualizacao: Sequence[str]) -> str:
+    return (f"SELECT COUNT(*) AS total, MAX(GREATEST({', '.join(colunas_atualizacao)})) AS atualizado_em "
+            f"{origem}")
+
+
+def versao_consulta(origem: str, colunas_atualizacao: Sequence[str],
+                    parametros: Optional[Tuple] = None) -> Optional[Dict]:
+    """
+    Versão dos dados de uma listagem
+
+    Parâmetros:
+        origem (str): FROM/JOIN/WHERE da consulta da listagem (sem ORDER BY)
+        colunas_atualizacao (list): data_atualizacao de cada tabela exibida
+        parametros (tuple): Parâmetros do WHERE
+
+    Retorna:
+        dict ou None: {'total', 'atualizado_em'}; None em caso de erro (sem 304)
+    """
+    return Database.executar(_sql_versao(origem, colunas_atualizacao), parametros, fetchone=True)
+
+
+async def versao_consulta_async(origem: str, colunas_atualizacao: Sequence[str],
+                                parametros: Optional[Tuple] = None) -> Optional[Dict]:
+    """versao_consulta pelo pool assíncrono (views async)"""
+    return await DatabaseAsync.executar(_sql_versao(origem, colunas_atualizacao), parametros, fetchone=True)
+
+
+def _versao_templates() -> str:
+    """Maior mtime em templates/: um deploy com templates novos muda todos os ETags"""
+    maior = 0.0
+    for raiz, _, arquivos in os.walk(BASE_DIR / 'templates'):
+        for arquivo in arquivos:
+            maior = max(maior, os.path.getmtime(os.path.join(raiz, arquivo)))
+    return f"{maior:.0f}"
+
+
+VERSAO_TEMPLATES = _versao_templates()
+
+
+# ============================================
+# GET CONDICIONAL
+# ============================================
+
+def _aplicavel() -> bool:
+    return (RESPOSTA_CONDICIONAL_ATIVA and request.method in ('GET', 'HEAD')
+            and not session.get('_flashes'))
+
+
+def _etag(versao: Dict) -> str:
+    usuario = AutenticacaoService.verificar_sessao()
+    # Páginas referenciam os pacotes estáticos pelo hash: um build novo muda o ETag
+    ativos = current_app.extensions.get('ativos')
+    identidade = (request.full_path, usuario and tuple(sorted(usuario.items())), VERSAO_TEMPLATES,
+                  ativos and ativos.versao, versao.get('total'), str(versao.get('atualizado_em')))
+    return hashlib.sha1(repr(identidade).encode('utf-8')).hexdigest()[:24]
+
+
+def _nao_modificado(etag: str, versao: Dict) -> Optional[Response]:
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    resposta = Response(status=304)
+    return _marcar(resposta, etag, versao)
+
+
+def _marcar(resposta: Response, etag: str, versao: Dict) -> Response:
+    if resposta.status_code not in (200, 304):
+        return resposta
+    resposta.set_etag(etag, weak=True)
+    if versao.get('atualizado_em') is not None:
+        resposta.last_modified = versao['atualizado_em']
+    resposta.headers['Cache-Control'] = 'private, no-cache'
+    resposta.vary.add('Cookie')
+    return resposta
+
+
+def condicional(versao: Callable[..., Any]):
+    """
+    Decorator de GET condicional para views de listagem
+
+    Parâmetros:
+        versao (callable): Recebe os argumentos da view e devolve a versão
+            dos dados (dict de versao_consulta), ou None para não usar 304
+            (ex.: usuário sem acesso). Pode ser async em views async.
+    """
+    def decorador(view):
+        if inspect.iscoroutinefunction(view):
+            @wraps(view)
+            async def envoltorio_async(*args, **kwargs):
+                if not _aplicavel():
+                    return await view(*args, **kwargs)
+                dados = versao(*args, **kwargs)
+                if inspect.isawaitable(dados):
+                    dados = await dados
+                if not dados:
+                    return await view(*args, **kwargs)
+                etag = _etag(dados)
+                resposta = _nao_modificado(etag, dados)
+                if resposta is None:
+                    resposta = _marcar(make_response(await view(*args, **kwargs)), etag, dados)
+                return resposta
+            return envoltorio_async
+
+        @wraps(view)
+        def envoltorio(*args, **kwargs):
+            if not _aplicavel():
+                return view(*args, **kwargs)
+            dados = versao(*args, **kwargs)
+            if not dados:
+                return view(*args, **kwargs)
+            etag = _etag(dados)
+            resposta = _nao_modificado(etag, dados)
+            if resposta is None:
+                resposta = _marcar(make_response(view(*args, **kwargs)), etag, dados)
+            return resposta
+        return envoltorio
+    return decorador
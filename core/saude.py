@@ -0,0 +1,189 @@
+"""
+============================================
+CORE - HEALTHCHECK DO BANCO (VERIFICAÇÃO EM SEGUNDO PLANO)
+============================================
+Uma thread por worker verifica o PostgreSQL a cada SAUDE_INTERVALO_SEGUNDOS
+com um SELECT 1 em uma conexão própria e persistente. As rotas /health/*,
+a rota raiz e a tela de carregamento apenas leem o último estado, então
+nenhuma requisição abre conexão só para saber se o banco está no ar.
+
+Estados do banco:
+- 'iniciando': nenhuma verificação concluída ainda
+- 'ok': respondeu abaixo de SAUDE_LATENCIA_DEGRADADA_MS
+- 'degradado': respondeu, mas acima do limite de latência
+- 'indisponivel': falhou; as novas tentativas seguem backoff exponencial
+  (com jitter) até SAUDE_BACKOFF_MAXIMO_SEGUNDOS, para não alimentar uma
+  tempestade de conexões durante a instabilidade
+
+Liveness: o processo responde (não depende do banco).
+Readiness: banco 'ok' ou 'degradado' com verificação recente.
+"""
+
+import os
+import random
+import threading
+import time
+from typing import Dict
+from core.database import Database
+from config import (SAUDE_INTERVALO_SEGUNDOS, SAUDE_BACKOFF_MAXIMO_SEGUNDOS,
+                    SAUDE_LATENCIA_DEGRADADA_MS, SAUDE_TIMEOUT_CONSULTA_MS)
+
+
+class MonitorSaude:
+    """Estado de saúde do banco, atualizado por uma thread de verificação"""
+
+    def __init__(self, intervalo: float = SAUDE_INTERVALO_SEGUNDOS,
+                 backoff_maximo: float = SAUDE_BACKOFF_MAXIMO_SEGUNDOS,
+                 latencia_degradada_ms: float = SAUDE_LATENCIA_DEGRADADA_MS,
+                 timeout_consulta_ms: int = SAUDE_TIMEOUT_CONSULTA_MS):
+        self.intervalo = intervalo
+        self.backoff_maximo = backoff_maximo
+        self.latencia_degradada_ms = latencia_degradada_ms
+        self.timeout_consulta_ms = timeout_consulta_ms
+        self._conexao = None
+        self._estado = {
+            'status': 'iniciando',
+            'latencia_ms': None,
+            'verificado_em': None,
+            'ultimo_sucesso_em': None,
+            'falhas_consecutivas': 0,
+            'proxima_verificacao_em': None,
+            'erro': None,
+        }
+        self._iniciado_em = time.time()
+        self._thread = None
+        self._pid = None
+        self._parar = threading.Event()
+        self._lock = threading.Lock()
+        self._lock_verificacao = threading.Lock()
+
+    # --------------------------------------------
+    # Verificação
+    # --------------------------------------------
+
+    def _consultar(self) -> float:
+        """Executa SELECT 1 na conexão de verificação; retorna a latência em ms"""
+        if self._conexao is None or self._conexao.closed:
+            self._conexao = Database.conectar()
+            if self._conexao is None:
+                raise ConnectionError('conexão recusada')
+            self._conexao.autocommit = True
+            with self._conexao.cursor() as cursor:
+                cursor.execute(f"SET statement_timeout = {int(self.timeout_consulta_ms)}")
+        inicio = time.perf_counter()
+        with self._conexao.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+        return (time.perf_counter() - inicio) * 1000
+
+    def _fechar_conexao(self) -> None:
+        if self._conexao is not None:
+            try:
+                self._conexao.close()
+            except Exception:
+                pass
+        self._conexao = None
+
+    def verificar(self) -> Dict:
+        """Executa uma verificação agora e atualiza o estado"""
+        with self._lock_verificacao:
+            agora = time.time()
+            try:
+                latencia = self._consultar()
+                status = 'degradado' if latencia > self.latencia_degradada_ms else 'ok'
+                novo = {'status': status, 'latencia_ms': round(latencia, 2), 'ultimo_sucesso_em': agora,
+                        'falhas_consecutivas': 0, 'erro': None}
+            except Exception as e:
+                self._fechar_conexao()
+                novo = {'status': 'indisponivel', 'latencia_ms': None,
+                        'falhas_consecutivas': self._estado['falhas_consecutivas'] + 1,
+                        'erro': str(e).strip().splitlines()[0] if str(e).strip() else type(e).__name__}
+            novo['verificado_em'] = agora
+            novo['proxima_verificacao_em'] = agora + self._espera(novo['falhas_consecutivas'])
+            self._estado = {**self._estado, **novo}
+            return dict(self._estado)
+
+    def _espera(self, falhas: int) -> float:
+        """Intervalo até a próxima verificação: fixo se saudável, exponencial com jitter se fora"""
+        if falhas == 0:
+            return self.intervalo
+        atraso = min(self.intervalo * (2 ** (falhas - 1)), self.backoff_maximo)
+        return atraso * random.uniform(0.8, 1.2)
+
+    # --------------------------------------------
+    # Leitura do estado (usada pelas rotas)
+    # --------------------------------------------
+
+    def estado(self) -> Dict:
+        """
+        Último estado conhecido, sem acessar o banco.
+
+        Só a primeira leitura do worker (antes de qualquer verificação)
+        espera uma verificação, para a rota raiz não exibir a tela de
+        carregamento à toa logo após o deploy.
+        """
+        if self._estado['verificado_em'] is None:
+            self.verificar()
+        estado = dict(self._estado)
+        agora = time.time()
+        estado['idade_segundos'] = round(agora - estado['verificado_em'], 2)
+        estado['verificador_ativo'] = self._thread is not None and self._thread.is_alive()
+        # Verificação atrasada demais (thread parada ou travada) não serve para readiness
+        limite = max(self.intervalo, self.backoff_maximo) * 3
+        estado['pronto'] = estado['status'] in ('ok', 'degradado') and estado['idade_segundos'] <= limite
+        return estado
+
+    def pronto(self) -> bool:
+        """Readiness: banco respondendo com verificação recente"""
+        return self.estado()['pronto']
+
+    def vivo(self) -> Dict:
+        """Liveness: apenas o processo (não depende do banco)"""
+        return {
+            'vivo': True,
+            'pid': os.getpid(),
+            'uptime_segundos': round(time.time() - self._iniciado_em, 2),
+            'verificador_ativo': self._thread is not None and self._thread.is_alive(),
+        }
+
+    # --------------------------------------------
+    # Thread de verificação
+    # --------------------------------------------
+
+    def _executar_verificador(self) -> None:
+        while True:
+            proxima = self._estado['proxima_verificacao_em'] or 0
+            if self._parar.wait(max(proxima - time.time(), 0)):
+                self._fechar_conexao()
+                return
+            try:
+                self.verificar()
+            except Exception as e:
+                print(f"Erro no verificador de saúde: {e}")
+                self._parar.wait(self.intervalo)
+
+    def garantir_iniciado(self) -> None:
+        """Inicia a thread de verificação uma vez por processo (seguro após fork)"""
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            if self._pid != os.getpid():
+                # Conexão herdada do processo pai não pode ser usada após o fork
+                self._conexao = None
+            self._parar.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._executar_verificador,
+                                            name='verificador-saude', daemon=True)
+            self._thread.start()
+
+    def parar(self) -> None:
+        """Sinaliza o encerramento da thread de verificação"""
+        self._parar.set()
+
+
+# ============================================
+# INSTÂNCIA COMPARTILHADA
+# ============================================
+monitor_saude = MonitorSaude()
@@ -5,18 +5,16 @@ CORE - SERVICES
 Camada de lógica de negócio (serviços)
 """
 
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Callable
 from flask import session, flash
 from core.database import Database
 from core.repositories import BaseRepository
-import json
+from core.dependencias import verificador_dependencias
+from core.auditoria import Auditoria, SQL_GRAVA_SNAPSHOT, SQL_PROXIMA_VERSAO
 import re
-import smtplib
 import random
 import string
 import hashlib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timedelta
 from decimal import Decimal
 from config import SMTP_CONFIG, CODIGO_ACESSO_TAMANHO
@@ -166,6 +164,9 @@ class LogService:
         """
         Registra uma alteração no sistema para auditoria (INSERT, UPDATE, DELETE)
         
+        Grava apenas os campos alterados (e, conforme a política de
+        snapshots, o estado completo) - ver core/auditoria.py.
+        
         Parâmetros:
             usuario_id (int): ID do usuário que fez a alteração
             tabela (str): Nome da tabela alterada
@@ -178,23 +179,26 @@ class LogService:
         Retorna:
             bool: True se registrado com sucesso
         """
-        # Converte dados para JSON se necessário
-        if dados_antigos and not isinstance(dados_antigos, str):
-            dados_antigos = json.dumps(dados_antigos, default=str)
-        if dados_novos and not isinstance(dados_novos, str):
-            dados_novos = json.dumps(dados_novos, default=str)
-        
-        query = """
-            INSERT INTO logs_alteracoes 
-            (usuario_id, tabela, registro_id, acao, dados_antigos, dados_novos, descricao)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        registro = Auditoria.montar(usuario_id, tabela, registro_id, acao,
+                                    dados_antigos, dados_novos, descricao)
+        resultado = Auditoria.gravar([registro])
+        return resultado is not None and resultado > 0
+    
+    @staticmethod
+    def reconstruir(tabela: str, registro_id: int, log_id: Optional[int] = None) -> Optional[Dict]:
         """
+        Reconstrói o estado de um registro a partir dos logs de auditoria
         
-        resultado = Database.executar(query, 
-                                     (usuario_id, tabela, registro_id, acao, 
-                                      dados_antigos, dados_novos, descricao),
-                                     commit=True)
-        return resultado is not None and resultado > 0
+        Parâmetros:
+            tabela (str): Tabela do registro
+            registro_id (int): ID do registro
+            log_id (int): Log de referência (None = estado após o último log)
+        
+        Retorna:
+            dict: Campos do registro naquela versão ou None se não houver histórico
+                  (ou se ele não tiver snapshot de partida)
+        """
+        return Auditoria.reconstruir(tabela, registro_id, log_id)
     
     @staticmethod
     def registrar_acesso(usuario_id: int, acao: str, 
@@ -297,31 +301,124 @@ class CRUDService:
         flash(f'Erro ao excluir {self.entidade_nome}.', 'danger')
         return False
     
-    def verificar_dependencias(self, id: int, checagens: List[Dict]) -> List[str]:
+    def atualizar_em_lote(self, ids: List[int], campo: str, valor: Any, usuario_id: int,
+                          condicao: Optional[str] = None, parametros_condicao: tuple = (),
+                          descricao: Optional[str] = None,
+                          apos_alterar: Optional[Callable[[Any, List[Dict]], Any]] = None) -> Optional[List[int]]:
+        """
+        Altera um campo de vários registros em um único statement (ação em lote)
+        
+        Um CTE trava as linhas cujo valor realmente muda, faz o UPDATE em
+        conjunto e grava em logs_alteracoes uma linha por registro com o
+        delta {campo: [antigo, novo]}, o diff de exibição (e o snapshot
+        quando a política de auditoria pede). Tudo em um único statement,
+        precedido do advisory lock dos registros (versões de auditoria).
+        
+        Parâmetros:
+            ids: IDs selecionados na listagem
+            campo: Coluna alterada (ex.: 'ativo', 'status')
+            valor: Novo valor
+            usuario_id: Autor da ação (auditoria)
+            condicao: Filtro SQL adicional sobre as linhas (ex.: regra de transição)
+            parametros_condicao: Parâmetros da condição
+            descricao: Texto do log
+            apos_alterar: Função (cursor, linhas) chamada na mesma transação com
+                          'id', 'valor_antigo' e 'versao_antiga' (data_atualizacao
+                          anterior) de cada registro alterado
+        
+        Retorna:
+            List[int]: IDs efetivamente alterados, ou None em erro
+        """
+        if not ids:
+            return []
+        tabela = self.repository.tabela
+        filtro = f" AND ({condicao})" if condicao else ""
+        query = f"""
+            WITH antigos AS (
+                SELECT id, {campo} AS valor_antigo, data_atualizacao AS versao_antiga
+                FROM {tabela}
+                WHERE id = ANY(%s) AND {campo} IS DISTINCT FROM %s{filtro}
+                FOR UPDATE
+            ), alterados AS (
+                UPDATE {tabela} AS t
+                SET {campo} = %s, data_atualizacao = CURRENT_TIMESTAMP
+                FROM antigos a
+                WHERE t.id = a.id
+                RETURNING t.id, a.valor_antigo, a.versao_antiga,
+                          t.{campo} AS valor_novo, to_jsonb(t) AS snapshot
+            ), auditoria AS (
+                INSERT INTO logs_alteracoes
+                    (usuario_id, tabela, registro_id, acao, alteracoes, snapshot, versao,
+                     diff, descricao, descricao_segura)
+                SELECT %s, %s, al.id, 'UPDATE',
+                       jsonb_build_object(%s::text, jsonb_build_array(al.valor_antigo, al.valor_novo)),
+                       CASE WHEN {SQL_GRAVA_SNAPSHOT} THEN al.snapshot END,
+                       v.versao,
+                       CASE WHEN %s THEN jsonb_build_array(jsonb_build_object(
+                           'campo', %s::text, 'antes', al.valor_antigo, 'depois', al.valor_novo))
+                       ELSE '[]'::jsonb END,
+                       %s, %s
+                FROM alterados al
+                CROSS JOIN LATERAL ({SQL_PROXIMA_VERSAO.format(tabela='%s', registro_id='al.id')}) v
+            )
+            SELECT id, valor_antigo, versao_antiga FROM alterados ORDER BY id
+        """
+        descricao = descricao or f'Ação em lote em {self.entidade_nome}'
+        parametros = ((list(ids), valor) + tuple(parametros_condicao) +
+                      (valor, usuario_id, tabela, campo, Auditoria.campo_exibido(campo), campo,
+                       descricao, Auditoria.sanitizar_descricao(descricao), tabela))
+        
+        def operacao(cursor):
+            # Versões lidas no próprio statement: os registros são travados antes
+            Auditoria.travar_registros(cursor, ((tabela, registro_id) for registro_id in ids))
+            cursor.execute(query, parametros)
+            linhas_alteradas = cursor.fetchall()
+            if apos_alterar and linhas_alteradas:
+                apos_alterar(cursor, linhas_alteradas)
+            return linhas_alteradas
+        
+        linhas = Database.transaction(operacao)
+        if linhas is None:
+            flash(f'Erro ao executar ação em lote em {self.entidade_nome}.', 'danger')
+            return None
+        
+        alterados = [linha['id'] for linha in linhas]
+        if alterados:
+            Database.notificar_alteracao(tabela)
+        flash(f'{len(alterados)} registro(s) de {self.entidade_nome} atualizado(s); '
+              f'{len(set(ids)) - len(alterados)} sem alteração.', 'success')
+        return alterados
+    
+    def verificar_dependencias(self, id: int, checagens: Optional[List[Dict]] = None) -> List[str]:
         """
-        Verifica dependências antes de excluir
+        Verifica dependências antes de excluir (uma única query de EXISTS)
         
         Parâmetros:
             id: ID do registro
-            checagens: Lista de dicts com 'tabela', 'campo' e 'mensagem'
+            checagens: Lista de dicts com 'tabela', 'campo' e 'mensagem'.
+                       Se omitida, é derivada das chaves estrangeiras que
+                       referenciam a tabela do repositório.
         
         Retorna:
             List[str]: Lista de mensagens de bloqueio
         """
-        bloqueios = []
+        if checagens is None:
+            checagens = verificador_dependencias.dependentes(self.repository.tabela)
         
-        for check in checagens:
-            query = f"SELECT COUNT(*) AS total FROM {check['tabela']} WHERE {check['campo']} = %s"
-            resultado = Database.executar(query, (id,), fetchone=True)
-            
-            if resultado and isinstance(resultado, dict) and int(resultado.get('total', 0)) > 0:
-                bloqueios.append(f"Possui {check['mensagem']} vinculados.")
+        encontrados = verificador_dependencias.verificar(id, checagens)
+        if encontrados is None:
+            return ['Não foi possível verificar as dependências.']
         
-        return bloqueios
+        return [f"Possui {check['mensagem']} vinculados." for check in encontrados]
 
 
 class EmailService:
-    """Serviço robusto para envio de emails"""
+    """
+    Serviço robusto para envio de emails
+
+    smtplib e email.mime são importados no primeiro envio (não no import
+    de core.services); app.precarregar() os antecipa sob --preload.
+    """
     
     def __init__(self):
         self.config = SMTP_CONFIG
@@ -334,7 +431,7 @@ class EmailService:
             if not self.config.get(field):
                 raise ValueError(f"Configuração de email inválida: {field} não definido")
     
-    def _criar_conexao_smtp(self) -> smtplib.SMTP:
+    def _criar_conexao_smtp(self) -> "smtplib.SMTP":
         """
         Cria e retorna uma conexão SMTP configurada
         
@@ -344,6 +441,8 @@ class EmailService:
         Raises:
             smtplib.SMTPException: Erro ao conectar ao servidor
         """
+        import smtplib
+
         timeout = float(self.config.get('timeout', 10))
         servidor = smtplib.SMTP(
             self.config['server'], 
@@ -375,6 +474,11 @@ class EmailService:
         Returns:
             True se enviado com sucesso, False caso contrário
         """
+        # Imports sob demanda: smtplib e email.mime só carregam em workers que enviam email
+        import smtplib
+        from email.mime.multipart import MIMEMultipart
+        from email.mime.text import MIMEText
+
         for tentativa in range(tentativas):
             try:
                 mensagem = MIMEMultipart('alternative')
@@ -495,6 +599,19 @@ class EmailService:
 class UtilsService:
     """Serviço para funções utilitárias gerais"""
     
+    @staticmethod
+    def extrair_ids(valores: List[str]) -> List[int]:
+        """
+        Converte IDs vindos de formulário (checkboxes e/ou listas coladas,
+        separadas por vírgula, espaço ou quebra de linha) em inteiros únicos
+        """
+        ids = []
+        for valor in valores or []:
+            for parte in re.split(r'[\s,;]+', str(valor)):
+                if parte.isdigit():
+                    ids.append(int(parte))
+        return list(dict.fromkeys(ids))
+    
     @staticmethod
     def gerar_codigo_acesso(tamanho: int = CODIGO_ACESSO_TAMANHO) -> str:
         """
@@ -0,0 +1,200 @@
+"""
+============================================
+CORE - SERVIDOR WSGI (GUNICORN)
+============================================
+Dimensionamento e ganchos de ciclo de vida usados por gunicorn.conf.py.
+
+Dimensionamento:
+- Threads por worker: THREADS_POR_WORKER_PADRAO, sem passar do pool async
+  (no gthread uma view async ocupa uma conexão do pool por thread); com
+  GUNICORN_ASGI são as threads que executam as views síncronas, e o pool
+  async pode encher (DB_POOL_ASYNC_MAX) com as requisições em andamento no loop
+- Workers: 2 x CPUs + 1 (CPUs do cgroup/afinidade, não do host), limitados
+  pelo orçamento DB_MAX_CONEXOES dividido pelas conexões que um worker
+  pode abrir no pior caso (requisições + fan-out, pool async, threads de
+  segundo plano)
+- GUNICORN_WORKERS/GUNICORN_THREADS > 0 substituem o cálculo
+
+Ciclo de vida:
+- verificar_schema(): no mestre, antes dos workers, recusa subir com
+  tabelas de logs anteriores ao particionamento (core/particionamento.py)
+- reiniciar_apos_fork(): no worker recém-criado, esquece loop/pool async,
+  pool de fan-out e conexões de cache herdados do mestre (--preload)
+- iniciar_servicos(): antes do worker aceitar requisições, inicia as
+  threads de segundo plano (app.SERVICOS_SEGUNDO_PLANO)
+- aquecer_worker(): antes do worker aceitar requisições, carrega os
+  templates que ainda não vieram do mestre (do bytecode em disco)
+- despejar_pilhas(): pilha de todas as threads, para o log do worker
+  abortado por timeout
+- drenar(): no desligamento do worker, após as requisições em andamento,
+  para as threads de segundo plano e fecha os pools
+
+Os imports da aplicação ficam dentro das funções: o mestre carrega este
+módulo ao ler a configuração, antes (ou sem) o --preload.
+"""
+
+import math
+import os
+import sys
+import threading
+import traceback
+from typing import Dict, Optional
+from config import (DB_MAX_CONEXOES, DB_POOL_ASYNC_MIN, DB_POOL_ASYNC_MAX, GUNICORN_WORKERS,
+                    GUNICORN_THREADS, GUNICORN_ASGI, PARALELO_MAX_THREADS, PARALELO_LIMITE_POR_REQUISICAO)
+
+# Threads gthread por worker: sobrepõem espera de I/O; além disso o GIL limita o ganho
+THREADS_POR_WORKER_PADRAO = 4
+
+# Saúde, invalidação, relatórios, partições e códigos: uma conexão cada no pior caso
+CONEXOES_SEGUNDO_PLANO = 5
+
+
+# ============================================
+# DIMENSIONAMENTO
+# ============================================
+
+def cpus_disponiveis() -> int:
+    """CPUs utilizáveis pelo processo: afinidade e cota do cgroup v2 (containers)"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # pragma: no cover - plataformas sem sched_getaffinity
+        cpus = os.cpu_count() or 1
+    try:
+        with open('/sys/fs/cgroup/cpu.max', encoding='ascii') as arquivo:
+            cota, periodo = arquivo.read().split()
+        if cota != 'max':
+            cpus = min(cpus, math.ceil(int(cota) / int(periodo)))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+
+def conexoes_por_worker(threads: int, asgi: bool = GUNICORN_ASGI) -> int:
+    """
+    Conexões que um worker pode manter abertas ao mesmo tempo
+
+    - Síncronas: cada thread de requisição, ou até PARALELO_LIMITE_POR_REQUISICAO
+      com fan-out (o pool de fan-out é limitado a PARALELO_MAX_THREADS)
+    - Pool async: conexões abertas em um pico continuam no pool, no máximo
+      uma por thread no gthread; sob ASGI, até DB_POOL_ASYNC_MAX
+    - Threads de segundo plano
+    """
+    sincronas = min(threads * max(1, PARALELO_LIMITE_POR_REQUISICAO), threads + PARALELO_MAX_THREADS)
+    pool_async = DB_POOL_ASYNC_MAX if asgi else max(DB_POOL_ASYNC_MIN, min(threads, DB_POOL_ASYNC_MAX))
+    return sincronas + pool_async + CONEXOES_SEGUNDO_PLANO
+
+
+def dimensionar(cpus: Optional[int] = None, conexoes_banco: int = DB_MAX_CONEXOES,
+                workers: int = GUNICORN_WORKERS, threads: int = GUNICORN_THREADS) -> Dict[str, int]:
+    """
+    Calcula workers e threads do gunicorn
+
+    Parâmetros:
+        cpus (int): CPUs disponíveis (padrão: cpus_disponiveis())
+        conexoes_banco (int): Conexões que a instância inteira pode abrir
+        workers, threads (int): Valores fixos; 0 = calcular
+
+    Retorna:
+        dict: workers, threads, cpus, conexoes_por_worker, conexoes_total, limite_workers_banco
+    """
+    cpus = cpus or cpus_disponiveis()
+    if threads <= 0:
+        threads = max(1, min(THREADS_POR_WORKER_PADRAO, DB_POOL_ASYNC_MAX))
+    por_worker = conexoes_por_worker(threads)
+    limite_banco = max(1, conexoes_banco // por_worker)
+
+    if workers <= 0:
+        workers = max(1, min(2 * cpus + 1, limite_banco))
+    elif workers > limite_banco:
+        print(f"Aviso: {workers} workers podem abrir {workers * por_worker} conexões "
+              f"(DB_MAX_CONEXOES={conexoes_banco})")
+
+    return {
+        'workers': workers,
+        'threads': threads,
+        'cpus': cpus,
+        'conexoes_por_worker': por_worker,
+        'conexoes_total': workers * por_worker,
+        'limite_workers_banco': limite_banco,
+    }
+
+
+# ============================================
+# CICLO DE VIDA DOS WORKERS
+# ============================================
+
+def verificar_schema() -> None:
+    """
+    Interrompe a subida se os logs ainda não são particionados (schema
+    anterior); com o banco indisponível segue, e a manutenção avisa depois
+    """
+    from core.particionamento import gerenciador_particoes
+
+    legadas = gerenciador_particoes.tabelas_legadas()
+    if legadas:
+        raise RuntimeError(gerenciador_particoes.instrucoes_migracao(legadas))
+
+
+def precarregar_mestre() -> None:
+    """Com --preload: imports adiados e gc.freeze() no mestre, antes do primeiro fork"""
+    from app import precarregar
+    precarregar()
+
+
+def reiniciar_apos_fork() -> None:
+    """Descarta no worker os recursos por processo copiados do mestre"""
+    from core.cache import cache_referencias
+    from core.database_async import DatabaseAsync
+    from core.fragmentos import cache_fragmentos
+    from core.paralelo import ExecucaoParalela
+
+    DatabaseAsync.reiniciar_apos_fork()
+    ExecucaoParalela.encerrar(esperar=False)
+    cache_referencias.reiniciar_apos_fork()
+    cache_fragmentos.reiniciar_apos_fork()
+
+
+def iniciar_servicos() -> None:
+    """Inicia as threads de segundo plano no worker, antes da primeira conexão"""
+    from app import iniciar_servicos_segundo_plano
+    iniciar_servicos_segundo_plano()
+
+
+def aquecer_worker() -> Optional[Dict]:
+    """Carrega todos os templates no worker antes da primeira requisição"""
+    from app import app
+    from core.compilacao_templates import aquecer_se_configurado
+
+    return aquecer_se_configurado(app.jinja_env)
+
+
+def despejar_pilhas() -> str:
+    """Pilha atual de cada thread do processo (diagnóstico de worker travado)"""
+    nomes = {thread.ident: thread.name for thread in threading.enumerate()}
+    blocos = []
+    for ident, quadro in sys._current_frames().items():
+        pilha = ''.join(traceback.format_stack(quadro))
+        blocos.append(f"--- Thread {nomes.get(ident, '?')} ({ident}) ---\n{pilha}")
+    return f"Pilhas do worker {os.getpid()}:\n" + '\n'.join(blocos)
+
+
+def drenar(timeout: float = 5.0) -> None:
+    """
+    Desligamento do worker, depois das requisições em andamento: para as
+    threads de segundo plano e fecha o pool de fan-out e o pool async.
+
+    Auditoria e códigos de acesso são gravados na transação da própria
+    requisição e o email é enviado dentro dela, então não há fila em
+    memória a esvaziar além do que o graceful_timeout já aguarda.
+    """
+    from app import SERVICOS_SEGUNDO_PLANO
+    from core.database_async import DatabaseAsync
+    from core.paralelo import ExecucaoParalela
+
+    for subsistema in SERVICOS_SEGUNDO_PLANO:
+        subsistema.parar()
+    try:
+        ExecucaoParalela.encerrar()
+        DatabaseAsync.fechar(timeout)
+    except Exception as e:
+        print(f"Erro ao drenar o worker: {e}")
@@ -0,0 +1,92 @@
+"""
+============================================
+CONECTA UNIFORME - CONFIGURAÇÃO DO GUNICORN
+============================================
+Carregada automaticamente pelo gunicorn a partir do diretório atual
+(ou com -c gunicorn.conf.py). Valores em config.py (GUNICORN_*,
+DB_MAX_CONEXOES); dimensionamento e ganchos em core/servidor.py.
+
+A aplicação vem daqui (wsgi_app): app:app em workers gthread, ou, com
+GUNICORN_ASGI, asgi:aplicacao em workers uvicorn (views async no loop).
+
+Para executar:
+    gunicorn -c gunicorn.conf.py
+    GUNICORN_ASGI=true gunicorn -c gunicorn.conf.py
+    python -c "from core.servidor import dimensionar; print(dimensionar())"
+"""
+
+from config import (GUNICORN_BIND, GUNICORN_ASGI, GUNICORN_PRELOAD, GUNICORN_TIMEOUT, GUNICORN_GRACEFUL_TIMEOUT,
+                    GUNICORN_KEEPALIVE, GUNICORN_MAX_REQUESTS, GUNICORN_MAX_REQUESTS_JITTER)
+from core import servidor
+
+_dimensoes = servidor.dimensionar()
+
+# ============================================
+# PROCESSOS E THREADS
+# ============================================
+bind = GUNICORN_BIND
+wsgi_app = 'asgi:aplicacao' if GUNICORN_ASGI else 'app:app'
+worker_class = 'uvicorn_worker.UvicornWorker' if GUNICORN_ASGI else 'gthread'
+workers = _dimensoes['workers']
+# gthread: threads de requisição; ASGI: threads das views síncronas (asgi.py)
+threads = _dimensoes['threads']
+
+# Aplicação importada no mestre: workers compartilham as páginas (copy-on-write)
+preload_app = GUNICORN_PRELOAD
+
+# Reciclagem contra vazamentos; o jitter evita que todos os workers reiniciem juntos
+max_requests = GUNICORN_MAX_REQUESTS
+max_requests_jitter = GUNICORN_MAX_REQUESTS_JITTER
+
+# ============================================
+# TIMEOUTS
+# ============================================
+timeout = GUNICORN_TIMEOUT
+graceful_timeout = GUNICORN_GRACEFUL_TIMEOUT
+keepalive = GUNICORN_KEEPALIVE
+
+# ============================================
+# LOGS
+# ============================================
+accesslog = '-'
+errorlog = '-'
+
+
+# ============================================
+# GANCHOS
+# ============================================
+
+def when_ready(server):
+    server.log.info(
+        "Dimensionamento: %(workers)s workers x %(threads)s threads (%(cpus)s CPUs), "
+        "até %(conexoes_total)s conexões ao banco (%(conexoes_por_worker)s por worker)" % _dimensoes
+    )
+    # RuntimeError aqui encerra o gunicorn com a mensagem (sem subir workers)
+    servidor.verificar_schema()
+    if server.cfg.preload_app:
+        servidor.precarregar_mestre()
+
+
+def post_fork(server, worker):
+    servidor.reiniciar_apos_fork()
+
+
+def post_worker_init(worker):
+    # Aplicação carregada e worker ainda sem aceitar conexões
+    servidor.iniciar_servicos()
+    aquecimento = servidor.aquecer_worker()
+    if aquecimento:
+        worker.log.info("Templates carregados: %(templates)s em %(duracao_ms)s ms" % aquecimento)
+
+
+def worker_abort(worker):
+    # SIGABRT do mestre: worker sem sinal de vida por mais de `timeout`
+    worker.log.critical("Worker abortado por timeout\n%s", servidor.despejar_pilhas())
+
+
+def worker_int(worker):
+    worker.log.warning("Worker interrompido\n%s", servidor.despejar_pilhas())
+
+
+def worker_exit(server, worker):
+    servidor.drenar()
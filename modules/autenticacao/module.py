@@ -10,10 +10,12 @@ Controla o processo de autenticação e autorização de usuários, garantindo s
 """
 
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify
-from datetime import datetime, timedelta
+from datetime import datetime
 from core.database import Database
+from core.database_async import DatabaseAsync
 from core.services import EmailService, UtilsService, ValidacaoService, LogService
-from config import CODIGO_ACESSO_DURACAO_HORAS, SESSAO_DURACAO_DIAS, DEBUG
+from core.codigos_acesso import gerenciador_codigos
+from config import SESSAO_DURACAO_DIAS, DEBUG
 
 # ============================================
 # CRIAÇÃO DO BLUEPRINT (MICROFRONT-END)
@@ -26,16 +28,18 @@ autenticacao_bp = Blueprint('autenticacao', __name__, url_prefix='/auth')
 # ============================================
 
 @autenticacao_bp.route('/tipos-por-email')
-def tipos_por_email():
+async def tipos_por_email():
     """Retorna os tipos de usuário ativos associados a um email (JSON).
 
+    View assíncrona (pool de DatabaseAsync): chamada a cada digitação de email.
+
     Resposta: { "email": str, "tipos": [str, ...] }
     """
     email = request.args.get('email', '').strip().lower()
     if not email:
         return jsonify({"email": email, "tipos": []})
     q = "SELECT DISTINCT tipo FROM usuarios WHERE email = %s AND ativo = TRUE ORDER BY tipo"
-    rows = Database.executar(q, (email,), fetchall=True)
+    rows = await DatabaseAsync.executar(q, (email,), fetchall=True)
     tipos = [r['tipo'] for r in rows] if isinstance(rows, list) else []
     # Labels amigáveis para cada tipo (acentos e capitalização)
     rotulos = {
@@ -124,18 +128,8 @@ def solicitar_codigo():
     # Gera um código de acesso aleatório (6 dígitos)
     codigo = UtilsService.gerar_codigo_acesso()
     
-    # Calcula a data de expiração do código (24 horas)
-    data_expiracao = datetime.now() + timedelta(hours=CODIGO_ACESSO_DURACAO_HORAS)
-    
-    # Salva o código no banco de dados
-    query_inserir = """
-        INSERT INTO codigos_acesso (usuario_id, codigo, data_expiracao)
-        VALUES (%s, %s, %s)
-    """
-    resultado = Database.executar(query_inserir, (usuario['id'], codigo, data_expiracao), commit=True)
-    
-    # Verifica se salvou com sucesso
-    if not resultado or resultado == 0:
+    # Salva o código no banco de dados (válido por CODIGO_ACESSO_DURACAO_HORAS)
+    if not gerenciador_codigos.emitir(usuario['id'], codigo):
         flash('Erro ao gerar código. Tente novamente.', 'danger')
         return render_template('auth/solicitar_codigo.html')
     
@@ -216,44 +210,22 @@ def validar_codigo():
         flash('Preencha todos os campos.', 'danger')
         return render_template('auth/validar_codigo.html', email=email, tipo=tipo, aviso_email='0', debug=DEBUG)
     
-    # Busca o código no banco de dados (amarra email+tipo)
-    query_codigo = """
-        SELECT ca.id, ca.usuario_id, ca.codigo, ca.data_expiracao, ca.usado,
-               u.nome, u.email, u.tipo, u.ativo
-        FROM codigos_acesso ca
-        JOIN usuarios u ON ca.usuario_id = u.id
-        WHERE u.email = %s AND u.tipo = %s AND ca.codigo = %s AND ca.usado = FALSE
-        ORDER BY ca.data_criacao DESC
-        LIMIT 1
-    """
-    registro_codigo = Database.executar(query_codigo, (email, tipo, codigo_digitado), fetchone=True)
-    if not isinstance(registro_codigo, dict):
-        registro_codigo = {}
-    
-    # Verifica se o código existe e está válido
-    if not registro_codigo or not registro_codigo.get('id'):
-        flash('Código inválido ou já utilizado.', 'danger')
-        return render_template('auth/validar_codigo.html', email=email, tipo=tipo, aviso_email='0', debug=DEBUG)
-    
-    # Verifica se o código expirou
-    data_expiracao = registro_codigo.get('data_expiracao')
-    if not data_expiracao:
-        flash('Código inválido.', 'danger')
-        return render_template('auth/validar_codigo.html', email=email, tipo=tipo, aviso_email='0', debug=DEBUG)
-    if datetime.now() > data_expiracao:
-        flash('Código expirado. Solicite um novo código.', 'danger')
-        return redirect(url_for('autenticacao.solicitar_codigo'))
-    
-    # Verifica se o usuário está ativo
-    if not registro_codigo.get('ativo'):
-        flash('Usuário inativo. Entre em contato com o administrador.', 'danger')
+    # Valida e marca o código como usado em um único UPDATE ... RETURNING
+    # (amarra email+tipo; exige código não expirado e usuário ativo)
+    registro_codigo = gerenciador_codigos.consumir(email, tipo, codigo_digitado)
+    
+    if not registro_codigo:
+        # Caminho de falha: descobre o motivo apenas para escolher a mensagem
+        motivo = gerenciador_codigos.motivo_recusa(email, tipo, codigo_digitado)
+        if motivo == 'expirado':
+            flash('Código expirado. Solicite um novo código.', 'danger')
+            return redirect(url_for('autenticacao.solicitar_codigo'))
+        if motivo == 'inativo':
+            flash('Usuário inativo. Entre em contato com o administrador.', 'danger')
+        else:
+            flash('Código inválido ou já utilizado.', 'danger')
         return render_template('auth/validar_codigo.html', email=email, tipo=tipo, aviso_email='0', debug=DEBUG)
     
-    # Código válido! Marca como usado
-    query_marcar_usado = "UPDATE codigos_acesso SET usado = TRUE WHERE id = %s"
-    if registro_codigo.get('id'):
-        Database.executar(query_marcar_usado, (registro_codigo['id'],), commit=True)
-    
     # Salva os dados do usuário na sessão do Flask
     session['usuario_id'] = registro_codigo.get('usuario_id')
     session['usuario_nome'] = registro_codigo.get('nome')
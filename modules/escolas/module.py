@@ -13,13 +13,14 @@ Controla o processo de cadastro e gestão de escolas no sistema.
 """
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash
-from core.repositories import EscolaRepository, UsuarioRepository, GestorEscolarRepository
+from core.repositories import EscolaRepositoryCache, UsuarioRepository, GestorEscolarRepository
 from core.services import AutenticacaoService, CRUDService, ValidacaoService
 from core.database import Database
+from core.resposta import condicional, versao_consulta
 
 # Blueprint e Serviços
 escolas_bp = Blueprint('escolas', __name__, url_prefix='/escolas')
-escola_repo = EscolaRepository()
+escola_repo = EscolaRepositoryCache()
 usuario_repo = UsuarioRepository()
 gestor_repo = GestorEscolarRepository()
 auth_service = AutenticacaoService()
@@ -31,8 +32,17 @@ validacao = ValidacaoService()
 # RF03.1 - LISTAR ESCOLAS
 # ============================================
 
+def _versao_listagem():
+    """Versão das escolas listadas (ETag); sem sessão a view apenas redireciona"""
+    if not auth_service.verificar_sessao():
+        return None
+    return versao_consulta("FROM escolas e JOIN usuarios u ON e.usuario_id = u.id",
+                           ['e.data_atualizacao', 'u.data_atualizacao'])
+
+
 @escolas_bp.route('/')
 @escolas_bp.route('/listar')
+@condicional(_versao_listagem)
 def listar():
     """Lista todas as escolas cadastradas"""
     # Verifica se o usuário está logado
@@ -116,7 +126,7 @@ def cadastrar():
         return render_template('escolas/cadastrar.html')
     
     # Processa gestores escolares (se informados)
-    _processar_gestores(request.form, escola_id)
+    gestor_repo.sincronizar_por_escola(escola_id, _coletar_gestores(request.form), usuario_logado['id'])
     
     flash('Escola cadastrada com sucesso!', 'success')
     return redirect(url_for('escolas.listar'))
@@ -226,9 +236,9 @@ def editar(id):
     # Atualiza escola
     crud_service.atualizar_com_log(id, dados_escola, dict(escola), usuario_logado['id'])
     
-    # Atualiza gestores (remove todos e insere novamente)
-    gestor_repo.excluir_por_escola(id)
-    _processar_gestores(request.form, id)
+    # Sincroniza gestores: aplica apenas inserções/alterações/remoções reais
+    if gestor_repo.sincronizar_por_escola(id, _coletar_gestores(request.form), usuario_logado['id']) is None:
+        flash('Erro ao atualizar gestores da escola.', 'danger')
     
     flash('Escola atualizada com sucesso!', 'success')
     return redirect(url_for('escolas.listar'))
@@ -254,12 +264,8 @@ def excluir(id):
         flash('Escola não encontrada.', 'danger')
         return redirect(url_for('escolas.listar'))
     
-    # Verifica dependências (não permite excluir se houver registros relacionados)
-    bloqueios = crud_service.verificar_dependencias(id, [
-        {'tabela': 'homologacao_fornecedores', 'campo': 'escola_id', 'mensagem': 'fornecedores homologados'},
-        {'tabela': 'produtos', 'campo': 'escola_id', 'mensagem': 'produtos'},
-        {'tabela': 'pedidos', 'campo': 'escola_id', 'mensagem': 'pedidos'}
-    ])
+    # Verifica dependências (FKs que referenciam escolas; não permite excluir se houver registros relacionados)
+    bloqueios = crud_service.verificar_dependencias(id)
     
     if bloqueios:
         flash('Não é possível excluir esta escola. ' + ' '.join(bloqueios) + 
@@ -277,10 +283,11 @@ def excluir(id):
 # FUNÇÕES AUXILIARES
 # ============================================
 
-def _processar_gestores(form_data, escola_id):
+def _coletar_gestores(form_data) -> list:
     """
-    Processa e insere gestores escolares a partir do formulário.
-    Gestores são contatos adicionais da escola (diretor, coordenador, etc)
+    Extrai os gestores escolares enviados no formulário.
+    Gestores são contatos adicionais da escola (diretor, coordenador, etc).
+    O id (campo oculto) identifica gestores já cadastrados.
     """
     # Identifica índices dos gestores no formulário
     indices = set()
@@ -292,19 +299,18 @@ def _processar_gestores(form_data, escola_id):
             except Exception:
                 pass
     
-    # Insere cada gestor
-    for idx in indices:
+    gestores = []
+    for idx in sorted(indices, key=lambda i: (len(i), i)):
         nome = form_data.get(f'gestores[{idx}][nome]', '').strip()
         if not nome:
             continue
         
-        dados = {
-            'escola_id': escola_id,
+        gestores.append({
+            'id': form_data.get(f'gestores[{idx}][id]', '').strip() or None,
             'nome': nome,
             'email': form_data.get(f'gestores[{idx}][email]', '').strip().lower() or None,
             'telefone': form_data.get(f'gestores[{idx}][telefone]', '').strip() or None,
             'cpf': form_data.get(f'gestores[{idx}][cpf]', '').strip() or None,
             'tipo_gestor': form_data.get(f'gestores[{idx}][tipo_gestor]', '').strip() or None
-        }
-        
-        gestor_repo.inserir(dados)
+        })
+    return gestores
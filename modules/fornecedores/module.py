@@ -9,16 +9,19 @@ Este módulo é responsável pelo CRUD básico de fornecedores:
 - RF05.4: Apagar fornecedor
 """
 
+from functools import partial
 from flask import Blueprint, render_template, request, redirect, url_for, flash
-from core.repositories import FornecedorRepository, UsuarioRepository
+from core.repositories import FornecedorRepositoryCache, UsuarioRepository
 from core.services import AutenticacaoService, CRUDService, ValidacaoService
 from core.database import Database
+from core.resposta import condicional, versao_consulta
+from core.paralelo import ExecucaoParalela
 
 # Blueprint
 fornecedores_bp = Blueprint('fornecedores', __name__, url_prefix='/fornecedores')
 
 # Repositories e Services
-fornecedor_repo = FornecedorRepository()
+fornecedor_repo = FornecedorRepositoryCache()
 usuario_repo = UsuarioRepository()
 auth_service = AutenticacaoService()
 crud_service = CRUDService(fornecedor_repo, 'Fornecedor')
@@ -28,8 +31,17 @@ validacao = ValidacaoService()
 # ============================================
 # RF05.1 - LISTAR FORNECEDORES
 # ============================================
+def _versao_listagem():
+    """Versão dos fornecedores listados (ETag); sem sessão a view apenas redireciona"""
+    if not auth_service.verificar_sessao():
+        return None
+    return versao_consulta("FROM fornecedores f JOIN usuarios u ON f.usuario_id = u.id",
+                           ['f.data_atualizacao', 'u.data_atualizacao'])
+
+
 @fornecedores_bp.route('/')
 @fornecedores_bp.route('/listar')
+@condicional(_versao_listagem)
 def listar():
     """
     RF05.1 - Listar fornecedores
@@ -192,19 +204,23 @@ def detalhes(id):
         flash('Faça login para continuar.', 'warning')
         return redirect(url_for('autenticacao.solicitar_codigo'))
     
-    # Buscar fornecedor com dados do usuário
-    fornecedor = fornecedor_repo.buscar_com_usuario(id)
-    if not fornecedor:
-        flash('Fornecedor não encontrado.', 'danger')
-        return redirect(url_for('fornecedores.listar'))
-    
-    # Contar produtos vinculados (opcional, informação útil)
+    # Fornecedor e contagem de produtos vinculados são buscados em paralelo
     query_produtos = """
         SELECT COUNT(*) as total_produtos
         FROM produtos
         WHERE fornecedor_id = %s
     """
-    result = Database.executar(query_produtos, (id,), fetchone=True)
+    resultados = ExecucaoParalela.executar({
+        'fornecedor': partial(fornecedor_repo.buscar_com_usuario, id),
+        'produtos': ExecucaoParalela.consulta(query_produtos, (id,), fetchone=True),
+    })
+    
+    fornecedor = resultados['fornecedor']
+    if not fornecedor:
+        flash('Fornecedor não encontrado.', 'danger')
+        return redirect(url_for('fornecedores.listar'))
+    
+    result = resultados['produtos']
     total_produtos = result['total_produtos'] if result else 0
     
     return render_template('fornecedores/detalhes.html', 
@@ -232,10 +248,8 @@ def excluir(id):
         flash('Fornecedor não encontrado.', 'danger')
         return redirect(url_for('fornecedores.listar'))
     
-    # Verificar dependências (se existem produtos vinculados)
-    bloqueios = crud_service.verificar_dependencias(id, [
-        {'tabela': 'produtos', 'campo': 'fornecedor_id', 'mensagem': 'produtos cadastrados'}
-    ])
+    # Verificar dependências (produtos, homologações e demais FKs que referenciam fornecedores)
+    bloqueios = crud_service.verificar_dependencias(id)
     
     if bloqueios:
         flash(f"Não é possível excluir: existem {bloqueios[0]}", 'warning')
@@ -12,7 +12,7 @@ Controla o processo de gerenciamento de gestores escolares no sistema.
 """
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash
-from core.repositories import GestorEscolarRepository, EscolaRepository
+from core.repositories import GestorEscolarRepository, EscolaRepositoryCache
 from core.services import AutenticacaoService, ValidacaoService, LogService
 
 # ============================================
@@ -24,7 +24,7 @@ gestores_bp = Blueprint('gestores', __name__, url_prefix='/gestores')
 # INICIALIZAÇÃO DOS REPOSITÓRIOS E SERVIÇOS
 # ============================================
 gestor_repo = GestorEscolarRepository()
-escola_repo = EscolaRepository()
+escola_repo = EscolaRepositoryCache()
 auth_service = AutenticacaoService()
 validacao = ValidacaoService()
 
@@ -11,15 +11,25 @@ Este módulo é responsável por:
 Controla o processo de controle de pedidos no sistema.
 """
 
+from functools import partial
 from flask import Blueprint, render_template, request, redirect, url_for, flash
-from core.repositories import PedidoRepository, ResponsavelRepository
-from core.services import AutenticacaoService, LogService
+from core.repositories import PedidoRepository, ResponsavelRepositoryCache
+from core.services import AutenticacaoService, CRUDService, LogService, UtilsService
 from core.database import Database
+from core.resposta import condicional, versao_consulta
+from core.paralelo import ExecucaoParalela
+from core.relatorios import DeltasVendas
 
 # Blueprint e Serviços
 pedidos_bp = Blueprint('pedidos', __name__, url_prefix='/pedidos')
 pedido_repo = PedidoRepository()
-responsavel_repo = ResponsavelRepository()
+responsavel_repo = ResponsavelRepositoryCache()
+crud_service = CRUDService(pedido_repo, 'Pedido')
+
+# Status aplicáveis por ação em lote e status que não podem mais mudar
+# (mesma regra de RF07.3: pedidos finalizados não são editados)
+STATUS_LOTE = ('pendente', 'pago', 'enviado', 'entregue', 'cancelado')
+STATUS_FINALIZADOS = ('entregue', 'cancelado')
 
 # ============================================
 # RF07.1 - CRIAR PEDIDO
@@ -61,8 +71,30 @@ def criar():
 # ============================================
 # RF07.4 - CONSULTAR PEDIDOS
 # ============================================
+def _versao_listagem():
+    """Versão dos pedidos listados (ETag): todos, ou só os do responsável logado"""
+    usuario_logado = auth_service.verificar_sessao()
+    if not usuario_logado:
+        return None
+    origem = """
+        FROM pedidos p
+        JOIN responsaveis r ON p.responsavel_id = r.id
+        JOIN usuarios u ON r.usuario_id = u.id
+        LEFT JOIN escolas e ON p.escola_id = e.id
+        LEFT JOIN usuarios e_usr ON e.usuario_id = e_usr.id
+        WHERE p.status != 'carrinho'
+    """
+    parametros = None
+    if usuario_logado['tipo'] == 'responsavel':
+        origem += " AND r.usuario_id = %s"
+        parametros = (usuario_logado['id'],)
+    return versao_consulta(origem, ['p.data_atualizacao', 'u.data_atualizacao', 'e_usr.data_atualizacao'],
+                           parametros)
+
+
 @pedidos_bp.route('/')
 @pedidos_bp.route('/listar')
+@condicional(_versao_listagem)
 def listar():
     """Lista pedidos"""
     usuario_logado = auth_service.verificar_sessao()
@@ -169,8 +201,14 @@ def finalizar(id):
         flash('Somente pedidos em status carrinho podem ser finalizados.', 'danger')
         return redirect(url_for('pedidos.listar'))
 
-    # Atualiza status e registra log
-    if Database.atualizar('pedidos', id, {'status': 'pendente'}):
+    # Atualiza status (com delta para os relatórios) e registra log
+    def operacao_finalizar(cursor):
+        DeltasVendas.transicao(cursor, id, 'pendente', 'finalizar')
+        cursor.execute("UPDATE pedidos SET status = 'pendente', data_atualizacao = CURRENT_TIMESTAMP WHERE id = %s", (id,))
+        return cursor.rowcount > 0
+
+    if Database.transaction(operacao_finalizar):
+        Database.notificar_alteracao('pedidos', id)
         LogService.registrar(usuario_logado['id'], 'pedidos', id, 'UPDATE', descricao='Pedido finalizado')
         flash('Pedido finalizado com sucesso!', 'success')
     else:
@@ -315,7 +353,14 @@ def editar(id):
             'valor_total': request.form.get('valor_total')
         }
         
-        if Database.atualizar('pedidos', id, dados):
+        def operacao_editar(cursor):
+            DeltasVendas.transicao(cursor, id, dados['status'], 'editar')
+            cursor.execute("UPDATE pedidos SET status = %s, valor_total = %s, data_atualizacao = CURRENT_TIMESTAMP WHERE id = %s",
+                           (dados['status'], dados['valor_total'], id))
+            return cursor.rowcount > 0
+        
+        if Database.transaction(operacao_editar):
+            Database.notificar_alteracao('pedidos', id)
             LogService.registrar(usuario_logado['id'], 'pedidos', id, 'UPDATE', descricao='Pedido editado')
             flash('Pedido atualizado com sucesso!', 'success')
             return redirect(url_for('pedidos.listar'))
@@ -326,6 +371,43 @@ def editar(id):
     return render_template('pedidos/editar.html', pedido=pedido)
 
 
+# ============================================
+# RF07.3 - ALTERAR STATUS EM LOTE
+# ============================================
+
+@pedidos_bp.route('/acoes-em-lote', methods=['POST'])
+def acoes_em_lote():
+    """
+    Altera o status de vários pedidos de uma vez (ex.: conciliação de pagamentos).
+    
+    Um único UPDATE para todos os IDs; pedidos finalizados ou ainda em
+    carrinho são ignorados e cada mudança real gera seu log de auditoria.
+    """
+    usuario_logado = auth_service.verificar_permissao(['administrador'])
+    if not usuario_logado:
+        flash('Acesso negado.', 'danger')
+        return redirect(url_for('pedidos.listar'))
+    
+    status = request.form.get('status')
+    if status not in STATUS_LOTE:
+        flash('Status inválido para ação em lote.', 'danger')
+        return redirect(url_for('pedidos.listar'))
+    
+    ids = UtilsService.extrair_ids(request.form.getlist('ids'))
+    if not ids:
+        flash('Selecione ao menos um pedido.', 'warning')
+        return redirect(url_for('pedidos.listar'))
+    
+    crud_service.atualizar_em_lote(
+        ids, 'status', status, usuario_logado['id'],
+        condicao="status <> 'carrinho' AND NOT (status = ANY(%s))",
+        parametros_condicao=(list(STATUS_FINALIZADOS),),
+        descricao=f'Status do pedido atualizado em lote para {status}',
+        apos_alterar=lambda cursor, linhas: DeltasVendas.transicoes(cursor, linhas, status, 'lote')
+    )
+    return redirect(url_for('pedidos.listar'))
+
+
 # ============================================
 # RF07.2 - APAGAR PEDIDO
 # ============================================
@@ -378,6 +460,7 @@ def apagar(id):
         if usuario_logado['tipo'] == 'administrador':
             # Tenta apagar os itens do pedido e em seguida o pedido dentro de uma transação
             def operacao_apagar(cursor):
+                DeltasVendas.transicao(cursor, id, None, 'apagar')
                 cursor.execute("DELETE FROM itens_pedido WHERE pedido_id = %s", (id,))
                 cursor.execute("DELETE FROM pedidos WHERE id = %s", (id,))
                 return True
@@ -414,7 +497,8 @@ def detalhes(id):
         flash('Faça login para continuar.', 'warning')
         return redirect(url_for('autenticacao.solicitar_codigo'))
     
-    # Busca o pedido com todas as informações
+    # Pedido, itens e (para responsável) o vínculo do usuário são independentes:
+    # buscados em paralelo, cada um em sua conexão
     query_pedido = """
         SELECT p.*, 
                r.cpf as responsavel_cpf,
@@ -433,7 +517,24 @@ def detalhes(id):
         LEFT JOIN usuarios e_usr ON e.usuario_id = e_usr.id
         WHERE p.id = %s
     """
-    pedido = Database.executar(query_pedido, (id,), fetchone=True)
+    query_itens = """
+        SELECT i.*, 
+               p.nome as produto_nome, 
+               p.descricao as produto_descricao, 
+               p.imagem_url as produto_imagem
+        FROM itens_pedido i
+        JOIN produtos p ON i.produto_id = p.id
+        WHERE i.pedido_id = %s
+        ORDER BY i.id
+    """
+    tarefas = {
+        'pedido': ExecucaoParalela.consulta(query_pedido, (id,), fetchone=True),
+        'itens': ExecucaoParalela.consulta(query_itens, (id,), fetchall=True),
+    }
+    if usuario_logado['tipo'] == 'responsavel':
+        tarefas['responsavel'] = partial(responsavel_repo.buscar_por_usuario_id, usuario_logado['id'])
+    resultados = ExecucaoParalela.executar(tarefas)
+    pedido = resultados['pedido']
     
     if not pedido:
         flash('Pedido não encontrado.', 'danger')
@@ -441,23 +542,12 @@ def detalhes(id):
     
     # Verifica permissão
     if usuario_logado['tipo'] == 'responsavel':
-        responsavel = responsavel_repo.buscar_por_usuario_id(usuario_logado['id'])
+        responsavel = resultados['responsavel']
         if not responsavel or pedido['responsavel_id'] != responsavel['id']:
             flash('Acesso negado.', 'danger')
             return redirect(url_for('pedidos.listar'))
     
-    # Busca itens do pedido
-    query_itens = """
-        SELECT i.*, 
-               p.nome as produto_nome, 
-               p.descricao as produto_descricao, 
-               p.imagem_url as produto_imagem
-        FROM itens_pedido i
-        JOIN produtos p ON i.produto_id = p.id
-        WHERE i.pedido_id = %s
-        ORDER BY i.id
-    """
-    itens = Database.executar(query_itens, (id,), fetchall=True) or []
+    itens = resultados['itens'] or []
     
     return render_template('pedidos/detalhes.html', pedido=pedido, itens=itens)
 
@@ -589,6 +679,7 @@ def atualizar_item():
     novo_subtotal = round(preco_unitario * quantidade, 2)
 
     def operacao_update(cursor):
+        DeltasVendas.item(cursor, item_id, quantidade, novo_subtotal, 'atualizar_item')
         cursor.execute('UPDATE itens_pedido SET quantidade = %s, subtotal = %s WHERE id = %s', (quantidade, novo_subtotal, item_id))
         # Recalcula total
         cursor.execute('SELECT COALESCE(SUM(subtotal),0) as total FROM itens_pedido WHERE pedido_id = %s', (item['pedido_id'],))
@@ -637,6 +728,7 @@ def remover_item():
             return redirect(url_for('pedidos.ver_carrinho'))
 
     def operacao_remover(cursor):
+        DeltasVendas.item(cursor, item_id, 0, 0, 'remover_item')
         cursor.execute('DELETE FROM itens_pedido WHERE id = %s', (item_id,))
         # Recalcula total
         cursor.execute('SELECT COALESCE(SUM(subtotal),0) as total FROM itens_pedido WHERE pedido_id = %s', (item['pedido_id'],))
@@ -12,9 +12,10 @@ Controla o processo de cadastro de produtos no sistema.
 """
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash
-from core.repositories import ProdutoRepository, FornecedorRepository
-from core.services import AutenticacaoService, CRUDService
+from core.repositories import ProdutoRepository, FornecedorRepositoryCache
+from core.services import AutenticacaoService, CRUDService, UtilsService
 from core.database import Database
+from core.resposta import condicional, versao_consulta, versao_consulta_async
 
 # ============================================
 # CONFIGURAÇÃO DO BLUEPRINT
@@ -25,7 +26,7 @@ produtos_bp = Blueprint('produtos', __name__, url_prefix='/produtos')
 # INICIALIZAÇÃO DE REPOSITÓRIOS E SERVIÇOS
 # ============================================
 produto_repo = ProdutoRepository()
-fornecedor_repo = FornecedorRepository()
+fornecedor_repo = FornecedorRepositoryCache()
 auth_service = AutenticacaoService()
 crud_service = CRUDService(produto_repo, 'Produto')
 
@@ -36,6 +37,7 @@ crud_service = CRUDService(produto_repo, 'Produto')
 
 @produtos_bp.route('/')
 @produtos_bp.route('/listar')
+@condicional(lambda: versao_consulta("FROM produtos", ['data_atualizacao']))
 def listar():
     """
     Lista todos os produtos cadastrados no sistema.
@@ -57,6 +59,38 @@ def listar():
     return render_template('produtos/listar.html', produtos=produtos, usuario_logado=usuario_logado)
 
 
+# ============================================
+# RF06.3 - AÇÕES EM LOTE (ATIVAR / DESATIVAR)
+# ============================================
+
+@produtos_bp.route('/acoes-em-lote', methods=['POST'])
+def acoes_em_lote():
+    """
+    Ativa ou desativa vários produtos selecionados na listagem.
+    
+    Executa um único UPDATE para todos os IDs, com auditoria em lote.
+    """
+    usuario_logado = auth_service.verificar_permissao(['administrador'])
+    if not usuario_logado:
+        flash('Acesso negado.', 'danger')
+        return redirect(url_for('produtos.listar'))
+    
+    acao = request.form.get('acao')
+    if acao not in ('ativar', 'desativar'):
+        flash('Ação em lote inválida.', 'danger')
+        return redirect(url_for('produtos.listar'))
+    
+    ids = UtilsService.extrair_ids(request.form.getlist('ids'))
+    if not ids:
+        flash('Selecione ao menos um produto.', 'warning')
+        return redirect(url_for('produtos.listar'))
+    
+    ativo = acao == 'ativar'
+    crud_service.atualizar_em_lote(ids, 'ativo', ativo, usuario_logado['id'],
+                                   descricao=f"Produto {'ativado' if ativo else 'desativado'} em lote")
+    return redirect(url_for('produtos.listar'))
+
+
 # ============================================
 # RF06.2 - CRIAR PRODUTO
 # ============================================
@@ -268,10 +302,8 @@ def excluir(id):
             flash('Você não tem permissão para excluir este produto.', 'danger')
             return redirect(url_for('produtos.listar'))
     
-    # Verifica se há dependências que impedem a exclusão
-    bloqueios = crud_service.verificar_dependencias(id, [
-        {'tabela': 'itens_pedido', 'campo': 'produto_id', 'mensagem': 'itens de pedido'}
-    ])
+    # Verifica se há dependências que impedem a exclusão (FKs que referenciam produtos)
+    bloqueios = crud_service.verificar_dependencias(id)
     
     # Se houver dependências, bloqueia a exclusão
     if bloqueios:
@@ -320,25 +352,41 @@ def detalhes(id):
 # ============================================
 # ROTA: VITRINE PÚBLICA DE PRODUTOS
 # ============================================
+def _filtros_vitrine() -> dict:
+    return {
+        'categoria': request.args.get('categoria'),
+        'escola': request.args.get('escola'),
+        'busca': request.args.get('busca')
+    }
+
+
+async def _versao_vitrine():
+    """Versão dos produtos exibidos com os filtros atuais (ETag da vitrine)"""
+    origem, parametros = produto_repo.origem_vitrine(_filtros_vitrine())
+    return await versao_consulta_async(origem, ['p.data_atualizacao', 'f.data_atualizacao',
+                                                'u.data_atualizacao', 'e.data_atualizacao'], parametros)
+
+
 @produtos_bp.route('/vitrine')
-def vitrine():
+@condicional(_versao_vitrine)
+async def vitrine():
     """
     Rota pública que lista produtos ativos disponíveis na vitrine.
 
+    View assíncrona: a consulta usa o pool de DatabaseAsync, liberando o
+    worker enquanto aguarda o PostgreSQL.
+
     Aceita parâmetros de query string para filtro:
     - categoria
     - escola
     - busca (nome do produto)
+
+    GET condicional: se os produtos filtrados não mudaram desde o ETag do
+    navegador, responde 304 sem a consulta completa nem a renderização.
     """
     usuario_logado = auth_service.verificar_sessao()
 
-    filtros = {
-        'categoria': request.args.get('categoria'),
-        'escola': request.args.get('escola'),
-        'busca': request.args.get('busca')
-    }
-
-    produtos = produto_repo.listar_vitrine(filtros)
+    produtos = await produto_repo.listar_vitrine_async(_filtros_vitrine())
 
     return render_template('produtos/vitrine.html', produtos=produtos, usuario_logado=usuario_logado)
 
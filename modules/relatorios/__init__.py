@@ -0,0 +1,7 @@
+"""
+Módulo de Relatórios
+Dashboards de vendas e estoque lidos dos rollups materializados
+"""
+from .module import relatorios_bp
+
+__all__ = ['relatorios_bp']
@@ -0,0 +1,133 @@
+"""
+============================================
+RELATÓRIOS - DASHBOARDS DE VENDAS E ESTOQUE
+============================================
+Este módulo é responsável por:
+- Dashboard de vendas por período, produto/tamanho e status
+- GMV por escola (administrador)
+- Estoque com vendas dos últimos 30 dias
+
+Os dados vêm exclusivamente de resumo_vendas_diario e mv_estoque_produtos,
+mantidos por core/relatorios.py; nenhuma consulta varre pedidos/itens_pedido.
+"""
+
+from datetime import date, timedelta
+from functools import partial
+from flask import Blueprint, render_template, request, redirect, url_for, flash
+from core.repositories import RelatorioRepository, EscolaRepositoryCache, FornecedorRepositoryCache
+from core.services import AutenticacaoService
+from core.paralelo import ExecucaoParalela
+from core.relatorios import atualizador_relatorios, STATUS_VENDA
+
+# Blueprint e Serviços
+relatorios_bp = Blueprint('relatorios', __name__, url_prefix='/relatorios')
+relatorio_repo = RelatorioRepository()
+escola_repo = EscolaRepositoryCache()
+fornecedor_repo = FornecedorRepositoryCache()
+auth_service = AutenticacaoService()
+
+# Período padrão do dashboard (dias)
+PERIODO_PADRAO_DIAS = 30
+
+
+# ============================================
+# DASHBOARD
+# ============================================
+
+@relatorios_bp.route('/')
+@relatorios_bp.route('/dashboard')
+def dashboard():
+    """Exibe o dashboard de vendas e estoque conforme o perfil do usuário"""
+    # Administrador vê tudo; escola e fornecedor apenas os próprios dados
+    usuario_logado = auth_service.verificar_permissao(['administrador', 'escola', 'fornecedor'])
+    if not usuario_logado:
+        flash('Acesso negado.', 'danger')
+        return redirect(url_for('home'))
+    
+    filtros = _coletar_filtros(request.args)
+    
+    if usuario_logado['tipo'] == 'escola':
+        escola = escola_repo.buscar_por_usuario_id(usuario_logado['id'])
+        if not escola:
+            flash('Escola não encontrada.', 'danger')
+            return redirect(url_for('home'))
+        filtros['escola_id'] = escola['id']
+    elif usuario_logado['tipo'] == 'fornecedor':
+        fornecedor = fornecedor_repo.buscar_por_usuario_id(usuario_logado['id'])
+        if not fornecedor:
+            flash('Fornecedor não encontrado.', 'danger')
+            return redirect(url_for('home'))
+        filtros['fornecedor_id'] = fornecedor['id']
+    
+    # Vendas confirmadas (GMV) para período e produtos; status usa todos os pedidos
+    filtros_venda = dict(filtros, status=STATUS_VENDA)
+    tarefas = {
+        'periodo': partial(relatorio_repo.vendas_por_periodo, filtros_venda),
+        'produtos': partial(relatorio_repo.vendas_por_produto, filtros_venda),
+        'status': partial(relatorio_repo.vendas_por_status, filtros),
+        'estoque': partial(relatorio_repo.estoque, filtros),
+    }
+    if usuario_logado['tipo'] == 'administrador':
+        tarefas['escolas'] = partial(relatorio_repo.gmv_por_escola, filtros_venda)
+    resultados = ExecucaoParalela.executar(tarefas)
+    
+    totais = {
+        'quantidade': sum(linha['quantidade'] or 0 for linha in resultados['periodo']),
+        'receita': sum(linha['receita'] or 0 for linha in resultados['periodo'])
+    }
+    
+    return render_template('relatorios/dashboard.html',
+                           filtros=filtros,
+                           totais=totais,
+                           granularidades=RelatorioRepository.GRANULARIDADES,
+                           **resultados)
+
+
+# ============================================
+# ATUALIZAÇÃO MANUAL DOS ROLLUPS
+# ============================================
+
+@relatorios_bp.route('/atualizar', methods=['POST'])
+def atualizar():
+    """Força um ciclo de atualização dos rollups (administrador)"""
+    usuario_logado = auth_service.verificar_permissao(['administrador'])
+    if not usuario_logado:
+        flash('Acesso negado.', 'danger')
+        return redirect(url_for('home'))
+    
+    resultado = atualizador_relatorios.executar_ciclo(completo=request.form.get('completo') == 'on')
+    
+    if resultado is None:
+        flash('Erro ao atualizar os relatórios.', 'danger')
+    elif not resultado.get('executado'):
+        flash('Os relatórios já estão sendo atualizados. Tente novamente em instantes.', 'info')
+    else:
+        flash(f"Relatórios atualizados em {resultado['duracao_ms']} ms.", 'success')
+    return redirect(url_for('relatorios.dashboard'))
+
+
+# ============================================
+# FUNÇÕES AUXILIARES
+# ============================================
+
+def _coletar_filtros(args) -> dict:
+    """Lê período (data_inicio/data_fim, ISO) e granularidade da query string"""
+    hoje = date.today()
+    data_fim = _ler_data(args.get('data_fim'), hoje)
+    data_inicio = _ler_data(args.get('data_inicio'), data_fim - timedelta(days=PERIODO_PADRAO_DIAS - 1))
+    if data_inicio > data_fim:
+        data_inicio, data_fim = data_fim, data_inicio
+    
+    granularidade = args.get('granularidade', 'dia')
+    if granularidade not in RelatorioRepository.GRANULARIDADES:
+        granularidade = 'dia'
+    
+    return {'data_inicio': data_inicio, 'data_fim': data_fim, 'granularidade': granularidade}
+
+
+def _ler_data(valor, padrao: date) -> date:
+    """Converte 'AAAA-MM-DD' em date, usando o padrão se vazio ou inválido"""
+    try:
+        return date.fromisoformat(valor) if valor else padrao
+    except ValueError:
+        return padrao
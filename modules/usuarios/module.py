@@ -12,30 +12,50 @@ Este módulo é responsável por:
 Controla o processo de controle de usuários no sistema.
 """
 
+from datetime import datetime, timedelta
 from flask import Blueprint, render_template, request, redirect, url_for, flash
-from core.repositories import UsuarioRepository, EscolaRepository, FornecedorRepository, ResponsavelRepository
-from core.services import AutenticacaoService, CRUDService, ValidacaoService, LogService
+from core.repositories import (UsuarioRepository, EscolaRepositoryCache, FornecedorRepositoryCache,
+                               ResponsavelRepositoryCache, LogAlteracaoRepository)
+from core.services import AutenticacaoService, CRUDService, ValidacaoService, LogService, UtilsService
 from core.database import Database
-import json
-import re
+from core.resposta import condicional, versao_consulta
+from core.dependencias import verificador_dependencias
+from core.auditoria import Auditoria
+from config import LOGS_PERIODO_CONSULTA_DIAS, LOGS_POR_PAGINA
 
 # Blueprint e Serviços
 usuarios_bp = Blueprint('usuarios', __name__, url_prefix='/usuarios')
 usuario_repo = UsuarioRepository()
-escola_repo = EscolaRepository()
-fornecedor_repo = FornecedorRepository()
-responsavel_repo = ResponsavelRepository()
+escola_repo = EscolaRepositoryCache()
+fornecedor_repo = FornecedorRepositoryCache()
+responsavel_repo = ResponsavelRepositoryCache()
+log_repo = LogAlteracaoRepository()
 auth_service = AutenticacaoService()
 crud_service = CRUDService(usuario_repo, 'Usuário')
 validacao = ValidacaoService()
 
+# Tabela de vínculo de cada tipo de usuário (usada nas checagens de dependência)
+_TABELAS_VINCULO = {'escola': 'escolas', 'fornecedor': 'fornecedores', 'responsavel': 'responsaveis'}
+
+# Janelas (em dias) oferecidas nas telas de logs; o filtro pela data limita
+# a consulta às partições mensais do período
+PERIODOS_LOGS = sorted({7, 30, 90, 365, LOGS_PERIODO_CONSULTA_DIAS})
+
 
 # ============================================
 # RF01.2 - CONSULTAR USUÁRIOS (LISTAGEM)
 # ============================================
 
+def _versao_listagem():
+    """Versão dos usuários listados (ETag); apenas para administradores"""
+    if not auth_service.verificar_permissao(['administrador']):
+        return None
+    return versao_consulta("FROM usuarios", ['data_atualizacao'])
+
+
 @usuarios_bp.route('/')
 @usuarios_bp.route('/listar')
+@condicional(_versao_listagem)
 def listar():
     """Lista todos os usuários cadastrados"""
     usuario_logado = auth_service.verificar_permissao(['administrador'])
@@ -53,6 +73,35 @@ def listar():
                          usuarios=usuarios)
 
 
+# ============================================
+# RF01.3 - AÇÕES EM LOTE (ATIVAR / DESATIVAR)
+# ============================================
+
+@usuarios_bp.route('/acoes-em-lote', methods=['POST'])
+def acoes_em_lote():
+    """Ativa ou desativa vários usuários selecionados na listagem"""
+    usuario_logado = auth_service.verificar_permissao(['administrador'])
+    if not usuario_logado:
+        flash('Acesso negado. Apenas administradores podem executar ações em lote.', 'danger')
+        return redirect(url_for('home'))
+    
+    acao = request.form.get('acao')
+    if acao not in ('ativar', 'desativar'):
+        flash('Ação em lote inválida.', 'danger')
+        return redirect(url_for('usuarios.listar'))
+    
+    # O próprio administrador nunca é desativado (garante ao menos um admin ativo)
+    ids = [i for i in UtilsService.extrair_ids(request.form.getlist('ids')) if i != usuario_logado['id']]
+    if not ids:
+        flash('Selecione ao menos um usuário.', 'warning')
+        return redirect(url_for('usuarios.listar'))
+    
+    ativo = acao == 'ativar'
+    crud_service.atualizar_em_lote(ids, 'ativo', ativo, usuario_logado['id'],
+                                   descricao=f"Usuário {'ativado' if ativo else 'desativado'} em lote")
+    return redirect(url_for('usuarios.listar'))
+
+
 # ============================================
 # RF01.1 - CADASTRAR USUÁRIO
 # ============================================
@@ -130,15 +179,15 @@ def visualizar(id):
         flash('Usuário não encontrado.', 'danger')
         return redirect(url_for('usuarios.listar'))
     
-    # Busca informações complementares
+    # Informação complementar: só a tabela de vínculo do tipo do usuário
+    vinculos = {
+        'escola': escola_repo,
+        'fornecedor': fornecedor_repo,
+        'responsavel': responsavel_repo,
+    }
     info_complementar = None
-    if isinstance(usuario, dict):
-        if usuario['tipo'] == 'escola':
-            info_complementar = escola_repo.buscar_por_usuario_id(id)
-        elif usuario['tipo'] == 'fornecedor':
-            info_complementar = fornecedor_repo.buscar_por_usuario_id(id)
-        elif usuario['tipo'] == 'responsavel':
-            info_complementar = responsavel_repo.buscar_por_usuario_id(id)
+    if usuario['tipo'] in vinculos:
+        info_complementar = vinculos[usuario['tipo']].buscar_por_usuario_id(id)
     
     return render_template('usuarios/visualizar.html', 
                          usuario=usuario,
@@ -260,18 +309,15 @@ def logs(id):
     
     usuario = Database.executar("SELECT nome, email FROM usuarios WHERE id = %s", (id,), fetchone=True)
     
-    query_logs = """
-        SELECT l.*, u.nome as usuario_nome
-        FROM logs_alteracoes l
-        LEFT JOIN usuarios u ON l.usuario_id = u.id
-        WHERE l.tabela = 'usuarios' AND l.registro_id = %s
-        ORDER BY l.data_alteracao DESC
-    """
-    logs = Database.executar(query_logs, (id,), fetchall=True)
-    logs = _preparar_detalhes_logs(logs or [])
+    dias, filtros = _filtros_logs(request.args)
+    filtros.update(tabela='usuarios', registro_id=id)
+    logs, proxima = log_repo.buscar(filtros, LOGS_POR_PAGINA, _ler_chave_pagina(request.args.get('apos'))) or ([], None)
+    logs = _preparar_detalhes_logs(logs)
     
     # Template movido para templates/logs/
-    return render_template('logs/logs.html', usuario=usuario, logs=logs)
+    return render_template('logs/logs.html', usuario=usuario, logs=logs,
+                           dias=dias, periodos=PERIODOS_LOGS, filtros=filtros,
+                           paginacao=_urls_paginacao(proxima))
 
 
 @usuarios_bp.route('/logs-acesso/<int:id>')
@@ -288,17 +334,19 @@ def logs_acesso(id):
         flash('Usuário não encontrado.', 'danger')
         return redirect(url_for('usuarios.listar'))
     
+    dias, desde = _periodo_logs(request.args)
     query_logs = """
         SELECT *
         FROM logs_acesso
-        WHERE usuario_id = %s
+        WHERE usuario_id = %s AND data_acesso >= %s
         ORDER BY data_acesso DESC
         LIMIT 100
     """
-    logs = Database.executar(query_logs, (id,), fetchall=True)
+    logs = Database.executar(query_logs, (id, desde), fetchall=True)
     
     # Template movido para templates/logs/
-    return render_template('logs/logs_acesso.html', usuario=usuario, logs=logs or [])
+    return render_template('logs/logs_acesso.html', usuario=usuario, logs=logs or [],
+                           dias=dias, periodos=PERIODOS_LOGS)
 
 
 @usuarios_bp.route('/logs')
@@ -309,37 +357,22 @@ def logs_sistema():
         flash('Acesso negado. Apenas administradores podem visualizar logs.', 'danger')
         return redirect(url_for('home'))
     
-    filtro_acao = request.args.get('acao')
-    filtro_tabela = request.args.get('tabela')
-    filtro_usuario_id = request.args.get('usuario_id')
-    
-    query = """
-        SELECT l.*, u.nome as usuario_nome
-        FROM logs_alteracoes l
-        LEFT JOIN usuarios u ON l.usuario_id = u.id
-        WHERE 1=1
-    """
-    parametros = []
-    
-    if filtro_acao:
-        query += " AND l.acao = %s"
-        parametros.append(filtro_acao)
-    
-    if filtro_tabela:
-        query += " AND l.tabela = %s"
-        parametros.append(filtro_tabela)
-    
-    if filtro_usuario_id:
-        query += " AND l.usuario_id = %s"
-        parametros.append(filtro_usuario_id)
-    
-    query += " ORDER BY l.data_alteracao DESC LIMIT 200"
-    
-    logs = Database.executar(query, tuple(parametros) if parametros else None, fetchall=True)
-    logs = _preparar_detalhes_logs(logs or [])
+    dias, filtros = _filtros_logs(request.args)
+    filtros.update(
+        acao=request.args.get('acao') or None,
+        tabela=request.args.get('tabela') or None,
+        registro_id=request.args.get('registro_id', type=int),
+        usuario_id=request.args.get('usuario_id', type=int),
+        campo=(request.args.get('campo') or '').strip() or None,
+        texto=(request.args.get('q') or '').strip() or None,
+    )
+    logs, proxima = log_repo.buscar(filtros, LOGS_POR_PAGINA, _ler_chave_pagina(request.args.get('apos'))) or ([], None)
+    logs = _preparar_detalhes_logs(logs)
     
     # Template movido para templates/logs/
-    return render_template('logs/logs.html', usuario=None, logs=logs)
+    return render_template('logs/logs.html', usuario=None, logs=logs,
+                           dias=dias, periodos=PERIODOS_LOGS, filtros=filtros,
+                           paginacao=_urls_paginacao(proxima))
 
 
 # ============================================
@@ -347,118 +380,98 @@ def logs_sistema():
 # ============================================
 
 def _verificar_dependencias_usuario(id: int, usuario: dict) -> list:
-    """Verifica dependências de um usuário antes de excluir"""
-    bloqueios = []
+    """
+    Verifica dependências de um usuário antes de excluir.
+
+    Todas as checagens rodam em um único SELECT (VerificadorDependencias);
+    para escola/fornecedor/responsável, as tabelas dependentes vêm das FKs
+    do banco e são filtradas pelo vínculo (via usuario_id).
+    """
     tipo = usuario.get('tipo') if isinstance(usuario, dict) else None
+    checagens = []
     
     if tipo == 'administrador':
-        q = "SELECT COUNT(*) AS total FROM usuarios WHERE tipo = 'administrador' AND id != %s AND ativo = TRUE"
-        r = Database.executar(q, (id,), fetchone=True)
-        if isinstance(r, dict) and int(r['total']) == 0:
-            bloqueios.append('Não é possível excluir: seria o último administrador ativo.')
-    
-    elif tipo == 'escola':
-        escola = escola_repo.buscar_por_usuario_id(id)
-        if isinstance(escola, dict):
-            escola_id = escola['id']
-            checks = [
-                ('homologacao_fornecedores', 'escola_id', 'fornecedores homologados'),
-                ('produtos', 'escola_id', 'produtos'),
-                ('pedidos', 'escola_id', 'pedidos')
-            ]
-            for tabela, campo, msg in checks:
-                q = f"SELECT COUNT(*) AS total FROM {tabela} WHERE {campo} = %s"
-                r = Database.executar(q, (escola_id,), fetchone=True)
-                if isinstance(r, dict) and int(r['total']) > 0:
-                    bloqueios.append(f'Possui {msg} vinculados.')
-    
-    elif tipo == 'fornecedor':
-        forn = fornecedor_repo.buscar_por_usuario_id(id)
-        if isinstance(forn, dict):
-            forn_id = forn['id']
-            checks = [
-                ('produtos', 'fornecedor_id', 'produtos')
-            ]
-            for tabela, campo, msg in checks:
-                q = f"SELECT COUNT(*) AS total FROM {tabela} WHERE {campo} = %s"
-                r = Database.executar(q, (forn_id,), fetchone=True)
-                if isinstance(r, dict) and int(r['total']) > 0:
-                    bloqueios.append(f'Possui {msg} vinculados.')
-    
-    elif tipo == 'responsavel':
-        resp = responsavel_repo.buscar_por_usuario_id(id)
-        if isinstance(resp, dict):
-            resp_id = resp['id']
-            q = "SELECT COUNT(*) AS total FROM pedidos WHERE responsavel_id = %s"
-            r = Database.executar(q, (resp_id,), fetchone=True)
-            if isinstance(r, dict) and int(r['total']) > 0:
-                bloqueios.append('Possui pedidos vinculados ao responsável.')
-    
-    return bloqueios
+        checagens.append({
+            'expressao': "NOT EXISTS (SELECT 1 FROM usuarios WHERE tipo = 'administrador' AND id != %s AND ativo = TRUE)",
+            'parametros': (id,),
+            'bloqueio': 'Não é possível excluir: seria o último administrador ativo.'
+        })
+    
+    elif tipo in _TABELAS_VINCULO:
+        tabela = _TABELAS_VINCULO[tipo]
+        for dependente in verificador_dependencias.dependentes(tabela):
+            dependente['via'] = {'tabela': tabela, 'campo': 'usuario_id'}
+            checagens.append(dependente)
+    
+    encontrados = verificador_dependencias.verificar(id, checagens)
+    if encontrados is None:
+        return ['Não foi possível verificar as dependências.']
+    return [c.get('bloqueio') or f"Possui {c['mensagem']} vinculados." for c in encontrados]
+
+
+def _periodo_logs(args) -> tuple:
+    """Janela da consulta de logs (?dias=N): retorna (dias, data inicial)"""
+    dias = args.get('dias', type=int)
+    if dias not in PERIODOS_LOGS:
+        dias = LOGS_PERIODO_CONSULTA_DIAS
+    return dias, datetime.now() - timedelta(days=dias)
+
+
+def _filtros_logs(args) -> tuple:
+    """
+    Período das telas de logs: ?data_inicio=/&data_fim= (AAAA-MM-DD) têm
+    precedência sobre o atalho ?dias=N. Retorna (dias, filtros).
+    """
+    dias, desde = _periodo_logs(args)
+    filtros = {'desde': desde, 'ate': None, 'data_inicio': None, 'data_fim': None}
+    try:
+        if args.get('data_inicio'):
+            filtros['data_inicio'] = datetime.strptime(args['data_inicio'], '%Y-%m-%d')
+            filtros['desde'] = filtros['data_inicio']
+        if args.get('data_fim'):
+            filtros['data_fim'] = datetime.strptime(args['data_fim'], '%Y-%m-%d')
+            filtros['ate'] = filtros['data_fim'] + timedelta(days=1)
+    except ValueError:
+        flash('Data inválida no filtro de logs; usando o período padrão.', 'warning')
+    return dias, filtros
+
+
+def _ler_chave_pagina(valor):
+    """?apos=<data_alteracao ISO>_<id> -> (datetime, id) para a paginação por keyset"""
+    if not valor:
+        return None
+    try:
+        data, id_log = valor.rsplit('_', 1)
+        return datetime.fromisoformat(data), int(id_log)
+    except ValueError:
+        return None
+
+
+def _urls_paginacao(chave) -> dict:
+    """URLs da primeira página e da seguinte (?apos=<data ISO>_<id>), com os mesmos filtros"""
+    args = request.args.to_dict()
+    args.pop('apos', None)
+    urls = {'primeira': None, 'proxima': None}
+    if 'apos' in request.args:
+        urls['primeira'] = url_for(request.endpoint, **request.view_args, **args)
+    if chave:
+        args['apos'] = f"{chave[0].isoformat()}_{chave[1]}"
+        urls['proxima'] = url_for(request.endpoint, **request.view_args, **args)
+    return urls
 
 
 def _preparar_detalhes_logs(logs):
-    """Converte JSON antigos/novos e calcula mudanças campo a campo"""
-    if not logs:
-        return []
-    
-    def parse_json(texto):
-        if not texto:
-            return {}
-        try:
-            return json.loads(texto)
-        except Exception:
-            return {}
-    
-    campos_ignorados = {"data_atualizacao", "data_cadastro", "id"}
-    
-    def eh_campo_id(chave: str) -> bool:
-        if not isinstance(chave, str):
-            return False
-        return chave == 'id' or chave.endswith('_id')
-    
-    def sanitizar(texto: str) -> str:
-        if not texto:
-            return texto
-        padroes = [
-            r"(?i)\b(id|registro|reg|cod|codigo)\s*[:=#-]?\s*\d+\b",
-            r"#[0-9]+\b",
-        ]
-        resultado = texto
-        for p in padroes:
-            resultado = re.sub(p, '[oculto]', resultado)
-        return resultado
+    """
+    Entrega a cada log as mudanças campo a campo e a descrição sanitizada.
     
+    Usa o diff gravado junto com o log (`diff`/`descricao_segura`); apenas
+    linhas ainda não preenchidas pelo backfill são calculadas aqui.
+    """
     for l in logs:
-        antigos = parse_json(l.get('dados_antigos'))
-        novos = parse_json(l.get('dados_novos'))
-        l['antigos'] = antigos
-        l['novos'] = novos
-        mudancas = []
-        
-        l['descricao'] = sanitizar(l.get('descricao'))
-        
-        acao = l.get('acao')
-        if acao == 'UPDATE':
-            chaves = set(antigos.keys()) | set(novos.keys())
-            for k in sorted(chaves):
-                if k in campos_ignorados or eh_campo_id(k):
-                    continue
-                antes = antigos.get(k)
-                depois = novos.get(k)
-                if antes != depois:
-                    mudancas.append({'campo': k, 'antes': antes, 'depois': depois})
-        elif acao == 'INSERT':
-            for k in sorted(novos.keys()):
-                if k in campos_ignorados or eh_campo_id(k):
-                    continue
-                mudancas.append({'campo': k, 'antes': None, 'depois': novos.get(k)})
-        elif acao == 'DELETE':
-            for k in sorted(antigos.keys()):
-                if k in campos_ignorados or eh_campo_id(k):
-                    continue
-                mudancas.append({'campo': k, 'antes': antigos.get(k), 'depois': None})
-        
-        l['mudancas'] = mudancas
-    
+        if l.get('diff') is not None:
+            l['mudancas'] = l['diff']
+            l['descricao'] = l.get('descricao_segura')
+        else:
+            l['mudancas'] = Auditoria.diff_do_log(l)
+            l['descricao'] = Auditoria.sanitizar_descricao(l.get('descricao'))
     return logs
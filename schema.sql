@@ -2,6 +2,8 @@
 -- CONECTA UNIFORME - SCHEMA DO BANCO DE DADOS
 -- ============================================
 -- Este arquivo contém todas as tabelas necessárias para o sistema
+-- Pode ser reaplicado: objetos com IF NOT EXISTS e dados iniciais
+-- protegidos por NOT EXISTS/ON CONFLICT
 
 -- ============================================
 -- TABELA: usuarios
@@ -24,6 +26,8 @@ CREATE TABLE IF NOT EXISTS usuarios (
 -- TABELA: codigos_acesso
 -- Armazena os códigos temporários de acesso (autenticação)
 -- Cada código tem validade de 24 horas
+-- Consumidos por UPDATE ... RETURNING e varridos após expirar
+-- (core/codigos_acesso.py)
 -- ============================================
 CREATE TABLE IF NOT EXISTS codigos_acesso (
     id SERIAL PRIMARY KEY,
@@ -34,6 +38,21 @@ CREATE TABLE IF NOT EXISTS codigos_acesso (
     usado BOOLEAN DEFAULT FALSE
 );
 
+-- ============================================
+-- TABELA: codigos_acesso_historico
+-- Metadados dos códigos varridos quando CODIGOS_ACESSO_ARQUIVAR=true
+-- (o código em si nunca é arquivado; sem FK para não bloquear a
+-- exclusão de usuários)
+-- ============================================
+CREATE TABLE IF NOT EXISTS codigos_acesso_historico (
+    id INTEGER PRIMARY KEY,
+    usuario_id INTEGER NOT NULL,
+    data_criacao TIMESTAMP,
+    data_expiracao TIMESTAMP NOT NULL,
+    usado BOOLEAN,
+    data_arquivamento TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
 -- ============================================
 -- TABELA: escolas
 -- Armazena informações das escolas cadastradas
@@ -167,60 +186,237 @@ CREATE TABLE IF NOT EXISTS itens_pedido (
     quantidade INTEGER NOT NULL DEFAULT 1,
     preco_unitario DECIMAL(10, 2) NOT NULL,
     subtotal DECIMAL(10, 2) NOT NULL,
-    data_adicao TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    data_adicao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- Fornecedor e tamanho do produto no momento da venda, copiados quando o
+    -- pedido sai do carrinho (DeltasVendas.fixar_dimensoes); o rollup usa
+    -- estes valores, então editar o produto não desloca vendas já registradas
+    fornecedor_id INTEGER,
+    tamanho VARCHAR(20)
 );
 
+-- Bancos criados antes da cópia das dimensões
+ALTER TABLE itens_pedido ADD COLUMN IF NOT EXISTS fornecedor_id INTEGER;
+ALTER TABLE itens_pedido ADD COLUMN IF NOT EXISTS tamanho VARCHAR(20);
+
 -- ============================================
 -- TABELA: logs_alteracoes
 -- Registra todas as alterações importantes no sistema (INSERT, UPDATE, DELETE)
 -- Para auditoria e rastreabilidade
+-- Particionada por mês (data_alteracao); partições mensais criadas e
+-- arquivadas por core/particionamento.py, partição padrão como reserva
+-- Formato compacto (core/auditoria.py): alteracoes guarda só os campos
+-- alterados {campo: [antes, depois]}; snapshot guarda o estado completo
+-- em INSERT/DELETE e a cada LOGS_SNAPSHOT_INTERVALO versões do registro.
+-- dados_antigos/dados_novos (TEXT) existem apenas para linhas legadas.
+-- diff/descricao_segura: o que as telas de logs exibem, calculado na
+-- gravação (linhas antigas: python -m core.auditoria --preencher-diffs)
 -- ============================================
 CREATE TABLE IF NOT EXISTS logs_alteracoes (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     usuario_id INTEGER REFERENCES usuarios(id) ON DELETE RESTRICT,
     tabela VARCHAR(100) NOT NULL,
     registro_id INTEGER NOT NULL,
     acao VARCHAR(20) NOT NULL CHECK (acao IN ('INSERT', 'UPDATE', 'DELETE')),
     dados_antigos TEXT,
     dados_novos TEXT,
-    data_alteracao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    alteracoes JSONB,
+    snapshot JSONB,
+    versao INTEGER,
+    diff JSONB,
+    descricao_segura TEXT,
+    data_alteracao TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     ip_usuario VARCHAR(50),
-    descricao TEXT
-);
+    descricao TEXT,
+    PRIMARY KEY (id, data_alteracao)
+) PARTITION BY RANGE (data_alteracao);
+
+CREATE TABLE IF NOT EXISTS logs_alteracoes_padrao PARTITION OF logs_alteracoes DEFAULT;
 
 -- ============================================
 -- TABELA: logs_acesso
 -- Registra eventos de LOGIN e LOGOFF dos usuários
 -- Separado dos logs de alterações para melhor organização
+-- Particionada por mês (data_acesso), como logs_alteracoes
 -- ============================================
 CREATE TABLE IF NOT EXISTS logs_acesso (
-    id SERIAL PRIMARY KEY,
+    id SERIAL,
     usuario_id INTEGER REFERENCES usuarios(id) ON DELETE RESTRICT,
     acao VARCHAR(20) NOT NULL CHECK (acao IN ('LOGIN', 'LOGOFF')),
     tipo_autenticacao VARCHAR(50), -- 'codigo'
-    data_acesso TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    data_acesso TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
     ip_usuario VARCHAR(50),
     user_agent TEXT,
     sucesso BOOLEAN DEFAULT TRUE,
-    descricao TEXT
+    descricao TEXT,
+    PRIMARY KEY (id, data_acesso)
+) PARTITION BY RANGE (data_acesso);
+
+CREATE TABLE IF NOT EXISTS logs_acesso_padrao PARTITION OF logs_acesso DEFAULT;
+
+-- ============================================
+-- TABELA: resumo_vendas_diario
+-- Rollup diário de vendas por escola, fornecedor, produto, tamanho e status.
+-- Única fonte dos dashboards de /relatorios (nunca leem pedidos/itens_pedido).
+-- escola_id = 0 quando o pedido não possui escola vinculada
+-- ============================================
+CREATE TABLE IF NOT EXISTS resumo_vendas_diario (
+    dia DATE NOT NULL,
+    escola_id INTEGER NOT NULL DEFAULT 0,
+    fornecedor_id INTEGER NOT NULL,
+    produto_id INTEGER NOT NULL,
+    tamanho VARCHAR(20) NOT NULL DEFAULT '',
+    status VARCHAR(20) NOT NULL,
+    quantidade INTEGER NOT NULL DEFAULT 0,
+    receita DECIMAL(14, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (dia, escola_id, fornecedor_id, produto_id, tamanho, status)
 );
 
+-- ============================================
+-- TABELA: resumo_vendas_deltas
+-- Deltas de vendas gravados junto com cada mudança de status/itens de pedido
+-- e somados em resumo_vendas_diario pelo compactador (core/relatorios.py).
+-- chave = idempotência (evento + pedido + versão anterior); deltas compactados
+-- ficam retidos por RELATORIOS_RETENCAO_DELTAS_HORAS para barrar replays
+-- ============================================
+CREATE TABLE IF NOT EXISTS resumo_vendas_deltas (
+    id BIGSERIAL PRIMARY KEY,
+    chave VARCHAR(150) NOT NULL,
+    dia DATE NOT NULL,
+    escola_id INTEGER NOT NULL DEFAULT 0,
+    fornecedor_id INTEGER NOT NULL,
+    produto_id INTEGER NOT NULL,
+    tamanho VARCHAR(20) NOT NULL DEFAULT '',
+    status VARCHAR(20) NOT NULL,
+    quantidade INTEGER NOT NULL,
+    receita DECIMAL(14, 2) NOT NULL,
+    pedido_id INTEGER NOT NULL,
+    status_origem VARCHAR(20),
+    status_destino VARCHAR(20),
+    data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    compactado_em TIMESTAMP,
+    UNIQUE (chave, dia, escola_id, fornecedor_id, produto_id, tamanho, status)
+);
+
+-- ============================================
+-- TABELA: relatorios_controle
+-- Última compactação / recálculo completo dos rollups
+-- ============================================
+CREATE TABLE IF NOT EXISTS relatorios_controle (
+    nome VARCHAR(50) PRIMARY KEY,
+    ultima_execucao TIMESTAMP,
+    ultima_completa TIMESTAMP,
+    duracao_ms INTEGER,
+    deltas_aplicados INTEGER
+);
+
+-- ============================================
+-- VISÃO MATERIALIZADA: mv_estoque_produtos
+-- Estoque atual por produto com vendas dos últimos 30 dias (do rollup).
+-- Atualizada com REFRESH MATERIALIZED VIEW CONCURRENTLY pelo agendador.
+-- Criada já populada: pode ser lida (e atualizada CONCURRENTLY) antes do
+-- primeiro ciclo; o agendador a atualiza logo ao iniciar
+-- ============================================
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_estoque_produtos AS
+SELECT p.id AS produto_id,
+       p.fornecedor_id,
+       COALESCE(p.escola_id, 0) AS escola_id,
+       p.nome,
+       p.categoria,
+       p.tamanho,
+       p.estoque,
+       p.ativo,
+       COALESCE(v.quantidade, 0) AS vendidos_30d
+FROM produtos p
+LEFT JOIN (
+    SELECT produto_id, SUM(quantidade) AS quantidade
+    FROM resumo_vendas_diario
+    WHERE dia >= CURRENT_DATE - 30 AND status IN ('pago', 'enviado', 'entregue')
+    GROUP BY produto_id
+) v ON v.produto_id = p.id
+WITH DATA;
+
 -- ============================================
 -- ÍNDICES PARA MELHORAR PERFORMANCE
 -- ============================================
-CREATE INDEX idx_usuarios_email ON usuarios(email);
-CREATE INDEX idx_usuarios_tipo ON usuarios(tipo);
-CREATE INDEX idx_codigos_acesso_usuario ON codigos_acesso(usuario_id);
-CREATE INDEX idx_produtos_fornecedor ON produtos(fornecedor_id);
-CREATE INDEX idx_produtos_escola ON produtos(escola_id);
-CREATE INDEX idx_pedidos_responsavel ON pedidos(responsavel_id);
-CREATE INDEX idx_pedidos_status ON pedidos(status);
-CREATE INDEX idx_itens_pedido_pedido ON itens_pedido(pedido_id);
-CREATE INDEX idx_logs_usuario ON logs_alteracoes(usuario_id);
-CREATE INDEX idx_logs_tabela ON logs_alteracoes(tabela);
+CREATE INDEX IF NOT EXISTS idx_usuarios_email ON usuarios(email);
+CREATE INDEX IF NOT EXISTS idx_usuarios_tipo ON usuarios(tipo);
+CREATE INDEX IF NOT EXISTS idx_codigos_acesso_usuario ON codigos_acesso(usuario_id);
+-- Só códigos não usados: a validação encontra o código do usuário sem
+-- tocar no histórico de códigos consumidos
+CREATE INDEX IF NOT EXISTS idx_codigos_acesso_validos ON codigos_acesso(usuario_id, codigo, data_criacao DESC)
+    INCLUDE (data_expiracao) WHERE usado = FALSE;
+CREATE INDEX IF NOT EXISTS idx_codigos_acesso_expiracao ON codigos_acesso(data_expiracao);
+CREATE INDEX IF NOT EXISTS idx_produtos_fornecedor ON produtos(fornecedor_id);
+CREATE INDEX IF NOT EXISTS idx_produtos_escola ON produtos(escola_id);
+CREATE INDEX IF NOT EXISTS idx_pedidos_responsavel ON pedidos(responsavel_id);
+CREATE INDEX IF NOT EXISTS idx_pedidos_status ON pedidos(status);
+CREATE INDEX IF NOT EXISTS idx_itens_pedido_pedido ON itens_pedido(pedido_id);
+-- logs_alteracoes: um índice por forma de consulta de LogAlteracaoRepository.buscar
+-- (sempre data_alteracao >= desde, ORDER BY data_alteracao DESC, id DESC LIMIT,
+-- keyset (data_alteracao, id) < apos). Os B-tree terminam na ordenação, então
+-- a página sai sem sort; acao (3 valores) não tem índice próprio e é filtrada
+-- sobre o índice escolhido para os demais filtros.
+-- Autor (/usuarios/logs?usuario_id=)
+CREATE INDEX IF NOT EXISTS idx_logs_usuario ON logs_alteracoes(usuario_id, data_alteracao DESC, id DESC);
+-- Tabela sem registro (/usuarios/logs?tabela=)
+CREATE INDEX IF NOT EXISTS idx_logs_tabela ON logs_alteracoes(tabela, data_alteracao DESC, id DESC);
+-- Só período, inclusive combinado com busca textual/campo em intervalos curtos
+-- (também serve a faixa de datas: o BRIN antigo era redundante)
+CREATE INDEX IF NOT EXISTS idx_logs_data ON logs_alteracoes(data_alteracao DESC, id DESC);
+DROP INDEX IF EXISTS idx_logs_data_brin;
+-- Tabela + registro (/usuarios/logs/<id>, Auditoria.reconstruir, próxima
+-- versão): servido pelo índice abaixo; o histórico de um registro é
+-- curto e a ordenação por data é feita sobre essas poucas linhas
+DROP INDEX IF EXISTS idx_logs_registro_data;
+-- Versões por registro. Não é UNIQUE: em tabela particionada o índice
+-- único precisa conter data_alteracao (chave de partição) e, com ela, não
+-- impediria versões repetidas. A unicidade vem de core/auditoria.py, que
+-- trava o registro (advisory lock) antes de ler a última versão. O índice
+-- UNIQUE de versões anteriores deste arquivo é trocado por este; na
+-- criação, versões duplicadas gravadas antes do lock são renumeradas na
+-- ordem dos eventos, a partir da menor versão que sobrou após a retenção.
+DROP INDEX IF EXISTS idx_logs_registro;
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_index WHERE indexrelid = to_regclass('idx_logs_registro_versao') AND indisunique) THEN
+        DROP INDEX idx_logs_registro_versao;
+    END IF;
+    IF to_regclass('idx_logs_registro_versao') IS NULL THEN
+        UPDATE logs_alteracoes l
+        SET versao = n.versao
+        FROM (
+            SELECT id, data_alteracao,
+                   MIN(versao) OVER (PARTITION BY tabela, registro_id)
+                   + ROW_NUMBER() OVER (PARTITION BY tabela, registro_id ORDER BY data_alteracao, id) - 1 AS versao
+            FROM logs_alteracoes
+            WHERE versao IS NOT NULL
+        ) n
+        WHERE l.id = n.id AND l.data_alteracao = n.data_alteracao AND l.versao <> n.versao;
+    END IF;
+END $$;
+CREATE INDEX IF NOT EXISTS idx_logs_registro_versao ON logs_alteracoes(tabela, registro_id, versao);
+-- Backfill de diff (Auditoria.preencher_diffs); vazio depois do backfill
+CREATE INDEX IF NOT EXISTS idx_logs_diff_pendente ON logs_alteracoes(id) WHERE diff IS NULL;
+-- Campo alterado (/usuarios/logs?campo=, diff @> '[{"campo": "preco"}]')
+CREATE INDEX IF NOT EXISTS idx_logs_diff_campos ON logs_alteracoes USING GIN (diff jsonb_path_ops);
+-- Busca textual (/usuarios/logs?q=) em descrição, tabela e nomes dos campos alterados;
+-- a expressão deve ser idêntica a LogAlteracaoRepository.DOCUMENTO_BUSCA
+CREATE INDEX IF NOT EXISTS idx_logs_busca ON logs_alteracoes USING GIN ((
+    to_tsvector('portuguese', coalesce(descricao, '') || ' ' || tabela || ' ' ||
+                coalesce(jsonb_path_query_array(diff, '$[*].campo')::text, ''))
+));
 CREATE INDEX IF NOT EXISTS idx_gestores_escola ON gestores_escolares(escola_id);
-CREATE INDEX IF NOT EXISTS idx_logs_acesso_usuario ON logs_acesso(usuario_id);
+CREATE INDEX IF NOT EXISTS idx_logs_acesso_usuario ON logs_acesso(usuario_id, data_acesso DESC);
 CREATE INDEX IF NOT EXISTS idx_logs_acesso_data ON logs_acesso(data_acesso);
+CREATE INDEX IF NOT EXISTS idx_pedidos_data_pedido ON pedidos(data_pedido);
+CREATE INDEX IF NOT EXISTS idx_resumo_vendas_escola ON resumo_vendas_diario(escola_id, dia);
+CREATE INDEX IF NOT EXISTS idx_resumo_vendas_fornecedor ON resumo_vendas_diario(fornecedor_id, dia);
+CREATE INDEX IF NOT EXISTS idx_resumo_vendas_produto ON resumo_vendas_diario(produto_id, dia);
+CREATE INDEX IF NOT EXISTS idx_resumo_deltas_pendentes ON resumo_vendas_deltas(id) WHERE compactado_em IS NULL;
+CREATE INDEX IF NOT EXISTS idx_resumo_deltas_compactado ON resumo_vendas_deltas(compactado_em);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_estoque_produto ON mv_estoque_produtos(produto_id);
+CREATE INDEX IF NOT EXISTS idx_mv_estoque_fornecedor ON mv_estoque_produtos(fornecedor_id);
+CREATE INDEX IF NOT EXISTS idx_mv_estoque_escola ON mv_estoque_produtos(escola_id);
 
 -- ============================================
 -- DADOS INICIAIS: usuários por email e tipo (evita duplicidade por conflito)
@@ -326,7 +522,8 @@ FROM (VALUES
     ((SELECT id FROM escolas WHERE cnpj = '44.555.666/0001-77'), (SELECT id FROM fornecedores WHERE cnpj = '11.222.333/0001-44'), '2025-02-10 11:30:00', TRUE, 'Produtos de qualidade premium aprovados'),
     ((SELECT id FROM escolas WHERE cnpj = '55.666.777/0001-88'), (SELECT id FROM fornecedores WHERE cnpj = '98.765.432/0001-10'), '2025-03-01 16:00:00', TRUE, 'Homologado após período de teste')
 ) AS v(escola_id, fornecedor_id, data_homologacao, ativo, observacoes)
-WHERE v.escola_id IS NOT NULL AND v.fornecedor_id IS NOT NULL;
+WHERE v.escola_id IS NOT NULL AND v.fornecedor_id IS NOT NULL
+ON CONFLICT (escola_id, fornecedor_id) DO NOTHING;
 
 -- ============================================
 -- DADOS SIMULADOS: Produtos
@@ -356,7 +553,9 @@ FROM (VALUES
     ((SELECT id FROM fornecedores WHERE cnpj = '11.222.333/0001-44'), (SELECT id FROM escolas WHERE cnpj = '44.555.666/0001-77'), 'Calça Social Premium', 'Calça social alfaiataria', 'Calça', 'M', 'Preta', 95.00, 70, TRUE),
     ((SELECT id FROM fornecedores WHERE cnpj = '11.222.333/0001-44'), (SELECT id FROM escolas WHERE cnpj = '44.555.666/0001-77'), 'Mochila Escolar', 'Mochila reforçada com porta notebook', 'Acessório', 'Único', 'Cinza', 120.00, 40, TRUE)
 ) AS v(fornecedor_id, escola_id, nome, descricao, categoria, tamanho, cor, preco, estoque, ativo)
-WHERE v.fornecedor_id IS NOT NULL AND v.escola_id IS NOT NULL;
+WHERE v.fornecedor_id IS NOT NULL AND v.escola_id IS NOT NULL
+AND NOT EXISTS (SELECT 1 FROM produtos p WHERE p.fornecedor_id = v.fornecedor_id AND p.escola_id = v.escola_id
+                AND p.nome = v.nome AND p.tamanho IS NOT DISTINCT FROM v.tamanho);
 
 -- ============================================
 -- DADOS SIMULADOS: Pedidos
@@ -372,7 +571,9 @@ FROM (VALUES
     ((SELECT id FROM responsaveis WHERE cpf = '444.555.666-77'), (SELECT id FROM escolas WHERE cnpj = '22.333.444/0001-55'), 91.80, 'pendente', '2025-11-08 08:30:00', 'Aguardando pagamento'),
     ((SELECT id FROM responsaveis WHERE cpf = '987.654.321-00'), (SELECT id FROM escolas WHERE cnpj = '33.444.555/0001-66'), 52.00, 'cancelado', '2025-10-01 12:00:00', 'Cancelado a pedido do cliente')
 ) AS v(responsavel_id, escola_id, valor_total, status, data_pedido, observacoes)
-WHERE v.responsavel_id IS NOT NULL AND v.escola_id IS NOT NULL;
+WHERE v.responsavel_id IS NOT NULL AND v.escola_id IS NOT NULL
+AND NOT EXISTS (SELECT 1 FROM pedidos p WHERE p.responsavel_id = v.responsavel_id
+                AND p.data_pedido = CAST(v.data_pedido AS TIMESTAMP));
 
 -- ============================================
 -- DADOS SIMULADOS: Itens de Pedido
@@ -405,7 +606,16 @@ FROM (VALUES
     -- Pedido 7 (Cancelado)
     (7, (SELECT id FROM produtos WHERE nome = 'Camisa Social Escolar' LIMIT 1), 1, 52.00, 52.00)
 ) AS v(pedido_id, produto_id, quantidade, preco_unitario, subtotal)
-WHERE v.pedido_id IS NOT NULL AND v.produto_id IS NOT NULL;
+WHERE v.pedido_id IS NOT NULL AND v.produto_id IS NOT NULL
+AND NOT EXISTS (SELECT 1 FROM itens_pedido i WHERE i.pedido_id = v.pedido_id AND i.produto_id = v.produto_id);
+
+-- Dimensões de venda dos itens de pedidos fora do carrinho que ainda não as
+-- têm (dados simulados e bancos anteriores à cópia)
+UPDATE itens_pedido i
+SET fornecedor_id = pr.fornecedor_id, tamanho = COALESCE(pr.tamanho, '')
+FROM produtos pr, pedidos p
+WHERE pr.id = i.produto_id AND p.id = i.pedido_id
+AND i.fornecedor_id IS NULL AND p.status <> 'carrinho';
 
 -- ============================================
 -- DADOS SIMULADOS: Logs de Acesso
@@ -433,7 +643,9 @@ FROM (VALUES
     ((SELECT id FROM usuarios WHERE email = 'victorccanela@gmail.com' AND tipo = 'responsavel'), 'LOGIN', 'codigo', '2025-11-08 20:00:00', '192.168.1.130', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)', FALSE, 'Código inválido'),
     ((SELECT id FROM usuarios WHERE email = 'victorccanela@gmail.com' AND tipo = 'responsavel'), 'LOGIN', 'codigo', '2025-11-08 20:05:00', '192.168.1.130', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)', TRUE, 'Login bem-sucedido após segunda tentativa')
 ) AS v(usuario_id, acao, tipo_autenticacao, data_acesso, ip_usuario, user_agent, sucesso, descricao)
-WHERE v.usuario_id IS NOT NULL;
+WHERE v.usuario_id IS NOT NULL
+AND NOT EXISTS (SELECT 1 FROM logs_acesso l WHERE l.usuario_id = v.usuario_id AND l.acao = v.acao
+                AND l.data_acesso = CAST(v.data_acesso AS TIMESTAMP));
 
 -- ============================================
 -- DADOS SIMULADOS: Logs de Alterações
@@ -473,4 +685,6 @@ FROM (VALUES
     -- Atualização de preço de produto
     ((SELECT id FROM usuarios WHERE email = 'murilosr@outlook.com.br' AND tipo = 'fornecedor'), 'produtos', 5, 'UPDATE', '{"preco": 65.00}', '{"preco": 62.50}', '2025-11-01 08:00:00', '192.168.1.105', 'Preço atualizado - promoção')
 ) AS v(usuario_id, tabela, registro_id, acao, dados_antigos, dados_novos, data_alteracao, ip_usuario, descricao)
-WHERE v.usuario_id IS NOT NULL;
\ No newline at end of file
+WHERE v.usuario_id IS NOT NULL
+AND NOT EXISTS (SELECT 1 FROM logs_alteracoes l WHERE l.tabela = v.tabela AND l.registro_id = v.registro_id
+                AND l.acao = v.acao AND l.data_alteracao = CAST(v.data_alteracao AS TIMESTAMP));
\ No newline at end of file
@@ -90,9 +90,26 @@ const App = (function() {
         }
     }
 
+    /**
+     * Checkbox "selecionar todos" das ações em lote: marca/desmarca os
+     * checkboxes name="ids" da mesma tabela.
+     */
+    function ativarSelecaoEmLote() {
+        document.querySelectorAll('[data-selecionar-todos]').forEach(function(mestre) {
+            mestre.addEventListener('change', function() {
+                const tabela = mestre.closest('table');
+                if (!tabela) return;
+                tabela.querySelectorAll('input[type="checkbox"][name="ids"]').forEach(function(cb) {
+                    cb.checked = mestre.checked;
+                });
+            });
+        });
+    }
+
     return {
         mostrarModal,
-        converterFlashParaModal
+        converterFlashParaModal,
+        ativarSelecaoEmLote
     };
 })();
 
@@ -103,4 +120,6 @@ window.App = App;
 document.addEventListener('DOMContentLoaded', function() {
     // Converter mensagens flash em modais automaticamente
     App.converterFlashParaModal();
+    // Checkboxes de seleção das ações em lote nas listagens
+    App.ativarSelecaoEmLote();
 });